@@ -14,7 +14,7 @@ from app.utils.db_optimizer import (
 )
 from app.core.security import get_current_active_superuser_or_open_access as get_current_active_superuser
 from app.core.scheduler import JobScheduler, update_active_stocks
-from app.utils.cache_manager import CacheManager
+from app.utils.cache_manager import get_cache_backend
 import psutil
 import os
 import time
@@ -158,7 +158,7 @@ async def scheduler_status(current_user = Depends(get_current_active_superuser))
         "status": "running",
         "jobs": formatted_jobs,
         "total_jobs": len(jobs),
-        "cache_stats": CacheManager.get_stats(),
+        "cache_stats": get_cache_backend().get_stats(),
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
 
@@ -177,7 +177,7 @@ async def run_scheduler_job(
         background_tasks.add_task(update_active_stocks)
         return {"status": "scheduled", "message": f"Job '{job_name}' has been scheduled to run", "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     elif job_name == "clear_cache":
-        count = CacheManager.clear_expired()
+        count = get_cache_backend().clear_expired()
         return {"status": "completed", "message": f"Cleared {count} expired cache entries", "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     elif job_name == "optimize_db":
         # Run database optimization in background
@@ -196,7 +196,7 @@ async def cache_stats(current_user = Depends(get_current_active_superuser)):
     """
     Get cache statistics (admin only)
     """
-    stats = CacheManager.get_stats()
+    stats = get_cache_backend().get_stats()
     return {
         **stats,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -213,9 +213,9 @@ async def clear_cache(
     """
     if clear_all:
         # Clear all cache
-        CacheManager.clear()
+        get_cache_backend().clear()
         return {"status": "success", "message": "All cache entries cleared", "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
     else:
         # Clear only expired cache
-        count = CacheManager.clear_expired()
+        count = get_cache_backend().clear_expired()
         return {"status": "success", "message": f"Cleared {count} expired cache entries", "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
@@ -7,10 +7,14 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+from pydantic import BaseModel, Field
 
 from app.core.database import get_db
-from app.models.stocks import Stock, StockPrice
+from app.models.stocks import Stock
 from app.core.security import get_current_active_user
+from app.core.price_loader import load_price_frame
+from app.core.backtest_engine import generate_signal_array, run_backtest_arrays
+from app.core.parameter_sweep import sweep_strategy
 
 router = APIRouter(tags=["backtesting"])
 
@@ -35,46 +39,7 @@ async def backtest_strategy(
     - initial_capital: Initial capital for backtest
     """
     try:
-        # Check if stock exists
-        stock = db.query(Stock).filter(Stock.ticker == ticker).first()
-        if not stock:
-            raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
-        
-        # Parse dates
-        today = datetime.now().date()
-        if end_date:
-            end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        else:
-            end = today
-            
-        if start_date:
-            start = datetime.strptime(start_date, "%Y-%m-%d").date()
-        else:
-            # Default to 1 year lookback if not specified
-            start = end - timedelta(days=365)
-        
-        # Get historical price data
-        prices = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock.id,
-            StockPrice.date >= start,
-            StockPrice.date <= end
-        ).order_by(StockPrice.date).all()
-        
-        if not prices:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"No price data found for {ticker} between {start} and {end}"
-            )
-            
-        # Convert to pandas DataFrame
-        price_data = pd.DataFrame([{
-            'date': p.date,
-            'open': p.open,
-            'high': p.high,
-            'low': p.low,
-            'close': p.close,
-            'volume': p.volume
-        } for p in prices])
+        price_data, start, end = load_price_data(db, ticker, start_date, end_date)
         
         # Fetch the strategy details - this would typically come from a database
         # For now, we'll simulate with predefined strategies
@@ -97,9 +62,110 @@ async def backtest_strategy(
             'results': results
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Backtest error: {str(e)}")
 
+class SweepRequest(BaseModel):
+    strategy_id: str
+    ticker: str
+    param_ranges: Dict[str, Any] = Field(
+        ..., description='Values per parameter, e.g. {"fast_ma": {"start": 5, "stop": 100, "step": 5}, "slow_ma": [50, 100, 200]}'
+    )
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    initial_capital: float = 10000.0
+    rank_by: str = "total_return_percent"
+    ascending: bool = False
+    top_n: Optional[int] = 20
+
+@router.post("/backtest/sweep")
+def sweep_backtest(
+    request: SweepRequest,
+    db: Session = Depends(get_db),
+    _: Dict = Depends(get_current_active_user)
+):
+    """
+    Backtest every combination of parameter ranges for a strategy
+    
+    Prices are loaded once and each distinct indicator window is computed
+    once for the whole grid. Returns the combinations ranked by ``rank_by``.
+    
+    A plain ``def`` endpoint: the CPU-bound sweep runs in FastAPI's
+    threadpool instead of blocking the event loop.
+    """
+    try:
+        price_data, start, end = load_price_data(db, request.ticker, request.start_date, request.end_date)
+        strategy_params = get_strategy_params(request.strategy_id)
+        
+        sweep = sweep_strategy(
+            price_data,
+            strategy_params,
+            request.param_ranges,
+            initial_capital=request.initial_capital,
+            rank_by=request.rank_by,
+            ascending=request.ascending,
+            top_n=request.top_n
+        )
+        
+        return {
+            'status': 'success',
+            'ticker': request.ticker,
+            'strategy_id': request.strategy_id,
+            'strategy_name': strategy_params.get('name', 'Unknown Strategy'),
+            'period': {
+                'start': start.strftime("%Y-%m-%d"),
+                'end': end.strftime("%Y-%m-%d"),
+                'days': (end - start).days
+            },
+            'initial_capital': request.initial_capital,
+            **sweep
+        }
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sweep error: {str(e)}")
+
+def load_price_data(db: Session, ticker: str, start_date: Optional[str], end_date: Optional[str]):
+    """
+    Load the price history used for a backtest
+    
+    Returns:
+        Tuple of (DataFrame with date/open/high/low/close/volume, start date, end date)
+    """
+    # Check if stock exists
+    stock = db.query(Stock).filter(Stock.ticker == ticker).first()
+    if not stock:
+        raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
+    
+    # Parse dates
+    today = datetime.now().date()
+    if end_date:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    else:
+        end = today
+        
+    if start_date:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    else:
+        # Default to 1 year lookback if not specified
+        start = end - timedelta(days=365)
+    
+    # Get historical price data as columns
+    price_data = load_price_frame(db, stock.id, start, end)
+    
+    if price_data.empty:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"No price data found for {ticker} between {start} and {end}"
+        )
+    
+    return price_data, start, end
+
 def get_strategy_params(strategy_id: str) -> Dict:
     """
     Get strategy parameters based on strategy ID
@@ -150,207 +216,25 @@ def run_backtest(price_data: pd.DataFrame, strategy_params: Dict, initial_capita
     """
     Run backtest simulation based on strategy parameters and price data
     """
-    # Initialize results
-    trades = []
-    portfolio_value = []
-    cash = initial_capital
-    shares = 0
-    
     # Get strategy type
     strategy_type = strategy_params.get('type', 'technical')
     params = strategy_params.get('parameters', {})
     
-    # Generate signals based on strategy type
-    signals = generate_signals(price_data, strategy_type, params)
-    
-    # Simulate trading
-    for i in range(len(price_data)):
-        date = price_data.iloc[i]['date']
-        close_price = price_data.iloc[i]['close']
-        
-        # Check for buy signal
-        if signals[i] == 1 and cash > 0:
-            # Buy as many shares as possible
-            max_shares = int(cash / close_price)
-            if max_shares > 0:
-                shares += max_shares
-                cost = max_shares * close_price
-                cash -= cost
-                
-                trades.append({
-                    'date': date.strftime("%Y-%m-%d"),
-                    'type': 'BUY',
-                    'shares': max_shares,
-                    'price': close_price,
-                    'cost': cost,
-                    'remaining_cash': cash
-                })
-        
-        # Check for sell signal
-        elif signals[i] == -1 and shares > 0:
-            # Sell all shares
-            proceeds = shares * close_price
-            cash += proceeds
-            
-            trades.append({
-                'date': date.strftime("%Y-%m-%d"),
-                'type': 'SELL',
-                'shares': shares,
-                'price': close_price,
-                'proceeds': proceeds,
-                'remaining_cash': cash
-            })
-            
-            shares = 0
-        
-        # Calculate portfolio value
-        portfolio_value.append({
-            'date': date.strftime("%Y-%m-%d"),
-            'close': close_price,
-            'shares': shares,
-            'cash': cash,
-            'value': cash + (shares * close_price)
-        })
-    
-    # Calculate performance metrics
-    if not portfolio_value:
-        return {
-            'trades': [],
-            'portfolio_history': [],
-            'metrics': {
-                'total_return': 0,
-                'total_return_percent': 0,
-                'annualized_return': 0,
-                'max_drawdown': 0,
-                'win_rate': 0,
-                'total_trades': 0
-            }
-        }
+    if price_data.empty:
+        return run_backtest_arrays(np.array([], dtype='datetime64[ns]'), np.array([]), np.array([]), initial_capital)
     
-    start_value = initial_capital
-    end_value = portfolio_value[-1]['value']
-    total_return = end_value - start_value
-    total_return_percent = (total_return / start_value) * 100
+    close = price_data['close'].to_numpy(dtype=np.float64)
+    signals = generate_signal_array(close, strategy_type, params)
     
-    # Calculate max drawdown
-    max_value = start_value
-    max_drawdown = 0
-    
-    for pv in portfolio_value:
-        if pv['value'] > max_value:
-            max_value = pv['value']
-        drawdown = (max_value - pv['value']) / max_value * 100
-        max_drawdown = max(max_drawdown, drawdown)
-    
-    # Calculate win rate
-    winning_trades = 0
-    current_buy = None
-    
-    for trade in trades:
-        if trade['type'] == 'BUY':
-            current_buy = trade
-        elif trade['type'] == 'SELL' and current_buy:
-            if trade['price'] > current_buy['price']:
-                winning_trades += 1
-            current_buy = None
-    
-    win_rate = (winning_trades / (len(trades) // 2)) * 100 if trades and len(trades) >= 2 else 0
-    
-    # Calculate annualized return
-    days = (price_data.iloc[-1]['date'] - price_data.iloc[0]['date']).days
-    annualized_return = ((1 + (total_return / start_value)) ** (365 / days) - 1) * 100 if days > 0 else 0
-    
-    return {
-        'trades': trades,
-        'portfolio_history': portfolio_value[::max(1, len(portfolio_value)//100)],  # Downsample to ~100 points
-        'metrics': {
-            'total_return': round(total_return, 2),
-            'total_return_percent': round(total_return_percent, 2),
-            'annualized_return': round(annualized_return, 2),
-            'max_drawdown': round(max_drawdown, 2),
-            'win_rate': round(win_rate, 2),
-            'total_trades': len(trades),
-            'profitable_trades': winning_trades,
-            'loss_making_trades': (len(trades) // 2) - winning_trades
-        }
-    }
+    return run_backtest_arrays(price_data['date'].to_numpy(), close, signals, initial_capital)
 
 def generate_signals(price_data: pd.DataFrame, strategy_type: str, params: Dict) -> List[int]:
     """
     Generate trading signals based on strategy parameters
     0 = Hold, 1 = Buy, -1 = Sell
     """
-    signals = [0] * len(price_data)
-    
-    if strategy_type == 'technical':
-        # Implement technical strategy signals
-        if 'fast_ma' in params and 'slow_ma' in params:
-            # Golden Cross / Death Cross strategy
-            fast_period = params.get('fast_ma', 50)
-            slow_period = params.get('slow_ma', 200)
-            
-            # Calculate moving averages
-            price_data['fast_ma'] = price_data['close'].rolling(window=fast_period).mean()
-            price_data['slow_ma'] = price_data['close'].rolling(window=slow_period).mean()
-            
-            # Generate signals
-            for i in range(1, len(price_data)):
-                if pd.notna(price_data.iloc[i]['fast_ma']) and pd.notna(price_data.iloc[i]['slow_ma']):
-                    # Buy when fast crosses above slow (Golden Cross)
-                    if (price_data.iloc[i-1]['fast_ma'] <= price_data.iloc[i-1]['slow_ma'] and
-                        price_data.iloc[i]['fast_ma'] > price_data.iloc[i]['slow_ma']):
-                        signals[i] = 1
-                    
-                    # Sell when fast crosses below slow (Death Cross)
-                    elif (price_data.iloc[i-1]['fast_ma'] >= price_data.iloc[i-1]['slow_ma'] and
-                          price_data.iloc[i]['fast_ma'] < price_data.iloc[i]['slow_ma']):
-                        signals[i] = -1
-        
-        elif 'rsi_period' in params and 'rsi_threshold' in params:
-            # RSI strategy
-            rsi_period = params.get('rsi_period', 14)
-            oversold = params.get('rsi_threshold', 30)
-            overbought = params.get('overbought_threshold', 70)
-            
-            # Calculate RSI
-            delta = price_data['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-            
-            rs = gain / loss
-            price_data['rsi'] = 100 - (100 / (1 + rs))
-            
-            # Generate signals
-            for i in range(1, len(price_data)):
-                if pd.notna(price_data.iloc[i]['rsi']):
-                    # Buy when RSI crosses below oversold threshold
-                    if (price_data.iloc[i-1]['rsi'] >= oversold and
-                        price_data.iloc[i]['rsi'] < oversold):
-                        signals[i] = 1
-                    
-                    # Sell when RSI crosses above overbought threshold
-                    elif (price_data.iloc[i-1]['rsi'] <= overbought and
-                          price_data.iloc[i]['rsi'] > overbought):
-                        signals[i] = -1
-    
-    elif strategy_type == 'ai':
-        # Simulate AI strategy with random signals for demonstration
-        # In a real implementation, this would use an actual AI model
-        import random
-        
-        # Generate signals with slight upward bias
-        for i in range(len(price_data)):
-            if i > 0 and signals[i-1] != 0:
-                # After a trade, wait a few days
-                continue
-                
-            rand_val = random.random()
-            if rand_val > 0.95:  # 5% chance of buy signal
-                signals[i] = 1
-            elif rand_val < 0.03:  # 3% chance of sell signal
-                signals[i] = -1
-    
-    return signals
+    close = price_data['close'].to_numpy(dtype=np.float64)
+    return generate_signal_array(close, strategy_type, params).tolist()
 
 @router.post("/backtest/export")
 async def export_backtest_results(
@@ -17,6 +17,9 @@ from app.models.big_data import (
 from app.core.data_sources import get_data_source_manager
 from app.core.data_processor import get_data_processor
 from app.core.ml_engine import get_ml_engine
+from app.core.price_loader import load_latest_bars
+from app.core import global_model
+from app.core.global_model import GLOBAL_MODEL_TYPES
 
 router = APIRouter(tags=["big_data"])
 
@@ -169,6 +172,49 @@ async def train_model(
             "model_id": model_id
         }
 
+@router.post("/ml/train-global")
+async def train_global_model(
+    model_type: str = "gbm",
+    days: int = 730,
+    prediction_horizon: int = 5,
+    interval: str = "1d",
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Train one pooled model on all active stocks
+    
+    Served by ``/ml/predict/{ticker}`` for every stock when ``ML_MODEL_MODE=global``.
+    
+    Args:
+        model_type: Type of model to train (linear, forest, gbm)
+        days: Number of days of historical data per stock
+        prediction_horizon: Number of intervals to predict into the future
+        interval: Data interval
+    """
+    if model_type not in GLOBAL_MODEL_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported model type for a global model: {model_type}")
+    
+    if background_tasks:
+        # Train in background
+        background_tasks.add_task(global_model.train_global_model, db, None, model_type, interval,
+                                  prediction_horizon, days)
+        return {
+            "message": f"Started training global {model_type} model",
+            "model_type": model_type
+        }
+    
+    result = global_model.train_global_model(db, None, model_type, interval, prediction_horizon, days)
+    if result["status"] != "success":
+        raise HTTPException(status_code=500, detail=result["message"])
+    
+    return {
+        "message": f"Successfully trained global {model_type} model on {result['tickers']} stocks",
+        "model_type": model_type,
+        "model_id": str(result["model_id"]),
+        "metrics": result["metrics"]
+    }
+
 @router.get("/ml/models")
 async def get_ml_models(
     ticker: Optional[str] = None,
@@ -179,7 +225,7 @@ async def get_ml_models(
     query = db.query(MLModel)
     
     if ticker:
-        query = query.filter(MLModel.name.like(f"{ticker}_%"))
+        query = query.filter(MLModel.ticker == ticker)
     
     if active_only:
         query = query.filter(MLModel.is_active == True)
@@ -345,12 +391,17 @@ async def get_trading_signals_dashboard(db: Session = Depends(get_db)):
                        .limit(100)
                        .all())
     
+    # Stocks and their latest bars in two queries instead of two per prediction
+    stock_ids = {prediction.stock_id for prediction in recent_predictions}
+    stocks = {stock.id: stock for stock in db.query(Stock).filter(Stock.id.in_(stock_ids)).all()} if stock_ids else {}
+    latest_bars = load_latest_bars(db, stocks.keys())
+    
     # Group by signal type
     buy_signals = []
     sell_signals = []
     
     for prediction in recent_predictions:
-        stock = db.query(Stock).filter(Stock.id == prediction.stock_id).first()
+        stock = stocks.get(prediction.stock_id)
         if not stock:
             continue
             
@@ -367,13 +418,9 @@ async def get_trading_signals_dashboard(db: Session = Depends(get_db)):
         }
         
         # Get current price
-        latest_price = (db.query(StockPrice)
-                      .filter(StockPrice.stock_id == stock.id)
-                      .order_by(StockPrice.date.desc())
-                      .first())
-        
-        if latest_price:
-            signal_data["current_price"] = latest_price.close
+        bars = latest_bars.get(stock.id)
+        if bars:
+            signal_data["current_price"] = bars.latest.close
             
         if prediction.signal == "BUY":
             buy_signals.append(signal_data)
@@ -547,6 +594,10 @@ async def get_trading_signals_dashboard(db: Session = Depends(get_db)):
     # List of top stocks to analyze
     top_stocks = ['BBRI', 'BBCA', 'TLKM', 'ASII', 'UNVR', 'BMRI', 'INDF', 'SMGR', 'PGAS', 'ICBP']
     
+    # Latest and previous bars of all listed stocks in one query
+    stock_ids = dict(db.query(Stock.ticker, Stock.id).filter(Stock.ticker.in_(top_stocks)).all())
+    latest_bars = load_latest_bars(db, stock_ids.values())
+    
     # Get signals for each stock
     signals = []
     for ticker in top_stocks:
@@ -554,16 +605,14 @@ async def get_trading_signals_dashboard(db: Session = Depends(get_db)):
             # Get signal strength metrics
             signal_metrics = ml_engine.calculate_signal_strength(ticker)
             
-            # Get latest stock price
-            latest_price = db.query(StockPrice).filter(
-                StockPrice.ticker == ticker
-            ).order_by(StockPrice.date.desc()).first()
-            
             # Add price info to signal metrics
-            if latest_price:
+            bars = latest_bars.get(stock_ids.get(ticker))
+            if bars:
+                latest_price = bars.latest
+                prev_close = bars.previous.close if bars.previous else latest_price.close
                 signal_metrics['current_price'] = latest_price.close
-                signal_metrics['price_change'] = latest_price.change
-                signal_metrics['price_change_percent'] = latest_price.change_percent
+                signal_metrics['price_change'] = latest_price.close - prev_close
+                signal_metrics['price_change_percent'] = ((latest_price.close - prev_close) / prev_close * 100) if prev_close else 0
             
             signals.append(signal_metrics)
         except Exception as e:
@@ -7,7 +7,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
-from app.models.stocks import Stock, StockPrice, StockIndicator
+from app.models.stocks import Stock, StockIndicator, LatestQuote
 from app.models.watchlist import WatchlistItem, Watchlist
 from app.models.user_strategies import Strategy
 from app.models.news_sentiment import MarketSentimentSummary
@@ -249,36 +249,30 @@ async def get_market_overview(db: Session = Depends(get_db)):
     ]
     
     # Get top gainers and losers
-    # Query for latest stock prices
+    # Latest quotes of stocks that traded since yesterday
     today = datetime.now().date()
     yesterday = today - timedelta(days=1)
     
-    stock_prices = db.query(StockPrice, Stock).join(
-        Stock, StockPrice.stock_id == Stock.id
+    quotes = db.query(LatestQuote, Stock).join(
+        Stock, LatestQuote.stock_id == Stock.id
     ).filter(
-        StockPrice.date >= yesterday
+        LatestQuote.interval == "1d",
+        LatestQuote.date >= yesterday,
+        LatestQuote.change_percent.isnot(None)
     ).all()
     
     # Calculate price changes
     price_changes = []
-    for price, stock in stock_prices:
-        # Get previous day price
-        prev_price = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock.id,
-            StockPrice.date < price.date
-        ).order_by(StockPrice.date.desc()).first()
-        
-        if prev_price:
-            # Calculate change percentage
-            change_percent = ((price.close - prev_price.close) / prev_price.close * 100)
-            
-            price_changes.append({
-                "ticker": stock.ticker,
-                "name": stock.name,
-                "last_price": price.close,
-                "change_percent": round(change_percent, 2),
-                "volume": price.volume
-            })
+    sector_by_ticker = {}
+    for quote, stock in quotes:
+        sector_by_ticker[stock.ticker] = stock.sector
+        price_changes.append({
+            "ticker": stock.ticker,
+            "name": stock.name,
+            "last_price": quote.last_close,
+            "change_percent": round(quote.change_percent, 2),
+            "volume": quote.volume
+        })
     
     # Sort by change percentage
     price_changes.sort(key=lambda x: x["change_percent"], reverse=True)
@@ -291,17 +285,17 @@ async def get_market_overview(db: Session = Depends(get_db)):
     # Group stocks by sector and calculate average performance
     sectors = {}
     for price_change in price_changes:
-        stock = db.query(Stock).filter(Stock.ticker == price_change["ticker"]).first()
-        if stock and stock.sector:
-            if stock.sector not in sectors:
-                sectors[stock.sector] = {
-                    "name": stock.sector,
+        sector = sector_by_ticker.get(price_change["ticker"])
+        if sector:
+            if sector not in sectors:
+                sectors[sector] = {
+                    "name": sector,
                     "change_sum": 0,
                     "count": 0
                 }
             
-            sectors[stock.sector]["change_sum"] += price_change["change_percent"]
-            sectors[stock.sector]["count"] += 1
+            sectors[sector]["change_sum"] += price_change["change_percent"]
+            sectors[sector]["count"] += 1
     
     # Calculate average change by sector
     sector_performance = []
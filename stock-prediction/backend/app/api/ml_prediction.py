@@ -10,6 +10,7 @@ import logging
 
 from app.core.database import get_db
 from app.ml.models import get_stock_predictor
+from app.core.price_loader import load_latest_bars, load_price_frame
 from app.models.stocks import Stock, StockPrice, StockIndicator
 
 from app.core.security import get_current_active_user, get_current_active_superuser_or_open_access
@@ -215,28 +216,22 @@ async def get_prediction_summary(
         if os.path.exists(base_path):
             model_dirs = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))]
         
-        stocks_with_models = []
+        # Extract tickers from directory names (format: TICKER_MODEL)
+        tickers = [model_dir.split('_')[0] for model_dir in model_dirs[:limit]]
+        stocks_by_ticker = {
+            stock.ticker: stock
+            for stock in db.query(Stock).filter(Stock.ticker.in_(tickers)).all()
+        } if tickers else {}
+        stocks_with_models = [stocks_by_ticker[ticker] for ticker in tickers if ticker in stocks_by_ticker]
         
-        for model_dir in model_dirs[:limit]:
-            # Extract ticker from directory name (format: TICKER_MODEL)
-            parts = model_dir.split('_')
-            if len(parts) >= 1:
-                ticker = parts[0]
-                stock = db.query(Stock).filter(Stock.ticker == ticker).first()
-                
-                if stock:
-                    stocks_with_models.append(stock)
+        # Latest bar of every stock in one query
+        latest_bars = load_latest_bars(db, [stock.id for stock in stocks_with_models])
         
         # For each stock, get a prediction summary
         predictions = []
         
         for stock in stocks_with_models:
-            # Get latest stock price
-            latest_price = db.query(StockPrice).filter(
-                StockPrice.stock_id == stock.id
-            ).order_by(StockPrice.date.desc()).first()
-            
-            if latest_price:
+            if stock.id in latest_bars:
                 # Get predictor
                 predictor = get_stock_predictor(stock.ticker, "random_forest")
                 
@@ -246,28 +241,10 @@ async def get_prediction_summary(
                     end_date = datetime.now()
                     start_date = end_date - timedelta(days=60)  # Get just enough data for prediction
                     
-                    prices = (db.query(StockPrice)
-                            .filter(StockPrice.stock_id == stock.id)
-                            .filter(StockPrice.date >= start_date)
-                            .filter(StockPrice.date <= end_date)
-                            .order_by(StockPrice.date)
-                            .all())
+                    df = load_price_frame(db, stock.id, start_date, end_date)
                     
-                    if prices:
-                        # Convert to DataFrame
-                        import pandas as pd
-                        df = pd.DataFrame([
-                            {
-                                'date': price.date,
-                                'open': price.open,
-                                'high': price.high,
-                                'low': price.low,
-                                'close': price.close,
-                                'volume': price.volume,
-                                'adjclose': price.close
-                            }
-                            for price in prices
-                        ])
+                    if not df.empty:
+                        df['adjclose'] = df['close']
                         
                         # Get predictions for 7 days
                         try:
@@ -12,9 +12,10 @@ import json
 from decimal import Decimal
 
 from app.core.database import get_db
-from app.models.stocks import Stock, StockPrice
+from app.models.stocks import Stock
 from app.models.portfolio import Portfolio, PortfolioHolding, PortfolioTransaction, PortfolioSnapshot, PortfolioAlert, TransactionType
 from app.core.security import get_current_active_user
+from app.core.latest_quotes import get_latest_quotes
 from pydantic import BaseModel, Field, validator
 
 router = APIRouter(tags=["portfolio"])
@@ -193,19 +194,22 @@ async def get_portfolio(
     portfolio_items = []
     total_current_value = portfolio.cash_balance
     
+    # Stock info and latest quotes for all holdings at once
+    tickers = {holding.ticker for holding in holdings}
+    stocks = {stock.ticker: stock for stock in db.query(Stock).filter(Stock.ticker.in_(tickers)).all()} if tickers else {}
+    quotes = get_latest_quotes(db, [stock.id for stock in stocks.values()])
+    needs_commit = False
+    
     for holding in holdings:
         # Get the stock info
-        stock = db.query(Stock).filter(Stock.ticker == holding.ticker).first()
+        stock = stocks.get(holding.ticker)
         stock_name = stock.name if stock else holding.ticker
         sector = stock.sector if stock else "Unknown"
         
         # Get latest price
         if stock:
-            latest_price = db.query(StockPrice).filter(
-                StockPrice.stock_id == stock.id
-            ).order_by(StockPrice.date.desc()).first()
-            
-            current_price = latest_price.close if latest_price else holding.current_price
+            quote = quotes.get(stock.id)
+            current_price = quote.last_close if quote and quote.last_close is not None else holding.current_price
         else:
             current_price = holding.current_price
             
@@ -221,7 +225,7 @@ async def get_portfolio(
             holding.unrealized_gain_loss = unrealized_gain_loss
             holding.unrealized_gain_loss_pct = unrealized_gain_loss_pct
             holding.last_updated = datetime.now()
-            db.commit()
+            needs_commit = True
         
         portfolio_items.append({
             "id": holding.id,
@@ -241,10 +245,12 @@ async def get_portfolio(
         
         total_current_value += current_value
     
-    # Update portfolio total value if needed
+    # Update portfolio total value if needed; one commit for all changes
     if portfolio.total_value != total_current_value:
         portfolio.total_value = total_current_value
         portfolio.updated_at = datetime.now()
+        needs_commit = True
+    if needs_commit:
         db.commit()
     
     # Calculate total performance
@@ -931,19 +937,18 @@ async def get_portfolio_risk_analysis(
     holdings = []
     total_value = 0
     
+    quotes = get_latest_quotes(db, [stock.id for stock in stocks])
+    
     # Use these stocks for risk analysis
     for idx, stock in enumerate(stocks):
         # Get latest price
-        latest_price = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock.id
-        ).order_by(StockPrice.date.desc()).first()
-        
-        if not latest_price:
+        quote = quotes.get(stock.id)
+        if not quote or quote.last_close is None:
             continue
             
         # Create mock holding
         quantity = (idx + 1) * 100  # 100, 200, 300, etc.
-        value = latest_price.close * quantity
+        value = quote.last_close * quantity
         total_value += value
         
         holdings.append({
@@ -139,6 +139,30 @@ async def get_latest_news(
         raise HTTPException(status_code=500, detail=f"Error fetching latest news: {str(e)}")
 
 
+@router.post("/collect")
+def collect_latest_news(
+    days: int = Query(1, description="Number of days to look back"),
+    ticker: Optional[str] = Query(None, description="Optional ticker to search news for"),
+    db: Session = Depends(get_db)
+):
+    """
+    Crawl the latest news from all sources and store new articles
+    
+    Articles already in the database are skipped; new ones are analyzed
+    and stored with their sentiment and ticker mentions.
+    
+    A plain ``def``: the crawl, sentiment analysis and database writes
+    block, so FastAPI runs this in its threadpool instead of on the event
+    loop, and the crawl gets its own loop in that thread.
+    """
+    try:
+        db_manager = get_sentiment_db_manager(db)
+        return db_manager.collect_latest_news(days=days, ticker=ticker)
+    except Exception as e:
+        logger.error(f"Error collecting latest news: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error collecting latest news: {str(e)}")
+
+
 @router.get("/analyze-article")
 async def analyze_article(
     url: str = Query(..., description="URL of the article to analyze"),
@@ -7,7 +7,7 @@ from sqlalchemy import or_, func
 from typing import List, Dict, Any, Optional
 
 from app.core.database import get_db
-from app.models.stocks import Stock
+from app.models.stocks import Stock, LatestQuote
 from app.core.security import get_current_active_user
 
 router = APIRouter(tags=["stock_search"])
@@ -61,43 +61,34 @@ async def get_top_traded_stocks(
     db: Session = Depends(get_db)
 ):
     """
-    Get top traded stocks based on recent volume
+    Get top traded stocks based on their latest session volume
     
     Parameters:
     - limit: Number of stocks to return (default: 10)
     """
-    from sqlalchemy import desc
-    from app.models.stocks import StockPrice
     from datetime import datetime, timedelta
     
-    # Get recent date range
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
+    # Only stocks that traded in the last week
+    start_date = datetime.now() - timedelta(days=7)
     
-    # Get stocks with highest average volume
-    result = db.execute("""
-        SELECT s.ticker, s.name, s.sector, AVG(sp.volume) as avg_volume
-        FROM stock_prices sp
-        JOIN stocks s ON sp.stock_id = s.id
-        WHERE sp.date >= :start_date
-        AND sp.date <= :end_date
-        AND s.is_active = true
-        GROUP BY s.id, s.ticker, s.name, s.sector
-        ORDER BY avg_volume DESC
-        LIMIT :limit
-    """, {
-        "start_date": start_date,
-        "end_date": end_date,
-        "limit": limit
-    })
+    # Read the one-row-per-stock quotes instead of aggregating stock_prices
+    rows = db.query(Stock.ticker, Stock.name, Stock.sector, LatestQuote.volume, LatestQuote.date).join(
+        LatestQuote, LatestQuote.stock_id == Stock.id
+    ).filter(
+        LatestQuote.interval == "1d",
+        LatestQuote.date >= start_date,
+        LatestQuote.volume.isnot(None),
+        Stock.is_active == True
+    ).order_by(LatestQuote.volume.desc()).limit(limit).all()
     
     stocks = []
-    for row in result:
+    for row in rows:
         stocks.append({
-            "ticker": row[0],
-            "name": row[1],
-            "sector": row[2],
-            "avg_volume": int(row[3]) if row[3] else 0
+            "ticker": row.ticker,
+            "name": row.name,
+            "sector": row.sector,
+            "volume": int(row.volume),
+            "date": row.date.strftime("%Y-%m-%d")
         })
     
     return {"results": stocks}
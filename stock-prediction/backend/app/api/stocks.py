@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.models.stocks import Stock, StockPrice, StockIndicator
+from app.core.price_loader import load_latest_bars
 from app.core.stock_fetcher import fetch_and_save_single_stock, fetch_and_save_all_stocks, get_latest_stock_data
 
 router = APIRouter(tags=["stocks"])
@@ -55,22 +56,19 @@ async def get_latest_stock_prices(db: Session = Depends(get_db)):
         # Get cutoff date (1 day ago)
         cutoff_date = datetime.now() - timedelta(days=1)
         
+        # Latest and previous bar of every stock in one query
+        latest_bars = load_latest_bars(db, [stock.id for stock in stocks])
+        
         for stock in stocks:
             ticker = stock.ticker.replace('.JK', '') if '.JK' in stock.ticker else stock.ticker
             
-            # Get latest price data from the database
-            latest_price = db.query(StockPrice).filter(
-                StockPrice.stock_id == stock.id,
-                StockPrice.date >= cutoff_date
-            ).order_by(StockPrice.date.desc()).first()
+            bars = latest_bars.get(stock.id)
+            latest_price = bars.latest if bars and bars.latest.date >= cutoff_date else None
             
             # If we have data, add it to the result
             if latest_price:
-                # Get previous price for calculating change
-                prev_price = db.query(StockPrice).filter(
-                    StockPrice.stock_id == stock.id,
-                    StockPrice.date < latest_price.date
-                ).order_by(StockPrice.date.desc()).first()
+                # Previous price for calculating change
+                prev_price = bars.previous
                 
                 # Calculate change percentage
                 prev_close = prev_price.close if prev_price else latest_price.close
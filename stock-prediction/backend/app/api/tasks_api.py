@@ -135,8 +135,8 @@ async def trigger_prediction(
 @router.post("/tasks/batch-predict")
 async def trigger_batch_prediction(
     tickers: List[str],
-    days: int = 7,
-    model_type: str = "random_forest",
+    days: int = 5,
+    model_type: Optional[str] = None,
     user = Depends(get_current_active_user)
 ):
     """
@@ -144,8 +144,8 @@ async def trigger_batch_prediction(
     
     Parameters:
     - tickers: List of stock ticker symbols
-    - days: Number of days to predict
-    - model_type: Type of ML model to use
+    - days: Prediction horizon of the preferred models
+    - model_type: Only use models of this type (default: best available)
     """
     try:
         if not tickers:
@@ -5,10 +5,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
+import numpy as np
 
 from app.core.database import get_db
-from app.models.stocks import Stock, StockPrice, StockIndicator
+from app.models.stocks import Stock
 from app.core.security import get_current_active_user
+from app.core.price_loader import load_price_arrays
 from app.utils.cache_manager import cached as cache_response
 
 router = APIRouter(tags=["technical_analysis"])
@@ -48,102 +50,89 @@ async def get_stock_indicators(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Get stock prices
-        prices = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock.id,
-            StockPrice.date >= start_date,
-            StockPrice.date <= end_date
-        ).order_by(StockPrice.date).all()
+        # Load prices with their stored indicators in one columnar query
+        series = load_price_arrays(
+            db, stock.id, start_date, end_date,
+            indicators=(
+                "sma_20", "sma_50", "sma_200",
+                "macd", "macd_signal", "macd_histogram",
+                "rsi_14",
+                "bb_upper", "bb_middle", "bb_lower",
+            )
+        )
         
-        if not prices:
+        if len(series["date"]) == 0:
             raise HTTPException(status_code=404, detail=f"No price data found for {ticker} in specified date range")
         
-        # Get indicators from database
-        indicators = db.query(StockIndicator).filter(
-            StockIndicator.stock_id == stock.id,
-            StockIndicator.date >= start_date,
-            StockIndicator.date <= end_date
-        ).order_by(StockIndicator.date).all()
+        dates = np.datetime_as_string(series["date"], unit="D").tolist()
         
         # Convert data to time series
-        price_data = []
+        price_data = [
+            {
+                "time": time,
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": int(volume) if volume is not None else None
+            }
+            for time, open_, high, low, close, volume in zip(
+                dates,
+                _to_list(series["open"]),
+                _to_list(series["high"]),
+                _to_list(series["low"]),
+                _to_list(series["close"]),
+                _to_list(series["volume"])
+            )
+        ]
+        
         indicator_data = {
             "sma": {"sma20": [], "sma50": [], "sma200": []},
+            # The schema has no ema_9/ema_21/ema_55 columns yet
             "ema": {"ema9": [], "ema21": [], "ema55": []},
             "macd": {"macd_line": [], "signal_line": [], "histogram": []},
             "rsi": {"rsi14": []},
             "bollinger": {"upper": [], "middle": [], "lower": []}
         }
         
-        # Map indicators to their dates for easy lookup
-        indicator_map = {ind.date.strftime("%Y-%m-%d"): ind for ind in indicators}
+        # SMA indicators
+        if include_sma:
+            indicator_data["sma"]["sma20"] = _points(dates, series["sma_20"])
+            indicator_data["sma"]["sma50"] = _points(dates, series["sma_50"])
+            indicator_data["sma"]["sma200"] = _points(dates, series["sma_200"])
         
-        for price in prices:
-            date_str = price.date.strftime("%Y-%m-%d")
-            
-            # Add price data
-            price_data.append({
-                "time": date_str,
-                "open": price.open,
-                "high": price.high,
-                "low": price.low,
-                "close": price.close,
-                "volume": price.volume
-            })
-            
-            # Add indicator data if available for this date
-            indicator = indicator_map.get(date_str)
-            if indicator:
-                # SMA indicators
-                if include_sma:
-                    if indicator.sma_20 is not None:
-                        indicator_data["sma"]["sma20"].append({"time": date_str, "value": indicator.sma_20})
-                    if indicator.sma_50 is not None:
-                        indicator_data["sma"]["sma50"].append({"time": date_str, "value": indicator.sma_50})
-                    if indicator.sma_200 is not None:
-                        indicator_data["sma"]["sma200"].append({"time": date_str, "value": indicator.sma_200})
-                
-                # EMA indicators (if available)
-                if include_ema:
-                    # Note: These fields might not exist in the current schema
-                    # In a real implementation, ensure these fields exist in the database
-                    if hasattr(indicator, "ema_9") and indicator.ema_9 is not None:
-                        indicator_data["ema"]["ema9"].append({"time": date_str, "value": indicator.ema_9})
-                    if hasattr(indicator, "ema_21") and indicator.ema_21 is not None:
-                        indicator_data["ema"]["ema21"].append({"time": date_str, "value": indicator.ema_21})
-                    if hasattr(indicator, "ema_55") and indicator.ema_55 is not None:
-                        indicator_data["ema"]["ema55"].append({"time": date_str, "value": indicator.ema_55})
-                
-                # MACD indicator
-                if include_macd and indicator.macd is not None:
-                    indicator_data["macd"]["macd_line"].append({"time": date_str, "value": indicator.macd})
-                    indicator_data["macd"]["signal_line"].append({"time": date_str, "value": indicator.macd_signal})
-                    indicator_data["macd"]["histogram"].append({"time": date_str, "value": indicator.macd_histogram})
-                
-                # RSI indicator
-                if include_rsi and indicator.rsi_14 is not None:
-                    indicator_data["rsi"]["rsi14"].append({"time": date_str, "value": indicator.rsi_14})
-                
-                # Bollinger Bands
-                if include_bollinger and indicator.bb_upper is not None:
-                    indicator_data["bollinger"]["upper"].append({"time": date_str, "value": indicator.bb_upper})
-                    indicator_data["bollinger"]["middle"].append({"time": date_str, "value": indicator.bb_middle})
-                    indicator_data["bollinger"]["lower"].append({"time": date_str, "value": indicator.bb_lower})
+        # MACD indicator
+        if include_macd:
+            present = ~np.isnan(series["macd"])
+            indicator_data["macd"]["macd_line"] = _points(dates, series["macd"], present)
+            indicator_data["macd"]["signal_line"] = _points(dates, series["macd_signal"], present)
+            indicator_data["macd"]["histogram"] = _points(dates, series["macd_histogram"], present)
+        
+        # RSI indicator
+        if include_rsi:
+            indicator_data["rsi"]["rsi14"] = _points(dates, series["rsi_14"])
+        
+        # Bollinger Bands
+        if include_bollinger:
+            present = ~np.isnan(series["bb_upper"])
+            indicator_data["bollinger"]["upper"] = _points(dates, series["bb_upper"], present)
+            indicator_data["bollinger"]["middle"] = _points(dates, series["bb_middle"], present)
+            indicator_data["bollinger"]["lower"] = _points(dates, series["bb_lower"], present)
         
         # Get AI predictions to highlight buy/sell zones
         from app.ml.models import get_stock_predictor
         import pandas as pd
         
-        # Convert price data to DataFrame for prediction
-        df = pd.DataFrame([{
-            'date': datetime.strptime(p['time'], "%Y-%m-%d"),
-            'open': p['open'],
-            'high': p['high'],
-            'low': p['low'],
-            'close': p['close'],
-            'volume': p['volume'],
-            'adjclose': p['close']  # Using close as adjclose
-        } for p in price_data])
+        # Price columns as a DataFrame for prediction
+        df = pd.DataFrame({
+            'date': pd.to_datetime(dates),
+            'open': series["open"],
+            'high': series["high"],
+            'low': series["low"],
+            'close': series["close"],
+            'volume': series["volume"],
+            'adjclose': series["close"]  # Using close as adjclose
+        })
         
         # Get predictor and make predictions
         predictor = get_stock_predictor(ticker, "random_forest")
@@ -196,6 +185,19 @@ async def get_stock_indicators(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching technical analysis: {str(e)}")
 
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    """Array values as Python floats, None where missing"""
+    return [None if value != value else value for value in values.tolist()]
+
+def _points(dates: List[str], values: np.ndarray, present: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """Chart points for the bars where ``present`` holds (default: value not missing)"""
+    if present is None:
+        present = ~np.isnan(values)
+    return [
+        {"time": dates[i], "value": value}
+        for i, value in zip(np.flatnonzero(present).tolist(), _to_list(values[present]))
+    ]
+
 def calculate_support_resistance(price_data, window=5):
     """Calculate support and resistance levels based on recent price action"""
     if not price_data or len(price_data) < window * 2:
@@ -11,6 +11,7 @@ import pandas as pd
 from app.core.database import get_db
 from app.models.user_strategies import User, UserStrategy
 from app.core.strategy_builder import StrategyBuilder
+from app.core.parameter_sweep import sweep_user_strategy
 from app.models.stocks import Stock, StockPrice
 
 router = APIRouter(prefix="/api", tags=["user_strategies"])
@@ -321,6 +322,87 @@ async def backtest_user_strategy(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error running backtest: {str(e)}")
 
+@router.post("/strategy/{strategy_id}/sweep/{ticker}")
+def sweep_user_strategy_params(
+    strategy_id: int = Path(...),
+    ticker: str = Path(...),
+    param_ranges: Dict[str, Any] = Body(..., description='Values per parameter path, e.g. {"indicators.0.params.period": {"start": 5, "stop": 30, "step": 1}}'),
+    days: int = Query(365, description="Days of historical data to use"),
+    rank_by: str = Query("avg_profit", description="Statistic used for ranking"),
+    top_n: int = Query(20, description="Number of best combinations to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Backtest every combination of parameter ranges for a user strategy
+    
+    Prices are loaded once and each distinct indicator configuration is
+    computed once for the whole grid. A plain ``def`` endpoint, so the
+    sweep runs in FastAPI's threadpool instead of blocking the event loop.
+    """
+    user_id = MOCK_USER_ID
+    
+    strategy = db.query(UserStrategy).filter(
+        UserStrategy.id == strategy_id,
+        UserStrategy.user_id == user_id
+    ).first()
+    
+    if not strategy:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    
+    stock = db.query(Stock).filter(Stock.ticker == ticker).first()
+    if not stock:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    
+    from datetime import timedelta
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
+    prices = (
+        db.query(StockPrice)
+        .filter(StockPrice.stock_id == stock.id)
+        .filter(StockPrice.date >= start_date)
+        .filter(StockPrice.date <= end_date)
+        .order_by(StockPrice.date)
+        .all()
+    )
+    
+    if not prices:
+        raise HTTPException(status_code=404, detail="No historical data found for this stock")
+    
+    try:
+        df = pd.DataFrame([
+            {
+                'Date': price.date,
+                'Open': price.open,
+                'High': price.high,
+                'Low': price.low,
+                'Close': price.close,
+                'Volume': price.volume
+            }
+            for price in prices
+        ])
+        df.set_index('Date', inplace=True)
+        
+        strategy_params = {
+            "indicators": strategy.strategy_params.get("indicators", []),
+            "buy_conditions": strategy.buy_conditions,
+            "sell_conditions": strategy.sell_conditions
+        }
+        
+        sweep = sweep_user_strategy(df, strategy_params, param_ranges, rank_by=rank_by, top_n=top_n)
+        
+        return {
+            "ticker": ticker,
+            "strategy_name": strategy.name,
+            "period": f"{days} days",
+            **sweep
+        }
+    
+    except (ValueError, KeyError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error running sweep: {str(e)}")
+
 @router.post("/strategy/{strategy_id}/predict/{ticker}")
 async def predict_with_strategy(
     strategy_id: int = Path(...),
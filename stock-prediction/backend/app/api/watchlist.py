@@ -9,9 +9,10 @@ import pandas as pd
 
 from app.core.database import get_db
 from app.models.watchlist import WatchlistItem
-from app.models.stocks import Stock, StockPrice
+from app.models.stocks import Stock
 from app.models.user_strategies import User
 from app.core.stock_predictor import get_prediction_service
+from app.core.latest_quotes import get_latest_quotes
 
 router = APIRouter(prefix="/api", tags=["watchlist"])
 
@@ -49,9 +50,14 @@ async def get_watchlist(
     
     result_items = []
     
+    # Stock info and latest quotes for all items at once
+    tickers = {item.ticker for item in watchlist_items}
+    stocks = {stock.ticker: stock for stock in db.query(Stock).filter(Stock.ticker.in_(tickers)).all()} if tickers else {}
+    quotes = get_latest_quotes(db, [stock.id for stock in stocks.values()])
+    
     for item in watchlist_items:
         # Get stock info
-        stock = db.query(Stock).filter(Stock.ticker == item.ticker).first()
+        stock = stocks.get(item.ticker)
         
         if not stock:
             stock_info = {
@@ -63,18 +69,13 @@ async def get_watchlist(
             }
         else:
             # Get the latest price
-            latest_price = (
-                db.query(StockPrice)
-                .filter(StockPrice.stock_id == stock.id)
-                .order_by(StockPrice.date.desc())
-                .first()
-            )
+            quote = quotes.get(stock.id)
             
             stock_info = {
                 "ticker": item.ticker,
                 "name": stock.name,
                 "sector": stock.sector,
-                "current_price": latest_price.close if latest_price else None,
+                "current_price": quote.last_close if quote else None,
                 "last_updated": stock.last_updated.strftime("%Y-%m-%d %H:%M:%S") if stock.last_updated else None
             }
         
@@ -315,25 +316,25 @@ async def get_watchlist_alerts(
     
     alerts = []
     
+    # Stock info and latest quotes for all items at once
+    tickers = {item.ticker for item in watchlist_items}
+    stocks = {stock.ticker: stock for stock in db.query(Stock).filter(Stock.ticker.in_(tickers)).all()}
+    quotes = get_latest_quotes(db, [stock.id for stock in stocks.values()])
+    
     for item in watchlist_items:
         # Get stock info
-        stock = db.query(Stock).filter(Stock.ticker == item.ticker).first()
+        stock = stocks.get(item.ticker)
         
         if not stock:
             continue
             
         # Get the latest price
-        latest_price = (
-            db.query(StockPrice)
-            .filter(StockPrice.stock_id == stock.id)
-            .order_by(StockPrice.date.desc())
-            .first()
-        )
+        quote = quotes.get(stock.id)
         
-        if not latest_price:
+        if not quote or quote.last_close is None:
             continue
         
-        current_price = latest_price.close
+        current_price = quote.last_close
         triggered_alerts = []
         
         # Check high price alert
@@ -0,0 +1,330 @@
+"""
+Vectorized backtest engine for the strategy backtesting API
+
+Signals, position state, equity curve and drawdown are computed on NumPy
+arrays. Only the bars that carry a signal are visited in Python, since cash
+and share counts can only change there.
+"""
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Maximum number of points returned in portfolio_history
+HISTORY_POINTS = 100
+
+
+def rolling_mean(values: np.ndarray, window: int, cumsum: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Simple moving average equivalent to ``Series.rolling(window).mean()``
+
+    Args:
+        values: 1-D float array without NaNs
+        window: Window length
+        cumsum: Optional precomputed ``np.cumsum`` of ``values`` (prefixed
+            with 0) so several windows can share one pass over the data
+
+    Returns:
+        Array of the same length, NaN for the first ``window - 1`` bars
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    result = np.full(n, np.nan)
+    if window <= 0 or window > n:
+        return result
+
+    if cumsum is None:
+        cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    result[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
+
+
+def rsi_sma(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI using simple rolling means of gains and losses, as in ``calculate_rsi``"""
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.empty_like(close)
+    if len(close):
+        delta[0] = 0.0
+        delta[1:] = np.diff(close)
+
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def crossover_signals(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """1 where ``fast`` crosses above ``slow``, -1 where it crosses below, else 0"""
+    signals = np.zeros(len(fast), dtype=np.int8)
+    if len(fast) < 2:
+        return signals
+
+    prev_fast, prev_slow = fast[:-1], slow[:-1]
+    cur_fast, cur_slow = fast[1:], slow[1:]
+    valid = ~np.isnan(cur_fast) & ~np.isnan(cur_slow)
+
+    buy = valid & (prev_fast <= prev_slow) & (cur_fast > cur_slow)
+    sell = valid & ~buy & (prev_fast >= prev_slow) & (cur_fast < cur_slow)
+
+    signals[1:][buy] = 1
+    signals[1:][sell] = -1
+    return signals
+
+
+def threshold_signals(series: np.ndarray, lower: float, upper: float) -> np.ndarray:
+    """1 where ``series`` crosses below ``lower``, -1 where it crosses above ``upper``"""
+    signals = np.zeros(len(series), dtype=np.int8)
+    if len(series) < 2:
+        return signals
+
+    prev, cur = series[:-1], series[1:]
+    valid = ~np.isnan(cur)
+
+    buy = valid & (prev >= lower) & (cur < lower)
+    sell = valid & ~buy & (prev <= upper) & (cur > upper)
+
+    signals[1:][buy] = 1
+    signals[1:][sell] = -1
+    return signals
+
+
+def random_signals(n: int) -> np.ndarray:
+    """Demonstration signals for the 'ai' strategy type (5% buy, 3% sell)"""
+    signals = np.zeros(n, dtype=np.int8)
+    for i in range(n):
+        if i > 0 and signals[i - 1] != 0:
+            # After a trade, wait a bar
+            continue
+        rand_val = random.random()
+        if rand_val > 0.95:
+            signals[i] = 1
+        elif rand_val < 0.03:
+            signals[i] = -1
+    return signals
+
+
+def generate_signal_array(close: np.ndarray, strategy_type: str, params: Dict) -> np.ndarray:
+    """
+    Generate trading signals for a strategy from a close-price array
+
+    Returns:
+        int8 array: 0 = Hold, 1 = Buy, -1 = Sell
+    """
+    close = np.asarray(close, dtype=np.float64)
+
+    if strategy_type == 'technical':
+        if 'fast_ma' in params and 'slow_ma' in params:
+            cumsum = np.concatenate(([0.0], np.cumsum(close)))
+            fast = rolling_mean(close, params.get('fast_ma', 50), cumsum)
+            slow = rolling_mean(close, params.get('slow_ma', 200), cumsum)
+            return crossover_signals(fast, slow)
+
+        if 'rsi_period' in params and 'rsi_threshold' in params:
+            rsi = rsi_sma(close, params.get('rsi_period', 14))
+            return threshold_signals(
+                rsi,
+                params.get('rsi_threshold', 30),
+                params.get('overbought_threshold', 70)
+            )
+
+    elif strategy_type == 'ai':
+        return random_signals(len(close))
+
+    return np.zeros(len(close), dtype=np.int8)
+
+
+def simulate_trades(close: np.ndarray, signals: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    """
+    Simulate an all-in/all-out strategy
+
+    Buys as many whole shares as the cash allows on a buy signal and sells
+    the whole position on a sell signal.
+
+    Returns:
+        Dictionary with per-bar ``cash``, ``shares`` and ``value`` arrays and
+        per-trade ``trade_index``, ``trade_type``, ``trade_shares`` and
+        ``trade_cash`` arrays
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    cash = initial_capital
+    shares = 0
+    trade_index: List[int] = []
+    trade_type: List[int] = []
+    trade_shares: List[int] = []
+    trade_cash: List[float] = []
+
+    for i in np.flatnonzero(signals):
+        price = close[i]
+        if signals[i] == 1 and cash > 0:
+            max_shares = int(cash / price)
+            if max_shares > 0:
+                shares += max_shares
+                cash -= max_shares * price
+                trade_index.append(i)
+                trade_type.append(1)
+                trade_shares.append(max_shares)
+                trade_cash.append(cash)
+        elif signals[i] == -1 and shares > 0:
+            cash += shares * price
+            trade_index.append(i)
+            trade_type.append(-1)
+            trade_shares.append(shares)
+            trade_cash.append(cash)
+            shares = 0
+
+    trade_index_arr = np.asarray(trade_index, dtype=np.int64)
+    trade_type_arr = np.asarray(trade_type, dtype=np.int8)
+    trade_shares_arr = np.asarray(trade_shares, dtype=np.int64)
+    trade_cash_arr = np.asarray(trade_cash, dtype=np.float64)
+
+    # State after each trade (slot 0 is the initial state), carried forward
+    # from the bar of the trade to every following bar
+    cash_states = np.concatenate(([initial_capital], trade_cash_arr))
+    share_states = np.concatenate(([0], np.cumsum(trade_type_arr * trade_shares_arr))).astype(np.int64)
+    state = np.zeros(n, dtype=np.int64)
+    state[trade_index_arr] = np.arange(1, len(trade_index_arr) + 1)
+    state = np.maximum.accumulate(state) if n else state
+
+    cash_arr = cash_states[state]
+    shares_arr = share_states[state]
+
+    return {
+        'cash': cash_arr,
+        'shares': shares_arr,
+        'value': cash_arr + shares_arr * close,
+        'trade_index': trade_index_arr,
+        'trade_type': trade_type_arr,
+        'trade_shares': trade_shares_arr,
+        'trade_cash': trade_cash_arr,
+    }
+
+
+def max_drawdown_percent(values: np.ndarray, initial_capital: float) -> float:
+    """Maximum peak-to-trough decline in percent, with the initial capital as first peak"""
+    if len(values) == 0:
+        return 0.0
+    peaks = np.maximum(np.maximum.accumulate(values), initial_capital)
+    return float(np.max((peaks - values) / peaks * 100))
+
+
+def simulation_metrics(dates: pd.DatetimeIndex, close: np.ndarray, sim: Dict[str, np.ndarray],
+                       initial_capital: float) -> Dict:
+    """Performance metrics of a ``simulate_trades`` result"""
+    start_value = initial_capital
+    end_value = float(sim['value'][-1])
+    total_return = end_value - start_value
+    total_return_percent = (total_return / start_value) * 100
+    max_drawdown = max_drawdown_percent(sim['value'], initial_capital)
+    total_trades = len(sim['trade_index'])
+
+    # Win rate over BUY -> SELL pairs
+    winning_trades = 0
+    buy_price = None
+    for k, i in enumerate(sim['trade_index']):
+        if sim['trade_type'][k] == 1:
+            buy_price = close[i]
+        elif buy_price is not None:
+            if close[i] > buy_price:
+                winning_trades += 1
+            buy_price = None
+
+    win_rate = (winning_trades / (total_trades // 2)) * 100 if total_trades >= 2 else 0
+
+    days = (dates[-1] - dates[0]).days
+    annualized_return = ((1 + (total_return / start_value)) ** (365 / days) - 1) * 100 if days > 0 else 0
+
+    return {
+        'total_return': round(total_return, 2),
+        'total_return_percent': round(total_return_percent, 2),
+        'annualized_return': round(annualized_return, 2),
+        'max_drawdown': round(max_drawdown, 2),
+        'win_rate': round(win_rate, 2),
+        'total_trades': total_trades,
+        'profitable_trades': winning_trades,
+        'loss_making_trades': (total_trades // 2) - winning_trades
+    }
+
+
+def backtest_metrics(dates: pd.DatetimeIndex, close: np.ndarray, signals: np.ndarray, initial_capital: float) -> Dict:
+    """Metrics only, without building the trade list and portfolio history"""
+    return simulation_metrics(dates, close, simulate_trades(close, signals, initial_capital), initial_capital)
+
+
+def run_backtest_arrays(dates: np.ndarray, close: np.ndarray, signals: np.ndarray, initial_capital: float) -> Dict:
+    """
+    Run a backtest from arrays and build the response of ``run_backtest``
+
+    Args:
+        dates: datetime64 array of bar dates, ascending
+        close: Close prices
+        signals: Signal array from ``generate_signal_array``
+        initial_capital: Starting cash
+    """
+    n = len(close)
+    if n == 0:
+        return {
+            'trades': [],
+            'portfolio_history': [],
+            'metrics': {
+                'total_return': 0,
+                'total_return_percent': 0,
+                'annualized_return': 0,
+                'max_drawdown': 0,
+                'win_rate': 0,
+                'total_trades': 0
+            }
+        }
+
+    close = np.asarray(close, dtype=np.float64)
+    dates = pd.DatetimeIndex(dates)
+    sim = simulate_trades(close, signals, initial_capital)
+
+    # Trade list
+    trades = []
+    trade_dates = dates[sim['trade_index']].strftime("%Y-%m-%d")
+    for k, i in enumerate(sim['trade_index']):
+        price = float(close[i])
+        shares = int(sim['trade_shares'][k])
+        trade = {
+            'date': trade_dates[k],
+            'type': 'BUY' if sim['trade_type'][k] == 1 else 'SELL',
+            'shares': shares,
+            'price': price,
+        }
+        if sim['trade_type'][k] == 1:
+            trade['cost'] = shares * price
+        else:
+            trade['proceeds'] = shares * price
+        trade['remaining_cash'] = float(sim['trade_cash'][k])
+        trades.append(trade)
+
+    # Downsampled portfolio history
+    history_index = np.arange(0, n, max(1, n // HISTORY_POINTS))
+    history_dates = dates[history_index].strftime("%Y-%m-%d")
+    portfolio_history = [
+        {
+            'date': date,
+            'close': price,
+            'shares': shares,
+            'cash': cash,
+            'value': value
+        }
+        for date, price, shares, cash, value in zip(
+            history_dates,
+            close[history_index].tolist(),
+            sim['shares'][history_index].tolist(),
+            sim['cash'][history_index].tolist(),
+            sim['value'][history_index].tolist()
+        )
+    ]
+
+    return {
+        'trades': trades,
+        'portfolio_history': portfolio_history,
+        'metrics': simulation_metrics(dates, close, sim, initial_capital)
+    }
@@ -0,0 +1,237 @@
+"""
+Set-based bulk writers for stock price and indicator data
+
+Sends whole DataFrames to ``stock_prices`` and ``stock_indicators`` as
+``INSERT ... ON CONFLICT (stock_id, date, interval) DO UPDATE`` statements
+instead of one existence query and one ORM add/update per row.
+"""
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import literal_column
+from sqlalchemy.orm import Session
+
+from app.models.stocks import StockPrice, StockIndicator
+
+logger = logging.getLogger(__name__)
+
+# Columns on the conflict target; must match the unique constraints on the models
+CONFLICT_COLUMNS = ["stock_id", "date", "interval"]
+
+# DataFrame column -> stock_prices column
+PRICE_COLUMN_MAP = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+}
+
+# Indicator columns share their names with the DataFrame columns
+INDICATOR_COLUMNS = [
+    "sma_20", "sma_50", "sma_200",
+    "ema_12", "ema_26",
+    "rsi_14",
+    "macd", "macd_signal", "macd_histogram",
+    "bb_upper", "bb_middle", "bb_lower",
+    "signal", "signal_strength", "notes",
+]
+
+# PostgreSQL accepts at most 65535 bind parameters per statement
+MAX_BIND_PARAMS = 65535
+
+
+def _date_column(df: pd.DataFrame) -> Optional[str]:
+    """Return the name of the date column produced by ``reset_index()``"""
+    for name in ("Date", "Datetime", "date"):
+        if name in df.columns:
+            return name
+    return None
+
+
+def normalize_dates(values):
+    """
+    Bar timestamps in the form stored in ``stock_prices.date``: naive UTC
+
+    Yahoo Finance returns exchange-local, tz-aware timestamps. Written as
+    is, PostgreSQL converts them to the session time zone, while text (COPY)
+    and naive values are stored unchanged, so the same bar would get
+    different keys depending on the writer. Every writer normalizes here
+    instead. Naive input is taken to be UTC already.
+
+    Args:
+        values: Series, DatetimeIndex or scalar of timestamps
+
+    Returns:
+        The same kind of object with naive UTC timestamps
+    """
+    converted = pd.to_datetime(values, utc=True)
+    if isinstance(converted, pd.Series):
+        return converted.dt.tz_localize(None)
+    return converted.tz_localize(None)
+
+
+def _to_python(value: Any) -> Any:
+    """Convert NaN/NaT and numpy scalars into values the DB driver accepts"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+    return value
+
+
+def _date_values(df: pd.DataFrame, column: str) -> List[Any]:
+    """Normalized dates of a frame as Python datetimes"""
+    return [_to_python(v) for v in normalize_dates(df[column]).tolist()]
+
+
+def _column_values(df: pd.DataFrame, column: str) -> List[Any]:
+    """Column values as plain Python objects, ``None`` where missing"""
+    if column not in df.columns:
+        return [None] * len(df)
+    return [_to_python(v) for v in df[column].tolist()]
+
+
+def _build_rows(stock_id: int, interval: str, dates: List[Any], columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Zip column lists into row dictionaries, keeping the last row per date
+
+    A single ON CONFLICT statement cannot touch the same key twice, so
+    duplicate timestamps in the frame are collapsed here.
+    """
+    rows = {}
+    for i, date in enumerate(dates):
+        if date is None:
+            continue
+        row = {"stock_id": stock_id, "date": date, "interval": interval}
+        for name, values in columns.items():
+            row[name] = values[i]
+        rows[date] = row
+    return list(rows.values())
+
+
+def frame_to_price_rows(stock_id: int, df: pd.DataFrame, interval: str = "1d") -> List[Dict[str, Any]]:
+    """Build ``stock_prices`` rows from an OHLCV DataFrame"""
+    date_col = _date_column(df)
+    if date_col is None or df.empty:
+        return []
+
+    dates = _date_values(df, date_col)
+    columns = {target: _column_values(df, source) for source, target in PRICE_COLUMN_MAP.items()}
+    volumes = columns["volume"]
+    columns["volume"] = [int(v) if v is not None else None for v in volumes]
+    return _build_rows(stock_id, interval, dates, columns)
+
+
+def frame_to_indicator_rows(stock_id: int, df: pd.DataFrame, interval: str = "1d") -> List[Dict[str, Any]]:
+    """Build ``stock_indicators`` rows from a DataFrame with indicator columns"""
+    date_col = _date_column(df)
+    if date_col is None or df.empty:
+        return []
+
+    dates = _date_values(df, date_col)
+    columns = {name: _column_values(df, name) for name in INDICATOR_COLUMNS}
+    return _build_rows(stock_id, interval, dates, columns)
+
+
+def _dialect_insert(db: Session):
+    """Return the dialect-specific ``insert`` construct supporting ON CONFLICT"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported for dialect '{dialect}'")
+    return dialect, insert
+
+
+def upsert_rows(db: Session, model, rows: List[Dict[str, Any]], batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Upsert rows into ``model``'s table keyed on (stock_id, date, interval)
+
+    Args:
+        db: Database session (the caller owns the transaction)
+        model: StockPrice or StockIndicator
+        rows: Row dictionaries with identical keys
+        batch_size: Rows per statement; defaults to the largest batch that
+            fits the bind parameter limit
+
+    Returns:
+        Tuple of (rows inserted, rows updated)
+    """
+    if not rows:
+        return 0, 0
+
+    dialect, insert = _dialect_insert(db)
+    columns = list(rows[0].keys())
+    update_columns = [c for c in columns if c not in CONFLICT_COLUMNS]
+
+    max_batch = max(1, MAX_BIND_PARAMS // len(columns))
+    batch_size = min(batch_size or max_batch, max_batch)
+
+    inserted = 0
+    updated = 0
+    table = model.__table__
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        stmt = insert(table).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=CONFLICT_COLUMNS,
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+
+        if dialect == "postgresql":
+            # xmax is 0 for freshly inserted tuples and non-zero for updated ones
+            result = db.execute(stmt.returning(literal_column("(xmax = 0)").label("inserted")))
+            flags = [row[0] for row in result]
+            batch_inserted = sum(1 for flag in flags if flag)
+            inserted += batch_inserted
+            updated += len(flags) - batch_inserted
+        else:
+            # No xmax outside PostgreSQL; count the keys that already exist
+            existing = db.query(model.id).filter(
+                model.stock_id == batch[0]["stock_id"],
+                model.interval == batch[0]["interval"],
+                model.date.in_([r["date"] for r in batch]),
+            ).count()
+            db.execute(stmt)
+            inserted += len(batch) - existing
+            updated += existing
+
+    return inserted, updated
+
+
+def bulk_upsert_stock_frame(db: Session, stock_id: int, df: pd.DataFrame, interval: str = "1d",
+                            batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Write a ticker's prices and indicators with one upsert statement per table
+
+    The caller is responsible for committing the session.
+
+    Returns:
+        Dictionary with inserted/updated counts for prices and indicators
+    """
+    price_rows = frame_to_price_rows(stock_id, df, interval)
+    indicator_rows = frame_to_indicator_rows(stock_id, df, interval)
+
+    prices_inserted, prices_updated = upsert_rows(db, StockPrice, price_rows, batch_size)
+    indicators_inserted, indicators_updated = upsert_rows(db, StockIndicator, indicator_rows, batch_size)
+
+    return {
+        "prices_inserted": prices_inserted,
+        "prices_updated": prices_updated,
+        "indicators_inserted": indicators_inserted,
+        "indicators_updated": indicators_updated,
+    }
@@ -77,6 +77,11 @@ celery_app.conf.update(
             "schedule": crontab(day_of_week=0, hour=2, minute=0),  # Sunday at 02:00 AM
             "options": {"queue": "ml_queue"}
         },
+        "predict-all-stocks": {
+            "task": "app.tasks.ml_tasks.batch_predict",
+            "schedule": crontab(hour=17, minute=30),  # 17:30 every day, after the stock update
+            "options": {"queue": "ml_queue"}
+        },
         "monitor-model-performance": {
             "task": "app.tasks.ml_tasks.monitor_model_performance",
             "schedule": crontab(hour=3, minute=0),  # Daily at 03:00 AM
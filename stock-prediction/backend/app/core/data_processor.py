@@ -17,11 +17,29 @@ from app.models.big_data import (
     DataPoint, StockMetrics, MLModel, StockPrediction, 
     MarketDataSnapshot, DataProcessingJob
 )
+from app.core.bulk_writer import normalize_dates
 from app.core.data_sources import get_data_source_manager
 from app.core.cache_manager import cache_data, clear_cache
+from app.core.indicator_engine import ATR, EMA, MACD, OBV, RSI, SMA, Bollinger, IndicatorEngine, Stochastic
+from app.core.latest_quotes import refresh_latest_quotes
 
 logger = logging.getLogger(__name__)
 
+def technical_indicator_engine() -> IndicatorEngine:
+    """Indicators of ``DataProcessor._calculate_technical_indicators``"""
+    indicators = [(SMA(window), f'SMA_{window}') for window in [5, 10, 20, 50, 100, 200]]
+    indicators += [(EMA(window), f'EMA_{window}') for window in [5, 10, 20, 50, 100, 200]]
+    indicators += [
+        (RSI(14), 'RSI'),
+        (MACD(12, 26, 9), ('MACD', 'MACD_Signal', 'MACD_Histogram')),
+        (Bollinger(20, 2.0), ('BB_Upper_20', 'BB_Middle_20', 'BB_Lower_20')),
+        (Stochastic(14, 3), ('%K', '%D')),
+        (ATR(14, smoothing='sma'), 'ATR'),
+        (OBV(), 'OBV'),
+        (SMA(20, source='volume'), 'Volume_MA_20'),
+    ]
+    return IndicatorEngine(indicators)
+
 class DataProcessor:
     """Processes raw financial data into features for machine learning"""
     
@@ -86,6 +104,10 @@ class DataProcessor:
             
             # Save processed data to database
             success = await self._save_processed_data(ticker, df, company_info)
+            if success:
+                # Imported here: feature_store imports this module
+                from app.core.feature_store import refresh_feature_store
+                refresh_feature_store(self.db, ticker)
             
             # Update job status
             job.status = "completed" if success else "failed"
@@ -105,7 +127,8 @@ class DataProcessor:
                 self.db.commit()
             return pd.DataFrame(), False
     
-    def _clean_stock_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _clean_stock_data(df: pd.DataFrame) -> pd.DataFrame:
         """Clean and preprocess stock data"""
         if df.empty:
             return df
@@ -149,69 +172,30 @@ class DataProcessor:
         
         return df
         
-    def _calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
         """Calculate technical indicators for the stock data"""
         if df.empty:
             return df
             
         try:
-            # Simple Moving Averages
-            for window in [5, 10, 20, 50, 100, 200]:
-                df[f'SMA_{window}'] = df['Close'].rolling(window=window).mean()
-                
-            # Exponential Moving Averages
-            for window in [5, 10, 20, 50, 100, 200]:
-                df[f'EMA_{window}'] = df['Close'].ewm(span=window, adjust=False).mean()
-                
-            # RSI (Relative Strength Index)
-            delta = df['Close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-            
-            avg_gain = gain.rolling(window=14).mean()
-            avg_loss = loss.rolling(window=14).mean()
-            
-            rs = avg_gain / avg_loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-            
-            # MACD (Moving Average Convergence Divergence)
-            ema_12 = df['Close'].ewm(span=12, adjust=False).mean()
-            ema_26 = df['Close'].ewm(span=26, adjust=False).mean()
-            df['MACD'] = ema_12 - ema_26
-            df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-            df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
-            
-            # Bollinger Bands
-            for window in [20]:
-                df[f'BB_Middle_{window}'] = df['Close'].rolling(window=window).mean()
-                df[f'BB_Std_{window}'] = df['Close'].rolling(window=window).std()
-                df[f'BB_Upper_{window}'] = df[f'BB_Middle_{window}'] + 2 * df[f'BB_Std_{window}']
-                df[f'BB_Lower_{window}'] = df[f'BB_Middle_{window}'] - 2 * df[f'BB_Std_{window}']
-                
-            # Stochastic Oscillator
-            low_14 = df['Low'].rolling(window=14).min()
-            high_14 = df['High'].rolling(window=14).max()
-            df['%K'] = 100 * ((df['Close'] - low_14) / (high_14 - low_14))
-            df['%D'] = df['%K'].rolling(window=3).mean()
-            
-            # Average True Range (ATR)
+            # Moving averages, RSI, MACD, Bollinger Bands, Stochastic, ATR and
+            # OBV come from the streaming indicator engine
+            values = technical_indicator_engine().run(df)
+            for column in values.columns:
+                df[column] = values[column]
+            df['BB_Std_20'] = (df['BB_Upper_20'] - df['BB_Middle_20']) / 2
+            
+            # True Range
             tr1 = df['High'] - df['Low']
             tr2 = abs(df['High'] - df['Close'].shift())
             tr3 = abs(df['Low'] - df['Close'].shift())
             df['TR'] = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            df['ATR'] = df['TR'].rolling(window=14).mean()
             
             # Volume indicators
             df['Volume_Change'] = df['Volume'].pct_change() * 100
-            df['Volume_MA_20'] = df['Volume'].rolling(window=20).mean()
             df['Relative_Volume'] = df['Volume'] / df['Volume_MA_20']
             
-            # On-Balance Volume (OBV)
-            df['OBV'] = 0
-            df.loc[df['Close'] > df['Close'].shift(), 'OBV'] = df['Volume']
-            df.loc[df['Close'] < df['Close'].shift(), 'OBV'] = -df['Volume']
-            df['OBV'] = df['OBV'].cumsum()
-            
             # Money Flow Index (MFI)
             typical_price = (df['High'] + df['Low'] + df['Close']) / 3
             raw_money_flow = typical_price * df['Volume']
@@ -330,8 +314,9 @@ class DataProcessor:
                 self.db.commit()
             
             # Process and save each day's data
+            df = df.assign(Date=normalize_dates(df['Date']))
             for _, row in df.iterrows():
-                date = row['Date']
+                date = row['Date'].to_pydatetime()
                 
                 # Save price data
                 price = self.db.query(StockPrice).filter(
@@ -426,6 +411,9 @@ class DataProcessor:
                     metrics.historical_volatility = row.get('Volatility_20')
                     metrics.atr = row.get('ATR')
             
+            # Keep the latest quote in the same transaction as the prices
+            refresh_latest_quotes(self.db, [stock.id])
+            
             # Commit all changes
             self.db.commit()
             logger.info(f"Successfully saved processed data for {ticker}")
@@ -7,12 +7,12 @@ import asyncio
 import pandas as pd
 import numpy as np
 import yfinance as yf
-import aiohttp
 import json
 from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from ratelimit import limits, sleep_and_retry
 from app.core.cache_manager import cache_data, clear_cache
+from app.core.http_cache import get_http_cache
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +142,9 @@ class YahooFinanceDataSource(DataSourceBase):
 class AlphaVantageDataSource(DataSourceBase):
     """Alpha Vantage data source implementation"""
     
+    # Directory and TTL of the source in the HTTP response cache
+    cache_namespace = "alpha_vantage"
+    
     def __init__(self, api_key: str):
         super().__init__("Alpha Vantage")
         self.api_key = api_key
@@ -172,56 +175,58 @@ class AlphaVantageDataSource(DataSourceBase):
                 "outputsize": "full"
             }
             
-            # Make request
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"Error fetching data from Alpha Vantage: {response.status}")
-                        return pd.DataFrame()
-                    
-                    data = await response.json()
-                    
-                    # Extract time series data
-                    if interval == "1d":
-                        time_series_key = "Time Series (Daily)"
-                    elif interval == "1w":
-                        time_series_key = "Weekly Time Series"
-                    else:
-                        time_series_key = "Monthly Time Series"
-                    
-                    if time_series_key not in data:
-                        logger.error(f"No time series data found in Alpha Vantage response: {data}")
-                        return pd.DataFrame()
-                    
-                    time_series = data[time_series_key]
-                    
-                    # Convert to dataframe
-                    records = []
-                    for date, values in time_series.items():
-                        record = {
-                            "Date": datetime.strptime(date, "%Y-%m-%d"),
-                            "Open": float(values["1. open"]),
-                            "High": float(values["2. high"]),
-                            "Low": float(values["3. low"]),
-                            "Close": float(values["4. close"]),
-                            "Volume": int(values["5. volume"])
-                        }
-                        records.append(record)
-                    
-                    df = pd.DataFrame(records)
-                    
-                    # Filter by date range if specified
-                    if start_date:
-                        df = df[df["Date"] >= start_date]
-                    if end_date:
-                        df = df[df["Date"] <= end_date]
-                    
-                    # Sort by date
-                    df = df.sort_values("Date")
-                    
-                    logger.info(f"Successfully fetched {len(df)} records from Alpha Vantage for {ticker}")
-                    return df
-                    
+            # Make request (conditional, through the HTTP response cache)
+            cache = get_http_cache()
+            response = await cache.get_async(self.base_url, self.cache_namespace, params)
+            if response.status != 200:
+                logger.error(f"Error fetching data from Alpha Vantage: {response.status}")
+                return pd.DataFrame()
+            
+            data = response.json()
+            
+            # Extract time series data
+            if interval == "1d":
+                time_series_key = "Time Series (Daily)"
+            elif interval == "1w":
+                time_series_key = "Weekly Time Series"
+            else:
+                time_series_key = "Monthly Time Series"
+            
+            if time_series_key not in data:
+                # Rate limit and error notes come with status 200; don't serve them again
+                cache.discard(self.base_url, self.cache_namespace, params)
+                logger.error(f"No time series data found in Alpha Vantage response: {data}")
+                return pd.DataFrame()
+            
+            time_series = data[time_series_key]
+            
+            # Convert to dataframe
+            records = []
+            for date, values in time_series.items():
+                record = {
+                    "Date": datetime.strptime(date, "%Y-%m-%d"),
+                    "Open": float(values["1. open"]),
+                    "High": float(values["2. high"]),
+                    "Low": float(values["3. low"]),
+                    "Close": float(values["4. close"]),
+                    "Volume": int(values["5. volume"])
+                }
+                records.append(record)
+            
+            df = pd.DataFrame(records)
+            
+            # Filter by date range if specified
+            if start_date:
+                df = df[df["Date"] >= start_date]
+            if end_date:
+                df = df[df["Date"] <= end_date]
+            
+            # Sort by date
+            df = df.sort_values("Date")
+            
+            logger.info(f"Successfully fetched {len(df)} records from Alpha Vantage for {ticker}")
+            return df
+            
         except Exception as e:
             logger.error(f"Error fetching data from Alpha Vantage for {ticker}: {str(e)}")
             return pd.DataFrame()
@@ -236,28 +241,31 @@ class AlphaVantageDataSource(DataSourceBase):
                 "apikey": self.api_key
             }
             
-            # Make request
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"Error fetching company info from Alpha Vantage: {response.status}")
-                        return {'name': ticker, 'sector': 'N/A'}
-                    
-                    data = await response.json()
-                    
-                    company_info = {
-                        'name': data.get('Name', ticker),
-                        'sector': data.get('Sector', 'N/A'),
-                        'industry': data.get('Industry', 'N/A'),
-                        'marketCap': float(data.get('MarketCapitalization', 0)),
-                        'beta': float(data.get('Beta', 0)),
-                        'pe_ratio': float(data.get('PERatio', 0)),
-                        'dividend_yield': float(data.get('DividendYield', 0)),
-                        'description': data.get('Description', ''),
-                    }
-                    
-                    return company_info
-                    
+            # Make request (conditional, through the HTTP response cache)
+            cache = get_http_cache()
+            response = await cache.get_async(self.base_url, self.cache_namespace, params)
+            if response.status != 200:
+                logger.error(f"Error fetching company info from Alpha Vantage: {response.status}")
+                return {'name': ticker, 'sector': 'N/A'}
+            
+            data = response.json()
+            if 'Symbol' not in data:
+                # Unknown ticker, rate limit or error note; don't serve it again
+                cache.discard(self.base_url, self.cache_namespace, params)
+            
+            company_info = {
+                'name': data.get('Name', ticker),
+                'sector': data.get('Sector', 'N/A'),
+                'industry': data.get('Industry', 'N/A'),
+                'marketCap': float(data.get('MarketCapitalization', 0)),
+                'beta': float(data.get('Beta', 0)),
+                'pe_ratio': float(data.get('PERatio', 0)),
+                'dividend_yield': float(data.get('DividendYield', 0)),
+                'description': data.get('Description', ''),
+            }
+            
+            return company_info
+            
         except Exception as e:
             logger.error(f"Error fetching company info from Alpha Vantage for {ticker}: {str(e)}")
             return {'name': ticker, 'sector': 'N/A'}
@@ -304,6 +312,9 @@ class GoogleFinanceDataSource(DataSourceBase):
 class MarketStackDataSource(DataSourceBase):
     """MarketStack data source implementation"""
     
+    # Directory and TTL of the source in the HTTP response cache
+    cache_namespace = "marketstack"
+    
     def __init__(self, api_key: str):
         super().__init__("MarketStack")
         self.api_key = api_key
@@ -337,40 +348,42 @@ class MarketStackDataSource(DataSourceBase):
                 "limit": 1000
             }
             
-            # Make request
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/eod", params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"Error fetching data from MarketStack: {response.status}")
-                        return pd.DataFrame()
-                    
-                    data = await response.json()
-                    
-                    if "data" not in data:
-                        logger.error(f"No data found in MarketStack response: {data}")
-                        return pd.DataFrame()
-                    
-                    # Convert to dataframe
-                    records = []
-                    for item in data["data"]:
-                        record = {
-                            "Date": datetime.fromisoformat(item["date"].split("T")[0]),
-                            "Open": item["open"],
-                            "High": item["high"],
-                            "Low": item["low"],
-                            "Close": item["close"],
-                            "Volume": item["volume"]
-                        }
-                        records.append(record)
-                    
-                    df = pd.DataFrame(records)
-                    
-                    # Sort by date
-                    df = df.sort_values("Date")
-                    
-                    logger.info(f"Successfully fetched {len(df)} records from MarketStack for {ticker}")
-                    return df
-                    
+            # Make request (conditional, through the HTTP response cache)
+            cache = get_http_cache()
+            url = f"{self.base_url}/eod"
+            response = await cache.get_async(url, self.cache_namespace, params)
+            if response.status != 200:
+                logger.error(f"Error fetching data from MarketStack: {response.status}")
+                return pd.DataFrame()
+            
+            data = response.json()
+            
+            if "data" not in data:
+                cache.discard(url, self.cache_namespace, params)
+                logger.error(f"No data found in MarketStack response: {data}")
+                return pd.DataFrame()
+            
+            # Convert to dataframe
+            records = []
+            for item in data["data"]:
+                record = {
+                    "Date": datetime.fromisoformat(item["date"].split("T")[0]),
+                    "Open": item["open"],
+                    "High": item["high"],
+                    "Low": item["low"],
+                    "Close": item["close"],
+                    "Volume": item["volume"]
+                }
+                records.append(record)
+            
+            df = pd.DataFrame(records)
+            
+            # Sort by date
+            df = df.sort_values("Date")
+            
+            logger.info(f"Successfully fetched {len(df)} records from MarketStack for {ticker}")
+            return df
+            
         except Exception as e:
             logger.error(f"Error fetching data from MarketStack for {ticker}: {str(e)}")
             return pd.DataFrame()
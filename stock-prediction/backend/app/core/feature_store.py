@@ -0,0 +1,515 @@
+"""
+Persistent, versioned feature store
+
+Materializes the ``create_feature_set`` matrix of each (ticker, interval)
+as float32 columnar files on local disk, computed from the bars stored in
+``stock_prices``. Training and inference read it memory-mapped instead of
+refetching prices and recomputing indicators; ingestion appends the rows
+of new bars, computed over a warm-up tail of stored bars. The last row is
+recomputed when its bar was rewritten after being stored (a bar that was
+still forming).
+
+Layout under ``FEATURE_STORE_DIR``::
+
+    {interval}/{ticker}/meta.json          columns, row count, schema hash, generation,
+                                           OHLCV of the last bar
+    {interval}/{ticker}/values-{gen}.f32   row-major float32 feature matrix
+    {interval}/{ticker}/dates-{gen}.i8     int64 nanosecond timestamps
+
+Data is written before ``meta.json`` is atomically replaced, so readers see
+either the old or the new row count. A rebuild, or rewriting the last row,
+writes a new generation.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.data_processor import DataProcessor
+from app.core.price_loader import TITLE_CASE_COLUMNS, get_stock_id, load_price_frame
+from app.models.stocks import StockPrice
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_DIR = os.getenv(
+    "FEATURE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "feature_store")
+)
+
+# Bump when create_feature_set or the indicators it uses change; stored
+# matrices of another version are rebuilt on the next sync
+FEATURE_SCHEMA_VERSION = 1
+
+# Stored bars computed in front of appended bars. SMA_200 needs 200 bars;
+# after 1000 bars EMA_200 keeps less than 0.01% weight on its start value.
+FEATURE_WARMUP_BARS = 1000
+
+# Running totals whose level depends on where computation starts; appended
+# values are shifted to continue the stored series
+CUMULATIVE_COLUMNS = ("OBV",)
+
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def schema_hash(columns: Sequence[str]) -> str:
+    """Hash of the feature schema version and column names"""
+    payload = json.dumps({"version": FEATURE_SCHEMA_VERSION, "columns": list(columns)})
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def bar_values(bar) -> List[Optional[float]]:
+    """OHLCV of a bar as kept in meta.json, to detect a rewritten last bar"""
+    return [None if pd.isna(bar[column]) else float(bar[column]) for column in BAR_COLUMNS]
+
+
+def create_feature_set(df: pd.DataFrame) -> pd.DataFrame:
+    """Create a comprehensive feature set for machine learning"""
+    # Start with a copy of the dataframe
+    features = df.copy()
+    
+    # List of technical indicators to use as features
+    indicator_columns = [
+        'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50', 'SMA_100', 'SMA_200',
+        'EMA_5', 'EMA_10', 'EMA_20', 'EMA_50', 'EMA_100', 'EMA_200',
+        'RSI', 'MACD', 'MACD_Signal', 'MACD_Histogram',
+        'BB_Upper_20', 'BB_Middle_20', 'BB_Lower_20',
+        '%K', '%D', 'ATR', 'OBV', 'MFI',
+        'Volatility_20', 'Volume_MA_20', 'Relative_Volume'
+    ]
+    
+    # Price-derived features
+    features['Price_SMA_20_Ratio'] = features['Close'] / features['SMA_20']
+    features['Price_SMA_50_Ratio'] = features['Close'] / features['SMA_50']
+    features['Price_SMA_200_Ratio'] = features['Close'] / features['SMA_200']
+    
+    # Momentum features
+    for period in [5, 10, 20, 50]:
+        features[f'Momentum_{period}'] = features['Close'] / features['Close'].shift(period) - 1
+    
+    # Volatility features
+    features['High_Low_Range'] = (features['High'] - features['Low']) / features['Close']
+    features['Daily_Return_Abs'] = abs(features['Return'])
+    
+    # Volume features
+    features['Volume_Price_Ratio'] = features['Volume'] / features['Close']
+    features['Dollar_Volume'] = features['Volume'] * features['Close']
+    
+    # Price patterns
+    features['Higher_High'] = ((features['High'] > features['High'].shift(1)) & 
+                              (features['High'].shift(1) > features['High'].shift(2))).astype(int)
+    features['Lower_Low'] = ((features['Low'] < features['Low'].shift(1)) & 
+                            (features['Low'].shift(1) < features['Low'].shift(2))).astype(int)
+    
+    # Trend features
+    features['Uptrend'] = ((features['SMA_20'] > features['SMA_50']) & 
+                          (features['SMA_50'] > features['SMA_200'])).astype(int)
+    features['Downtrend'] = ((features['SMA_20'] < features['SMA_50']) & 
+                            (features['SMA_50'] < features['SMA_200'])).astype(int)
+    
+    # Distance features
+    features['BB_Position'] = (features['Close'] - features['BB_Lower_20']) / (features['BB_Upper_20'] - features['BB_Lower_20'])
+    
+    # Lag features (previous days values)
+    for lag in range(1, 6):
+        features[f'Close_Lag_{lag}'] = features['Close'].shift(lag)
+        features[f'Return_Lag_{lag}'] = features['Return'].shift(lag)
+        features[f'Volume_Lag_{lag}'] = features['Volume'].shift(lag)
+    
+    # Moving average crossovers
+    features['SMA_20_50_Crossover'] = ((features['SMA_20'] > features['SMA_50']) & 
+                                     (features['SMA_20'].shift() <= features['SMA_50'].shift())).astype(int)
+    features['SMA_50_200_Crossover'] = ((features['SMA_50'] > features['SMA_200']) & 
+                                      (features['SMA_50'].shift() <= features['SMA_200'].shift())).astype(int)
+    
+    # RSI conditions
+    features['RSI_Oversold'] = (features['RSI'] < 30).astype(int)
+    features['RSI_Overbought'] = (features['RSI'] > 70).astype(int)
+    
+    # MACD conditions
+    features['MACD_Crossover'] = ((features['MACD'] > features['MACD_Signal']) & 
+                                (features['MACD'].shift() <= features['MACD_Signal'].shift())).astype(int)
+    features['MACD_Crossunder'] = ((features['MACD'] < features['MACD_Signal']) & 
+                                 (features['MACD'].shift() >= features['MACD_Signal'].shift())).astype(int)
+    
+    # Drop NA values
+    features = features.dropna()
+    
+    # Add date-based features
+    features['DayOfWeek'] = features['Date'].dt.dayofweek
+    features['Month'] = features['Date'].dt.month
+    features['Year'] = features['Date'].dt.year
+    features['DayOfMonth'] = features['Date'].dt.day
+    features['Quarter'] = features['Date'].dt.quarter
+    
+    # One-hot encode categorical features
+    for col in ['DayOfWeek', 'Month', 'Quarter']:
+        dummies = pd.get_dummies(features[col], prefix=col)
+        features = pd.concat([features, dummies], axis=1)
+        
+    return features
+
+
+def build_feature_frame(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Feature rows for stored bars
+
+    Args:
+        bars: ``Date`` + OHLCV DataFrame, ascending
+
+    Returns:
+        ``Date`` plus the numeric feature columns as float32
+    """
+    df = DataProcessor._clean_stock_data(bars.copy())
+    df = DataProcessor._calculate_technical_indicators(df)
+    features = create_feature_set(df)
+
+    frame = features.select_dtypes(include=["number"]).astype(np.float32)
+    frame.insert(0, "Date", features["Date"].to_numpy(dtype="datetime64[ns]"))
+    return frame.reset_index(drop=True)
+
+
+class FeatureStore:
+    """Float32 feature matrices per (ticker, interval), appendable and memory-mapped"""
+
+    def __init__(self, root: str = FEATURE_STORE_DIR):
+        self.root = root
+
+    def _directory(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, interval, ticker)
+
+    @staticmethod
+    def _paths(directory: str, generation: int):
+        return (os.path.join(directory, f"dates-{generation}.i8"),
+                os.path.join(directory, f"values-{generation}.f32"))
+
+    @contextmanager
+    def _writer(self, directory: str):
+        """Exclusive writer lock on a directory, across threads and processes"""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _write_meta(directory: str, meta: Dict[str, Any]) -> None:
+        path = os.path.join(directory, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def meta(self, ticker: str, interval: str = "1d") -> Optional[Dict[str, Any]]:
+        """Stored metadata (columns, rows, dates, schema hash), or None"""
+        try:
+            with open(os.path.join(self._directory(ticker, interval), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, ticker: str, interval: str = "1d", start: Optional[datetime] = None,
+             tail: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Stored feature rows, ascending by date
+
+        Args:
+            start: Only rows on or after this date
+            tail: Only the last ``tail`` rows
+
+        Returns:
+            DataFrame with ``Date`` and float32 feature columns, or None if
+            nothing current is stored
+        """
+        for _ in range(2):
+            meta = self.meta(ticker, interval)
+            if meta is None or meta["version"] != FEATURE_SCHEMA_VERSION:
+                return None
+            try:
+                dates, values = self._map(self._directory(ticker, interval), meta)
+                break
+            except FileNotFoundError:
+                # Replaced by a concurrent rebuild; read the new generation
+                continue
+        else:
+            return None
+
+        begin = 0
+        if start is not None:
+            begin = int(np.searchsorted(dates, pd.Timestamp(start).value, side="left"))
+        if tail is not None:
+            begin = max(begin, len(dates) - tail)
+
+        frame = pd.DataFrame(np.array(values[begin:]), columns=meta["columns"])
+        frame.insert(0, "Date", np.array(dates[begin:]).view("datetime64[ns]"))
+        return frame
+
+    @staticmethod
+    def _map(directory: str, meta: Dict[str, Any]):
+        rows, columns = meta["rows"], len(meta["columns"])
+        dates_path, values_path = FeatureStore._paths(directory, meta["generation"])
+        if rows == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, columns), dtype=np.float32)
+        dates = np.memmap(dates_path, dtype=np.int64, mode="r", shape=(rows,))
+        values = np.memmap(values_path, dtype=np.float32, mode="r", shape=(rows, columns))
+        return dates, values
+
+    @staticmethod
+    def _split(frame: pd.DataFrame):
+        columns = [column for column in frame.columns if column != "Date"]
+        dates = frame["Date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        values = np.ascontiguousarray(frame[columns].to_numpy(dtype=np.float32))
+        return columns, dates, values
+
+    @staticmethod
+    def _date_range(meta: Dict[str, Any], dates: np.ndarray) -> None:
+        if len(dates):
+            if meta.get("first_date") is None:
+                meta["first_date"] = pd.Timestamp(dates[0]).isoformat()
+            meta["last_date"] = pd.Timestamp(dates[-1]).isoformat()
+
+    def write(self, ticker: str, interval: str, frame: pd.DataFrame,
+              last_bar: Optional[List[Optional[float]]] = None) -> int:
+        """
+        Replace the stored matrix with ``frame`` (``Date`` + feature columns)
+
+        Args:
+            last_bar: ``bar_values`` of the bar behind the last row
+
+        Returns:
+            Number of rows written
+        """
+        directory = self._directory(ticker, interval)
+        columns, dates, values = self._split(frame)
+
+        with self._writer(directory):
+            previous = self.meta(ticker, interval)
+            generation = previous["generation"] + 1 if previous else 1
+            dates_path, values_path = self._paths(directory, generation)
+            dates.tofile(dates_path)
+            values.tofile(values_path)
+
+            meta = {
+                "version": FEATURE_SCHEMA_VERSION,
+                "schema_hash": schema_hash(columns),
+                "columns": columns,
+                "rows": len(dates),
+                "generation": generation,
+                "first_date": None,
+                "last_date": None,
+                "last_bar": last_bar,
+                "updated_at": datetime.now().isoformat(),
+            }
+            self._date_range(meta, dates)
+            self._write_meta(directory, meta)
+
+            if previous:
+                for path in self._paths(directory, previous["generation"]):
+                    if os.path.exists(path):
+                        os.remove(path)
+        return len(dates)
+
+    def append(self, ticker: str, interval: str, frame: pd.DataFrame,
+               last_bar: Optional[List[Optional[float]]] = None) -> int:
+        """
+        Append the rows of ``frame`` dated after the last stored row
+
+        A row dated on the last stored row replaces it. Readers may be
+        mapping the current files, so that is written as a new generation.
+
+        Args:
+            last_bar: ``bar_values`` of the bar behind the new last row
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            ValueError: If nothing is stored yet or the columns differ
+        """
+        directory = self._directory(ticker, interval)
+        with self._writer(directory):
+            meta = self.meta(ticker, interval)
+            if meta is None:
+                raise ValueError(f"No stored features for {ticker} ({interval})")
+
+            replace = False
+            if meta["last_date"] is not None:
+                last_date = pd.Timestamp(meta["last_date"])
+                frame = frame[frame["Date"] >= last_date]
+                replace = not frame.empty and frame["Date"].iloc[0] == last_date
+            columns, dates, values = self._split(frame)
+            if schema_hash(columns) != meta["schema_hash"]:
+                raise ValueError(f"Feature schema of {ticker} ({interval}) changed")
+            if not len(dates):
+                return 0
+
+            kept = meta["rows"] - 1 if replace else meta["rows"]
+            old_paths = self._paths(directory, meta["generation"])
+            if replace:
+                meta["generation"] += 1
+            new_paths = self._paths(directory, meta["generation"])
+            for old_path, path, array in zip(old_paths, new_paths, (dates, values)):
+                if path != old_path:
+                    with open(old_path, "rb") as src, open(path, "wb") as f:
+                        f.write(src.read(kept * array[0].nbytes))
+                # Write after the kept rows; bytes left by an interrupted
+                # append are overwritten
+                with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                    f.seek(kept * array[0].nbytes)
+                    f.write(array.tobytes())
+                    f.truncate()
+
+            meta["rows"] = kept + len(dates)
+            meta["last_bar"] = last_bar
+            meta["updated_at"] = datetime.now().isoformat()
+            self._date_range(meta, dates)
+            self._write_meta(directory, meta)
+
+            if replace:
+                for path in old_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+        return len(dates)
+
+    def delete(self, ticker: str, interval: Optional[str] = None) -> None:
+        """Remove the stored features of a ticker (all intervals if None)"""
+        intervals = [interval] if interval else (os.listdir(self.root) if os.path.isdir(self.root) else [])
+        for name in intervals:
+            shutil.rmtree(self._directory(ticker, name), ignore_errors=True)
+
+
+def _append_new_bars(db: Session, store: FeatureStore, ticker: str, interval: str,
+                     stock_id: int, meta: Dict[str, Any]) -> Optional[int]:
+    """
+    Write features of the bars from the last stored one on; None if a rebuild is needed
+
+    The last stored row is recomputed too, since its bar may have changed.
+    """
+    stored = store.read(ticker, interval, tail=2)
+    if stored is None or len(stored) < 2:
+        return None
+    # Last row kept as stored; aligns the cumulative columns
+    anchor_date = stored["Date"].iloc[0]
+
+    new_bars = db.execute(
+        select(func.count()).select_from(StockPrice).where(
+            StockPrice.stock_id == stock_id,
+            StockPrice.interval == interval,
+            StockPrice.date > anchor_date.to_pydatetime()
+        )
+    ).scalar()
+    bars = load_price_frame(db, stock_id, interval=interval, limit=FEATURE_WARMUP_BARS + new_bars,
+                            rename=TITLE_CASE_COLUMNS)
+    frame = build_feature_frame(bars)
+
+    overlap = frame[frame["Date"] == anchor_date]
+    if overlap.empty or schema_hash(frame.columns[1:]) != meta["schema_hash"]:
+        return None
+
+    appended = frame[frame["Date"] > anchor_date].copy()
+    for column in CUMULATIVE_COLUMNS:
+        if column in appended.columns:
+            offset = float(stored[column].iloc[0]) - float(overlap[column].iloc[0])
+            appended[column] = (appended[column].astype(np.float64) + offset).astype(np.float32)
+    return store.append(ticker, interval, appended, last_bar=bar_values(bars.iloc[-1]))
+
+
+def _last_bar_values(db: Session, stock_id: int, interval: str, date: datetime) -> Optional[List[Optional[float]]]:
+    """``bar_values`` of a stored bar, None if it is missing"""
+    row = db.execute(
+        select(StockPrice.open, StockPrice.high, StockPrice.low, StockPrice.close, StockPrice.volume).where(
+            StockPrice.stock_id == stock_id,
+            StockPrice.interval == interval,
+            StockPrice.date == date
+        )
+    ).first()
+    if row is None:
+        return None
+    return [None if value is None else float(value) for value in row]
+
+
+def sync_feature_store(db: Session, ticker: str, interval: str = "1d", stock_id: Optional[int] = None,
+                       last_bar_date: Optional[datetime] = None, rebuild: bool = False,
+                       store: Optional[FeatureStore] = None) -> int:
+    """
+    Bring a ticker's stored features up to date with its stored bars
+
+    Appends rows for bars after the last stored one, and recomputes the
+    last stored row if its bar was rewritten; builds the matrix from
+    the full bar history when nothing current is stored (missing, other
+    schema version, or ``rebuild``). Nothing is fetched from the network.
+
+    Args:
+        stock_id: Stock ID if already known
+        last_bar_date: Date of the newest stored bar if already known
+
+    Returns:
+        Number of feature rows written
+    """
+    store = store or get_feature_store()
+    if stock_id is None:
+        stock_id = get_stock_id(db, ticker)
+        if stock_id is None:
+            return 0
+    if last_bar_date is None:
+        last_bar_date = db.execute(
+            select(func.max(StockPrice.date)).where(
+                StockPrice.stock_id == stock_id, StockPrice.interval == interval
+            )
+        ).scalar()
+        if last_bar_date is None:
+            return 0
+
+    meta = None if rebuild else store.meta(ticker, interval)
+    if meta is not None and meta["version"] == FEATURE_SCHEMA_VERSION and meta["last_date"] is not None:
+        stored_last = pd.Timestamp(meta["last_date"])
+        if stored_last > pd.Timestamp(last_bar_date):
+            return 0
+        if stored_last == pd.Timestamp(last_bar_date):
+            if meta.get("last_bar") == _last_bar_values(db, stock_id, interval, last_bar_date):
+                return 0
+        appended = _append_new_bars(db, store, ticker, interval, stock_id, meta)
+        if appended is not None:
+            logger.debug(f"Appended {appended} feature rows for {ticker} ({interval})")
+            return appended
+
+    bars = load_price_frame(db, stock_id, interval=interval, rename=TITLE_CASE_COLUMNS)
+    last_bar = bar_values(bars.iloc[-1]) if not bars.empty else None
+    rows = store.write(ticker, interval, build_feature_frame(bars), last_bar=last_bar)
+    logger.info(f"Built feature store for {ticker} ({interval}): {rows} rows")
+    return rows
+
+
+def refresh_feature_store(db: Session, ticker: str, interval: str = "1d") -> None:
+    """``sync_feature_store`` for ingestion paths: errors are logged, not raised"""
+    try:
+        sync_feature_store(db, ticker, interval)
+    except Exception as e:
+        logger.warning(f"Feature store update failed for {ticker} ({interval}): {str(e)}")
+
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """Process-wide feature store rooted at ``FEATURE_STORE_DIR``"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore(FEATURE_STORE_DIR)
+    return _store
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from app.data.indonesian_stocks import INDONESIAN_STOCKS
 from app.models.stocks import Stock, StockPrice, StockIndicator
 from app.core.database import SessionLocal
+from app.core.indicator_engine import EMA, MACD, RSI, SMA, Bollinger, IndicatorEngine
 
 # Configure logging
 logging.basicConfig(
@@ -65,32 +66,19 @@ def generate_price_data(base_price, days=365, volatility=0.02):
 
 def calculate_indicators(prices_df):
     """Calculate technical indicators for the price data"""
-    # Calculate SMA
-    prices_df['sma_20'] = prices_df['close'].rolling(window=20).mean()
-    prices_df['sma_50'] = prices_df['close'].rolling(window=50).mean()
-    prices_df['sma_200'] = prices_df['close'].rolling(window=200).mean()
-    
-    # Calculate EMA
-    prices_df['ema_12'] = prices_df['close'].ewm(span=12, adjust=False).mean()
-    prices_df['ema_26'] = prices_df['close'].ewm(span=26, adjust=False).mean()
-    
-    # Calculate MACD
-    prices_df['macd'] = prices_df['ema_12'] - prices_df['ema_26']
-    prices_df['macd_signal'] = prices_df['macd'].ewm(span=9, adjust=False).mean()
-    prices_df['macd_histogram'] = prices_df['macd'] - prices_df['macd_signal']
-    
-    # Calculate RSI
-    delta = prices_df['close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-    rs = gain / loss
-    prices_df['rsi_14'] = 100 - (100 / (1 + rs))
-    
-    # Calculate Bollinger Bands
-    prices_df['bb_middle'] = prices_df['close'].rolling(window=20).mean()
-    prices_df['bb_std'] = prices_df['close'].rolling(window=20).std()
-    prices_df['bb_upper'] = prices_df['bb_middle'] + (2 * prices_df['bb_std'])
-    prices_df['bb_lower'] = prices_df['bb_middle'] - (2 * prices_df['bb_std'])
+    values = IndicatorEngine([
+        (SMA(20), 'sma_20'),
+        (SMA(50), 'sma_50'),
+        (SMA(200), 'sma_200'),
+        (EMA(12), 'ema_12'),
+        (EMA(26), 'ema_26'),
+        (MACD(12, 26, 9), ('macd', 'macd_signal', 'macd_histogram')),
+        (RSI(14), 'rsi_14'),
+        (Bollinger(20, 2.0), ('bb_upper', 'bb_middle', 'bb_lower')),
+    ]).run(prices_df)
+    for column in values.columns:
+        prices_df[column] = values[column]
+    prices_df['bb_std'] = (prices_df['bb_upper'] - prices_df['bb_middle']) / 2
     
     # Generate some buy/sell signals based on simple rules for demonstration
     # SMA crossover
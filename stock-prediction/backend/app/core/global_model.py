@@ -0,0 +1,258 @@
+"""
+Pooled cross-sectional model across all tickers
+
+Instead of one model per ticker, one model is trained on the stacked
+feature rows of every stock. Features are made scale-free (price levels
+relative to the close, volumes relative to their 20-bar average) so rows
+of a 50 and a 50,000 stock are comparable, and the model predicts the
+forward return rather than a price. Each row also carries a smoothed
+target encoding of its ticker and a one-hot encoding of its sector;
+tickers unseen in training get the pooled mean.
+
+The model is an ordinary ``MLModel`` row whose ``ticker`` is
+``GLOBAL_MODEL_TICKER``, so the registry loads it once and it serves every
+stock. With ``ML_MODEL_MODE=global`` ``MLEngine.generate_prediction`` and
+``batch_generate_predictions`` prefer it over per-ticker models.
+"""
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.feature_store import get_feature_store, sync_feature_store
+from app.core.model_registry import get_model_registry, prune_model_artifacts
+from app.models.big_data import DataProcessingJob, MLModel
+from app.models.stocks import Stock
+
+logger = logging.getLogger(__name__)
+
+# ``MLModel.ticker`` (and artifact file prefix) of pooled models
+GLOBAL_MODEL_TICKER = "_GLOBAL"
+
+# "global" to serve predictions from the pooled model when one exists
+GLOBAL_MODEL_MODE = os.getenv("ML_MODEL_MODE", "per_ticker") == "global"
+
+GLOBAL_MODEL_TYPES = ("linear", "forest", "gbm")
+
+# Rows of a ticker at which its own mean return gets half the weight in its encoding
+TICKER_ENCODING_SMOOTHING = 100
+
+# Test share of the date-ordered panel (as in ``MLEngine.fit_model``)
+TEST_SIZE = 0.2
+
+# Columns in price units: expressed relative to the close
+_RELATIVE_PRICE_PREFIXES = ("SMA_", "EMA_", "Close_Lag_")
+_RELATIVE_PRICE_COLUMNS = {"Open", "High", "Low", "BB_Upper_20", "BB_Middle_20", "BB_Lower_20"}
+_PRICE_UNIT_COLUMNS = {"PriceChange", "MACD", "MACD_Signal", "MACD_Histogram", "ATR", "BB_Std_20", "TR"}
+
+# Columns in share units: expressed relative to the 20-bar average volume
+_VOLUME_PREFIXES = ("Volume_Lag_",)
+_VOLUME_COLUMNS = {"Volume"}
+
+# Levels with no scale-free counterpart, or that depend on the start of the series
+_DROPPED_COLUMNS = {"Close", "Volume_MA_20", "OBV", "Volume_Price_Ratio", "Dollar_Volume", "Year"}
+
+
+def is_global_model(ml_model: Optional[MLModel]) -> bool:
+    """Whether an ``MLModel`` row is a pooled model"""
+    return ml_model is not None and ml_model.ticker == GLOBAL_MODEL_TICKER
+
+
+def scale_free_features(features: pd.DataFrame) -> pd.DataFrame:
+    """
+    Feature-store rows with price and volume levels replaced by ratios
+
+    Args:
+        features: Feature-store rows (``Date``, ``Close``, ``Volume_MA_20``, ...)
+
+    Returns:
+        ``Date`` plus float columns that are comparable across tickers
+    """
+    close = features["Close"].to_numpy(dtype=np.float64)
+    volume_ma = features["Volume_MA_20"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = {}
+        for name in features.columns:
+            if name == "Date" or name in _DROPPED_COLUMNS:
+                continue
+            values = features[name].to_numpy(dtype=np.float64)
+            if name in _RELATIVE_PRICE_COLUMNS or name.startswith(_RELATIVE_PRICE_PREFIXES):
+                values = values / close - 1
+            elif name in _PRICE_UNIT_COLUMNS:
+                values = values / close
+            elif name in _VOLUME_COLUMNS or name.startswith(_VOLUME_PREFIXES):
+                values = values / volume_ma
+            columns[name] = values
+        # Liquidity, on a log scale
+        columns["Log_Dollar_Volume"] = np.log10(np.maximum(features["Volume"].to_numpy(dtype=np.float64) * close, 1.0))
+
+    frame = pd.DataFrame(columns, index=features.index)
+    frame = frame.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    frame.insert(0, "Date", features["Date"].to_numpy())
+    return frame
+
+
+def encode_entities(frame: pd.DataFrame, tickers: Sequence[str], sectors: Sequence[Optional[str]],
+                    parameters: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Add the ticker and sector encodings of a pooled model to scale-free rows
+
+    Args:
+        frame: Output of ``scale_free_features``
+        tickers: Ticker of each row
+        sectors: Sector of each row (None if unknown)
+        parameters: ``MLModel.parameters`` of the pooled model
+    """
+    encoding = parameters.get("ticker_encoding") or {}
+    default = parameters.get("default_encoding", 0.0)
+    frame = frame.copy()
+    frame["Ticker_Encoding"] = [encoding.get(ticker, default) for ticker in tickers]
+    sectors = np.asarray([sector or "" for sector in sectors], dtype=object)
+    for sector in parameters.get("sectors") or []:
+        frame[f"Sector_{sector}"] = (sectors == sector).astype(np.float64)
+    return frame
+
+
+def global_model_inputs(rows: pd.DataFrame, tickers: Sequence[str], sectors: Sequence[Optional[str]],
+                        parameters: Dict[str, Any]) -> pd.DataFrame:
+    """Model inputs (without ``Date``) of a pooled model for feature-store rows"""
+    frame = encode_entities(scale_free_features(rows), tickers, sectors, parameters)
+    return frame.drop(columns=["Date"])
+
+
+def _ticker_encoding(train: pd.DataFrame) -> Dict[str, Any]:
+    """Mean forward return per ticker, shrunk towards the pooled mean"""
+    pooled = float(train["Target_Price"].mean())
+    stats = train.groupby("Ticker")["Target_Price"].agg(["sum", "count"])
+    encoded = (stats["sum"] + TICKER_ENCODING_SMOOTHING * pooled) / (stats["count"] + TICKER_ENCODING_SMOOTHING)
+    return {"ticker_encoding": {ticker: float(value) for ticker, value in encoded.items()},
+            "default_encoding": pooled}
+
+
+def train_global_model(db: Session, tickers: Optional[List[str]] = None, model_type: str = "gbm",
+                       interval: str = "1d", prediction_horizon: int = 5, days: int = 730,
+                       n_jobs: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Train one pooled model on the stacked features of many stocks
+
+    Args:
+        db: Database session
+        tickers: Stocks to pool (all active stocks if None)
+        model_type: One of ``GLOBAL_MODEL_TYPES``
+        interval: Bar interval
+        prediction_horizon: Bars ahead to predict
+        days: Days of history per stock
+        n_jobs: Threads for the random forest
+
+    Returns:
+        ``{"status": "success", "model_id", "tickers", "rows", "metrics"}``
+        or ``{"status": "error", "message"}``
+    """
+    if model_type not in GLOBAL_MODEL_TYPES:
+        raise ValueError(f"Unsupported model type for a global model: {model_type}")
+    from app.core.ml_engine import MLEngine  # ml_engine imports this module
+
+    store = get_feature_store()
+    stock_query = db.query(Stock.id, Stock.ticker, Stock.sector)
+    if tickers is None:
+        stock_query = stock_query.filter(Stock.is_active == True)
+    else:
+        stock_query = stock_query.filter(Stock.ticker.in_(tickers))
+    stocks = stock_query.all()
+
+    job = DataProcessingJob(
+        job_type="model_training",
+        status="running",
+        parameters={"global": True, "tickers": len(stocks), "model_type": model_type, "days": days}
+    )
+    db.add(job)
+    db.commit()
+
+    started = time.monotonic()
+    start = datetime.now() - timedelta(days=days)
+    panels = []
+    for stock_id, ticker, sector in stocks:
+        try:
+            sync_feature_store(db, ticker, interval, stock_id=stock_id, store=store)
+            features = store.read(ticker, interval, start=start)
+        except Exception as e:
+            logger.error(f"Skipping {ticker} in global model: {str(e)}")
+            continue
+        if features is None or len(features) <= prediction_horizon:
+            continue
+
+        forward_return = features["Close"].shift(-prediction_horizon) / features["Close"] - 1
+        frame = scale_free_features(features)
+        frame["Ticker"] = ticker
+        frame["Sector"] = sector or ""
+        frame["Target_Price"] = forward_return.to_numpy()
+        panels.append(frame.iloc[:-prediction_horizon])
+
+    if not panels:
+        job.status = "failed"
+        job.error_message = "No stored features to train on"
+        job.completed_at = datetime.now()
+        db.commit()
+        return {"status": "error", "message": job.error_message}
+
+    # Order the panel by date so the test split is the most recent period of every stock
+    panel = pd.concat(panels, ignore_index=True)
+    panel = panel.sort_values("Date", kind="stable", ignore_index=True)
+    panel["Target_Direction"] = (panel["Target_Price"] > 0).astype(int)
+    panel["Target_Percent_Change"] = panel["Target_Price"] * 100
+
+    train = panel.iloc[:len(panel) - math.ceil(len(panel) * TEST_SIZE)]
+    encodings = _ticker_encoding(train)
+    encodings["sectors"] = sorted(sector for sector in panel["Sector"].unique() if sector)
+    panel = encode_entities(panel, panel["Ticker"].tolist(), panel["Sector"].tolist(), encodings)
+
+    trained = MLEngine.fit_model(panel.drop(columns=["Ticker", "Sector"]), GLOBAL_MODEL_TICKER,
+                                 model_type, n_jobs=n_jobs)
+    if trained is None:
+        job.status = "failed"
+        job.error_message = "Failed to train global model"
+        job.completed_at = datetime.now()
+        db.commit()
+        return {"status": "error", "message": job.error_message}
+
+    # fit_model reports errors of the standardized target; also keep them as returns
+    metrics = trained["metrics"]
+    metrics["return_rmse"] = metrics["rmse"] * float(train["Target_Price"].std(ddof=0))
+    stock_count = int(panel["Ticker"].nunique())
+
+    previous = db.query(MLModel).filter(
+        MLModel.ticker == GLOBAL_MODEL_TICKER,
+        MLModel.model_type == model_type,
+        MLModel.interval == interval,
+        MLModel.prediction_horizon == prediction_horizon
+    )
+    version = previous.with_entities(func.count(MLModel.id)).scalar() + 1
+    previous.update({MLModel.is_active: False}, synchronize_session=False)
+
+    record = MLEngine.model_record(GLOBAL_MODEL_TICKER, model_type, interval, prediction_horizon, days,
+                                   trained, version=f"{version}.0")
+    record["description"] = (f"Global {model_type.upper()} model predicting the {prediction_horizon} {interval} "
+                             f"return of {stock_count} stocks")
+    record["target"] = "return"
+    record["parameters"].update(encodings, tickers=stock_count, rows=len(panel))
+    ml_model = MLModel(**record)
+    db.add(ml_model)
+
+    job.status = "completed"
+    job.completed_at = datetime.now()
+    job.results = {"rows": len(panel), "tickers": stock_count, "metrics": metrics,
+                   "seconds": round(time.monotonic() - started, 1)}
+    db.commit()
+
+    get_model_registry().invalidate(ticker=GLOBAL_MODEL_TICKER)
+    prune_model_artifacts(db, [GLOBAL_MODEL_TICKER], model_type, interval, prediction_horizon)
+    logger.info(f"Trained global {model_type} model {ml_model.id} on {len(panel)} rows of {stock_count} stocks")
+    return {"status": "success", "model_id": ml_model.id, "tickers": stock_count, "rows": len(panel),
+            "metrics": metrics}
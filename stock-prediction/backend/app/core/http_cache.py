@@ -0,0 +1,370 @@
+"""
+On-disk HTTP response cache with conditional requests
+
+Responses of the news scrapers and market data APIs are kept on local disk,
+a gzip-compressed body next to a small JSON header file, in a directory per
+source. Within the source's TTL a stored response is served without
+touching the network. After that it is revalidated with If-None-Match /
+If-Modified-Since, and a 304 refreshes the stored copy instead of
+downloading the body again.
+
+HTTP_CACHE_MODE selects the behaviour:
+    normal  serve fresh responses, revalidate stale ones, store new ones
+    replay  serve stored responses of any age and never use the network;
+            a miss raises LookupError (offline tests, development backfills)
+    off     always use the network and store nothing
+
+``HTTPCache.prune`` deletes entries past HTTP_CACHE_MAX_AGE and then the
+oldest ones until the cache fits in HTTP_CACHE_MAX_BYTES; it runs after
+each news collection and with the periodic cache cleanup.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import requests
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "http")
+)
+
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "normal").lower()
+HTTP_CACHE_MODES = ("normal", "replay", "off")
+
+# Seconds a stored response is served without revalidation, by source;
+# override with HTTP_CACHE_TTL_<SOURCE>, e.g. HTTP_CACHE_TTL_BISNIS_COM=60
+HTTP_CACHE_TTLS = {
+    "bisnis_com": 600,            # listing pages change through the trading day
+    "alpha_vantage": 6 * 3600,    # end-of-day series and company overviews
+    "marketstack": 6 * 3600,
+}
+HTTP_CACHE_DEFAULT_TTL = 300
+
+# Seconds per request
+HTTP_CACHE_TIMEOUT = 10
+
+# Seconds since it was stored or revalidated after which an entry is deleted
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# Bytes the cache may use on disk; the least recently stored entries go first
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 2**20)))
+
+# Seconds after which a temporary file is taken to be left by an interrupted write
+STALE_TMP_SECONDS = 3600
+
+# Query parameters left out of cache keys, so recorded responses replay with any key
+SECRET_PARAMS = {"apikey", "api_key", "access_key", "token"}
+
+# Response headers kept with a stored body
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+
+def cache_ttl(namespace: str) -> int:
+    """TTL in seconds of a source's responses"""
+    override = os.getenv(f"HTTP_CACHE_TTL_{namespace.upper()}")
+    if override is not None:
+        return int(override)
+    return HTTP_CACHE_TTLS.get(namespace, HTTP_CACHE_DEFAULT_TTL)
+
+
+def cache_namespace(name: str) -> str:
+    """Directory name of a source, e.g. "Bisnis.com" -> "bisnis_com" """
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+class HTTPResponse:
+    """Status, headers and body of a response, from the network or the cache"""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], content: bytes,
+                 from_cache: bool = False, revalidated: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+        # Served from disk without a request
+        self.from_cache = from_cache
+        # Stored body confirmed by a 304
+        self.revalidated = revalidated
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class HTTPCache:
+    """GET responses on local disk, one directory per source"""
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, mode: str = HTTP_CACHE_MODE):
+        if mode not in HTTP_CACHE_MODES:
+            raise ValueError(f"Unknown HTTP cache mode {mode!r}, expected one of {HTTP_CACHE_MODES}")
+        self.directory = directory
+        self.mode = mode
+
+    # Blocking requests
+
+    def get(self, url: str, namespace: str, params: Optional[Dict[str, Any]] = None,
+            session: Optional[requests.Session] = None, timeout: float = HTTP_CACHE_TIMEOUT) -> HTTPResponse:
+        """
+        GET through the cache
+
+        Args:
+            url: URL to fetch
+            namespace: Source of the URL, selects the directory and TTL
+            params: Query parameters
+            session: Session to send the request with (``requests.get`` if None)
+            timeout: Seconds per request
+
+        Returns:
+            Stored or network response (errors are returned, not stored)
+        """
+        return self.fresh(url, namespace, params) or self.revalidate(url, namespace, params, session, timeout)
+
+    def revalidate(self, url: str, namespace: str, params: Optional[Dict[str, Any]] = None,
+                   session: Optional[requests.Session] = None,
+                   timeout: float = HTTP_CACHE_TIMEOUT) -> HTTPResponse:
+        """Conditional GET of a URL, skipping the freshness check"""
+        headers = self._request_headers(url, namespace, params)
+        response = (session or requests).get(url, params=params, headers=headers, timeout=timeout)
+        return self._complete(url, namespace, params, response.status_code, response.headers, response.content)
+
+    # aiohttp
+
+    async def get_async(self, url: str, namespace: str, params: Optional[Dict[str, Any]] = None,
+                        session: Optional[aiohttp.ClientSession] = None) -> HTTPResponse:
+        """``get`` over aiohttp; a client is opened for the request if none is given"""
+        response = await asyncio.to_thread(self.fresh, url, namespace, params)
+        if response is not None:
+            return response
+        if session is not None:
+            return await self.revalidate_async(session, url, namespace, params)
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_CACHE_TIMEOUT)) as session:
+            return await self.revalidate_async(session, url, namespace, params)
+
+    async def revalidate_async(self, session: aiohttp.ClientSession, url: str, namespace: str,
+                               params: Optional[Dict[str, Any]] = None) -> HTTPResponse:
+        """``revalidate`` over aiohttp"""
+        headers = await asyncio.to_thread(self._request_headers, url, namespace, params)
+        async with session.get(url, params=params, headers=headers) as response:
+            status, response_headers, body = response.status, dict(response.headers), await response.read()
+        return await asyncio.to_thread(self._complete, url, namespace, params, status, response_headers, body)
+
+    # Storage
+
+    def fresh(self, url: str, namespace: str, params: Optional[Dict[str, Any]] = None,
+              ttl: Optional[int] = None) -> Optional[HTTPResponse]:
+        """
+        Stored response that can be served without a request
+
+        In replay mode any stored response is served, and a miss raises
+        LookupError instead of returning None.
+        """
+        if self.mode == "off":
+            return None
+
+        entry = self._load(namespace, self._key(url, params))
+        if self.mode == "replay":
+            if entry is None:
+                raise LookupError(f"No recorded response for {url} (HTTP_CACHE_MODE=replay)")
+        elif entry is None or time.time() - entry[0]["stored_at"] >= (cache_ttl(namespace) if ttl is None else ttl):
+            return None
+
+        meta, body = entry
+        return HTTPResponse(url, meta["status"], meta["headers"], body, from_cache=True)
+
+    def discard(self, url: str, namespace: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Remove a stored response, e.g. an API error sent with status 200
+
+        Replay mode never changes the recordings.
+        """
+        if self.mode != "normal":
+            return
+        path = self._path(namespace, self._key(url, params))
+        for suffix in (".json", ".body.gz"):
+            self._remove(path + suffix)
+
+    def prune(self, max_age: int = HTTP_CACHE_MAX_AGE, max_bytes: int = HTTP_CACHE_MAX_BYTES) -> int:
+        """
+        Delete entries older than ``max_age`` seconds, then the oldest until
+        the cache fits in ``max_bytes``
+
+        An entry's age counts from when it was stored or last revalidated
+        (the header file's mtime). Temporary files left by interrupted
+        writes are removed too. Replay mode never changes the recordings.
+
+        Returns:
+            Number of entries deleted
+        """
+        if self.mode != "normal":
+            return 0
+
+        now = time.time()
+        entries: Dict[str, list] = {}  # path without suffix -> [mtime, bytes]
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".tmp"):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        self._remove(path)
+                    continue
+                for suffix in (".json", ".body.gz"):
+                    if name.endswith(suffix):
+                        entry = entries.setdefault(path[:-len(suffix)], [stat.st_mtime, 0])
+                        if suffix == ".json":
+                            entry[0] = stat.st_mtime
+                        entry[1] += stat.st_size
+
+        removed = 0
+        total = sum(size for _, size in entries.values())
+        for path, (mtime, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if now - mtime <= max_age and total <= max_bytes:
+                break
+            # Header first, so a reader never finds it without its body
+            self._remove(path + ".json")
+            self._remove(path + ".body.gz")
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Pruned {removed} HTTP cache entries, {total / 2**20:.1f} MB left")
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _request_headers(self, url: str, namespace: str, params: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        if self.mode == "replay":
+            raise LookupError(f"No recorded response for {url} (HTTP_CACHE_MODE=replay)")
+        if self.mode == "off":
+            return {}
+
+        meta = self._load_meta(namespace, self._key(url, params))
+        headers = {}
+        if meta:
+            if meta["headers"].get("etag"):
+                headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+        return headers
+
+    def _complete(self, url: str, namespace: str, params: Optional[Dict[str, Any]], status: int,
+                  headers, body: bytes) -> HTTPResponse:
+        """Response for a network reply: a 304 is answered from disk, a 200 is stored"""
+        headers = {name.lower(): value for name, value in headers.items()}
+        if self.mode == "off":
+            return HTTPResponse(url, status, headers, body)
+
+        key = self._key(url, params)
+        if status == 304:
+            entry = self._load(namespace, key)
+            if entry is not None:
+                meta, stored_body = entry
+                # Validators may change on a 304; the stored body stays
+                meta["headers"].update({name: headers[name] for name in STORED_HEADERS if name in headers})
+                meta["stored_at"] = time.time()
+                self._store(namespace, key, meta)
+                return HTTPResponse(url, meta["status"], meta["headers"], stored_body, revalidated=True)
+            logger.warning(f"Got 304 for {url} without a stored response")
+
+        if status == 200 and "no-store" not in headers.get("cache-control", ""):
+            meta = {
+                "url": url,
+                "status": status,
+                "headers": {name: headers[name] for name in STORED_HEADERS if name in headers},
+                "stored_at": time.time(),
+            }
+            self._store(namespace, key, meta, body)
+            return HTTPResponse(url, status, meta["headers"], body)
+
+        return HTTPResponse(url, status, headers, body)
+
+    @staticmethod
+    def _key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        params = sorted((str(name), str(value)) for name, value in (params or {}).items()
+                        if str(name).lower() not in SECRET_PARAMS)
+        return hashlib.sha256(json.dumps(["GET", url, params]).encode("utf-8")).hexdigest()
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.directory, namespace, key[:2], key)
+
+    def _load_meta(self, namespace: str, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(namespace, key) + ".json", "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable HTTP cache entry {namespace}/{key}: {str(e)}")
+            return None
+
+    def _load(self, namespace: str, key: str) -> Optional[Tuple[Dict, bytes]]:
+        meta = self._load_meta(namespace, key)
+        if meta is None:
+            return None
+        try:
+            with gzip.open(self._path(namespace, key) + ".body.gz", "rb") as f:
+                return meta, f.read()
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable HTTP cache entry {namespace}/{key}: {str(e)}")
+            return None
+
+    def _store(self, namespace: str, key: str, meta: Dict, body: Optional[bytes] = None) -> None:
+        """Write an entry, or only its header file if body is None"""
+        path = self._path(namespace, key)
+        try:
+            # The header file is written last, so a reader never pairs it with a partial body
+            if body is not None:
+                self._write(path + ".body.gz", gzip.compress(body, compresslevel=6))
+            self._write(path + ".json", json.dumps(meta).encode("utf-8"))
+        except Exception as e:
+            logger.warning(f"Could not store HTTP response for {meta['url']}: {str(e)}")
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        """Atomically replace a file"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+_http_cache: Optional[HTTPCache] = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPCache:
+    """Process-wide cache configured from the environment"""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache()
+        return _http_cache
@@ -0,0 +1,247 @@
+"""
+Incremental (delta) refresh of stock prices and indicators
+
+Instead of refetching a fixed period and rewriting the whole history, a
+refresh reads the last stored bar per (stock_id, interval), fetches only
+the bars from it on and continues the indicators from the persisted
+streaming state (or, without state, from a short warm-up tail of stored
+bars). Only the last stored bar, which may have been partial, and the new
+bars are written, so the I/O of a daily refresh depends on the number of
+new bars, not on history length.
+"""
+import copy
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+from sqlalchemy.orm import Session
+
+from app.core.bulk_writer import bulk_upsert_stock_frame, normalize_dates
+from app.core.feature_store import refresh_feature_store
+from app.core.indicator_engine import IndicatorEngine, stock_indicator_engine
+from app.core.latest_quotes import refresh_latest_quotes
+from app.models.stocks import IndicatorState, Stock, StockPrice
+
+logger = logging.getLogger(__name__)
+
+# Bars of history loaded in front of the new bars. sma_200 needs 200 bars;
+# the EMA/MACD/RSI recursions started on the tail have converged to the
+# full-history values well before its end.
+WARMUP_BARS = 250
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def get_last_bar_date(db: Session, stock_id: int, interval: str = "1d") -> Optional[datetime]:
+    """Date of the most recent stored bar for a stock and interval"""
+    return db.query(StockPrice.date).filter(
+        StockPrice.stock_id == stock_id,
+        StockPrice.interval == interval
+    ).order_by(StockPrice.date.desc()).limit(1).scalar()
+
+
+def load_warmup_tail(db: Session, stock_id: int, interval: str = "1d", bars: int = WARMUP_BARS) -> pd.DataFrame:
+    """Last ``bars`` stored bars as an ascending OHLCV DataFrame with a ``Date`` column"""
+    rows = db.query(
+        StockPrice.date, StockPrice.open, StockPrice.high,
+        StockPrice.low, StockPrice.close, StockPrice.volume
+    ).filter(
+        StockPrice.stock_id == stock_id,
+        StockPrice.interval == interval
+    ).order_by(StockPrice.date.desc()).limit(bars).all()
+
+    df = pd.DataFrame(rows, columns=["Date"] + PRICE_COLUMNS)
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def normalize_bars(df: pd.DataFrame) -> pd.DataFrame:
+    """Bring a Yahoo Finance frame into ``Date`` + OHLCV form with stored (naive UTC) timestamps"""
+    if df.empty:
+        return pd.DataFrame(columns=["Date"] + PRICE_COLUMNS)
+
+    df = df.reset_index()
+    if "Datetime" in df.columns:
+        df = df.rename(columns={"Datetime": "Date"})
+    df["Date"] = normalize_dates(df["Date"])
+    return df[["Date"] + PRICE_COLUMNS]
+
+
+def fetch_bars_since(ticker: str, since: Optional[datetime], interval: str = "1d",
+                     fallback_period: str = "1y") -> pd.DataFrame:
+    """
+    Fetch bars from Yahoo Finance starting at the day of ``since``
+
+    The first day is fetched again (Yahoo's ``start`` has day granularity);
+    the caller drops bars that are already stored.
+    """
+    history = yf.Ticker(ticker)
+    if since is None:
+        df = history.history(period=fallback_period, interval=interval)
+    else:
+        df = history.history(start=since.date(), interval=interval)
+    return normalize_bars(df)
+
+
+def load_indicator_state(db: Session, stock_id: int, interval: str = "1d") -> Optional[IndicatorState]:
+    """Persisted indicator engine state for a stock and interval"""
+    return db.query(IndicatorState).filter(
+        IndicatorState.stock_id == stock_id,
+        IndicatorState.interval == interval
+    ).first()
+
+
+def save_indicator_state(db: Session, stock_id: int, interval: str, engine: IndicatorEngine,
+                         last_bar: pd.Series, previous_bar: Optional[pd.Series] = None,
+                         previous_state: Optional[Dict] = None,
+                         state_row: Optional[IndicatorState] = None) -> None:
+    """
+    Store the engine state after ``last_bar`` (the caller commits)
+
+    The state after ``previous_bar`` is stored with it, so the next refresh
+    can roll back one bar and rewrite ``last_bar``.
+    """
+    if state_row is None:
+        state_row = IndicatorState(stock_id=stock_id, interval=interval)
+        db.add(state_row)
+    state = engine.to_dict()
+    if previous_bar is not None and previous_state is not None:
+        state["previous"] = {
+            "date": previous_bar["Date"].isoformat(),
+            "close": float(previous_bar["Close"]),
+            "engine": previous_state,
+        }
+    state_row.last_date = last_bar["Date"].to_pydatetime()
+    state_row.last_close = float(last_bar["Close"])
+    state_row.state = state
+
+
+def run_with_snapshot(engine: IndicatorEngine, bars: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+    """Indicator values of ``bars`` and the engine state before the last of them"""
+    head = engine.run(bars.iloc[:-1])
+    before_last = copy.deepcopy(engine.to_dict())
+    tail = engine.run(bars.iloc[-1:])
+    return pd.concat([head, tail]), before_last
+
+
+def _resume_engine(state_row: Optional[IndicatorState], last_date: Optional[datetime],
+                   first_date: pd.Timestamp) -> Optional[Tuple[IndicatorEngine, pd.DataFrame]]:
+    """
+    Restored engine that continues right before ``first_date``, and the bar before it
+
+    Returns:
+        ``(engine, previous)`` with ``previous`` a one-row frame of the bar
+        before ``first_date`` and its indicator values, or None if the
+        persisted state does not reach that bar
+    """
+    if last_date is None or state_row is None or state_row.last_date != last_date:
+        return None
+
+    state = state_row.state
+    if first_date > pd.Timestamp(last_date):
+        engine_state, date, close = state, last_date, state_row.last_close
+    elif "previous" in state:
+        # The last stored bar is rewritten: continue from the state one bar earlier
+        previous = state["previous"]
+        engine_state, date, close = previous["engine"], pd.Timestamp(previous["date"]), previous["close"]
+    else:
+        return None
+
+    row = {"Date": pd.Timestamp(date), "Close": close, **engine_state.get("last_values", {})}
+    return IndicatorEngine.from_dict(engine_state), pd.DataFrame([row])
+
+
+def append_new_bars(db: Session, stock_id: int, bars: pd.DataFrame, interval: str = "1d",
+                    last_date: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Write the bars from the last stored one on, with their indicators
+
+    The last stored bar is written again: it may have been stored while
+    still forming (today's daily bar, an open intraday bar). When the
+    persisted indicator state reaches the last stored bar, indicators
+    continue from it (rolled back one bar when that bar is rewritten) and
+    only the fetched bars are processed. Otherwise they are computed over a
+    warm-up tail of stored bars. The state is stored for the next refresh.
+
+    Args:
+        db: Database session (the caller commits)
+        stock_id: Stock ID
+        bars: ``Date`` + OHLCV frame, may overlap with stored history
+        interval: Bar interval
+        last_date: Last stored bar date if already known
+
+    Returns:
+        Inserted/updated counts from ``bulk_upsert_stock_frame``
+    """
+    # Imported here: stock_fetcher imports this module for its incremental path
+    from app.core.stock_fetcher import add_signal_columns
+
+    if last_date is None:
+        last_date = get_last_bar_date(db, stock_id, interval)
+
+    new_bars = bars.sort_values("Date").drop_duplicates(subset="Date", keep="last")[["Date"] + PRICE_COLUMNS]
+    if last_date is not None:
+        new_bars = new_bars[new_bars["Date"] >= pd.Timestamp(last_date)]
+    new_bars = new_bars.reset_index(drop=True)
+
+    if new_bars.empty:
+        return {"prices_inserted": 0, "prices_updated": 0, "indicators_inserted": 0, "indicators_updated": 0}
+
+    state_row = load_indicator_state(db, stock_id, interval)
+    resumed = _resume_engine(state_row, last_date, new_bars["Date"].iloc[0])
+    if resumed is not None:
+        engine, previous = resumed
+        values, before_last = run_with_snapshot(engine, new_bars)
+
+        # The previous bar is prepended so crossover signals see the boundary
+        combined = pd.concat([previous, pd.concat([new_bars, values], axis=1)], ignore_index=True)
+        combined = combined.astype({column: float for column in values.columns})
+        add_signal_columns(combined)
+        appended = combined.iloc[1:]
+    else:
+        engine = stock_indicator_engine()
+        tail = load_warmup_tail(db, stock_id, interval) if last_date is not None else new_bars.iloc[0:0]
+        tail = tail[tail["Date"] < new_bars["Date"].iloc[0]]
+        combined = pd.concat([tail, new_bars], ignore_index=True)
+        values, before_last = run_with_snapshot(engine, combined)
+        for column in values.columns:
+            combined[column] = values[column]
+        add_signal_columns(combined)
+        appended = combined.iloc[len(tail):]
+
+    stats = bulk_upsert_stock_frame(db, stock_id, appended, interval)
+    refresh_latest_quotes(db, [stock_id], interval)
+    save_indicator_state(
+        db, stock_id, interval, engine, combined.iloc[-1],
+        combined.iloc[-2] if len(combined) > 1 else None, before_last, state_row
+    )
+    return stats
+
+
+def refresh_stock_incremental(db: Session, stock: Stock, interval: str = "1d",
+                              fallback_period: str = "1y") -> Dict[str, int]:
+    """
+    Fetch and store only the bars after the last stored one
+
+    Stocks without stored bars for ``interval`` get ``fallback_period`` of
+    history. Commits on success.
+
+    Returns:
+        Inserted/updated counts for prices and indicators
+    """
+    last_date = get_last_bar_date(db, stock.id, interval)
+    bars = fetch_bars_since(stock.ticker, last_date, interval, fallback_period)
+    stats = append_new_bars(db, stock.id, bars, interval, last_date)
+
+    if stats["prices_inserted"] or stats["prices_updated"]:
+        stock.last_updated = datetime.now()
+    db.commit()
+    if stats["prices_inserted"]:
+        refresh_feature_store(db, stock.ticker, interval)
+
+    logger.info(
+        f"Incremental refresh of {stock.ticker} ({interval}) since {last_date}: "
+        f"{stats['prices_inserted']} new bars"
+    )
+    return stats
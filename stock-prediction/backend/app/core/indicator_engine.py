@@ -0,0 +1,587 @@
+"""
+Streaming technical indicator engine
+
+Every indicator is an update object that consumes one bar at a time in
+O(1) (amortized for rolling min/max) and keeps only the state it needs.
+The state of each indicator, and of a whole ``IndicatorEngine``, can be
+serialized to a JSON-compatible dictionary and restored, so intraday bars
+can update indicators without reloading history.
+
+The same objects back batch mode: ``IndicatorEngine.run`` feeds a whole
+DataFrame through the engine and returns the indicator columns.
+
+Windowed indicators (SMA, Bollinger) treat a missing value like
+``Series.rolling(period)``: it enters the window and the output is NaN
+until it has left. Recursive ones (EMA, Wilder, RSI) skip it.
+"""
+import math
+from collections import deque
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+
+
+def _is_nan(value: float) -> bool:
+    return value is None or value != value
+
+
+def _window_to_json(window: deque) -> List:
+    """Window values with NaN as None (JSONB has no NaN)"""
+    return [None if _is_nan(value) else value for value in window]
+
+
+def _window_from_json(values: List, period: int) -> deque:
+    return deque((NAN if value is None else value for value in values), maxlen=period)
+
+
+class Indicator:
+    """Base class for streaming indicators
+
+    Subclasses declare the bar fields they read (``inputs``) and the values
+    they produce (``outputs``), and implement ``update``, ``params`` and
+    ``get_state``/``set_state``.
+    """
+
+    inputs: Tuple[str, ...] = ("close",)
+    outputs: Tuple[str, ...] = ("value",)
+
+    def update(self, *values: float) -> Union[float, Tuple[float, ...]]:
+        raise NotImplementedError
+
+    def params(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_state(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize parameters and state"""
+        return {"type": type(self).__name__, "params": self.params(), "state": self.get_state()}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "Indicator":
+        """Restore an indicator serialized with ``to_dict``"""
+        indicator = INDICATOR_TYPES[data["type"]](**data["params"])
+        indicator.set_state(data["state"])
+        return indicator
+
+
+class SMA(Indicator):
+    """Simple moving average over ``period`` values of ``source``
+
+    NaN while a missing value is in the window, as ``rolling(period).mean()``.
+    """
+
+    def __init__(self, period: int, source: str = "close"):
+        self.period = period
+        self.source = source
+        self.inputs = (source,)
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+        self._missing = 0
+
+    def update(self, x: float) -> float:
+        if len(self._window) == self.period:
+            old = self._window[0]
+            if _is_nan(old):
+                self._missing -= 1
+            else:
+                self._sum -= old
+        if _is_nan(x):
+            self._window.append(NAN)
+            self._missing += 1
+        else:
+            self._window.append(x)
+            self._sum += x
+        if len(self._window) < self.period or self._missing:
+            return NAN
+        return self._sum / self.period
+
+    def params(self):
+        return {"period": self.period, "source": self.source}
+
+    def get_state(self):
+        return {"window": _window_to_json(self._window)}
+
+    def set_state(self, state):
+        self._window = _window_from_json(state["window"], self.period)
+        self._sum = math.fsum(value for value in self._window if not _is_nan(value))
+        self._missing = sum(1 for value in self._window if _is_nan(value))
+
+
+class EMA(Indicator):
+    """Exponential moving average with ``alpha = 2 / (period + 1)``
+
+    ``seed="first"`` starts from the first value (``ewm(adjust=False)``);
+    ``seed="sma"`` outputs NaN for ``period - 1`` values and starts from
+    their simple average (pandas_ta ``ema``). NaN inputs are skipped.
+    """
+
+    def __init__(self, period: int, seed: str = "first", source: str = "close"):
+        self.period = period
+        self.seed = seed
+        self.source = source
+        self.inputs = (source,)
+        self.alpha = 2.0 / (period + 1)
+        self._value = NAN
+        self._seed_values: List[float] = []
+
+    def update(self, x: float) -> float:
+        if _is_nan(x):
+            return NAN
+        if not _is_nan(self._value):
+            self._value += self.alpha * (x - self._value)
+        elif self.seed == "first":
+            self._value = x
+        else:
+            self._seed_values.append(x)
+            if len(self._seed_values) < self.period:
+                return NAN
+            self._value = math.fsum(self._seed_values) / self.period
+            self._seed_values = []
+        return self._value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def params(self):
+        return {"period": self.period, "seed": self.seed, "source": self.source}
+
+    def get_state(self):
+        return {"value": None if _is_nan(self._value) else self._value, "seed_values": list(self._seed_values)}
+
+    def set_state(self, state):
+        self._value = NAN if state["value"] is None else state["value"]
+        self._seed_values = list(state["seed_values"])
+
+
+class WilderAverage(Indicator):
+    """Wilder's smoothing: SMA of the first ``period`` values, then ``(prev * (n - 1) + x) / n``"""
+
+    def __init__(self, period: int, source: str = "close"):
+        self.period = period
+        self.source = source
+        self.inputs = (source,)
+        self._value = NAN
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x: float) -> float:
+        if _is_nan(x):
+            return NAN
+        if self._count < self.period:
+            self._count += 1
+            self._sum += x
+            if self._count < self.period:
+                return NAN
+            self._value = self._sum / self.period
+        else:
+            self._value = (self._value * (self.period - 1) + x) / self.period
+        return self._value
+
+    def params(self):
+        return {"period": self.period, "source": self.source}
+
+    def get_state(self):
+        return {"value": None if _is_nan(self._value) else self._value, "count": self._count, "sum": self._sum}
+
+    def set_state(self, state):
+        self._value = NAN if state["value"] is None else state["value"]
+        self._count = state["count"]
+        self._sum = state["sum"]
+
+
+class RSI(Indicator):
+    """Relative Strength Index with Wilder's smoothing of gains and losses"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._gain = WilderAverage(period)
+        self._loss = WilderAverage(period)
+        self._prev = NAN
+
+    def update(self, close: float) -> float:
+        if _is_nan(close):
+            return NAN
+        prev, self._prev = self._prev, close
+        if _is_nan(prev):
+            return NAN
+        change = close - prev
+        avg_gain = self._gain.update(change if change > 0 else 0.0)
+        avg_loss = self._loss.update(-change if change < 0 else 0.0)
+        if _is_nan(avg_gain):
+            return NAN
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else NAN
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def params(self):
+        return {"period": self.period}
+
+    def get_state(self):
+        return {
+            "prev": None if _is_nan(self._prev) else self._prev,
+            "gain": self._gain.get_state(),
+            "loss": self._loss.get_state(),
+        }
+
+    def set_state(self, state):
+        self._prev = NAN if state["prev"] is None else state["prev"]
+        self._gain.set_state(state["gain"])
+        self._loss.set_state(state["loss"])
+
+
+class MACD(Indicator):
+    """MACD line, signal line and histogram"""
+
+    outputs = ("macd", "signal", "histogram")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, seed: str = "first"):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.seed = seed
+        self._fast = EMA(fast, seed)
+        self._slow = EMA(slow, seed)
+        self._signal = EMA(signal, seed)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        return macd, signal, macd - signal
+
+    def params(self):
+        return {"fast": self.fast, "slow": self.slow, "signal": self.signal, "seed": self.seed}
+
+    def get_state(self):
+        return {"fast": self._fast.get_state(), "slow": self._slow.get_state(), "signal": self._signal.get_state()}
+
+    def set_state(self, state):
+        self._fast.set_state(state["fast"])
+        self._slow.set_state(state["slow"])
+        self._signal.set_state(state["signal"])
+
+
+class Bollinger(Indicator):
+    """Bollinger Bands: SMA +/- ``num_std`` rolling standard deviations
+
+    NaN while a missing value is in the window, as ``rolling(period)``.
+    """
+
+    outputs = ("upper", "middle", "lower")
+
+    def __init__(self, period: int = 20, num_std: float = 2.0, ddof: int = 1):
+        self.period = period
+        self.num_std = num_std
+        self.ddof = ddof
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._missing = 0
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        if len(self._window) == self.period:
+            old = self._window[0]
+            if _is_nan(old):
+                self._missing -= 1
+            else:
+                self._sum -= old
+                self._sum_sq -= old * old
+        if _is_nan(close):
+            self._window.append(NAN)
+            self._missing += 1
+        else:
+            self._window.append(close)
+            self._sum += close
+            self._sum_sq += close * close
+        if len(self._window) < self.period or self._missing:
+            return NAN, NAN, NAN
+
+        mean = self._sum / self.period
+        variance = max(0.0, (self._sum_sq - self.period * mean * mean) / (self.period - self.ddof))
+        band = self.num_std * math.sqrt(variance)
+        return mean + band, mean, mean - band
+
+    def params(self):
+        return {"period": self.period, "num_std": self.num_std, "ddof": self.ddof}
+
+    def get_state(self):
+        return {"window": _window_to_json(self._window)}
+
+    def set_state(self, state):
+        self._window = _window_from_json(state["window"], self.period)
+        values = [value for value in self._window if not _is_nan(value)]
+        self._sum = math.fsum(values)
+        self._sum_sq = math.fsum(v * v for v in values)
+        self._missing = len(self._window) - len(values)
+
+
+class ATR(Indicator):
+    """Average True Range, smoothed with Wilder's method or a simple average
+
+    The first bar's true range is its high - low.
+    """
+
+    inputs = ("high", "low", "close")
+
+    def __init__(self, period: int = 14, smoothing: str = "wilder"):
+        self.period = period
+        self.smoothing = smoothing
+        self._average = WilderAverage(period) if smoothing == "wilder" else SMA(period)
+        self._prev_close = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        true_range = high - low
+        if not _is_nan(self._prev_close):
+            true_range = max(true_range, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        return self._average.update(true_range)
+
+    def params(self):
+        return {"period": self.period, "smoothing": self.smoothing}
+
+    def get_state(self):
+        return {
+            "prev_close": None if _is_nan(self._prev_close) else self._prev_close,
+            "average": self._average.get_state(),
+        }
+
+    def set_state(self, state):
+        self._prev_close = NAN if state["prev_close"] is None else state["prev_close"]
+        self._average.set_state(state["average"])
+
+
+class OBV(Indicator):
+    """On-Balance Volume, starting at 0 on the first bar"""
+
+    inputs = ("close", "volume")
+
+    def __init__(self):
+        self._value = 0.0
+        self._prev_close = NAN
+
+    def update(self, close: float, volume: float) -> float:
+        if not _is_nan(self._prev_close):
+            if close > self._prev_close:
+                self._value += volume
+            elif close < self._prev_close:
+                self._value -= volume
+        self._prev_close = close
+        return self._value
+
+    def params(self):
+        return {}
+
+    def get_state(self):
+        return {"value": self._value, "prev_close": None if _is_nan(self._prev_close) else self._prev_close}
+
+    def set_state(self, state):
+        self._value = state["value"]
+        self._prev_close = NAN if state["prev_close"] is None else state["prev_close"]
+
+
+class _RollingExtreme:
+    """Rolling max (or min) over the last ``period`` values with a monotonic deque"""
+
+    def __init__(self, period: int, maximum: bool):
+        self.period = period
+        self.maximum = maximum
+        self._queue: deque = deque()  # (position, value), values monotonic
+        self._position = 0
+
+    def update(self, x: float) -> float:
+        queue = self._queue
+        if self.maximum:
+            while queue and queue[-1][1] <= x:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= x:
+                queue.pop()
+        queue.append((self._position, x))
+        if queue[0][0] <= self._position - self.period:
+            queue.popleft()
+        self._position += 1
+        return queue[0][1] if self._position >= self.period else NAN
+
+    def get_state(self):
+        return {"queue": [list(item) for item in self._queue], "position": self._position}
+
+    def set_state(self, state):
+        self._queue = deque(tuple(item) for item in state["queue"])
+        self._position = state["position"]
+
+
+class Stochastic(Indicator):
+    """Stochastic oscillator %K over ``k_period`` bars and %D as its ``d_period`` SMA"""
+
+    inputs = ("high", "low", "close")
+    outputs = ("k", "d")
+
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.k_period = k_period
+        self.d_period = d_period
+        self._highest = _RollingExtreme(k_period, maximum=True)
+        self._lowest = _RollingExtreme(k_period, maximum=False)
+        self._d = SMA(d_period)
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float]:
+        highest = self._highest.update(high)
+        lowest = self._lowest.update(low)
+        if _is_nan(highest) or highest == lowest:
+            k = NAN
+        else:
+            k = 100.0 * (close - lowest) / (highest - lowest)
+        return k, self._d.update(k)
+
+    def params(self):
+        return {"k_period": self.k_period, "d_period": self.d_period}
+
+    def get_state(self):
+        return {"highest": self._highest.get_state(), "lowest": self._lowest.get_state(), "d": self._d.get_state()}
+
+    def set_state(self, state):
+        self._highest.set_state(state["highest"])
+        self._lowest.set_state(state["lowest"])
+        self._d.set_state(state["d"])
+
+
+INDICATOR_TYPES = {
+    cls.__name__: cls
+    for cls in (SMA, EMA, WilderAverage, RSI, MACD, Bollinger, ATR, OBV, Stochastic)
+}
+
+# Bar field -> candidate DataFrame column names
+BAR_COLUMNS = {
+    "open": ("Open", "open"),
+    "high": ("High", "high"),
+    "low": ("Low", "low"),
+    "close": ("Close", "close"),
+    "volume": ("Volume", "volume"),
+}
+
+
+class IndicatorEngine:
+    """
+    A set of indicators updated together, bar by bar
+
+    Args:
+        indicators: ``(indicator, columns)`` pairs; ``columns`` is the output
+            column name, or a sequence of names for multi-output indicators
+            (in the order of ``indicator.outputs``)
+    """
+
+    def __init__(self, indicators: Sequence[Tuple[Indicator, Union[str, Sequence[str]]]]):
+        self.indicators: List[Tuple[Indicator, Tuple[str, ...]]] = [
+            (indicator, (columns,) if isinstance(columns, str) else tuple(columns))
+            for indicator, columns in indicators
+        ]
+        self.bars = 0
+        self.last_values: Dict[str, float] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return [column for _, columns in self.indicators for column in columns]
+
+    def update(self, bar: Dict[str, float]) -> Dict[str, float]:
+        """
+        Consume one bar (tick mode)
+
+        Args:
+            bar: Mapping with the fields the indicators need
+                (``open``, ``high``, ``low``, ``close``, ``volume``)
+
+        Returns:
+            Mapping of output column -> value for this bar
+        """
+        values = {}
+        for indicator, columns in self.indicators:
+            result = indicator.update(*(bar[name] for name in indicator.inputs))
+            if len(columns) == 1:
+                values[columns[0]] = result
+            else:
+                values.update(zip(columns, result))
+        self.bars += 1
+        self.last_values = values
+        return values
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feed every row of ``df`` through the engine (batch mode)
+
+        Accepts ``Open``/``High``/... or lower-case price columns. State is
+        carried over, so a restored engine continues where it stopped.
+
+        Returns:
+            DataFrame of output columns aligned with ``df.index``
+        """
+        needed = {name for indicator, _ in self.indicators for name in indicator.inputs}
+        arrays = {}
+        for name in needed:
+            column = next((c for c in BAR_COLUMNS[name] if c in df.columns), None)
+            if column is None:
+                raise KeyError(f"DataFrame has no {name} column")
+            arrays[name] = df[column].to_numpy(dtype=np.float64).tolist()
+
+        n = len(df)
+        outputs = {column: np.empty(n) for column in self.columns}
+        for indicator, columns in self.indicators:
+            update = indicator.update
+            inputs = [arrays[name] for name in indicator.inputs]
+            if len(columns) == 1:
+                out = outputs[columns[0]]
+                if len(inputs) == 1:
+                    for i, x in enumerate(inputs[0]):
+                        out[i] = update(x)
+                else:
+                    for i, args in enumerate(zip(*inputs)):
+                        out[i] = update(*args)
+            else:
+                outs = [outputs[column] for column in columns]
+                for i, args in enumerate(zip(*inputs)):
+                    for out, value in zip(outs, update(*args)):
+                        out[i] = value
+
+        if n:
+            self.bars += n
+            self.last_values = {column: float(values[-1]) for column, values in outputs.items()}
+        return pd.DataFrame(outputs, index=df.index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the engine, including indicator state, to JSON-compatible data"""
+        return {
+            "bars": self.bars,
+            "indicators": [
+                {"columns": list(columns), **indicator.to_dict()}
+                for indicator, columns in self.indicators
+            ],
+            "last_values": {k: (None if _is_nan(v) else v) for k, v in self.last_values.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorEngine":
+        """Restore an engine serialized with ``to_dict``"""
+        engine = cls([(Indicator.from_dict(item), item["columns"]) for item in data["indicators"]])
+        engine.bars = data.get("bars", 0)
+        engine.last_values = {k: (NAN if v is None else v) for k, v in data.get("last_values", {}).items()}
+        return engine
+
+
+def stock_indicator_engine() -> IndicatorEngine:
+    """Indicators stored in ``stock_indicators`` (``stock_fetcher.calculate_indicators``)"""
+    return IndicatorEngine([
+        (SMA(20), "sma_20"),
+        (SMA(50), "sma_50"),
+        (SMA(200), "sma_200"),
+        (EMA(12, seed="sma"), "ema_12"),
+        (EMA(26, seed="sma"), "ema_26"),
+        (RSI(14), "rsi_14"),
+        (MACD(12, 26, 9, seed="sma"), ("macd", "macd_signal", "macd_histogram")),
+        (Bollinger(20, 2.0, ddof=0), ("bb_upper", "bb_middle", "bb_lower")),
+    ])
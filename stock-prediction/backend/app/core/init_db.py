@@ -2,7 +2,8 @@
 Database initialization script optimized for PostgreSQL
 """
 from app.core.database import engine, Base, SessionLocal, get_connection_with_retry
-from app.models.stocks import Stock, StockPrice, StockIndicator
+from app.models.stocks import Stock, StockPrice, StockIndicator, LatestQuote
+from app.core.latest_quotes import rebuild_latest_quotes
 from app.data.indonesian_stocks import INDONESIAN_STOCKS
 import logging
 import time
@@ -71,6 +72,11 @@ def init_db(max_retries=5):
             logger.info("Creating database tables...")
             Base.metadata.create_all(bind=engine)
             logger.info("Database tables created successfully")
+
+            # Existing tables predate the unique keys required by bulk upserts
+            from app.utils.db_optimizer import create_unique_price_indexes, ensure_ml_model_lookup_columns
+            create_unique_price_indexes()
+            ensure_ml_model_lookup_columns()
             
             # Create a session
             db = SessionLocal()
@@ -112,6 +118,10 @@ def init_db(max_retries=5):
                 else:
                     logger.info(f"Database already contains {stocks_count} stocks, skipping initialization")
                 
+                # Backfill quotes for databases that predate the latest_quotes table
+                if db.query(LatestQuote).count() == 0:
+                    rebuild_latest_quotes(db)
+                
                 return True
             except SQLAlchemyError as e:
                 logger.error(f"Database initialization error: {e}")
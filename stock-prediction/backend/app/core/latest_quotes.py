@@ -0,0 +1,106 @@
+"""
+Maintenance of the denormalized ``latest_quotes`` table
+
+Writers call ``refresh_latest_quotes`` after upserting bars and before
+committing, so each stock's quote row changes in the same transaction as
+its prices. Read paths (market overview, top traded, watchlist,
+portfolio valuation) then read one row per stock instead of scanning
+``stock_prices``.
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.core.price_loader import load_latest_bars
+from app.models.stocks import LatestQuote, StockIndicator
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_latest_quotes(db: Session, stock_ids: Optional[Iterable[int]] = None,
+                          interval: str = "1d") -> int:
+    """
+    Recompute ``latest_quotes`` rows from the stored bars (the caller commits)
+
+    Args:
+        db: Database session; pending bar writes are flushed first
+        stock_ids: Stocks to refresh (all stocks if None)
+        interval: Bar interval
+
+    Returns:
+        Number of quote rows written
+    """
+    db.flush()
+    bars = load_latest_bars(db, stock_ids, interval)
+    if not bars:
+        return 0
+
+    # Signal of each stock's latest bar
+    keys = [(stock_id, latest.latest.date) for stock_id, latest in bars.items()]
+    signals = {
+        (row.stock_id, row.date): row
+        for row in db.query(
+            StockIndicator.stock_id, StockIndicator.date,
+            StockIndicator.signal, StockIndicator.signal_strength
+        ).filter(
+            StockIndicator.interval == interval,
+            tuple_(StockIndicator.stock_id, StockIndicator.date).in_(keys)
+        )
+    }
+
+    quotes = {
+        quote.stock_id: quote
+        for quote in db.query(LatestQuote).filter(
+            LatestQuote.stock_id.in_(list(bars)),
+            LatestQuote.interval == interval
+        )
+    }
+
+    for stock_id, (latest, previous) in bars.items():
+        quote = quotes.get(stock_id)
+        if quote is None:
+            quote = LatestQuote(stock_id=stock_id, interval=interval)
+            db.add(quote)
+
+        previous_close = previous.close if previous else None
+        signal = signals.get((stock_id, latest.date))
+
+        quote.date = latest.date
+        quote.open = latest.open
+        quote.high = latest.high
+        quote.low = latest.low
+        quote.last_close = latest.close
+        quote.previous_close = previous_close
+        quote.change_percent = (
+            (latest.close - previous_close) / previous_close * 100
+            if previous_close and latest.close is not None else None
+        )
+        quote.volume = int(latest.volume) if latest.volume is not None else None
+        quote.signal = signal.signal if signal else None
+        quote.signal_strength = signal.signal_strength if signal else None
+
+    return len(bars)
+
+
+def get_latest_quotes(db: Session, stock_ids: Iterable[int], interval: str = "1d") -> Dict[int, LatestQuote]:
+    """Quote rows by stock ID for the given stocks"""
+    stock_ids = list(stock_ids)
+    if not stock_ids:
+        return {}
+    return {
+        quote.stock_id: quote
+        for quote in db.query(LatestQuote).filter(
+            LatestQuote.stock_id.in_(stock_ids),
+            LatestQuote.interval == interval
+        )
+    }
+
+
+def rebuild_latest_quotes(db: Session, interval: str = "1d") -> int:
+    """Rebuild the quote rows of all stocks, e.g. after the table was created; commits"""
+    count = refresh_latest_quotes(db, None, interval)
+    db.commit()
+    logger.info(f"Rebuilt {count} latest quotes ({interval})")
+    return count
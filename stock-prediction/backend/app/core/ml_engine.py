@@ -8,6 +8,7 @@ import numpy as np
 from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import asyncio
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import joblib
 import os
@@ -20,7 +21,7 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 # TensorFlow import - make it optional
 try:
     import tensorflow as tf
-    from tensorflow.keras.models import Sequential, load_model, Model
+    from tensorflow.keras.models import Sequential, Model
     from tensorflow.keras.layers import Dense, LSTM, Dropout, Input, Concatenate
     from tensorflow.keras.optimizers import Adam
     from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
@@ -35,6 +36,14 @@ from app.models.big_data import (
     MLModel, StockPrediction, StockMetrics, DataProcessingJob
 )
 from app.core.data_processor import get_data_processor
+from app.core.model_registry import (
+    get_model_registry, model_artifact_path, new_artifact_version, prune_model_artifacts, scaler_artifact_paths
+)
+from app.core.feature_store import create_feature_set, get_feature_store, sync_feature_store
+from app.core.price_loader import load_latest_bars
+from app.core.global_model import (
+    GLOBAL_MODEL_MODE, GLOBAL_MODEL_TICKER, global_model_inputs, is_global_model
+)
 
 logger = logging.getLogger(__name__)
 
@@ -63,120 +72,68 @@ class MLEngine:
             Tuple of (features DataFrame, success flag)
         """
         try:
-            # Process stock data to ensure we have the latest
-            df, success = await self.data_processor.process_stock_data(ticker, days)
-            if not success or df.empty:
+            # Features of stored bars, from the feature store
+            features = await self._stored_features(ticker, interval, start=datetime.now() - timedelta(days=days), days=days)
+            if features is None or features.empty:
                 logger.error(f"Failed to process data for {ticker}")
                 return pd.DataFrame(), False
-                
-            # Create target variable: future price movement
-            # For regression models, predict the actual price n days in the future
-            df['Target_Price'] = df['Close'].shift(-prediction_horizon)
-            
-            # For classification models, predict the direction (up/down)
-            df['Target_Direction'] = (df['Target_Price'] > df['Close']).astype(int)
-            
-            # Calculate the percent change for target
-            df['Target_Percent_Change'] = (df['Target_Price'] / df['Close'] - 1) * 100
-            
-            # Drop rows with NaN targets (at the end of the dataframe)
-            df = df.dropna(subset=['Target_Price', 'Target_Direction', 'Target_Percent_Change'])
             
-            # Create feature sets
-            features = self._create_feature_set(df)
-            
-            return features, True
+            return self.add_targets(features, prediction_horizon), True
             
         except Exception as e:
             logger.error(f"Error preparing features for {ticker}: {str(e)}")
             return pd.DataFrame(), False
     
-    def _create_feature_set(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create a comprehensive feature set for machine learning"""
-        # Start with a copy of the dataframe
-        features = df.copy()
-        
-        # List of technical indicators to use as features
-        indicator_columns = [
-            'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50', 'SMA_100', 'SMA_200',
-            'EMA_5', 'EMA_10', 'EMA_20', 'EMA_50', 'EMA_100', 'EMA_200',
-            'RSI', 'MACD', 'MACD_Signal', 'MACD_Histogram',
-            'BB_Upper_20', 'BB_Middle_20', 'BB_Lower_20',
-            '%K', '%D', 'ATR', 'OBV', 'MFI',
-            'Volatility_20', 'Volume_MA_20', 'Relative_Volume'
-        ]
-        
-        # Price-derived features
-        features['Price_SMA_20_Ratio'] = features['Close'] / features['SMA_20']
-        features['Price_SMA_50_Ratio'] = features['Close'] / features['SMA_50']
-        features['Price_SMA_200_Ratio'] = features['Close'] / features['SMA_200']
-        
-        # Momentum features
-        for period in [5, 10, 20, 50]:
-            features[f'Momentum_{period}'] = features['Close'] / features['Close'].shift(period) - 1
-        
-        # Volatility features
-        features['High_Low_Range'] = (features['High'] - features['Low']) / features['Close']
-        features['Daily_Return_Abs'] = abs(features['Return'])
-        
-        # Volume features
-        features['Volume_Price_Ratio'] = features['Volume'] / features['Close']
-        features['Dollar_Volume'] = features['Volume'] * features['Close']
-        
-        # Price patterns
-        features['Higher_High'] = ((features['High'] > features['High'].shift(1)) & 
-                                  (features['High'].shift(1) > features['High'].shift(2))).astype(int)
-        features['Lower_Low'] = ((features['Low'] < features['Low'].shift(1)) & 
-                                (features['Low'].shift(1) < features['Low'].shift(2))).astype(int)
-        
-        # Trend features
-        features['Uptrend'] = ((features['SMA_20'] > features['SMA_50']) & 
-                              (features['SMA_50'] > features['SMA_200'])).astype(int)
-        features['Downtrend'] = ((features['SMA_20'] < features['SMA_50']) & 
-                                (features['SMA_50'] < features['SMA_200'])).astype(int)
-        
-        # Distance features
-        features['BB_Position'] = (features['Close'] - features['BB_Lower_20']) / (features['BB_Upper_20'] - features['BB_Lower_20'])
-        
-        # Lag features (previous days values)
-        for lag in range(1, 6):
-            features[f'Close_Lag_{lag}'] = features['Close'].shift(lag)
-            features[f'Return_Lag_{lag}'] = features['Return'].shift(lag)
-            features[f'Volume_Lag_{lag}'] = features['Volume'].shift(lag)
-        
-        # Moving average crossovers
-        features['SMA_20_50_Crossover'] = ((features['SMA_20'] > features['SMA_50']) & 
-                                         (features['SMA_20'].shift() <= features['SMA_50'].shift())).astype(int)
-        features['SMA_50_200_Crossover'] = ((features['SMA_50'] > features['SMA_200']) & 
-                                          (features['SMA_50'].shift() <= features['SMA_200'].shift())).astype(int)
-        
-        # RSI conditions
-        features['RSI_Oversold'] = (features['RSI'] < 30).astype(int)
-        features['RSI_Overbought'] = (features['RSI'] > 70).astype(int)
-        
-        # MACD conditions
-        features['MACD_Crossover'] = ((features['MACD'] > features['MACD_Signal']) & 
-                                    (features['MACD'].shift() <= features['MACD_Signal'].shift())).astype(int)
-        features['MACD_Crossunder'] = ((features['MACD'] < features['MACD_Signal']) & 
-                                     (features['MACD'].shift() >= features['MACD_Signal'].shift())).astype(int)
-        
-        # Drop NA values
-        features = features.dropna()
-        
-        # Add date-based features
-        features['DayOfWeek'] = features['Date'].dt.dayofweek
-        features['Month'] = features['Date'].dt.month
-        features['Year'] = features['Date'].dt.year
-        features['DayOfMonth'] = features['Date'].dt.day
-        features['Quarter'] = features['Date'].dt.quarter
-        
-        # One-hot encode categorical features
-        for col in ['DayOfWeek', 'Month', 'Quarter']:
-            dummies = pd.get_dummies(features[col], prefix=col)
-            features = pd.concat([features, dummies], axis=1)
-            
+    @staticmethod
+    def add_targets(features: pd.DataFrame, prediction_horizon: int) -> pd.DataFrame:
+        """Add the training targets and drop the rows without them (the last ``prediction_horizon``)"""
+        # Create target variable: future price movement
+        # For regression models, predict the actual price n days in the future
+        features['Target_Price'] = features['Close'].shift(-prediction_horizon)
+        
+        # For classification models, predict the direction (up/down)
+        features['Target_Direction'] = (features['Target_Price'] > features['Close']).astype(int)
+        
+        # Calculate the percent change for target
+        features['Target_Percent_Change'] = (features['Target_Price'] / features['Close'] - 1) * 100
+        
+        # Drop rows with NaN targets (at the end of the dataframe)
+        features = features.dropna(subset=['Target_Price', 'Target_Direction', 'Target_Percent_Change'])
         return features
     
+    async def _stored_features(self, ticker: str, interval: str = '1d', start: Optional[datetime] = None,
+                               tail: Optional[int] = None, days: int = 365) -> Optional[pd.DataFrame]:
+        """
+        Feature rows from the feature store, after appending any new stored bars
+        
+        Only a ticker without stored daily features is fetched from the data
+        sources (``days`` of history), which also fills the store.
+        """
+        store = get_feature_store()
+        sync_feature_store(self.db, ticker, interval, store=store)
+        features = store.read(ticker, interval, start=start, tail=tail)
+        if features is None and interval == '1d':
+            df, success = await self.data_processor.process_stock_data(ticker, days)
+            if success and not df.empty:
+                sync_feature_store(self.db, ticker, interval, store=store)
+                features = store.read(ticker, interval, start=start, tail=tail)
+        return features
+    
+    @staticmethod
+    def _align_features(X: pd.DataFrame, scaler_X) -> pd.DataFrame:
+        """Feature columns in the order the model's scaler was fitted on"""
+        columns = getattr(scaler_X, 'feature_names_in_', None)
+        if columns is None:
+            return X.select_dtypes(include=['number'])
+        missing = [column for column in columns if column not in X.columns]
+        if missing:
+            raise ValueError(f"Model expects features that are not stored ({', '.join(missing[:5])}); retrain it")
+        return X[list(columns)]
+    
+    def _create_feature_set(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Create a comprehensive feature set for machine learning (see ``feature_store.create_feature_set``)"""
+        return create_feature_set(df)
+    
     async def train_ml_model(self, ticker: str, model_type: str = 'lstm', days: int = 500, interval: str = '1d', prediction_horizon: int = 5) -> Tuple[str, bool]:
         """
         Train a machine learning model for stock prediction
@@ -208,87 +165,41 @@ class MLEngine:
                 self.db.commit()
                 return "", False
             
-            # Determine the target variable based on model type
-            if model_type in ['lstm', 'linear', 'forest', 'gbm']:
-                target_col = 'Target_Price'
-            else:
-                target_col = 'Target_Direction'  # Classification target
-                
-            # Select features and target
-            X = features.drop(['Date', 'Target_Price', 'Target_Direction', 'Target_Percent_Change'], axis=1)
-            y = features[target_col]
-            
-            # Handle non-numeric columns
-            X = X.select_dtypes(include=['number'])
-            
-            # Train-test split
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-            
-            # Scale the data
-            scaler_X = StandardScaler()
-            X_train_scaled = scaler_X.fit_transform(X_train)
-            X_test_scaled = scaler_X.transform(X_test)
-            
-            scaler_y = StandardScaler()
-            y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1, 1)).flatten()
-            y_test_scaled = scaler_y.transform(y_test.values.reshape(-1, 1)).flatten()
-            
-            # Train the model based on the specified type
-            model, model_path, metrics = None, "", {}
-            
-            if model_type == 'linear':
-                model, model_path, metrics = self._train_linear_model(
-                    X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker
-                )
-            elif model_type == 'forest':
-                model, model_path, metrics = self._train_random_forest(
-                    X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker
-                )
-            elif model_type == 'gbm':
-                model, model_path, metrics = self._train_gradient_boosting(
-                    X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker
-                )
-            elif model_type == 'lstm':
-                # Reshape data for LSTM [samples, time steps, features]
-                X_train_lstm = X_train_scaled.reshape((X_train_scaled.shape[0], 1, X_train_scaled.shape[1]))
-                X_test_lstm = X_test_scaled.reshape((X_test_scaled.shape[0], 1, X_test_scaled.shape[1]))
-                
-                model, model_path, metrics = self._train_lstm_model(
-                    X_train_lstm, y_train_scaled, X_test_lstm, y_test_scaled, ticker
-                )
-            else:
-                raise ValueError(f"Unsupported model type: {model_type}")
-                
-            if not model_path:
+            # Fit the scalers and model and save the artifacts
+            trained = self.fit_model(features, ticker, model_type)
+            if trained is None:
                 job.status = "failed"
                 job.error_message = f"Failed to train model for {ticker}"
                 job.completed_at = datetime.now()
                 self.db.commit()
                 return "", False
-                
-            # Save scalers
-            scaler_paths = self._save_scalers(ticker, scaler_X, scaler_y)
+            metrics = trained["metrics"]
+            
+            # The new version's files are complete; retire the earlier versions
+            # of this model in the same commit that adds it
+            previous = self.db.query(MLModel).filter(
+                MLModel.ticker == ticker,
+                MLModel.model_type == model_type,
+                MLModel.interval == interval,
+                MLModel.prediction_horizon == prediction_horizon
+            ).all()
+            for old_model in previous:
+                old_model.is_active = False
             
             # Create ML model record in database
-            ml_model = MLModel(
-                name=f"{ticker}_{model_type}_{interval}_{prediction_horizon}",
-                description=f"{model_type.upper()} model for predicting {ticker} stock price {prediction_horizon} {interval} ahead",
-                model_type=model_type,
-                target="price",
-                version="1.0",
-                metrics=metrics,
-                parameters={
-                    "days": days, 
-                    "interval": interval,
-                    "prediction_horizon": prediction_horizon,
-                    "scaler_paths": scaler_paths
-                },
-                is_active=True
-            )
+            ml_model = MLModel(**self.model_record(
+                ticker, model_type, interval, prediction_horizon, days, trained,
+                version=f"{len(previous) + 1}.0",
+                feature_schema=(get_feature_store().meta(ticker, interval) or {}).get("schema_hash")
+            ))
             self.db.add(ml_model)
             self.db.commit()
             self.db.refresh(ml_model)
             
+            # Drop loaded copies of the retired versions and old versions' files
+            get_model_registry().invalidate(ticker=ticker)
+            prune_model_artifacts(self.db, [ticker], model_type, interval, prediction_horizon)
+            
             # Update the job status
             job.status = "completed"
             job.completed_at = datetime.now()
@@ -307,11 +218,140 @@ class MLEngine:
                 self.db.commit()
             return "", False
     
-    def _train_linear_model(self, X_train, y_train, X_test, y_test, ticker):
+    @staticmethod
+    def training_matrix(features: pd.DataFrame, model_type: str) -> Tuple[pd.DataFrame, pd.Series]:
+        """Numeric feature columns and the target column of prepared features"""
+        # Determine the target variable based on model type
+        if model_type in ['lstm', 'linear', 'forest', 'gbm']:
+            target_col = 'Target_Price'
+        else:
+            target_col = 'Target_Direction'  # Classification target
+            
+        # Select features and target
+        X = features.drop(['Date', 'Target_Price', 'Target_Direction', 'Target_Percent_Change'], axis=1)
+        y = features[target_col]
+        
+        # Handle non-numeric columns
+        return X.select_dtypes(include=['number']), y
+    
+    @staticmethod
+    def build_estimator(model_type: str, n_jobs: Optional[int] = None):
+        """Unfitted sklearn estimator for a model type (not ``lstm``)"""
+        if model_type == 'linear':
+            return Ridge(alpha=1.0)
+        if model_type == 'forest':
+            return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        if model_type == 'gbm':
+            return GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, random_state=42)
+        raise ValueError(f"Unsupported model type: {model_type}")
+    
+    @staticmethod
+    def fit_model(features: pd.DataFrame, ticker: str, model_type: str,
+                  n_jobs: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fit scalers and a model on prepared features and save the artifacts
+        
+        Runs without a database session, so training workers can call it.
+        The files are named by a new artifact version, so models of other
+        intervals, horizons or versions are never overwritten, and a file
+        left half-written by a killed worker is never referenced.
+        
+        Args:
+            features: Output of ``prepare_features``
+            n_jobs: Threads for the random forest (sklearn default if None)
+            
+        Returns:
+            ``model_path``, ``scaler_paths``, ``artifact_version`` and
+            ``metrics``, or None if training failed
+            
+        Raises:
+            ValueError: For an unsupported model type
+        """
+        X, y = MLEngine.training_matrix(features, model_type)
+        
+        # Train-test split
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+        
+        # Scale the data
+        scaler_X = StandardScaler()
+        X_train_scaled = scaler_X.fit_transform(X_train)
+        X_test_scaled = scaler_X.transform(X_test)
+        
+        scaler_y = StandardScaler()
+        y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1, 1)).flatten()
+        y_test_scaled = scaler_y.transform(y_test.values.reshape(-1, 1)).flatten()
+        
+        # Train the model based on the specified type
+        model, model_path, metrics = None, "", {}
+        version = new_artifact_version()
+        
+        if model_type == 'linear':
+            model, model_path, metrics = MLEngine._train_linear_model(
+                X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker, version
+            )
+        elif model_type == 'forest':
+            model, model_path, metrics = MLEngine._train_random_forest(
+                X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker, version, n_jobs
+            )
+        elif model_type == 'gbm':
+            model, model_path, metrics = MLEngine._train_gradient_boosting(
+                X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled, ticker, version
+            )
+        elif model_type == 'lstm':
+            # Reshape data for LSTM [samples, time steps, features]
+            X_train_lstm = X_train_scaled.reshape((X_train_scaled.shape[0], 1, X_train_scaled.shape[1]))
+            X_test_lstm = X_test_scaled.reshape((X_test_scaled.shape[0], 1, X_test_scaled.shape[1]))
+            
+            model, model_path, metrics = MLEngine._train_lstm_model(
+                X_train_lstm, y_train_scaled, X_test_lstm, y_test_scaled, ticker, version
+            )
+        else:
+            raise ValueError(f"Unsupported model type: {model_type}")
+            
+        if not model_path:
+            return None
+            
+        # Save scalers
+        scaler_paths = MLEngine._save_scalers(ticker, scaler_X, scaler_y, version)
+        if not scaler_paths:
+            if os.path.exists(model_path):
+                os.remove(model_path)
+            return None
+        return {"model_path": model_path, "scaler_paths": scaler_paths, "artifact_version": version,
+                "metrics": metrics}
+    
+    @staticmethod
+    def model_record(ticker: str, model_type: str, interval: str, prediction_horizon: int, days: int,
+                     trained: Dict[str, Any], version: str, feature_schema: Optional[str] = None) -> Dict[str, Any]:
+        """Column values of the ``MLModel`` row for a model trained with ``fit_model``"""
+        return {
+            "name": f"{ticker}_{model_type}_{interval}_{prediction_horizon}",
+            "description": f"{model_type.upper()} model for predicting {ticker} stock price {prediction_horizon} {interval} ahead",
+            "model_type": model_type,
+            "target": "price",
+            "version": version,
+            "metrics": trained["metrics"],
+            "parameters": {
+                "days": days,
+                "interval": interval,
+                "prediction_horizon": prediction_horizon,
+                "scaler_paths": trained["scaler_paths"],
+                "model_path": trained["model_path"],
+                "artifact_version": trained.get("artifact_version"),
+                "feature_schema": feature_schema
+            },
+            "is_active": True,
+            "ticker": ticker,
+            "interval": interval,
+            "prediction_horizon": prediction_horizon
+        }
+    
+    @staticmethod
+    def _train_linear_model(X_train, y_train, X_test, y_test, ticker, version=None):
         """Train a linear regression model"""
         try:
             # Create and train the model
-            model = Ridge(alpha=1.0)
+            model = MLEngine.build_estimator('linear')
             model.fit(X_train, y_train)
             
             # Evaluate the model
@@ -328,7 +368,7 @@ class MLEngine:
             }
             
             # Save the model
-            model_path = os.path.join(MODEL_DIR, f"{ticker}_linear.joblib")
+            model_path = model_artifact_path(MODEL_DIR, ticker, "linear", version)
             joblib.dump(model, model_path)
             
             return model, model_path, metrics
@@ -337,11 +377,12 @@ class MLEngine:
             logger.error(f"Error training linear model: {str(e)}")
             return None, "", {}
     
-    def _train_random_forest(self, X_train, y_train, X_test, y_test, ticker):
+    @staticmethod
+    def _train_random_forest(X_train, y_train, X_test, y_test, ticker, version=None, n_jobs=None):
         """Train a random forest regression model"""
         try:
             # Create and train the model
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
+            model = MLEngine.build_estimator('forest', n_jobs)
             model.fit(X_train, y_train)
             
             # Evaluate the model
@@ -358,7 +399,7 @@ class MLEngine:
             }
             
             # Save the model
-            model_path = os.path.join(MODEL_DIR, f"{ticker}_forest.joblib")
+            model_path = model_artifact_path(MODEL_DIR, ticker, "forest", version)
             joblib.dump(model, model_path)
             
             return model, model_path, metrics
@@ -367,11 +408,12 @@ class MLEngine:
             logger.error(f"Error training random forest model: {str(e)}")
             return None, "", {}
     
-    def _train_gradient_boosting(self, X_train, y_train, X_test, y_test, ticker):
+    @staticmethod
+    def _train_gradient_boosting(X_train, y_train, X_test, y_test, ticker, version=None):
         """Train a gradient boosting regression model"""
         try:
             # Create and train the model
-            model = GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, random_state=42)
+            model = MLEngine.build_estimator('gbm')
             model.fit(X_train, y_train)
             
             # Evaluate the model
@@ -388,7 +430,7 @@ class MLEngine:
             }
             
             # Save the model
-            model_path = os.path.join(MODEL_DIR, f"{ticker}_gbm.joblib")
+            model_path = model_artifact_path(MODEL_DIR, ticker, "gbm", version)
             joblib.dump(model, model_path)
             
             return model, model_path, metrics
@@ -397,7 +439,8 @@ class MLEngine:
             logger.error(f"Error training gradient boosting model: {str(e)}")
             return None, "", {}
     
-    def _train_lstm_model(self, X_train, y_train, X_test, y_test, ticker):
+    @staticmethod
+    def _train_lstm_model(X_train, y_train, X_test, y_test, ticker, version=None):
         """Train an LSTM deep learning model"""
         try:
             # Create and train the model
@@ -442,7 +485,7 @@ class MLEngine:
             }
             
             # Save the model
-            model_path = os.path.join(MODEL_DIR, f"{ticker}_lstm.h5")
+            model_path = model_artifact_path(MODEL_DIR, ticker, "lstm", version)
             model.save(model_path)
             
             return model, model_path, metrics
@@ -451,16 +494,16 @@ class MLEngine:
             logger.error(f"Error training LSTM model: {str(e)}")
             return None, "", {}
     
-    def _save_scalers(self, ticker, scaler_X, scaler_y):
+    @staticmethod
+    def _save_scalers(ticker, scaler_X, scaler_y, version):
         """Save the scalers for later use in predictions"""
         try:
-            scaler_X_path = os.path.join(MODEL_DIR, f"{ticker}_scaler_X.joblib")
-            scaler_y_path = os.path.join(MODEL_DIR, f"{ticker}_scaler_y.joblib")
+            paths = scaler_artifact_paths(MODEL_DIR, ticker, version)
             
-            joblib.dump(scaler_X, scaler_X_path)
-            joblib.dump(scaler_y, scaler_y_path)
+            joblib.dump(scaler_X, paths["X"])
+            joblib.dump(scaler_y, paths["y"])
             
-            return {"X": scaler_X_path, "y": scaler_y_path}
+            return paths
             
         except Exception as e:
             logger.error(f"Error saving scalers: {str(e)}")
@@ -478,23 +521,15 @@ class MLEngine:
             Dictionary with prediction results
         """
         try:
+            registry = get_model_registry()
+            ml_model = None
+            
             # If no model_id specified, find the best model for this ticker and timeframe
             if not model_id:
-                query = (self.db.query(MLModel)
-                         .filter(MLModel.is_active == True)
-                         .order_by(MLModel.created_at.desc()))
-                
-                # If interval and prediction_horizon are specified, try to find a matching model
-                if interval and prediction_horizon:
-                    ml_model = query.filter(MLModel.name == f"{ticker}_{interval}_{prediction_horizon}").first()
-                    
-                    # If no exact match, try to find a model with the same interval
-                    if not ml_model and interval:
-                        ml_model = query.filter(MLModel.name.like(f"{ticker}_%_{interval}_%")).first()
-                
-                # If still no model found, get any model for this ticker
+                if GLOBAL_MODEL_MODE:
+                    ml_model = registry.resolve(self.db, GLOBAL_MODEL_TICKER, interval, prediction_horizon)
                 if not ml_model:
-                    ml_model = query.filter(MLModel.name.like(f"{ticker}_%")).first()
+                    ml_model = registry.resolve(self.db, ticker, interval, prediction_horizon)
                 
                 if not ml_model:
                     logger.warning(f"No active model found for {ticker}, training a new one")
@@ -510,61 +545,60 @@ class MLEngine:
                         interval = ml_model.parameters['interval']
             
             # Get the model record
-            ml_model = self.db.query(MLModel).filter(MLModel.id == int(model_id)).first()
+            if ml_model is None:
+                ml_model = self.db.query(MLModel).filter(MLModel.id == int(model_id)).first()
             if not ml_model:
                 return {"error": f"Model with ID {model_id} not found"}
                 
             # Get the model type
             model_type = ml_model.model_type
             
-            # Process latest data
-            features, success = await self.prepare_features(ticker, interval=interval, prediction_horizon=prediction_horizon or 5)
-            if not success or features.empty:
+            # Features of the latest stored bar
+            features = await self._stored_features(ticker, interval or '1d', tail=1)
+            if features is None or features.empty:
                 return {"error": f"Failed to prepare features for {ticker}"}
-                
-            # Get the latest data point for prediction
-            latest_data = features.iloc[-1:].copy()
-            X = latest_data.drop(['Date', 'Target_Price', 'Target_Direction', 'Target_Percent_Change'], axis=1)
-            X = X.select_dtypes(include=['number'])
-            
-            # Load scalers
-            scaler_paths = ml_model.parameters.get('scaler_paths', {})
-            if not scaler_paths:
-                return {"error": "Scaler paths not found in model parameters"}
-                
-            scaler_X = joblib.load(scaler_paths['X'])
-            scaler_y = joblib.load(scaler_paths['y'])
+            
+            # Model and scalers, loaded once and then served from the registry
+            pooled = is_global_model(ml_model)
+            try:
+                if pooled:
+                    loaded = registry.load(ml_model, GLOBAL_MODEL_TICKER, MODEL_DIR)
+                    sector = self.db.query(Stock.sector).filter(Stock.ticker == ticker).scalar()
+                    X = global_model_inputs(features, [ticker], [sector], ml_model.parameters)
+                else:
+                    loaded = registry.load(ml_model, ticker, MODEL_DIR)
+                    X = features.drop(columns=['Date'])
+                X = self._align_features(X, loaded.scaler_X)
+            except (FileNotFoundError, ValueError) as e:
+                return {"error": str(e)}
             
             # Scale the input data
-            X_scaled = scaler_X.transform(X)
+            X_scaled = loaded.scaler_X.transform(X)
             
-            # Load the model and generate prediction
-            prediction_result = self._predict_with_model(model_type, ticker, X_scaled, scaler_y)
+            # Generate prediction
+            prediction_result = self._predict_with_model(model_type, loaded.model, X_scaled, loaded.scaler_y)
             if 'error' in prediction_result:
                 return prediction_result
                 
             # Get latest price for reference
-            latest_price = features.iloc[-1]['Close']
+            latest_price = float(features.iloc[-1]['Close'])
             predicted_price = prediction_result['predicted_price']
+            if pooled:
+                # Pooled models predict the return
+                predicted_price = latest_price * (1 + predicted_price)
             
             # Calculate percent change
             percent_change = (predicted_price / latest_price - 1) * 100
             
             # Determine trading signal based on predicted change
-            signal = "HOLD"
-            signal_strength = 0.5
-            
-            if percent_change > 2:
-                signal = "BUY"
-                signal_strength = min(0.9, 0.5 + abs(percent_change) / 20)
-            elif percent_change < -2:
-                signal = "SELL"
-                signal_strength = min(0.9, 0.5 + abs(percent_change) / 20)
+            signal, signal_strength = self._signal_from_change(percent_change)
                 
             # Calculate confidence interval
             confidence = prediction_result.get('confidence', 0.8)
             mse = ml_model.metrics.get('mse', 0)
             rmse = np.sqrt(mse) if mse else prediction_result.get('rmse', 0)
+            if pooled:
+                rmse = latest_price * ml_model.metrics.get('return_rmse', 0)
             
             upper_bound = predicted_price + 1.96 * rmse
             lower_bound = predicted_price - 1.96 * rmse
@@ -628,35 +662,175 @@ class MLEngine:
             logger.error(f"Error generating prediction for {ticker}: {str(e)}")
             return {"error": str(e)}
     
-    def _predict_with_model(self, model_type, ticker, X_scaled, scaler_y):
-        """Make prediction with the specified model type"""
+    def batch_generate_predictions(self, tickers: Optional[List[str]] = None, interval: str = '1d',
+                                   prediction_horizon: int = 5, model_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Predict many stocks at once from stored bars
+        
+        Models are resolved with one query, each stock's latest feature row
+        is read from the feature store (appending bars newer than the store
+        first), each model predicts once on the stacked rows of its stocks,
+        and all ``StockPrediction`` rows are written with one bulk insert.
+        Unlike ``generate_prediction`` nothing is fetched from external
+        sources and no model is trained. With ``ML_MODEL_MODE=global`` the
+        pooled model, when there is one, predicts every stock.
+        
+        Args:
+            tickers: Stocks to predict (all active stocks if None)
+            interval: Bar interval
+            prediction_horizon: Preferred model horizon
+            model_type: Only use models of this type
+            
+        Returns:
+            Summary with per-ticker status and the number of predictions stored
+        """
+        registry = get_model_registry()
+        store = get_feature_store()
+        
+        stock_query = self.db.query(Stock.id, Stock.ticker, Stock.sector)
+        if tickers is None:
+            stock_query = stock_query.filter(Stock.is_active == True)
+        else:
+            stock_query = stock_query.filter(Stock.ticker.in_(tickers))
+        stocks = stock_query.all()
+        stock_ids = {stock_id: ticker for stock_id, ticker, _ in stocks}
+        sectors = {ticker: sector for _, ticker, sector in stocks}
+        
+        results = {ticker: {"status": "error", "message": "Stock not found"} for ticker in (tickers or [])}
+        global_model = None
+        if GLOBAL_MODEL_MODE:
+            global_model = registry.resolve_many(
+                self.db, [GLOBAL_MODEL_TICKER], interval, prediction_horizon, model_type
+            ).get(GLOBAL_MODEL_TICKER)
+        if global_model is not None:
+            # One pooled model serves every stock
+            models = {ticker: global_model for ticker in stock_ids.values()}
+        else:
+            models = registry.resolve_many(self.db, list(stock_ids.values()), interval, prediction_horizon, model_type)
+        for ticker in stock_ids.values():
+            if ticker not in models:
+                results[ticker] = {"status": "error", "message": "No active model"}
+        
+        latest_bars = load_latest_bars(
+            self.db, [stock_id for stock_id, ticker in stock_ids.items() if ticker in models], interval
+        )
+        
+        # Latest feature row of every stock, grouped by the model that predicts it
+        groups: Dict[int, List[Tuple[int, str, pd.DataFrame]]] = {}
+        for stock_id, ticker in stock_ids.items():
+            if ticker not in models:
+                continue
+            if stock_id not in latest_bars:
+                results[ticker] = {"status": "error", "message": "No price data"}
+                continue
+            try:
+                sync_feature_store(self.db, ticker, interval, stock_id=stock_id,
+                                   last_bar_date=latest_bars[stock_id].latest.date, store=store)
+                features = store.read(ticker, interval, tail=1)
+            except Exception as e:
+                results[ticker] = {"status": "error", "message": f"Failed to build features: {e}"}
+                continue
+            if features is None or features.empty:
+                results[ticker] = {"status": "error", "message": "Not enough history"}
+                continue
+            groups.setdefault(models[ticker].id, []).append((stock_id, ticker, features))
+        
+        now = datetime.now()
+        rows = []
+        for model_id, members in groups.items():
+            ml_model = models[members[0][1]]
+            pooled = is_global_model(ml_model)
+            try:
+                loaded = registry.load(ml_model, ml_model.ticker if pooled else members[0][1], MODEL_DIR)
+                X = pd.concat([row for _, _, row in members], ignore_index=True)
+                if pooled:
+                    member_tickers = [ticker for _, ticker, _ in members]
+                    X = global_model_inputs(X, member_tickers, [sectors[ticker] for ticker in member_tickers],
+                                            ml_model.parameters)
+                else:
+                    X = X.drop(columns=['Date'])
+                X = self._align_features(X, loaded.scaler_X)
+                predicted = self._predict_prices(
+                    ml_model.model_type, loaded.model, loaded.scaler_X.transform(X), loaded.scaler_y
+                )
+            except Exception as e:
+                logger.error(f"Batch prediction with model {model_id} failed: {str(e)}")
+                for _, ticker, _ in members:
+                    results[ticker] = {"status": "error", "message": str(e)}
+                continue
+            
+            mse = (ml_model.metrics or {}).get('mse', 0)
+            rmse = float(np.sqrt(mse)) if mse else 0.0
+            horizon = ml_model.prediction_horizon or prediction_horizon
+            target_date = self._calculate_target_date(now, ml_model.interval or interval, horizon)
+            
+            for (stock_id, ticker, row), predicted_price in zip(members, predicted.tolist()):
+                latest_price = float(row['Close'].iloc[0])
+                if pooled:
+                    # Pooled models predict the return
+                    predicted_price = latest_price * (1 + predicted_price)
+                    rmse = latest_price * (ml_model.metrics or {}).get('return_rmse', 0)
+                percent_change = (predicted_price / latest_price - 1) * 100
+                signal, signal_strength = self._signal_from_change(percent_change)
+                rows.append({
+                    "stock_id": stock_id,
+                    "model_id": ml_model.id,
+                    "prediction_date": now,
+                    "target_date": target_date,
+                    "predicted_price": predicted_price,
+                    "confidence": 0.8,
+                    "upper_bound": predicted_price + 1.96 * rmse,
+                    "lower_bound": predicted_price - 1.96 * rmse,
+                    "signal": signal,
+                    "signal_strength": signal_strength,
+                    "features_used": list(X.columns),
+                })
+                results[ticker] = {
+                    "status": "success",
+                    "model_id": ml_model.id,
+                    "current_price": latest_price,
+                    "predicted_price": predicted_price,
+                    "percent_change": percent_change,
+                    "signal": signal,
+                }
+        
+        if rows:
+            self.db.execute(insert(StockPrediction), rows)
+            self.db.commit()
+        
+        logger.info(f"Batch prediction stored {len(rows)} predictions using {len(groups)} models")
+        return {
+            "predicted": len(rows),
+            "models_used": len(groups),
+            "results": results
+        }
+    
+    @staticmethod
+    def _signal_from_change(percent_change: float) -> Tuple[str, float]:
+        """Trading signal and its strength for a predicted percent change"""
+        if percent_change > 2:
+            return "BUY", min(0.9, 0.5 + abs(percent_change) / 20)
+        if percent_change < -2:
+            return "SELL", min(0.9, 0.5 + abs(percent_change) / 20)
+        return "HOLD", 0.5
+    
+    @staticmethod
+    def _predict_prices(model_type, model, X_scaled, scaler_y) -> np.ndarray:
+        """Predicted prices for each row of scaled features"""
+        if model_type == 'lstm':
+            # Reshape for LSTM [samples, time steps, features]
+            X_scaled = X_scaled.reshape((X_scaled.shape[0], 1, X_scaled.shape[1]))
+            y_pred_scaled = model.predict(X_scaled, verbose=0)
+        else:
+            y_pred_scaled = model.predict(X_scaled)
+        
+        # Inverse transform to get actual prices
+        return scaler_y.inverse_transform(np.asarray(y_pred_scaled).reshape(-1, 1)).flatten()
+    
+    def _predict_with_model(self, model_type, model, X_scaled, scaler_y):
+        """Make prediction with a loaded model of the specified type"""
         try:
-            model_path = ""
-            
-            if model_type == 'linear':
-                model_path = os.path.join(MODEL_DIR, f"{ticker}_linear.joblib")
-            elif model_type == 'forest':
-                model_path = os.path.join(MODEL_DIR, f"{ticker}_forest.joblib")
-            elif model_type == 'gbm':
-                model_path = os.path.join(MODEL_DIR, f"{ticker}_gbm.joblib")
-            elif model_type == 'lstm':
-                model_path = os.path.join(MODEL_DIR, f"{ticker}_lstm.h5")
-                
-            if not os.path.exists(model_path):
-                return {"error": f"Model file not found: {model_path}"}
-                
-            # Load the model
-            if model_type == 'lstm':
-                model = load_model(model_path)
-                # Reshape for LSTM [samples, time steps, features]
-                X_reshaped = X_scaled.reshape((X_scaled.shape[0], 1, X_scaled.shape[1]))
-                y_pred_scaled = model.predict(X_reshaped)
-            else:
-                model = joblib.load(model_path)
-                y_pred_scaled = model.predict(X_scaled)
-                
-            # Inverse transform to get actual price
-            y_pred = scaler_y.inverse_transform(y_pred_scaled.reshape(-1, 1)).flatten()
+            y_pred = self._predict_prices(model_type, model, X_scaled, scaler_y)
             
             # Calculate confidence based on model metrics
             # This is a simplified approach; real confidence would be model-specific
@@ -4,13 +4,14 @@ Machine Learning job functions for background processing
 
 import logging
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
-from app.models.stocks import Stock, StockPrice
+from app.core.training_pool import train_models_parallel, train_predictors_parallel
+from app.models.stocks import LatestQuote, Stock
 from app.ml.models import get_stock_predictor
-from app.utils.cache_manager import CacheManager
 
 logger = logging.getLogger(__name__)
 
@@ -22,65 +23,44 @@ def train_ml_models():
     db = SessionLocal()
     
     try:
-        # Get top active stocks by trading volume
-        stocks = db.query(Stock).filter(Stock.is_active == True).order_by(Stock.volume.desc()).limit(10).all()
+        # Get top active stocks by latest trading volume
+        tickers = [
+            ticker for (ticker,) in db.query(Stock.ticker)
+            .join(LatestQuote, and_(LatestQuote.stock_id == Stock.id, LatestQuote.interval == "1d"))
+            .filter(Stock.is_active == True)
+            .order_by(LatestQuote.volume.desc())
+            .limit(10)
+            .all()
+        ]
         
-        if not stocks:
+        if not tickers:
             logger.warning("No active stocks found for ML training")
             return 0
         
+        # Train across a process pool; one year of history per ticker. The
+        # ML engine models serve generate_prediction/batch_predict, the
+        # predictors serve /ml/predict.
+        results = train_models_parallel(db, tickers, model_type="forest", days=365)
+        predictor_results = train_predictors_parallel(db, tickers, days=365)
+        
         trained_count = 0
-        for stock in stocks:
-            try:
-                logger.info(f"Training ML model for {stock.ticker}")
-                
-                # Get historical data (1 year)
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=365)
-                
-                prices = (db.query(StockPrice)
-                         .filter(StockPrice.stock_id == stock.id)
-                         .filter(StockPrice.date >= start_date)
-                         .filter(StockPrice.date <= end_date)
-                         .order_by(StockPrice.date)
-                         .all())
-                
-                if not prices or len(prices) < 60:  # Need at least 60 data points
-                    logger.warning(f"Insufficient price data for {stock.ticker}. Need at least 60 days.")
-                    continue
-                
-                # Convert to DataFrame
-                import pandas as pd
-                df = pd.DataFrame([
-                    {
-                        'date': price.date,
-                        'open': price.open,
-                        'high': price.high,
-                        'low': price.low,
-                        'close': price.close,
-                        'volume': price.volume,
-                        'adjclose': price.close
-                    }
-                    for price in prices
-                ])
-                
-                # Get predictor and train
-                predictor = get_stock_predictor(stock.ticker)
-                training_result = predictor.train(df)
-                
-                # Log results
-                metrics = training_result.get('metrics', {})
-                rmse = metrics.get('rmse', 'N/A')
-                direction_acc = metrics.get('direction_accuracy', 'N/A') 
-                logger.info(f"Model for {stock.ticker} trained successfully. RMSE: {rmse}, Direction Accuracy: {direction_acc}")
-                
-                # Clear cache for this stock's predictions
-                CacheManager.delete(f"predict_stock_{stock.ticker}")
-                
+        for ticker, result in results.items():
+            if result["status"] == "success":
+                metrics = result["metrics"]
+                logger.info(f"Model for {ticker} trained successfully. RMSE: {metrics.get('rmse', 'N/A')}, "
+                            f"R2: {metrics.get('r2', 'N/A')}")
                 trained_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error training model for {stock.ticker}: {str(e)}")
+            else:
+                logger.error(f"Error training model for {ticker}: {result['message']}")
+        
+        for ticker, result in predictor_results.items():
+            if result["status"] == "success":
+                metrics = result["metrics"]
+                logger.info(f"Predictor for {ticker} trained successfully. RMSE: {metrics.get('rmse', 'N/A')}, "
+                            f"Direction Accuracy: {metrics.get('direction_accuracy', 'N/A')}")
+                trained_count += 1
+            else:
+                logger.error(f"Error training predictor for {ticker}: {result['message']}")
         
         logger.info(f"Successfully trained {trained_count} models")
         return trained_count
@@ -0,0 +1,285 @@
+"""
+Registry of trained prediction models
+
+Resolves (ticker, interval, horizon) to the active ``MLModel`` row with one
+indexed query and keeps loaded model artifacts and scalers in a bounded
+in-process LRU, so warm predictions skip ``joblib.load``/``load_model``.
+
+Every trained version writes its artifacts to files of its own, named by
+an artifact version, so a file never changes once a row points to it.
+``prune_model_artifacts`` deletes the files of old retired versions.
+Entries are dropped when ``MLEngine.train_ml_model`` writes a new version
+and are reloaded when an artifact file changes on disk (files of models
+trained before versioned paths are overwritten in place).
+"""
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import joblib
+from sqlalchemy import and_, case
+from sqlalchemy.orm import Session
+
+from app.models.big_data import MLModel
+
+logger = logging.getLogger(__name__)
+
+# Artifact file suffix per model type
+MODEL_FILE_SUFFIXES = {
+    "linear": "linear.joblib",
+    "forest": "forest.joblib",
+    "gbm": "gbm.joblib",
+    "lstm": "lstm.h5",
+}
+
+
+# Newest versions per (ticker, model type, interval, horizon) whose files are
+# kept: the active one and the version it replaced, which requests that
+# resolved it just before the switch may still be loading
+MODEL_VERSIONS_KEPT = int(os.getenv("MODEL_VERSIONS_KEPT", "2"))
+
+
+class LoadedModel(NamedTuple):
+    """A model with its feature and target scalers, ready to predict"""
+    model_id: int
+    model_type: str
+    model: Any
+    scaler_X: Any
+    scaler_y: Any
+
+
+def new_artifact_version() -> str:
+    """Unique name part for the files of one trained model"""
+    return f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+
+
+def model_artifact_path(model_dir: str, ticker: str, model_type: str, version: Optional[str] = None) -> str:
+    """Path of a ticker's model file for ``model_type`` (unversioned for models trained before versioning)"""
+    suffix = MODEL_FILE_SUFFIXES.get(model_type)
+    if suffix is None:
+        raise ValueError(f"Unsupported model type: {model_type}")
+    if version is None:
+        return os.path.join(model_dir, f"{ticker}_{suffix}")
+    return os.path.join(model_dir, f"{ticker}_{version}_{suffix}")
+
+
+def scaler_artifact_paths(model_dir: str, ticker: str, version: str) -> Dict[str, str]:
+    """Paths of the feature (``X``) and target (``y``) scaler files of a model version"""
+    return {
+        "X": os.path.join(model_dir, f"{ticker}_{version}_scaler_X.joblib"),
+        "y": os.path.join(model_dir, f"{ticker}_{version}_scaler_y.joblib"),
+    }
+
+
+def versioned_artifact_paths(ml_model: MLModel) -> List[str]:
+    """Model and scaler files of a row written with an artifact version (none for older rows)"""
+    parameters = ml_model.parameters or {}
+    if not parameters.get("artifact_version"):
+        # Unversioned files may be shared with other rows
+        return []
+    paths = [parameters.get("model_path")] + list((parameters.get("scaler_paths") or {}).values())
+    return [path for path in paths if path]
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class ModelRegistry:
+    """Active-model lookup plus a bounded LRU of loaded models and scalers"""
+
+    def __init__(self, max_models: int = 64):
+        self.max_models = max_models
+        # model_id -> (file mtimes, LoadedModel, ticker)
+        self._models: "OrderedDict[int, Tuple[Tuple, LoadedModel, str]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(self, db: Session, ticker: str, interval: Optional[str] = None,
+                prediction_horizon: Optional[int] = None) -> Optional[MLModel]:
+        """
+        Newest active model for a ticker, preferring an exact interval and
+        horizon match, then the same interval, then any model
+
+        Served by the ``(ticker, is_active, created_at)`` index in one query.
+        """
+        query = db.query(MLModel).filter(MLModel.ticker == ticker, MLModel.is_active == True)
+        if interval:
+            exact = and_(MLModel.interval == interval, MLModel.prediction_horizon == prediction_horizon)
+            query = query.order_by(case((exact, 0), (MLModel.interval == interval, 1), else_=2))
+        return query.order_by(MLModel.created_at.desc()).first()
+
+    def resolve_many(self, db: Session, tickers: Sequence[str], interval: Optional[str] = None,
+                     prediction_horizon: Optional[int] = None,
+                     model_type: Optional[str] = None) -> Dict[str, MLModel]:
+        """
+        ``resolve`` for many tickers with one query
+
+        Args:
+            model_type: Only consider models of this type
+
+        Returns:
+            Mapping of ticker -> model for tickers that have an active model
+        """
+        if not tickers:
+            return {}
+        query = db.query(MLModel).filter(MLModel.ticker.in_(list(tickers)), MLModel.is_active == True)
+        if model_type:
+            query = query.filter(MLModel.model_type == model_type)
+
+        def preference(model: MLModel):
+            if interval and model.interval == interval:
+                rank = 0 if model.prediction_horizon == prediction_horizon else 1
+            else:
+                rank = 2 if interval else 0
+            return rank, -(model.created_at.timestamp() if model.created_at else 0)
+
+        best = {}
+        for model in query.all():
+            current = best.get(model.ticker)
+            if current is None or preference(model) < preference(current):
+                best[model.ticker] = model
+        return best
+
+    def load(self, ml_model: MLModel, ticker: str, model_dir: str) -> LoadedModel:
+        """
+        Loaded model and scalers for an ``MLModel`` row, from the LRU when warm
+
+        Raises:
+            FileNotFoundError: If the model or scaler files are missing
+            ValueError: If the row has no scaler paths or an unknown model type
+        """
+        scaler_paths = (ml_model.parameters or {}).get('scaler_paths') or {}
+        if not scaler_paths:
+            raise ValueError("Scaler paths not found in model parameters")
+
+        model_path = (ml_model.parameters or {}).get('model_path') or \
+            model_artifact_path(model_dir, ticker, ml_model.model_type)
+        paths = (model_path, scaler_paths['X'], scaler_paths['y'])
+        mtimes = tuple(_mtime(path) for path in paths)
+        for path, mtime in zip(paths, mtimes):
+            if mtime is None:
+                raise FileNotFoundError(f"Model file not found: {path}")
+
+        with self._lock:
+            entry = self._models.get(ml_model.id)
+            if entry is not None and entry[0] == mtimes:
+                self._models.move_to_end(ml_model.id)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        # Loading happens outside the lock; concurrent misses load twice at worst
+        loaded = LoadedModel(
+            model_id=ml_model.id,
+            model_type=ml_model.model_type,
+            model=self._load_model_file(ml_model.model_type, model_path),
+            scaler_X=joblib.load(scaler_paths['X']),
+            scaler_y=joblib.load(scaler_paths['y']),
+        )
+
+        with self._lock:
+            self._models[ml_model.id] = (mtimes, loaded, ticker)
+            self._models.move_to_end(ml_model.id)
+            while len(self._models) > self.max_models:
+                evicted, _ = self._models.popitem(last=False)
+                logger.debug(f"Evicted model {evicted} from registry")
+        logger.info(f"Loaded {ml_model.model_type} model {ml_model.id} for {ticker}")
+        return loaded
+
+    @staticmethod
+    def _load_model_file(model_type: str, path: str) -> Any:
+        if model_type == 'lstm':
+            from tensorflow.keras.models import load_model
+            return load_model(path)
+        return joblib.load(path)
+
+    def invalidate(self, ticker: Optional[str] = None, model_id: Optional[int] = None) -> int:
+        """Drop loaded models of a ticker, one model, or everything; returns the count"""
+        with self._lock:
+            if ticker is None and model_id is None:
+                count = len(self._models)
+                self._models.clear()
+                return count
+            keys = [
+                key for key, (_, _, entry_ticker) in self._models.items()
+                if key == model_id or (ticker is not None and entry_ticker == ticker)
+            ]
+            for key in keys:
+                del self._models[key]
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "models": len(self._models),
+                "max_models": self.max_models,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+
+def prune_model_artifacts(db: Session, tickers: Iterable[str], model_type: str, interval: str,
+                          prediction_horizon: int, keep: int = MODEL_VERSIONS_KEPT) -> int:
+    """
+    Delete the files of retired versions beyond the newest ``keep`` of each ticker
+
+    Call after the commit that retires them. Active rows are never touched,
+    and the rows themselves stay as history.
+
+    Returns:
+        Number of files deleted
+    """
+    models = db.query(MLModel).filter(
+        MLModel.ticker.in_(list(tickers)),
+        MLModel.model_type == model_type,
+        MLModel.interval == interval,
+        MLModel.prediction_horizon == prediction_horizon
+    ).order_by(MLModel.ticker, MLModel.created_at.desc(), MLModel.id.desc()).all()
+
+    registry = get_model_registry()
+    seen: Dict[str, int] = {}
+    deleted = 0
+    for ml_model in models:
+        seen[ml_model.ticker] = seen.get(ml_model.ticker, 0) + 1
+        if seen[ml_model.ticker] <= keep or ml_model.is_active:
+            continue
+        paths = versioned_artifact_paths(ml_model)
+        for path in paths:
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete model file {path}: {str(e)}")
+        if paths:
+            registry.invalidate(model_id=ml_model.id)
+
+    if deleted:
+        logger.info(f"Deleted {deleted} files of retired {model_type} models")
+    return deleted
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide registry; size from ``MODEL_CACHE_MAX_ENTRIES`` (default 64)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "64")))
+    return _registry
@@ -10,9 +10,16 @@ import time
 import random
 from datetime import datetime
 
+from app.core.http_cache import HTTPResponse, cache_namespace, get_http_cache
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+}
+
 class NewsScraperBase:
     """Base class for all news scrapers"""
     
@@ -20,21 +27,32 @@ class NewsScraperBase:
         """Initialize the scraper with source name and base URL"""
         self.source_name = source_name
         self.base_url = base_url
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-        }
+        # Directory and TTL of the source in the HTTP response cache
+        self.cache_namespace = cache_namespace(source_name)
+        self.headers = dict(DEFAULT_HEADERS)
+        # Pooled connections for the blocking path; AsyncNewsCrawler has its own
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
     
-    def _get_page_content(self, url: str) -> Optional[BeautifulSoup]:
-        """Get page content as BeautifulSoup object"""
+    def _fetch(self, url: str) -> Optional[HTTPResponse]:
+        """Response for a page through the HTTP cache, or None on any error"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            response = get_http_cache().get(url, self.cache_namespace, session=self.session)
+            if not response.ok:
+                logger.error(f"Error fetching {url}: HTTP {response.status}")
+                return None
+            return response
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
     
+    def _get_page_content(self, url: str) -> Optional[BeautifulSoup]:
+        """Get page content as BeautifulSoup object"""
+        response = self._fetch(url)
+        if response is None:
+            return None
+        return BeautifulSoup(response.content, 'html.parser')
+    
     def _extract_date(self, date_str: str) -> datetime:
         """Extract date from string in various formats"""
         # This method should be implemented by subclasses
@@ -48,16 +66,67 @@ class NewsScraperBase:
     
     def search_by_ticker(self, ticker: str, max_pages: int = 3) -> List[Dict]:
         """Search news for a specific stock ticker"""
-        # This method should be implemented by subclasses
-        raise NotImplementedError
+        return self._list_articles(ticker, max_pages)
     
     def get_latest_news(self, max_pages: int = 2) -> List[Dict]:
         """Get the latest market news from the source"""
-        # This method should be implemented by subclasses
-        raise NotImplementedError
+        return self._list_articles(None, max_pages)
     
     def extract_article_content(self, url: str) -> Dict:
         """Extract content from a specific article URL"""
+        try:
+            soup = self._get_page_content(url)
+            
+            if not soup:
+                return {'url': url, 'content': '', 'error': 'Failed to fetch page'}
+            
+            return self._parse_article_content(url, soup)
+            
+        except Exception as e:
+            logger.error(f"Error extracting content from {url}: {str(e)}")
+            return {'url': url, 'content': '', 'error': str(e)}
+    
+    def _list_articles(self, ticker: Optional[str], max_pages: int) -> List[Dict]:
+        """Articles on the listing pages, stopping at the first empty page"""
+        all_articles = []
+        
+        for page in range(1, max_pages + 1):
+            try:
+                response = self._fetch(self._listing_url(ticker, page))
+                
+                if not response:
+                    continue
+                
+                articles = self._parse_article_list(BeautifulSoup(response.content, 'html.parser'), ticker)
+                
+                if articles is None:
+                    break
+                
+                all_articles.extend(articles)
+                
+                # Add delay to avoid being blocked (pages served from the cache made no request)
+                if not response.from_cache:
+                    self._add_delay()
+                
+            except Exception as e:
+                logger.error(f"Error fetching page {page} of {self.source_name}: {str(e)}")
+        
+        return all_articles
+    
+    # Page layout of a source, shared by the blocking methods above and AsyncNewsCrawler
+    
+    def _listing_url(self, ticker: Optional[str], page: int) -> str:
+        """URL of a page of latest news (ticker None) or of a ticker search"""
+        # This method should be implemented by subclasses
+        raise NotImplementedError
+    
+    def _parse_article_list(self, soup: BeautifulSoup, ticker: Optional[str]) -> Optional[List[Dict]]:
+        """Articles on a listing page, or None if the page has no articles"""
+        # This method should be implemented by subclasses
+        raise NotImplementedError
+    
+    def _parse_article_content(self, url: str, soup: BeautifulSoup) -> Dict:
+        """Content and ticker mentions of an article page"""
         # This method should be implemented by subclasses
         raise NotImplementedError
     
@@ -56,132 +56,66 @@ class BisnisComScraper(NewsScraperBase):
             logger.warning(f"Failed to parse date: {date_str}. Error: {str(e)}")
             return datetime.now()
     
-    def search_by_ticker(self, ticker: str, max_pages: int = 3) -> List[Dict]:
-        """Search news for a specific stock ticker on Bisnis.com"""
-        all_articles = []
-        # Remove .JK suffix if present
-        search_term = ticker.split('.')[0]
+    def _listing_url(self, ticker: Optional[str], page: int) -> str:
+        """URL of a page of latest market news or of a ticker search on Bisnis.com"""
+        if ticker:
+            # Remove .JK suffix if present
+            search_term = ticker.split('.')[0]
+            return f"{self.base_url}/search/index_saham/{search_term}?page={page}"
+        return f"{self.base_url}/index/index_saham?page={page}"
+    
+    def _parse_article_list(self, soup: BeautifulSoup, ticker: Optional[str]) -> Optional[List[Dict]]:
+        """Articles on a Bisnis.com listing page"""
+        articles = soup.select('div.col-sm-8.col-md-9 div.list-news')
         
-        for page in range(1, max_pages + 1):
-            try:
-                search_url = f"{self.base_url}/search/index_saham/{search_term}?page={page}"
-                soup = self._get_page_content(search_url)
-                
-                if not soup:
-                    continue
-                
-                articles = soup.select('div.col-sm-8.col-md-9 div.list-news')
-                
-                if not articles:
-                    break
-                
-                for article in articles:
-                    try:
-                        title_tag = article.select_one('h2 a')
-                        date_tag = article.select_one('div.date')
-                        
-                        if title_tag and date_tag:
-                            title = title_tag.text.strip()
-                            url = title_tag['href']
-                            date_str = date_tag.text.strip()
-                            
-                            article_data = {
-                                'title': title,
-                                'url': url,
-                                'source': self.source_name,
-                                'date': self._extract_date(date_str),
-                                'ticker': ticker
-                            }
-                            
-                            all_articles.append(article_data)
-                    except Exception as e:
-                        logger.error(f"Error parsing article: {str(e)}")
-                
-                # Add delay to avoid being blocked
-                self._add_delay()
-                
-            except Exception as e:
-                logger.error(f"Error searching page {page} for {ticker}: {str(e)}")
+        if not articles:
+            return None
         
-        return all_articles
-    
-    def get_latest_news(self, max_pages: int = 2) -> List[Dict]:
-        """Get latest market news from Bisnis.com"""
         all_articles = []
-        
-        for page in range(1, max_pages + 1):
+        for article in articles:
             try:
-                page_url = f"{self.base_url}/index/index_saham?page={page}"
-                soup = self._get_page_content(page_url)
-                
-                if not soup:
-                    continue
-                
-                articles = soup.select('div.col-sm-8.col-md-9 div.list-news')
-                
-                if not articles:
-                    break
-                
-                for article in articles:
-                    try:
-                        title_tag = article.select_one('h2 a')
-                        date_tag = article.select_one('div.date')
-                        
-                        if title_tag and date_tag:
-                            title = title_tag.text.strip()
-                            url = title_tag['href']
-                            date_str = date_tag.text.strip()
-                            
-                            article_data = {
-                                'title': title,
-                                'url': url,
-                                'source': self.source_name,
-                                'date': self._extract_date(date_str),
-                                'ticker': None
-                            }
-                            
-                            all_articles.append(article_data)
-                    except Exception as e:
-                        logger.error(f"Error parsing article: {str(e)}")
-                
-                # Add delay to avoid being blocked
-                self._add_delay()
+                title_tag = article.select_one('h2 a')
+                date_tag = article.select_one('div.date')
                 
+                if title_tag and date_tag:
+                    title = title_tag.text.strip()
+                    url = title_tag['href']
+                    date_str = date_tag.text.strip()
+                    
+                    article_data = {
+                        'title': title,
+                        'url': url,
+                        'source': self.source_name,
+                        'date': self._extract_date(date_str),
+                        'ticker': ticker
+                    }
+                    
+                    all_articles.append(article_data)
             except Exception as e:
-                logger.error(f"Error fetching page {page}: {str(e)}")
+                logger.error(f"Error parsing article: {str(e)}")
         
         return all_articles
     
-    def extract_article_content(self, url: str) -> Dict:
-        """Extract content from a Bisnis.com article URL"""
-        try:
-            soup = self._get_page_content(url)
-            
-            if not soup:
-                return {'url': url, 'content': '', 'error': 'Failed to fetch page'}
-            
-            # Extract article text
-            article_body = soup.select_one('div.col-sm-10.col-sm-offset-1.col-md-8.col-md-offset-2')
-            
-            if article_body:
-                # Get all paragraphs
-                paragraphs = article_body.select('p')
-                content = ' '.join([p.text.strip() for p in paragraphs])
-                
-                # Extract mentioned tickers
-                ticker_mentions = self._extract_ticker_mentions(content)
-                
-                return {
-                    'url': url,
-                    'content': content,
-                    'mentioned_tickers': ticker_mentions
-                }
+    def _parse_article_content(self, url: str, soup: BeautifulSoup) -> Dict:
+        """Content of a Bisnis.com article page"""
+        # Extract article text
+        article_body = soup.select_one('div.col-sm-10.col-sm-offset-1.col-md-8.col-md-offset-2')
+        
+        if article_body:
+            # Get all paragraphs
+            paragraphs = article_body.select('p')
+            content = ' '.join([p.text.strip() for p in paragraphs])
             
-            return {'url': url, 'content': '', 'error': 'Article body not found'}
+            # Extract mentioned tickers
+            ticker_mentions = self._extract_ticker_mentions(content)
             
-        except Exception as e:
-            logger.error(f"Error extracting content from {url}: {str(e)}")
-            return {'url': url, 'content': '', 'error': str(e)}
+            return {
+                'url': url,
+                'content': content,
+                'mentioned_tickers': ticker_mentions
+            }
+        
+        return {'url': url, 'content': '', 'error': 'Article body not found'}
     
     def _extract_ticker_mentions(self, content: str) -> List[str]:
         """Extract stock ticker mentions from article content"""
@@ -0,0 +1,226 @@
+"""
+Asynchronous crawler for the news scrapers
+
+Fetches listing and article pages of all sources concurrently over one
+pooled HTTP client. Instead of sleeping between every page, requests to
+the same host are spaced by a politeness delay and capped per host, while
+requests to different hosts run side by side up to a global limit. HTML
+is parsed with the scrapers' own ``_parse_*`` methods in worker threads,
+off the event loop. Pages go through the HTTP response cache: fresh pages
+are served from disk without taking a host slot, stale ones are
+revalidated with a conditional request.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+from sqlalchemy.orm import Session
+
+from app.core.http_cache import HTTPCache, get_http_cache
+from app.core.news_scrapers.base import DEFAULT_HEADERS, NewsScraperBase
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight across all hosts
+CRAWLER_MAX_CONCURRENCY = int(os.getenv("NEWS_CRAWLER_CONCURRENCY", "16"))
+
+# Requests in flight to one host
+CRAWLER_HOST_CONCURRENCY = int(os.getenv("NEWS_CRAWLER_HOST_CONCURRENCY", "2"))
+
+# Minimum seconds between request starts to one host (plus up to 50% jitter)
+CRAWLER_HOST_DELAY = float(os.getenv("NEWS_CRAWLER_HOST_DELAY", "1.0"))
+
+# Seconds per request
+CRAWLER_TIMEOUT = 10
+
+# URLs per frontier lookup query
+FRONTIER_LOOKUP_BATCH = 1000
+
+
+class HostLimiter:
+    """Per-host concurrency cap and spacing between request starts"""
+
+    def __init__(self, concurrency: int = CRAWLER_HOST_CONCURRENCY, delay: float = CRAWLER_HOST_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    async def acquire(self, host: str) -> None:
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        await semaphore.acquire()
+        # Reserve the next start slot before sleeping, so waiters queue up in order
+        now = time.monotonic()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.delay * random.uniform(1.0, 1.5)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def release(self, host: str) -> None:
+        self._semaphores[host].release()
+
+
+class AsyncNewsCrawler:
+    """
+    Concurrent, per-host polite crawler over ``NewsScraperBase`` scrapers
+
+    Use as an async context manager; the HTTP client and its connection
+    pool live as long as the ``async with`` block.
+    """
+
+    def __init__(self, max_concurrency: int = CRAWLER_MAX_CONCURRENCY,
+                 host_concurrency: int = CRAWLER_HOST_CONCURRENCY,
+                 host_delay: float = CRAWLER_HOST_DELAY, timeout: float = CRAWLER_TIMEOUT,
+                 headers: Optional[Dict[str, str]] = None, cache: Optional[HTTPCache] = None):
+        self.max_concurrency = max_concurrency
+        self.host_concurrency = host_concurrency
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.hosts = HostLimiter(host_concurrency, host_delay)
+        self.cache = cache or get_http_cache()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncNewsCrawler":
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.host_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def fetch(self, url: str, namespace: str) -> Optional[bytes]:
+        """Body of a page of a source (``scraper.cache_namespace``), or None on any error"""
+        try:
+            response = await asyncio.to_thread(self.cache.fresh, url, namespace)
+            if response is not None:
+                return response.content
+        except Exception as e:
+            logger.error(f"Error fetching {url}: {str(e)}")
+            return None
+
+        host = urlparse(url).netloc
+        async with self._slots:
+            await self.hosts.acquire(host)
+            try:
+                response = await self.cache.revalidate_async(self._session, url, namespace)
+                if not response.ok:
+                    logger.error(f"Error fetching {url}: HTTP {response.status}")
+                    return None
+                return response.content
+            except Exception as e:
+                logger.error(f"Error fetching {url}: {str(e)}")
+                return None
+            finally:
+                self.hosts.release(host)
+
+    @staticmethod
+    async def _parse(body: bytes, parse, *args) -> Any:
+        """``parse(soup, *args)`` of a page body, in a worker thread"""
+        return await asyncio.to_thread(lambda: parse(BeautifulSoup(body, 'html.parser'), *args))
+
+    async def list_articles(self, scraper: NewsScraperBase, ticker: Optional[str] = None,
+                            max_pages: int = 2) -> List[Dict]:
+        """
+        Articles on a source's listing pages (latest news, or a ticker search)
+
+        All pages are requested at once. As with the blocking scrapers, a
+        page that fails to download is skipped and the result stops at the
+        first page without articles.
+        """
+        async def page_articles(page: int) -> Optional[List[Dict]]:
+            try:
+                body = await self.fetch(scraper._listing_url(ticker, page), scraper.cache_namespace)
+                if body is None:
+                    return []
+                return await self._parse(body, scraper._parse_article_list, ticker)
+            except Exception as e:
+                logger.error(f"Error fetching page {page} of {scraper.source_name}: {str(e)}")
+                return []
+
+        pages = await asyncio.gather(*(page_articles(page) for page in range(1, max_pages + 1)))
+
+        all_articles = []
+        for articles in pages:
+            if articles is None:
+                break
+            all_articles.extend(articles)
+        return all_articles
+
+    async def extract_article_content(self, scraper: NewsScraperBase, url: str) -> Dict:
+        """``scraper.extract_article_content`` over the shared client"""
+        try:
+            body = await self.fetch(url, scraper.cache_namespace)
+            if body is None:
+                return {'url': url, 'content': '', 'error': 'Failed to fetch page'}
+            return await self._parse(body, lambda soup: scraper._parse_article_content(url, soup))
+        except Exception as e:
+            logger.error(f"Error extracting content from {url}: {str(e)}")
+            return {'url': url, 'content': '', 'error': str(e)}
+
+    async def fetch_articles(self, urls: Iterable[str], skip: Optional[Set[str]] = None) -> Dict[str, Dict]:
+        """
+        Content of many articles, fetched concurrently
+
+        Args:
+            urls: Article URLs (duplicates are fetched once)
+            skip: Frontier of URLs not to fetch, e.g. ``stored_urls``
+
+        Returns:
+            ``extract_article_content`` result by URL; URLs without a
+            scraper map to an error result and skipped URLs are absent
+        """
+        from app.core.news_scrapers.factory import get_scraper_for_source
+
+        skip = skip or set()
+        frontier = [url for url in dict.fromkeys(urls) if url not in skip]
+
+        async def fetch_one(url: str) -> Dict:
+            scraper = get_scraper_for_source(url)
+            if not scraper:
+                return {'url': url, 'error': 'No scraper available for this news source'}
+            return await self.extract_article_content(scraper, url)
+
+        articles = await asyncio.gather(*(fetch_one(url) for url in frontier))
+        return dict(zip(frontier, articles))
+
+
+def stored_urls(db: Session, urls: Iterable[str]) -> Set[str]:
+    """URLs already in ``news_articles``, with one query per batch"""
+    from app.models.news_sentiment import NewsArticle
+
+    urls = list(dict.fromkeys(urls))
+    stored = set()
+    for start in range(0, len(urls), FRONTIER_LOOKUP_BATCH):
+        stored.update(
+            db.query(NewsArticle.url).filter(NewsArticle.url.in_(urls[start:start + FRONTIER_LOOKUP_BATCH])).scalars()
+        )
+    return stored
+
+
+def run_crawl(coroutine: Awaitable) -> Any:
+    """
+    Run a crawl from blocking code
+
+    Uses a private event loop in a helper thread when called from inside a
+    running loop (e.g. a FastAPI ``async def`` endpoint that calls blocking
+    service code).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -3,7 +3,8 @@ Factory for news scrapers
 """
 
 from urllib.parse import urlparse
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
+import asyncio
 import logging
 from datetime import datetime, timedelta
 
@@ -12,10 +13,30 @@ from app.core.news_scrapers.base import NewsScraperBase
 
 # Import all scrapers 
 from app.core.news_scrapers.bisnis_com import BisnisComScraper
+from app.core.news_scrapers.crawler import AsyncNewsCrawler, run_crawl
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# All supported news sources
+NEWS_SOURCES = [
+    "https://market.bisnis.com/",
+    # Other sources will be added as their scrapers are implemented
+    # "https://investasi.kontan.co.id/",
+    # "https://www.cnbcindonesia.com/tag/saham", 
+    # "https://id.investing.com/news/stock-market-news",
+    # "https://www.most.co.id/riset",
+    # "https://investor.id/",
+    # "https://www.metrotvnews.com/tag/2235/saham",
+    # "https://id.tradingview.com/markets/stocks-indonesia/",
+    # "https://www.sindonews.com/topic/707/saham",
+    # "https://www.liputan6.com/saham"
+]
+
+# Scraper instances by domain, created on first use
+_scrapers: Optional[Dict[str, NewsScraperBase]] = None
+
+
 # Register all scrapers
 def get_scraper_for_source(source_url: str) -> Optional[NewsScraperBase]:
     """
@@ -27,70 +48,63 @@ def get_scraper_for_source(source_url: str) -> Optional[NewsScraperBase]:
     Returns:
         NewsScraperBase: An appropriate scraper instance or None if no scraper available
     """
+    global _scrapers
     domain = urlparse(source_url).netloc
     
-    scrapers = {
-        'market.bisnis.com': BisnisComScraper(),
-        # Additional scrapers will be added as they are implemented
-        # 'investasi.kontan.co.id': KontanScraper(),
-        # 'www.cnbcindonesia.com': CNBCIndonesiaScraper(),
-        # 'id.investing.com': InvestingComScraper(),
-        # 'www.most.co.id': MostCoIdScraper(),
-        # 'investor.id': InvestorIdScraper(),
-        # 'www.metrotvnews.com': MetroTVScraper(),
-        # 'id.tradingview.com': TradingViewScraper(),
-        # 'www.sindonews.com': SindoNewsScraper(),
-        # 'www.liputan6.com': Liputan6Scraper()
-    }
+    if _scrapers is None:
+        _scrapers = {
+            'market.bisnis.com': BisnisComScraper(),
+            # Additional scrapers will be added as they are implemented
+            # 'investasi.kontan.co.id': KontanScraper(),
+            # 'www.cnbcindonesia.com': CNBCIndonesiaScraper(),
+            # 'id.investing.com': InvestingComScraper(),
+            # 'www.most.co.id': MostCoIdScraper(),
+            # 'investor.id': InvestorIdScraper(),
+            # 'www.metrotvnews.com': MetroTVScraper(),
+            # 'id.tradingview.com': TradingViewScraper(),
+            # 'www.sindonews.com': SindoNewsScraper(),
+            # 'www.liputan6.com': Liputan6Scraper()
+        }
     
-    return scrapers.get(domain)
+    return _scrapers.get(domain)
 
 
-def aggregate_news(ticker: Optional[str] = None, days: int = 7) -> List[Dict]:
+async def aggregate_news_async(ticker: Optional[str] = None, days: int = 7,
+                               crawler: Optional[AsyncNewsCrawler] = None) -> List[Dict]:
     """
-    Aggregate news from all supported sources
+    Aggregate news from all supported sources concurrently
     
     Args:
         ticker: Optional stock ticker to filter by
         days: Number of days to look back
+        crawler: Open crawler to use (a new one if None)
         
     Returns:
         List of articles from all sources
     """
-    all_articles = []
+    if crawler is None:
+        async with AsyncNewsCrawler() as crawler:
+            return await aggregate_news_async(ticker, days, crawler)
     
-    # All supported news sources
-    sources = [
-        "https://market.bisnis.com/",
-        # Other sources will be added as their scrapers are implemented
-        # "https://investasi.kontan.co.id/",
-        # "https://www.cnbcindonesia.com/tag/saham", 
-        # "https://id.investing.com/news/stock-market-news",
-        # "https://www.most.co.id/riset",
-        # "https://investor.id/",
-        # "https://www.metrotvnews.com/tag/2235/saham",
-        # "https://id.tradingview.com/markets/stocks-indonesia/",
-        # "https://www.sindonews.com/topic/707/saham",
-        # "https://www.liputan6.com/saham"
-    ]
-    
-    for source_url in sources:
+    async def source_articles(source_url: str) -> List[Dict]:
         try:
             scraper = get_scraper_for_source(source_url)
             
             if not scraper:
                 logger.warning(f"No scraper available for {source_url}")
-                continue
+                return []
             
             if ticker:
-                articles = scraper.search_by_ticker(ticker)
-            else:
-                articles = scraper.get_latest_news()
-            
-            all_articles.extend(articles)
+                return await crawler.list_articles(scraper, ticker=ticker, max_pages=3)
+            return await crawler.list_articles(scraper, max_pages=2)
             
         except Exception as e:
             logger.error(f"Error aggregating from {source_url}: {str(e)}")
+            return []
+    
+    all_articles = []
+    for articles in await asyncio.gather(*(source_articles(url) for url in NEWS_SOURCES)):
+        all_articles.extend(articles)
     
     # Filter by date if specified
     if days > 0:
@@ -101,3 +115,35 @@ def aggregate_news(ticker: Optional[str] = None, days: int = 7) -> List[Dict]:
     all_articles.sort(key=lambda x: x['date'], reverse=True)
     
     return all_articles
+
+
+def aggregate_news(ticker: Optional[str] = None, days: int = 7) -> List[Dict]:
+    """
+    Aggregate news from all supported sources
+    
+    Args:
+        ticker: Optional stock ticker to filter by
+        days: Number of days to look back
+        
+    Returns:
+        List of articles from all sources
+    """
+    return run_crawl(aggregate_news_async(ticker, days))
+
+
+def fetch_articles(urls: List[str], skip: Optional[Set[str]] = None) -> Dict[str, Dict]:
+    """
+    Extract the content of many articles concurrently
+    
+    Args:
+        urls: Article URLs
+        skip: URLs not to fetch (e.g. already stored)
+        
+    Returns:
+        ``extract_article_content`` result by URL (skipped URLs are absent)
+    """
+    async def crawl() -> Dict[str, Dict]:
+        async with AsyncNewsCrawler() as crawler:
+            return await crawler.fetch_articles(urls, skip)
+    
+    return run_crawl(crawl())
@@ -14,13 +14,15 @@ from datetime import datetime, timedelta
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
 import os
+from sqlalchemy.orm import Session
 
 # For Indonesian sentiment analysis
 # Multilingual libraries or dictionaries would be preferred
 import pickle
 
 # Import news scraper
-from app.core.news_scrapers.factory import aggregate_news, get_scraper_for_source
+from app.core.news_scrapers.factory import aggregate_news, fetch_articles, get_scraper_for_source
+from app.services.sentiment_cache import SENTIMENT_CACHE_ENABLED, SentimentCache, content_hash, lexicon_version
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -77,8 +79,16 @@ except LookupError:
 class NewsSentimentAnalyzer:
     """Analyzes sentiment from financial news articles"""
     
-    def __init__(self):
-        """Initialize the sentiment analyzer"""
+    # Model type of cached results
+    model_type = "vader-id"
+    
+    def __init__(self, db: Optional[Session] = None):
+        """
+        Initialize the sentiment analyzer
+        
+        Args:
+            db: Session for the sentiment cache (short-lived sessions if None)
+        """
         self.sia = SentimentIntensityAnalyzer()
         # Load or create cache for articles
         self.cache_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
@@ -87,6 +97,10 @@ class NewsSentimentAnalyzer:
         
         # Add finance-specific sentiment words to the lexicon
         self._update_sentiment_lexicon()
+        
+        # Results of unchanged texts are reused until the lexicon changes
+        self.lexicon_version = lexicon_version(self.sia.lexicon, POSITIVE_WORDS, NEGATIVE_WORDS)
+        self.cache = SentimentCache(db) if SENTIMENT_CACHE_ENABLED else None
     
     def _update_sentiment_lexicon(self):
         """Update the sentiment lexicon with finance-specific terms"""
@@ -102,6 +116,33 @@ class NewsSentimentAnalyzer:
     
     def analyze_text(self, text: str) -> Dict[str, float]:
         """Analyze sentiment in a text snippet"""
+        return self.analyze_texts([text])[0]
+    
+    def analyze_texts(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        ``analyze_text`` for many texts
+        
+        Cached results are looked up in one batch before any scoring, and
+        the new results are stored in one batch afterwards.
+        """
+        if self.cache is None:
+            return [self._score_text(text) for text in texts]
+        
+        hashes = [content_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes, self.model_type, self.lexicon_version)
+        
+        scored = {}
+        results = []
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in scored:
+                scored[text_hash] = self._score_text(text)
+            results.append(dict(cached[text_hash] if text_hash in cached else scored[text_hash]))
+        
+        self.cache.put_many(scored, self.model_type, self.lexicon_version)
+        return results
+    
+    def _score_text(self, text: str) -> Dict[str, float]:
+        """Sentiment scores of a text snippet, without the cache"""
         # Convert text to lowercase for better matching
         text_lower = text.lower()
         
@@ -152,40 +193,62 @@ class NewsSentimentAnalyzer:
     
     def analyze_article(self, article_url: str) -> Dict:
         """Analyze the sentiment of a specific article"""
-        # Check if we have a scraper for this URL
-        scraper = get_scraper_for_source(article_url)
-        
-        if not scraper:
-            return {
-                'url': article_url,
-                'error': 'No scraper available for this news source'
-            }
+        return self.analyze_articles([article_url])[0]
+    
+    def analyze_articles(self, article_urls: List[str], include_article: bool = False) -> List[Dict]:
+        """
+        Analyze the sentiment of many articles
         
-        # Extract the article content
-        article_data = scraper.extract_article_content(article_url)
+        All articles are scraped first, concurrently, so their sentiment is
+        looked up in and stored to the cache in one batch.
         
-        if 'error' in article_data:
-            return article_data
+        Args:
+            article_urls: URLs of the articles
+            include_article: Whether to add the scraped article data
+                (``article``) and the scraper's ``source`` to each result
         
-        content = article_data.get('content', '')
+        Returns:
+            One ``analyze_article`` result per URL, in order
+        """
+        results: List[Optional[Dict]] = [None] * len(article_urls)
+        contents = {}
+        mentions = {}
+        scraped = {}
         
-        # Extract ticker mentions
-        tickers_in_content = set(article_data.get('mentioned_tickers', []))
-        company_mentions = set(self._extract_company_mentions(content))
+        # Extract the article contents
+        fetched = fetch_articles(article_urls)
         
-        # Combine ticker mentions
-        all_tickers = tickers_in_content.union(company_mentions)
+        for i, article_url in enumerate(article_urls):
+            article_data = fetched[article_url]
+            
+            if 'error' in article_data:
+                results[i] = article_data
+                continue
+            
+            content = article_data.get('content', '')
+            
+            # Extract ticker mentions
+            tickers_in_content = set(article_data.get('mentioned_tickers', []))
+            company_mentions = set(self._extract_company_mentions(content))
+            
+            # Combine ticker mentions
+            contents[i] = content
+            mentions[i] = tickers_in_content.union(company_mentions)
+            if include_article:
+                scraped[i] = {'article': article_data, 'source': get_scraper_for_source(article_url).source_name}
         
         # Analyze the overall sentiment
-        sentiment = self.analyze_text(content)
-        
-        result = {
-            'url': article_url,
-            'sentiment': sentiment,
-            'mentioned_tickers': list(all_tickers)
-        }
+        sentiments = self.analyze_texts(list(contents.values()))
+        
+        for i, sentiment in zip(contents, sentiments):
+            results[i] = {
+                'url': article_urls[i],
+                'sentiment': sentiment,
+                'mentioned_tickers': list(mentions[i]),
+                **scraped.get(i, {})
+            }
         
-        return result
+        return results
     
     def analyze_ticker_sentiment(self, ticker: str, days: int = 7) -> Dict:
         """
@@ -214,15 +277,12 @@ class NewsSentimentAnalyzer:
         analyzed_articles = []
         sentiment_scores = []
         
-        for article in articles:
-            # Get article URL
-            url = article.get('url')
-            
-            if not url:
-                continue
-            
-            # Analyze article sentiment
-            sentiment_data = self.analyze_article(url)
+        # Analyze all articles together, so cached sentiment is looked up at once
+        articles = [article for article in articles if article.get('url')]
+        article_sentiments = self.analyze_articles([article['url'] for article in articles])
+        
+        for article, sentiment_data in zip(articles, article_sentiments):
+            url = article['url']
             
             if 'sentiment' in sentiment_data:
                 sentiment_scores.append(sentiment_data['sentiment']['adjusted_compound'])
@@ -272,15 +332,12 @@ class NewsSentimentAnalyzer:
         sentiment_scores = []
         ticker_sentiments = {}
         
-        for article in articles:
-            # Get article URL
-            url = article.get('url')
-            
-            if not url:
-                continue
-            
-            # Analyze article sentiment
-            sentiment_data = self.analyze_article(url)
+        # Analyze all articles together, so cached sentiment is looked up at once
+        articles = [article for article in articles if article.get('url')]
+        article_sentiments = self.analyze_articles([article['url'] for article in articles])
+        
+        for article, sentiment_data in zip(articles, article_sentiments):
+            url = article['url']
             
             if 'sentiment' in sentiment_data:
                 sentiment_score = sentiment_data['sentiment']['adjusted_compound']
@@ -14,7 +14,7 @@ from app.models.news_sentiment import (
     MarketSentimentSummary, TickerSentimentHistory
 )
 from app.services.news_sentiment_db import NewsSentimentDBService
-from app.core.news_sentiment import NewsSentimentAnalyzer
+from app.core.news_sentiment import NewsSentimentAnalyzer, TICKER_TO_COMPANY
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,7 +25,7 @@ class NewsSentimentDBManager:
     def __init__(self, db: Session):
         """Initialize with database session"""
         self.db = db
-        self.analyzer = NewsSentimentAnalyzer()
+        self.analyzer = NewsSentimentAnalyzer(db)
         self.db_service = NewsSentimentDBService()
     
     def analyze_and_store_article(self, article_url: str) -> Dict:
@@ -38,87 +38,95 @@ class NewsSentimentDBManager:
         Returns:
             Dict with analysis results and storage status
         """
-        try:
-            # First analyze the article
-            analysis_result = self.analyzer.analyze_article(article_url)
+        return self.analyze_and_store_articles([article_url])[0]
+    
+    def analyze_and_store_articles(self, article_urls: List[str]) -> List[Dict]:
+        """
+        Analyze the sentiment of many articles and store them in one transaction
+        
+        Each article is scraped once; articles, sentiment analyses and
+        ticker mentions are then written with a few bulk statements and a
+        single commit.
+        
+        Args:
+            article_urls: URLs of the articles to analyze
             
-            if 'error' in analysis_result:
-                return analysis_result
+        Returns:
+            List of dicts with analysis results and storage status, in order
+        """
+        try:
+            # First analyze the articles
+            analysis_results = self.analyzer.analyze_articles(article_urls, include_article=True)
             
-            # Get article metadata from the scraper
-            scraper = get_scraper_for_source(article_url)
-            if not scraper:
-                return {
-                    'error': f"No scraper available for {article_url}",
-                    'analysis_result': analysis_result
+            to_store = []
+            for article_url, analysis_result in zip(article_urls, analysis_results):
+                if 'error' in analysis_result:
+                    continue
+                
+                article_data = analysis_result.pop('article')
+                source = analysis_result.pop('source')
+                
+                sentiment = analysis_result.get('sentiment', {})
+                ticker_mentions = analysis_result.get('mentioned_tickers', [])
+                
+                # Get company names if available
+                company_names = {
+                    ticker: TICKER_TO_COMPANY[ticker] for ticker in ticker_mentions if ticker in TICKER_TO_COMPANY
                 }
                 
-            article_data = scraper.extract_article_content(article_url)
-            
-            # Store article in database
-            article = self.db_service.store_article(
-                db=self.db,
-                url=article_url,
-                title=article_data.get('title', 'Unknown Title'),
-                source=scraper.source_name,
-                published_date=article_data.get('date', datetime.now()),
-                content=article_data.get('content', '')
-            )
-            
-            # Store sentiment analysis
-            sentiment = analysis_result.get('sentiment', {})
-            sentiment_label = self.analyzer._get_sentiment_label(sentiment.get('adjusted_compound', 0))
-            
-            sentiment_analysis = self.db_service.store_sentiment_analysis(
-                db=self.db,
-                article_id=article.id,
-                sentiment_data=sentiment,
-                sentiment_label=sentiment_label
-            )
-            
-            # Store ticker mentions
-            ticker_mentions = analysis_result.get('mentioned_tickers', [])
-            
-            # Get company names if available
-            company_names = {}
-            from app.core.news_sentiment import TICKER_TO_COMPANY
-            for ticker in ticker_mentions:
-                if ticker in TICKER_TO_COMPANY:
-                    company_names[ticker] = TICKER_TO_COMPANY[ticker]
-            
-            # Determine primary ticker (if any)
-            primary_ticker = None
-            if ticker_mentions:
-                # Simple heuristic: the most mentioned ticker is the primary one
-                # In a real implementation, this would use more sophisticated analysis
-                ticker_count = {}
-                for ticker in ticker_mentions:
-                    ticker_count[ticker] = ticker_count.get(ticker, 0) + 1
+                to_store.append({
+                    'url': article_url,
+                    'title': article_data.get('title', 'Unknown Title'),
+                    'source': source,
+                    'published_date': article_data.get('date', datetime.now()),
+                    'content': article_data.get('content', ''),
+                    'sentiment_data': sentiment,
+                    'sentiment_label': self.analyzer._get_sentiment_label(sentiment.get('adjusted_compound', 0)),
+                    'ticker_mentions': ticker_mentions,
+                    'company_names': company_names,
+                    'primary_ticker': self._primary_ticker(ticker_mentions)
+                })
+            
+            stored = iter(self.db_service.store_analyzed_articles(self.db, to_store))
+            
+            results = []
+            for analysis_result in analysis_results:
+                if 'error' in analysis_result:
+                    results.append(analysis_result)
+                    continue
                 
-                primary_ticker = max(ticker_count.items(), key=lambda x: x[1])[0] if ticker_count else None
-            
-            ticker_mention_records = self.db_service.store_ticker_mentions(
-                db=self.db,
-                article_id=article.id,
-                ticker_mentions=ticker_mentions,
-                company_names=company_names,
-                primary_ticker=primary_ticker
-            )
+                records = next(stored)
+                results.append({
+                    'success': True,
+                    'article_id': records['article_id'],
+                    'sentiment_analysis_id': records['sentiment_analysis_id'],
+                    'ticker_mentions': records['ticker_mentions'],
+                    'analysis_result': analysis_result
+                })
             
-            return {
-                'success': True,
-                'article_id': article.id,
-                'sentiment_analysis_id': sentiment_analysis.id,
-                'ticker_mentions': len(ticker_mention_records),
-                'analysis_result': analysis_result
-            }
+            return results
             
         except Exception as e:
             logger.error(f"Error storing article analysis: {str(e)}", exc_info=True)
-            return {
-                'error': f"Failed to store analysis: {str(e)}",
-                'analysis_result': analysis_result if 'analysis_result' in locals() else None
-            }
+            analysis_results = analysis_results if 'analysis_results' in locals() else [None] * len(article_urls)
+            return [
+                {
+                    'error': f"Failed to store analysis: {str(e)}",
+                    'analysis_result': analysis_result
+                }
+                for analysis_result in analysis_results
+            ]
+    
+    @staticmethod
+    def _primary_ticker(ticker_mentions: List[str]) -> Optional[str]:
+        """Most mentioned ticker (if any)"""
+        # Simple heuristic: the most mentioned ticker is the primary one
+        # In a real implementation, this would use more sophisticated analysis
+        ticker_count = {}
+        for ticker in ticker_mentions:
+            ticker_count[ticker] = ticker_count.get(ticker, 0) + 1
+        
+        return max(ticker_count.items(), key=lambda x: x[1])[0] if ticker_count else None
     
     def analyze_and_store_ticker_sentiment(self, ticker: str, days: int = 7) -> Dict:
         """
@@ -143,15 +151,13 @@ class NewsSentimentDBManager:
             sentiment_label = analysis_result.get('sentiment_label', 'Netral')
             article_count = analysis_result.get('articles_analyzed', 0)
             
-            # Get article IDs
-            article_ids = []
-            for article_data in analysis_result.get('articles', []):
-                # First store each article
-                article_url = article_data.get('url')
-                if article_url:
-                    article_result = self.analyze_and_store_article(article_url)
-                    if 'article_id' in article_result:
-                        article_ids.append(article_result['article_id'])
+            # Store the articles together and get their IDs
+            article_urls = [a.get('url') for a in analysis_result.get('articles', []) if a.get('url')]
+            article_ids = [
+                article_result['article_id']
+                for article_result in self.analyze_and_store_articles(article_urls)
+                if 'article_id' in article_result
+            ]
             
             # Store ticker sentiment history
             ticker_sentiment = self.db_service.update_ticker_sentiment(
@@ -219,11 +225,20 @@ class NewsSentimentDBManager:
                 reverse=True
             )[:10]  # Top 10
             
-            # Store each article
-            for article_data in analysis_result.get('articles', []):
-                article_url = article_data.get('url')
-                if article_url:
-                    self.analyze_and_store_article(article_url)
+            # Store the articles together
+            article_urls = [a.get('url') for a in analysis_result.get('articles', []) if a.get('url')]
+            self.analyze_and_store_articles(article_urls)
+            
+            # Update ticker-specific sentiment for each mentioned ticker, committed with the summary
+            self.db_service.update_ticker_sentiments_bulk(
+                db=self.db,
+                date=datetime.now(),
+                ticker_sentiments={
+                    ticker: data for ticker, data in ticker_sentiments.items()
+                    if data.get('article_count', 0) > 0
+                },
+                commit=False
+            )
             
             # Store market sentiment summary
             market_summary = self.db_service.update_market_sentiment_summary(
@@ -237,18 +252,6 @@ class NewsSentimentDBManager:
                 most_mentioned_tickers=most_mentioned
             )
             
-            # Also update ticker-specific sentiment for each mentioned ticker
-            for ticker, data in ticker_sentiments.items():
-                if data.get('article_count', 0) > 0:
-                    self.db_service.update_ticker_sentiment(
-                        db=self.db,
-                        ticker=ticker,
-                        date=datetime.now(),
-                        sentiment_score=data.get('sentiment_score', 0),
-                        sentiment_label=data.get('sentiment_label', 'Netral'),
-                        article_count=data.get('article_count', 0)
-                    )
-            
             return {
                 'success': True,
                 'market_summary_id': market_summary.id,
@@ -257,11 +260,55 @@ class NewsSentimentDBManager:
             
         except Exception as e:
             logger.error(f"Error storing market sentiment: {str(e)}", exc_info=True)
+            self.db.rollback()
             return {
                 'error': f"Failed to store market sentiment: {str(e)}",
                 'analysis_result': analysis_result if 'analysis_result' in locals() else None
             }
     
+    def collect_latest_news(self, days: int = 1, ticker: Optional[str] = None) -> Dict:
+        """
+        Crawl the latest news of all sources and store the new articles
+        
+        Listing pages are crawled concurrently, URLs already in the
+        database are skipped, and only the new articles are fetched,
+        analyzed and stored.
+        
+        Args:
+            days: Number of days to look back
+            ticker: Optional ticker to search news for
+            
+        Returns:
+            Dict with article counts and storage status
+        """
+        try:
+            articles = aggregate_news(ticker=ticker, days=days)
+            urls = list(dict.fromkeys(a['url'] for a in articles if a.get('url')))
+            
+            # Frontier: only articles not stored yet
+            known_urls = stored_urls(self.db, urls)
+            new_urls = [url for url in urls if url not in known_urls]
+            
+            results = self.analyze_and_store_articles(new_urls)
+            stored = sum(1 for result in results if result.get('success'))
+            
+            logger.info(f"Collected {stored} new articles ({len(known_urls)} already stored, "
+                        f"{len(new_urls) - stored} failed)")
+            
+            # Keep the cached listing and article pages within their budget
+            get_http_cache().prune()
+            return {
+                'success': True,
+                'articles_found': len(urls),
+                'already_stored': len(known_urls),
+                'articles_stored': stored,
+                'articles_failed': len(new_urls) - stored
+            }
+            
+        except Exception as e:
+            logger.error(f"Error collecting latest news: {str(e)}", exc_info=True)
+            return {'error': f"Failed to collect latest news: {str(e)}"}
+    
     def get_latest_sentiment_data(self, ticker: Optional[str] = None) -> Dict:
         """
         Get the latest sentiment data, either for market or specific ticker
@@ -336,7 +383,9 @@ class NewsSentimentDBManager:
 
 
 # Import necessary modules for function
-from app.core.news_scrapers.factory import get_scraper_for_source
+from app.core.news_scrapers.crawler import stored_urls
+from app.core.news_scrapers.factory import aggregate_news
+from app.core.http_cache import get_http_cache
 
 def get_sentiment_db_manager(db: Session) -> NewsSentimentDBManager:
     """
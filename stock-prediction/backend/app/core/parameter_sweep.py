@@ -0,0 +1,350 @@
+"""
+Parameter sweep (grid backtest) for built-in and user-defined strategies
+
+Prices are loaded once by the caller and every distinct indicator in the
+grid is computed once up front. The combinations are then evaluated in
+chunks, across a process pool for larger grids, and returned as a ranked
+table of metrics.
+"""
+import copy
+import itertools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.backtest_engine import (
+    backtest_metrics,
+    crossover_signals,
+    generate_signal_array,
+    rolling_mean,
+    rsi_sma,
+    threshold_signals,
+)
+from app.core.strategy_builder import StrategyBuilder
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of combinations evaluated by one sweep
+MAX_COMBINATIONS = 10000
+
+# Grids smaller than this are evaluated in-process because the pool start-up
+# would cost more than it saves. Built-in strategies run in well under a
+# millisecond per combination; user strategies go through pandas.
+MIN_PARALLEL_COMBINATIONS = {"builtin": 2000, "user": 50}
+
+# Metrics a sweep can be ranked by: the keys of backtest_metrics for
+# built-in strategies and of StrategyBuilder statistics for user strategies
+RANK_METRICS = {
+    "builtin": ("total_return", "total_return_percent", "annualized_return", "max_drawdown",
+                "win_rate", "total_trades", "profitable_trades", "loss_making_trades"),
+    "user": ("total_trades", "winning_trades", "win_rate", "avg_profit", "max_drawdown", "profit_factor"),
+}
+
+# Parameters used as window lengths, which must be positive integers
+WINDOW_PARAMS = ("fast_ma", "slow_ma", "rsi_period")
+WINDOW_SUFFIXES = ("period", "window")
+
+# State shared with pool workers, set once per worker by the initializer
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _range_length(spec: Any) -> int:
+    """Number of values of one parameter, computed without building them"""
+    if isinstance(spec, dict):
+        start = spec["start"]
+        stop = spec["stop"]
+        step = spec.get("step", 1)
+        for name, value in (("start", start), ("stop", stop), ("step", step)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{name} must be a finite number, got {value!r}")
+        if step <= 0:
+            raise ValueError("step must be positive")
+        # The tolerance keeps ``stop`` when float division falls just short of it
+        return max(0, math.floor((stop - start) / step + 1e-9) + 1)
+    if isinstance(spec, (list, tuple)):
+        return len(spec)
+    return 1
+
+
+def _range_values(spec: Any) -> List[Any]:
+    """Values for one parameter: a list, a scalar, or {start, stop, step} (inclusive)"""
+    if isinstance(spec, dict):
+        start = spec["start"]
+        step = spec.get("step", 1)
+        return [start + i * step for i in range(_range_length(spec))]
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+
+def _is_window_param(name: str) -> bool:
+    """Whether a parameter (or the last key of a dotted path) is a window length"""
+    key = name.rsplit(".", 1)[-1]
+    return key in WINDOW_PARAMS or key.endswith(WINDOW_SUFFIXES)
+
+
+def _window_value(name: str, value: Any) -> int:
+    """Window length as an int; JSON numbers like ``5.0`` are accepted"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not float(value).is_integer() or value < 1:
+        raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return int(value)
+
+
+def _check_rank_by(kind: str, rank_by: str):
+    if rank_by not in RANK_METRICS[kind]:
+        raise ValueError(f"Unknown rank_by {rank_by!r}, expected one of {', '.join(RANK_METRICS[kind])}")
+
+
+def expand_param_ranges(param_ranges: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expand parameter ranges into the list of all combinations
+
+    Args:
+        param_ranges: Mapping of parameter name to a list of values or a
+            ``{"start": 5, "stop": 50, "step": 5}`` range. Window lengths
+            (``fast_ma``, ``*period``, ...) are converted to int.
+
+    Returns:
+        List of {parameter: value} dictionaries
+    """
+    names = list(param_ranges.keys())
+    # Checked before any range is built, so a huge range fails fast
+    total = math.prod(_range_length(param_ranges[name]) for name in names) if names else 0
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"Sweep has {total} combinations, the maximum is {MAX_COMBINATIONS}")
+
+    values = [_range_values(param_ranges[name]) for name in names]
+    values = [
+        [_window_value(name, value) for value in name_values] if _is_window_param(name) else name_values
+        for name, name_values in zip(names, values)
+    ]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def _chunks(items: List[Any], count: int) -> List[List[Any]]:
+    """Split ``items`` into at most ``count`` contiguous chunks"""
+    size = max(1, -(-len(items) // count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _init_worker(state: Dict[str, Any]):
+    """Pool initializer: receive prices and precomputed indicators once per worker"""
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+
+def _evaluate_chunk(combos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Evaluate a chunk of combinations against the worker state"""
+    state = _WORKER_STATE
+    evaluate = _evaluate_builtin if state["kind"] == "builtin" else _evaluate_user
+    return [evaluate(state, combo) for combo in combos]
+
+
+def _run_combinations(state: Dict[str, Any], combos: List[Dict[str, Any]],
+                      workers: Optional[int]) -> List[Dict[str, Any]]:
+    """Evaluate all combinations, in a process pool when the grid is large enough"""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(combos) < MIN_PARALLEL_COMBINATIONS[state["kind"]]:
+        _init_worker(state)
+        return _evaluate_chunk(combos)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as executor:
+        for chunk_results in executor.map(_evaluate_chunk, _chunks(combos, workers * 4)):
+            results.extend(chunk_results)
+    return results
+
+
+def _rank(results: List[Dict[str, Any]], rank_by: str, ascending: bool, top_n: Optional[int]) -> List[Dict[str, Any]]:
+    """Sort results by one metric and number them"""
+    def sort_key(result):
+        value = result["metrics"].get(rank_by)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return float("inf") if ascending else float("-inf")
+        return value
+
+    ranked = sorted(results, key=sort_key, reverse=not ascending)
+    if top_n:
+        ranked = ranked[:top_n]
+    for position, result in enumerate(ranked, start=1):
+        result["rank"] = position
+    return ranked
+
+
+# Built-in strategies (get_strategy_params)
+
+def _evaluate_builtin(state: Dict[str, Any], combo: Dict[str, Any]) -> Dict[str, Any]:
+    """Backtest one combination of a built-in strategy using cached indicators"""
+    params = {**state["base_params"], **combo}
+    close = state["close"]
+
+    if state["strategy_type"] == "technical" and "fast_ma" in params and "slow_ma" in params:
+        signals = crossover_signals(state["sma"][params["fast_ma"]], state["sma"][params["slow_ma"]])
+    elif state["strategy_type"] == "technical" and "rsi_period" in params and "rsi_threshold" in params:
+        signals = threshold_signals(
+            state["rsi"][params["rsi_period"]],
+            params["rsi_threshold"],
+            params.get("overbought_threshold", 70)
+        )
+    else:
+        signals = generate_signal_array(close, state["strategy_type"], params)
+
+    return {
+        "params": combo,
+        "metrics": backtest_metrics(state["dates"], close, signals, state["initial_capital"])
+    }
+
+
+def sweep_strategy(price_data: pd.DataFrame, strategy_params: Dict, param_ranges: Dict[str, Any],
+                   initial_capital: float = 10000.0, rank_by: str = "total_return_percent",
+                   ascending: bool = False, top_n: Optional[int] = None,
+                   workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Grid-backtest a strategy from ``get_strategy_params``
+
+    Args:
+        price_data: DataFrame with ``date`` and ``close`` columns, ascending
+        strategy_params: Strategy definition (type and default parameters)
+        param_ranges: Ranges for ``fast_ma``, ``slow_ma``, ``rsi_period``,
+            ``rsi_threshold``, ``overbought_threshold``
+        initial_capital: Starting cash for every run
+        rank_by: Metric used for ranking (one of ``RANK_METRICS``)
+        ascending: Rank ascending instead of descending
+        top_n: Only return the best ``top_n`` rows
+        workers: Process pool size (defaults to the number of CPUs)
+
+    Returns:
+        Dictionary with the number of combinations and the ranked results
+
+    Raises:
+        ValueError: For an unknown ``rank_by``, a non-integer window or a
+            grid over ``MAX_COMBINATIONS``
+    """
+    started = time.perf_counter()
+    _check_rank_by("builtin", rank_by)
+    base_params = strategy_params.get("parameters", {})
+    combos = expand_param_ranges(param_ranges)
+
+    # A fast average that is not faster than the slow one is not a crossover
+    combos = [
+        c for c in combos
+        if c.get("fast_ma", base_params.get("fast_ma", 0)) < c.get("slow_ma", base_params.get("slow_ma", float("inf")))
+    ]
+
+    close = price_data["close"].to_numpy(dtype=np.float64)
+
+    # Every distinct window is computed once, from one shared cumulative sum
+    cumsum = np.concatenate(([0.0], np.cumsum(close)))
+    windows = {c.get(k, base_params.get(k)) for c in combos for k in ("fast_ma", "slow_ma")}
+    periods = {c.get("rsi_period", base_params.get("rsi_period")) for c in combos}
+
+    state = {
+        "kind": "builtin",
+        "strategy_type": strategy_params.get("type", "technical"),
+        "base_params": base_params,
+        "dates": pd.DatetimeIndex(price_data["date"].to_numpy()),
+        "close": close,
+        "initial_capital": initial_capital,
+        "sma": {w: rolling_mean(close, w, cumsum) for w in windows if w is not None},
+        "rsi": {p: rsi_sma(close, p) for p in periods if p is not None},
+    }
+
+    results = _run_combinations(state, combos, workers)
+
+    return {
+        "combinations": len(combos),
+        "distinct_windows": len(state["sma"]) + len(state["rsi"]),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "rank_by": rank_by,
+        "results": _rank(results, rank_by, ascending, top_n)
+    }
+
+
+# User strategies (StrategyBuilder)
+
+def set_param_path(params: Dict, path: str, value: Any):
+    """
+    Set a nested strategy parameter addressed by a dotted path
+
+    ``"indicators.0.params.period"`` sets ``params["indicators"][0]["params"]["period"]``.
+    """
+    keys = path.split(".")
+    target = params
+    for key in keys[:-1]:
+        target = target[int(key)] if isinstance(target, list) else target.setdefault(key, {})
+    last = keys[-1]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        target[last] = value
+
+
+def _evaluate_user(state: Dict[str, Any], combo: Dict[str, Any]) -> Dict[str, Any]:
+    """Backtest one combination of a user strategy using cached indicators"""
+    strategy_params = copy.deepcopy(state["strategy_params"])
+    for path, value in combo.items():
+        set_param_path(strategy_params, path, value)
+
+    builder = StrategyBuilder()
+    result = builder.backtest_strategy(state["df"], strategy_params, indicator_cache=state["indicator_cache"])
+    return {"params": combo, "metrics": result["statistics"]}
+
+
+def sweep_user_strategy(df: pd.DataFrame, strategy_params: Dict, param_ranges: Dict[str, Any],
+                        rank_by: str = "avg_profit", ascending: bool = False,
+                        top_n: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Grid-backtest a user-defined ``StrategyBuilder`` strategy
+
+    Args:
+        df: OHLCV DataFrame indexed by date, as used by ``StrategyBuilder``
+        strategy_params: Strategy definition (indicators and conditions)
+        param_ranges: Ranges keyed by dotted parameter path, e.g.
+            ``"indicators.0.params.period"`` or ``"buy_conditions.0.params.value"``
+        rank_by: Statistic used for ranking (one of ``RANK_METRICS``)
+        ascending: Rank ascending instead of descending
+        top_n: Only return the best ``top_n`` rows
+        workers: Process pool size (defaults to the number of CPUs)
+
+    Returns:
+        Dictionary with the number of combinations and the ranked results
+
+    Raises:
+        ValueError: For an unknown ``rank_by``, a non-integer window or a
+            grid over ``MAX_COMBINATIONS``
+    """
+    started = time.perf_counter()
+    _check_rank_by("user", rank_by)
+    combos = expand_param_ranges(param_ranges)
+
+    # Compute every distinct indicator configuration once, before fanning out
+    builder = StrategyBuilder()
+    indicator_cache: Dict[str, Dict[str, np.ndarray]] = {}
+    for combo in combos:
+        params = copy.deepcopy(strategy_params)
+        for path, value in combo.items():
+            set_param_path(params, path, value)
+        builder.precompute_indicators(df, params, indicator_cache)
+
+    state = {
+        "kind": "user",
+        "df": df,
+        "strategy_params": strategy_params,
+        "indicator_cache": indicator_cache,
+    }
+
+    results = _run_combinations(state, combos, workers)
+
+    return {
+        "combinations": len(combos),
+        "distinct_indicators": len(indicator_cache),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "rank_by": rank_by,
+        "results": _rank(results, rank_by, ascending, top_n)
+    }
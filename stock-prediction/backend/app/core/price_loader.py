@@ -0,0 +1,225 @@
+"""
+Columnar price-series loader
+
+Runs a Core ``select`` of only the requested ``stock_prices`` columns
+(optionally outer-joined to ``stock_indicators``) and builds NumPy arrays
+or a DataFrame straight from the result rows, without materializing ORM
+objects or intermediate dictionaries.
+
+``load_latest_bars`` returns the latest and previous bar of many stocks
+in one query, for endpoints that would otherwise query per stock. On
+PostgreSQL it reads two index entries per stock, however long the
+history.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, select, true
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.models.stocks import Stock, StockIndicator, StockPrice
+
+PRICE_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+# Column names used by the pandas-based strategy code (``Date``, ``Close``, ...)
+TITLE_CASE_COLUMNS = {name: name.capitalize() for name in PRICE_COLUMNS}
+
+INDICATOR_COLUMNS = (
+    "sma_20", "sma_50", "sma_200",
+    "ema_12", "ema_26",
+    "rsi_14",
+    "macd", "macd_signal", "macd_histogram",
+    "bb_upper", "bb_middle", "bb_lower",
+    "signal", "signal_strength", "notes",
+)
+
+# Indicator columns that hold text rather than numbers
+TEXT_INDICATOR_COLUMNS = {"signal", "notes"}
+
+DateLike = Union[date, datetime, None]
+
+
+def get_stock_id(db: Session, ticker: str) -> Optional[int]:
+    """ID of a stock by ticker, without loading the Stock object"""
+    return db.execute(select(Stock.id).where(Stock.ticker == ticker)).scalar()
+
+
+def _build_select(stock_id: int, start: DateLike, end: DateLike, columns: Sequence[str],
+                  indicators: Sequence[str], interval: Optional[str], limit: Optional[int]):
+    selected = [getattr(StockPrice, name).label(name) for name in columns]
+    selected += [getattr(StockIndicator, name).label(name) for name in indicators]
+
+    stmt = select(*selected)
+    if indicators:
+        stmt = stmt.select_from(StockPrice).outerjoin(
+            StockIndicator,
+            and_(
+                StockIndicator.stock_id == StockPrice.stock_id,
+                StockIndicator.date == StockPrice.date,
+                func.coalesce(StockIndicator.interval, "1d") == func.coalesce(StockPrice.interval, "1d"),
+            ),
+        )
+
+    stmt = stmt.where(StockPrice.stock_id == stock_id)
+    if start is not None:
+        stmt = stmt.where(StockPrice.date >= start)
+    if end is not None:
+        stmt = stmt.where(StockPrice.date <= end)
+    if interval is not None:
+        stmt = stmt.where(StockPrice.interval == interval)
+
+    if limit is not None:
+        # Latest ``limit`` bars, returned ascending below
+        return stmt.order_by(StockPrice.date.desc()).limit(limit), True
+    return stmt.order_by(StockPrice.date), False
+
+
+def load_price_arrays(db: Session, stock_id: int, start: DateLike = None, end: DateLike = None,
+                      columns: Sequence[str] = PRICE_COLUMNS, indicators: Sequence[str] = (),
+                      interval: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Load a stock's price series as one NumPy array per column, ascending by date
+
+    Args:
+        db: Database session
+        stock_id: Stock ID
+        start: Inclusive lower date bound
+        end: Inclusive upper date bound
+        columns: ``stock_prices`` columns to load
+        indicators: ``stock_indicators`` columns to join in (NaN/None where
+            a bar has no indicator row)
+        interval: Only bars of this interval (all intervals if None)
+        limit: Only the latest ``limit`` bars
+
+    Returns:
+        Mapping of column name -> array. ``date`` is ``datetime64``, text
+        indicators are object arrays and everything else is ``float64``.
+    """
+    stmt, descending = _build_select(stock_id, start, end, columns, indicators, interval, limit)
+    rows = db.execute(stmt).all()
+    if descending:
+        rows.reverse()
+
+    names = list(columns) + list(indicators)
+    values = list(zip(*rows)) if rows else [()] * len(names)
+
+    arrays = {}
+    for name, column in zip(names, values):
+        if name == "date":
+            arrays[name] = np.array(column, dtype="datetime64[us]")
+        elif name in TEXT_INDICATOR_COLUMNS:
+            arrays[name] = np.array(column, dtype=object)
+        else:
+            # None becomes NaN
+            arrays[name] = np.array(column, dtype=np.float64)
+    return arrays
+
+
+def load_price_frame(db: Session, stock_id: int, start: DateLike = None, end: DateLike = None,
+                     columns: Sequence[str] = PRICE_COLUMNS, indicators: Sequence[str] = (),
+                     interval: Optional[str] = None, limit: Optional[int] = None,
+                     rename: Optional[Dict[str, str]] = None, index: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a stock's price series as a DataFrame (see ``load_price_arrays``)
+
+    Args:
+        rename: Optional column renames, e.g. ``{"close": "Close"}``
+        index: Column (after renaming) to use as the index
+    """
+    df = pd.DataFrame(load_price_arrays(db, stock_id, start, end, columns, indicators, interval, limit))
+    if rename:
+        df = df.rename(columns=rename)
+    if index:
+        df = df.set_index(index)
+    return df
+
+
+def _ranked_bars(stock_ids: Optional[Sequence[int]], interval: Optional[str], since: DateLike):
+    """Subquery of bars numbered per stock from the newest (``rank`` 1) backwards"""
+    rank = func.row_number().over(
+        partition_by=StockPrice.stock_id,
+        order_by=StockPrice.date.desc()
+    ).label("rank")
+    ranked = select(StockPrice.stock_id, *[getattr(StockPrice, name) for name in PRICE_COLUMNS], rank)
+    if stock_ids is not None:
+        ranked = ranked.where(StockPrice.stock_id.in_(stock_ids))
+    if interval is not None:
+        ranked = ranked.where(StockPrice.interval == interval)
+    if since is not None:
+        ranked = ranked.where(StockPrice.date >= since)
+    return ranked.subquery()
+
+
+def _lateral_bars(stock_ids: Optional[Sequence[int]], interval: Optional[str], since: DateLike):
+    """Query of the two newest bars per stock, one ``LIMIT 2`` index scan each (PostgreSQL)"""
+    stocks = select(Stock.id.label("stock_id"))
+    if stock_ids is not None:
+        stocks = stocks.where(Stock.id.in_(stock_ids))
+    stocks = stocks.subquery("wanted")
+
+    top = select(*[getattr(StockPrice, name) for name in PRICE_COLUMNS]).where(
+        StockPrice.stock_id == stocks.c.stock_id
+    )
+    if interval is not None:
+        top = top.where(StockPrice.interval == interval)
+    if since is not None:
+        top = top.where(StockPrice.date >= since)
+    top = top.order_by(StockPrice.date.desc()).limit(2).lateral("latest")
+
+    return select(stocks.c.stock_id, *[top.c[name] for name in PRICE_COLUMNS]).select_from(
+        stocks.join(top, true())
+    ).order_by(stocks.c.stock_id, top.c.date.desc())
+
+
+class LatestBars(NamedTuple):
+    """Most recent bar of a stock and the one before it (None if there is none)"""
+    latest: Row
+    previous: Optional[Row]
+
+
+def load_latest_bars(db: Session, stock_ids: Optional[Iterable[int]] = None, interval: Optional[str] = "1d",
+                     since: DateLike = None) -> Dict[int, LatestBars]:
+    """
+    Latest and previous bar for a set of stocks in one query
+
+    On PostgreSQL each stock's bars are read with a LATERAL ``ORDER BY
+    date DESC LIMIT 2``, two entries of the ``(stock_id, interval, date
+    DESC)`` index. Other databases rank the bars with ``row_number()``,
+    which reads every bar after ``since``.
+
+    Args:
+        db: Database session
+        stock_ids: Stocks to load (all stocks if None)
+        interval: Only bars of this interval (all intervals if None)
+        since: Ignore bars before this date; bounds the scan when only
+            recent bars matter
+
+    Returns:
+        Mapping of stock ID -> LatestBars for stocks with at least one bar.
+        Rows have ``stock_id``, ``date`` and the OHLCV columns.
+    """
+    if stock_ids is not None:
+        stock_ids = list(stock_ids)
+        if not stock_ids:
+            return {}
+
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = _lateral_bars(stock_ids, interval, since)
+    else:
+        ranked = _ranked_bars(stock_ids, interval, since)
+        columns = [ranked.c.stock_id] + [ranked.c[name] for name in PRICE_COLUMNS]
+        stmt = select(*columns).where(ranked.c.rank <= 2).order_by(ranked.c.stock_id, ranked.c.rank)
+    rows = db.execute(stmt).all()
+
+    bars = {}
+    for row in rows:
+        current = bars.get(row.stock_id)
+        if current is None:
+            bars[row.stock_id] = LatestBars(row, None)
+        else:
+            bars[row.stock_id] = LatestBars(current.latest, row)
+    return bars
+
@@ -14,10 +14,11 @@ import schedule
 from datetime import datetime, timedelta
 from typing import Callable, Dict, Any, List, Optional
 import yfinance as yf
-import pandas as pd
 from sqlalchemy.orm import Session
 
+from app.core.bulk_writer import normalize_dates
 from app.core.database import SessionLocal
+from app.core.http_cache import get_http_cache
 from app.models.stocks import Stock, StockPrice
 from app.utils.cache_manager import CacheManager
 from app.utils.db_optimizer import analyze_db_tables
@@ -140,8 +141,8 @@ def update_active_stocks():
                     logger.warning(f"No data returned for {stock.ticker}")
                     continue
                     
-                # Convert index to datetime
-                hist.index = pd.to_datetime(hist.index)
+                # Stored dates are naive UTC
+                hist.index = normalize_dates(hist.index)
                 
                 # Get latest date in DB
                 latest_price = db.query(StockPrice).filter(
@@ -152,8 +153,7 @@ def update_active_stocks():
                 
                 # Only add new data
                 for date, row in hist.iterrows():
-                    # Convert to datetime date
-                    date = date.to_pydatetime().date()
+                    date = date.to_pydatetime()
                     
                     # Skip if we already have this date
                     if latest_date and date <= latest_date:
@@ -176,9 +176,6 @@ def update_active_stocks():
                 stock.last_updated = datetime.now()
                 db.commit()
                 
-                # Clear cache for this stock
-                CacheManager.delete(f"get_stock_data_{stock.ticker}")
-                
             except Exception as e:
                 logger.error(f"Error updating {stock.ticker}: {str(e)}")
                 db.rollback()
@@ -198,6 +195,7 @@ def clear_expired_cache():
     logger.info("Running scheduled job: clear_expired_cache")
     count = CacheManager.clear_expired()
     logger.info(f"Cleared {count} expired cache entries")
+    get_http_cache().prune()
     return count
 
 
@@ -3,7 +3,6 @@ Utility functions for fetching stock data from Yahoo Finance and saving to datab
 """
 import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -13,85 +12,86 @@ from app.models.stocks import Stock, StockPrice, StockIndicator
 from app.data.indonesian_stocks import INDONESIAN_STOCKS
 import asyncio
 import time
-import random
 from ratelimit import limits, sleep_and_retry
-from app.core.cache_manager import cache_data, clear_cache
+from app.core.cache_manager import clear_cache
+from app.core.bulk_writer import bulk_upsert_stock_frame, normalize_dates
+from app.core.feature_store import refresh_feature_store
+from app.core.indicator_engine import stock_indicator_engine
+from app.core.incremental_refresh import get_last_bar_date, refresh_stock_incremental
+from app.core.latest_quotes import refresh_latest_quotes
 
 logger = logging.getLogger(__name__)
 
-def calculate_indicators(df):
-    """Calculate technical indicators for a dataframe of stock prices"""
+# History requested per interval, balancing data depth against request size
+PERIOD_BY_INTERVAL = {
+    "1d": "1y",
+    "1h": "7d",
+    "15m": "5d",
+    "5m": "1d",
+}
+
+def calculate_indicators(df, engine=None):
+    """Calculate technical indicators for a dataframe of stock prices
+    
+    Args:
+        df: OHLCV DataFrame, ascending by date
+        engine: Optional ``IndicatorEngine`` from ``stock_indicator_engine``
+            whose state continues right before the first row of ``df``
+    """
     if df.empty:
         return df
     
     try:
-        # SMA
-        df['sma_20'] = ta.sma(df['Close'], length=20)
-        df['sma_50'] = ta.sma(df['Close'], length=50)
-        df['sma_200'] = ta.sma(df['Close'], length=200)
-        
-        # EMA
-        df['ema_12'] = ta.ema(df['Close'], length=12)
-        df['ema_26'] = ta.ema(df['Close'], length=26)
-        
-        # RSI
-        df['rsi_14'] = ta.rsi(df['Close'], length=14)
-        
-        # MACD
-        macd = ta.macd(df['Close'], fast=12, slow=26, signal=9)
-        if not macd.empty:
-            df['macd'] = macd['MACD_12_26_9']
-            df['macd_signal'] = macd['MACDs_12_26_9']
-            df['macd_histogram'] = macd['MACDh_12_26_9']
-        
-        # Bollinger Bands
-        bbands = ta.bbands(df['Close'], length=20, std=2)
-        if not bbands.empty:
-            df['bb_upper'] = bbands['BBU_20_2.0']
-            df['bb_middle'] = bbands['BBM_20_2.0']
-            df['bb_lower'] = bbands['BBL_20_2.0']
-            
-        # Generate signals
-        df['signal'] = 'HOLD'
-        df['signal_strength'] = 0.5
-        
-        # Criteria for signals
-        # Buy signals
-        buy_conditions = (
-            (df['Close'] < df['bb_lower']) |  # Price below lower BB
-            ((df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1))) |  # MACD crosses above signal
-            (df['rsi_14'] < 30)  # RSI oversold
-        )
-        df.loc[buy_conditions, 'signal'] = 'BUY'
+        engine = engine or stock_indicator_engine()
+        values = engine.run(df)
+        for column in values.columns:
+            df[column] = values[column]
         
-        # Sell signals
-        sell_conditions = (
-            (df['Close'] > df['bb_upper']) |  # Price above upper BB
-            ((df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1))) |  # MACD crosses below signal
-            (df['rsi_14'] > 70)  # RSI overbought
-        )
-        df.loc[sell_conditions, 'signal'] = 'SELL'
-        
-        # Signal strength based on RSI distance from midpoint
-        df['signal_strength'] = abs(df['rsi_14'] - 50) / 50
-        df['signal_strength'] = df['signal_strength'].fillna(0.5)
-        
-        # Add notes for signals
-        df['notes'] = ''
-        df.loc[df['Close'] < df['bb_lower'], 'notes'] = df.loc[df['Close'] < df['bb_lower'], 'notes'] + 'Price below lower Bollinger Band. '
-        df.loc[df['Close'] > df['bb_upper'], 'notes'] = df.loc[df['Close'] > df['bb_upper'], 'notes'] + 'Price above upper Bollinger Band. '
-        df.loc[df['rsi_14'] < 30, 'notes'] = df.loc[df['rsi_14'] < 30, 'notes'] + 'RSI in oversold territory. '
-        df.loc[df['rsi_14'] > 70, 'notes'] = df.loc[df['rsi_14'] > 70, 'notes'] + 'RSI in overbought territory. '
-        df.loc[(df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1)), 'notes'] = \
-            df.loc[(df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1)), 'notes'] + 'MACD crossed above signal line. '
-        df.loc[(df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1)), 'notes'] = \
-            df.loc[(df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1)), 'notes'] + 'MACD crossed below signal line. '
+        add_signal_columns(df)
     
     except Exception as e:
         logger.error(f"Error calculating indicators: {str(e)}")
     
     return df
 
+def add_signal_columns(df):
+    """Add signal, signal_strength and notes derived from the indicator columns"""
+    # Generate signals
+    df['signal'] = 'HOLD'
+    df['signal_strength'] = 0.5
+    
+    # Criteria for signals
+    # Buy signals
+    buy_conditions = (
+        (df['Close'] < df['bb_lower']) |  # Price below lower BB
+        ((df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1))) |  # MACD crosses above signal
+        (df['rsi_14'] < 30)  # RSI oversold
+    )
+    df.loc[buy_conditions, 'signal'] = 'BUY'
+    
+    # Sell signals
+    sell_conditions = (
+        (df['Close'] > df['bb_upper']) |  # Price above upper BB
+        ((df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1))) |  # MACD crosses below signal
+        (df['rsi_14'] > 70)  # RSI overbought
+    )
+    df.loc[sell_conditions, 'signal'] = 'SELL'
+    
+    # Signal strength based on RSI distance from midpoint
+    df['signal_strength'] = abs(df['rsi_14'] - 50) / 50
+    df['signal_strength'] = df['signal_strength'].fillna(0.5)
+    
+    # Add notes for signals
+    df['notes'] = ''
+    df.loc[df['Close'] < df['bb_lower'], 'notes'] = df.loc[df['Close'] < df['bb_lower'], 'notes'] + 'Price below lower Bollinger Band. '
+    df.loc[df['Close'] > df['bb_upper'], 'notes'] = df.loc[df['Close'] > df['bb_upper'], 'notes'] + 'Price above upper Bollinger Band. '
+    df.loc[df['rsi_14'] < 30, 'notes'] = df.loc[df['rsi_14'] < 30, 'notes'] + 'RSI in oversold territory. '
+    df.loc[df['rsi_14'] > 70, 'notes'] = df.loc[df['rsi_14'] > 70, 'notes'] + 'RSI in overbought territory. '
+    df.loc[(df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1)), 'notes'] = \
+        df.loc[(df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1)), 'notes'] + 'MACD crossed above signal line. '
+    df.loc[(df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1)), 'notes'] = \
+        df.loc[(df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1)), 'notes'] + 'MACD crossed below signal line. '
+
 # Rate limit: 2 calls per second, with a small random delay to avoid bursts
 @sleep_and_retry
 @limits(calls=2, period=1)
@@ -101,26 +101,8 @@ def fetch_yahoo_data(ticker, period="1y", interval="1d"):
     stock = yf.Ticker(ticker)
     return stock.history(period=period, interval=interval), stock.info
 
-@cache_data(ttl_seconds=300)  # Cache data for 5 minutes
-async def fetch_stock_data(ticker, period="1y", interval="1d", db=None):
-    """Fetch stock data from Yahoo Finance, save to database, and then distribute.
-    
-    Following the data flow:
-    1. Try to fetch real-time data from Yahoo Finance
-    2. If successful, save it to database first
-    3. Always return data from database (most recent) to frontend
-    4. If API fails or hits limit, return previously stored data from database
-    """
-    df = pd.DataFrame()
-    company_info = {'name': ticker, 'sector': 'N/A'}
-    fetch_success = False
-    
-    # If we don't have a database session, we can't implement the desired flow
-    if db is None:
-        logger.warning(f"Database session is required for the data flow - {ticker}")
-        return df, company_info
-    
-    # Step 1: Try to fetch real-time data from Yahoo Finance
+async def _fetch_full_period(db, ticker, period, interval):
+    """Fetch ``period`` of data with company info and save it (full refresh)"""
     try:
         yahoo_df, info = fetch_yahoo_data(ticker, period, interval)
         
@@ -145,14 +127,51 @@ async def fetch_stock_data(ticker, period="1y", interval="1d", db=None):
                 'fiftyTwoWeekLow': info.get('fiftyTwoWeekLow', 0),
                 'fiftyTwoWeekHigh': info.get('fiftyTwoWeekHigh', 0),
             }
-            fetch_success = True
             logger.info(f"Successfully fetched data from Yahoo Finance for {ticker}")
             
             # Step 2: Save newly fetched data to database first
-            await save_stock_data(db, ticker, yahoo_df, company_info)
+            await save_stock_data(db, ticker, yahoo_df, company_info, interval=interval)
             logger.info(f"Saved new data to database for {ticker}")
+            return True
     except Exception as e:
         logger.warning(f"Failed to fetch data from Yahoo Finance for {ticker}: {str(e)}")
+    return False
+
+async def fetch_stock_data(ticker, period="1y", interval="1d", db=None, incremental=True):
+    """Fetch stock data from Yahoo Finance, save to database, and then distribute.
+    
+    Following the data flow:
+    1. Try to fetch real-time data from Yahoo Finance
+    2. If successful, save it to database first
+    3. Always return data from database (most recent) to frontend
+    4. If API fails or hits limit, return previously stored data from database
+    
+    With ``incremental=True`` a stock that already has bars for ``interval``
+    only fetches and writes the bars after the last stored one; ``period``
+    is then only used for stocks without history. Not cached, since every
+    call is expected to write to the database.
+    """
+    df = pd.DataFrame()
+    company_info = {'name': ticker, 'sector': 'N/A'}
+    fetch_success = False
+    
+    # If we don't have a database session, we can't implement the desired flow
+    if db is None:
+        logger.warning(f"Database session is required for the data flow - {ticker}")
+        return df, company_info
+    
+    # Step 1: Try to fetch real-time data from Yahoo Finance
+    stock = db.query(Stock).filter(Stock.ticker == ticker).first() if incremental else None
+    last_date = get_last_bar_date(db, stock.id, interval) if stock else None
+    if last_date is not None:
+        try:
+            refresh_stock_incremental(db, stock, interval=interval, fallback_period=period)
+            fetch_success = True
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Incremental refresh failed for {ticker}: {str(e)}")
+    else:
+        fetch_success = await _fetch_full_period(db, ticker, period, interval)
     
     # Step 3: Always return data from database (either newly saved data or previous data)
     # This way we implement the flow: API -> DB -> Frontend
@@ -228,14 +247,27 @@ async def fetch_stock_data(ticker, period="1y", interval="1d", db=None):
     
     return df, company_info
 
-async def save_stock_data(db, ticker, df, company_info):
+async def save_stock_data(db, ticker, df, company_info, interval="1d", bulk=True):
+    """Save stock data and indicators to database (see ``save_stock_frame``)"""
+    return save_stock_frame(db, ticker, df, company_info, interval=interval, bulk=bulk)
+
+def save_stock_frame(db, ticker, df, company_info, interval="1d", bulk=True):
     """Save stock data and indicators to database
     
     This function saves the data in an atomic way to ensure data consistency.
+    It is synchronous so that pipelines can run it in a worker thread.
+    
+    With ``bulk=True`` (default) the whole DataFrame is written with one
+    ``INSERT ... ON CONFLICT DO UPDATE`` statement per table instead of
+    querying and merging row by row.
+    
+    Returns:
+        Dictionary with inserted/updated counts for prices and indicators,
+        or None if nothing was saved
     """
     if df.empty:
         logger.warning(f"Cannot save empty dataframe for {ticker}")
-        return
+        return None
     
     try:
         # Check if stock exists
@@ -259,82 +291,25 @@ async def save_stock_data(db, ticker, df, company_info):
             stock.last_updated = datetime.now()
             db.commit()
         
-        # Process and save each day's data
-        for _, row in df.iterrows():
-            date = row['Date']
-            
-            # Check if price exists for this date
-            price = db.query(StockPrice).filter(
-                StockPrice.stock_id == stock.id,
-                StockPrice.date == date
-            ).first()
-            
-            # Create or update price
-            if not price:
-                price = StockPrice(
-                    stock_id=stock.id,
-                    date=date,
-                    open=row['Open'],
-                    high=row['High'],
-                    low=row['Low'],
-                    close=row['Close'],
-                    volume=row['Volume']
-                )
-                db.add(price)
-            else:
-                price.open = row['Open']
-                price.high = row['High']
-                price.low = row['Low']
-                price.close = row['Close']
-                price.volume = row['Volume']
-            
-            # Check if indicators exist for this date
-            indicator = db.query(StockIndicator).filter(
-                StockIndicator.stock_id == stock.id,
-                StockIndicator.date == date
-            ).first()
-            
-            # Create or update indicators
-            if not indicator:
-                indicator = StockIndicator(
-                    stock_id=stock.id,
-                    date=date,
-                    sma_20=row.get('sma_20'),
-                    sma_50=row.get('sma_50'),
-                    sma_200=row.get('sma_200'),
-                    ema_12=row.get('ema_12'),
-                    ema_26=row.get('ema_26'),
-                    rsi_14=row.get('rsi_14'),
-                    macd=row.get('macd'),
-                    macd_signal=row.get('macd_signal'),
-                    macd_histogram=row.get('macd_histogram'),
-                    bb_upper=row.get('bb_upper'),
-                    bb_middle=row.get('bb_middle'),
-                    bb_lower=row.get('bb_lower'),
-                    signal=row.get('signal'),
-                    signal_strength=row.get('signal_strength'),
-                    notes=row.get('notes')
-                )
-                db.add(indicator)
-            else:
-                indicator.sma_20 = row.get('sma_20')
-                indicator.sma_50 = row.get('sma_50') 
-                indicator.sma_200 = row.get('sma_200')
-                indicator.ema_12 = row.get('ema_12')
-                indicator.ema_26 = row.get('ema_26')
-                indicator.rsi_14 = row.get('rsi_14')
-                indicator.macd = row.get('macd')
-                indicator.macd_signal = row.get('macd_signal')
-                indicator.macd_histogram = row.get('macd_histogram')
-                indicator.bb_upper = row.get('bb_upper')
-                indicator.bb_middle = row.get('bb_middle')
-                indicator.bb_lower = row.get('bb_lower')
-                indicator.signal = row.get('signal')
-                indicator.signal_strength = row.get('signal_strength')
-                indicator.notes = row.get('notes')
+        stats = None
+        if bulk:
+            try:
+                stats = bulk_upsert_stock_frame(db, stock.id, df, interval)
+            except NotImplementedError as e:
+                logger.warning(f"{e}, falling back to row-by-row save for {ticker}")
+        
+        if stats is None:
+            stats = _save_stock_rows(db, stock, df, interval)
         
+        refresh_latest_quotes(db, [stock.id], interval)
         db.commit()
-        logger.info(f"Successfully saved {len(df)} records for {ticker}")
+        refresh_feature_store(db, ticker, interval)
+        logger.info(
+            f"Successfully saved {len(df)} records for {ticker} "
+            f"(prices: {stats['prices_inserted']} inserted, {stats['prices_updated']} updated; "
+            f"indicators: {stats['indicators_inserted']} inserted, {stats['indicators_updated']} updated)"
+        )
+        return stats
         
     except IntegrityError as e:
         db.rollback()
@@ -342,8 +317,102 @@ async def save_stock_data(db, ticker, df, company_info):
     except Exception as e:
         db.rollback()
         logger.error(f"Error saving {ticker} data: {str(e)}")
+    return None
+
+def _save_stock_rows(db, stock, df, interval="1d"):
+    """Row-by-row save used when the database dialect has no ON CONFLICT support"""
+    stats = {
+        'prices_inserted': 0,
+        'prices_updated': 0,
+        'indicators_inserted': 0,
+        'indicators_updated': 0,
+    }
+    date_column = 'Date' if 'Date' in df.columns else 'Datetime'
+    dates = normalize_dates(df[date_column])
+    
+    # Process and save each day's data
+    for (_, row), date in zip(df.iterrows(), dates.dt.to_pydatetime()):
+        
+        # Check if price exists for this date
+        price = db.query(StockPrice).filter(
+            StockPrice.stock_id == stock.id,
+            StockPrice.date == date,
+            StockPrice.interval == interval
+        ).first()
+        
+        # Create or update price
+        if not price:
+            price = StockPrice(
+                stock_id=stock.id,
+                date=date,
+                interval=interval,
+                open=row['Open'],
+                high=row['High'],
+                low=row['Low'],
+                close=row['Close'],
+                volume=row['Volume']
+            )
+            db.add(price)
+            stats['prices_inserted'] += 1
+        else:
+            price.open = row['Open']
+            price.high = row['High']
+            price.low = row['Low']
+            price.close = row['Close']
+            price.volume = row['Volume']
+            stats['prices_updated'] += 1
+        
+        # Check if indicators exist for this date
+        indicator = db.query(StockIndicator).filter(
+            StockIndicator.stock_id == stock.id,
+            StockIndicator.date == date,
+            StockIndicator.interval == interval
+        ).first()
+        
+        # Create or update indicators
+        if not indicator:
+            indicator = StockIndicator(
+                stock_id=stock.id,
+                date=date,
+                interval=interval,
+                sma_20=row.get('sma_20'),
+                sma_50=row.get('sma_50'),
+                sma_200=row.get('sma_200'),
+                ema_12=row.get('ema_12'),
+                ema_26=row.get('ema_26'),
+                rsi_14=row.get('rsi_14'),
+                macd=row.get('macd'),
+                macd_signal=row.get('macd_signal'),
+                macd_histogram=row.get('macd_histogram'),
+                bb_upper=row.get('bb_upper'),
+                bb_middle=row.get('bb_middle'),
+                bb_lower=row.get('bb_lower'),
+                signal=row.get('signal'),
+                signal_strength=row.get('signal_strength'),
+                notes=row.get('notes')
+            )
+            db.add(indicator)
+            stats['indicators_inserted'] += 1
+        else:
+            indicator.sma_20 = row.get('sma_20')
+            indicator.sma_50 = row.get('sma_50') 
+            indicator.sma_200 = row.get('sma_200')
+            indicator.ema_12 = row.get('ema_12')
+            indicator.ema_26 = row.get('ema_26')
+            indicator.rsi_14 = row.get('rsi_14')
+            indicator.macd = row.get('macd')
+            indicator.macd_signal = row.get('macd_signal')
+            indicator.macd_histogram = row.get('macd_histogram')
+            indicator.bb_upper = row.get('bb_upper')
+            indicator.bb_middle = row.get('bb_middle')
+            indicator.bb_lower = row.get('bb_lower')
+            indicator.signal = row.get('signal')
+            indicator.signal_strength = row.get('signal_strength')
+            indicator.notes = row.get('notes')
+            stats['indicators_updated'] += 1
+    
+    return stats
 
-@cache_data(ttl_seconds=60)  # Cache results for 1 minute
 async def get_latest_stock_data(db, ticker, fetch_if_outdated=False):
     """Get the latest stock data from the database or fetch if outdated
     
@@ -351,6 +420,9 @@ async def get_latest_stock_data(db, ticker, fetch_if_outdated=False):
     - Always returns data from DB
     - If data is outdated, triggers a fetch in background but still returns current DB data
     - Next request will get the updated data from DB
+    
+    Not cached: the returned ORM objects belong to the caller's session, and
+    the outdated check has to run on every call.
     """
     stock = db.query(Stock).filter(Stock.ticker == ticker).first()
     
@@ -409,16 +481,7 @@ async def fetch_and_save_single_stock(db, ticker, interval="1d"):
         # Fetch data from Yahoo Finance
         try:
             # Penentuan period berdasarkan interval untuk keseimbangan data
-            if interval == "1d":
-                period = "1y"
-            elif interval == "1h":
-                period = "7d"
-            elif interval == "15m":
-                period = "5d"
-            elif interval == "5m":
-                period = "1d"
-            else:
-                period = "1y"
+            period = PERIOD_BY_INTERVAL.get(interval, "1y")
                 
             logger.info(f"Fetching {ticker} data with interval={interval}, period={period}")
             df, info = fetch_yahoo_data(ticker, period=period, interval=interval)
@@ -446,7 +509,7 @@ async def fetch_and_save_single_stock(db, ticker, interval="1d"):
                 }
                 
                 # Save directly to database
-                await save_stock_data(db, ticker, df, company_info)
+                await save_stock_data(db, ticker, df, company_info, interval=interval)
                 logger.info(f"Successfully updated data for {ticker}")
                 
                 # Update last_updated timestamp
@@ -467,24 +530,169 @@ async def fetch_and_save_single_stock(db, ticker, interval="1d"):
         logger.error(f"Error in fetch_and_save_single_stock for {ticker}: {str(e)}")
         return False
 
-async def fetch_and_save_all_stocks(db: Session, ticker_list=None):
-    """Fetch and save data for all Indonesian stocks with rate limiting"""
+class TokenBucket:
+    """Async token bucket shared by all fetch tasks of a pipeline
+    
+    Allows bursts of up to ``capacity`` calls and ``rate`` calls per second
+    on average; ``acquire`` sleeps without blocking the event loop.
+    """
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+def download_batch(tickers, period="1y", interval="1d"):
+    """Download OHLCV data for several tickers with one ``yf.download`` call
+    
+    Returns:
+        Dictionary of ticker -> DataFrame with a ``Date`` column, only for
+        tickers that returned data
+    """
+    data = yf.download(
+        tickers,
+        period=period,
+        interval=interval,
+        group_by="ticker",
+        auto_adjust=True,
+        actions=True,
+        threads=False,
+        progress=False,
+    )
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker]
+        else:
+            # A single ticker comes back without the ticker column level
+            frame = data
+        frame = frame.dropna(how="all", subset=[c for c in ["Open", "High", "Low", "Close"] if c in frame.columns])
+        if frame.empty:
+            continue
+        frame = frame.reset_index()
+        if "Datetime" in frame.columns:
+            frame = frame.rename(columns={"Datetime": "Date"})
+        frames[ticker] = frame
+    return frames
+
+async def fetch_and_save_all_stocks(db: Session, ticker_list=None, interval="1d", period=None,
+                                    batch_size=20, max_concurrency=4, calls_per_second=2.0):
+    """Fetch and save data for all Indonesian stocks
+    
+    Runs as a pipeline: fetch tasks download ``batch_size`` tickers per
+    ``yf.download`` call, limited by a shared token bucket
+    (``calls_per_second``) and a semaphore (``max_concurrency``), and compute
+    indicators off the event loop. A single writer task takes the frames
+    from a queue and bulk-upserts them with the given session.
+    
+    Returns:
+        Report with the number of succeeded and failed tickers, the failure
+        reason per ticker, row counts and the elapsed time
+    """
     if ticker_list is None:
         ticker_list = [stock['ticker'] for stock in INDONESIAN_STOCKS]
+    period = period or PERIOD_BY_INTERVAL.get(interval, "1y")
+    known_stocks = {stock['ticker']: stock for stock in INDONESIAN_STOCKS}
     
+    started = time.perf_counter()
     total = len(ticker_list)
-    for i, ticker in enumerate(ticker_list):
-        logger.info(f"Fetching data for {ticker}... ({i+1}/{total})")
-        try:
-            # Pass db session to enable fallback to database
-            df, company_info = await fetch_stock_data(ticker, db=db)
-            if not df.empty:
-                await save_stock_data(db, ticker, df, company_info)
-                logger.info(f"Successfully saved data for {ticker}")
-            else:
-                logger.warning(f"No data fetched for {ticker}")
-        except Exception as e:
-            logger.error(f"Error processing {ticker}: {str(e)}")
+    batches = [ticker_list[i:i + batch_size] for i in range(0, total, batch_size)]
+    bucket = TokenBucket(calls_per_second)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    queue = asyncio.Queue(maxsize=max(1, max_concurrency * batch_size))
+    
+    succeeded = []
+    failed = {}
+    rows = {'prices_inserted': 0, 'prices_updated': 0, 'indicators_inserted': 0, 'indicators_updated': 0}
+    
+    async def fetch_batch(batch):
+        async with semaphore:
+            await bucket.acquire()
+            try:
+                frames = await asyncio.to_thread(download_batch, batch, period, interval)
+            except Exception as e:
+                logger.error(f"Batch download failed for {len(batch)} tickers: {str(e)}")
+                for ticker in batch:
+                    failed[ticker] = f"download failed: {str(e)}"
+                return
         
-        # Delay minimal antara API calls
-        time.sleep(random.uniform(0.5, 1.0))
+        for ticker in batch:
+            frame = frames.get(ticker)
+            if frame is None:
+                failed[ticker] = "no data returned"
+                continue
+            try:
+                frame = await asyncio.to_thread(calculate_indicators, frame)
+            except Exception as e:
+                failed[ticker] = f"indicator calculation failed: {str(e)}"
+                continue
+            await queue.put((ticker, frame))
+    
+    async def write_frames():
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                ticker, frame = item
+                info = known_stocks.get(ticker, {})
+                company_info = {k: info[k] for k in ('name', 'sector') if k in info}
+                try:
+                    stats = await asyncio.to_thread(save_stock_frame, db, ticker, frame, company_info, interval)
+                    if stats is None:
+                        failed[ticker] = "database write failed"
+                        continue
+                except Exception as e:
+                    failed[ticker] = f"database write failed: {str(e)}"
+                    continue
+                for key in rows:
+                    rows[key] += stats.get(key, 0)
+                succeeded.append(ticker)
+                done = len(succeeded) + len(failed)
+                if done % batch_size == 0 or done == total:
+                    logger.info(f"Progress: {done}/{total} tickers processed")
+            finally:
+                queue.task_done()
+    
+    writer = asyncio.create_task(write_frames())
+    try:
+        await asyncio.gather(*(fetch_batch(batch) for batch in batches))
+    finally:
+        await queue.put(None)
+        await writer
+    
+    report = {
+        'total': total,
+        'succeeded': len(succeeded),
+        'failed': len(failed),
+        'failures': failed,
+        'batches': len(batches),
+        **rows,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info(
+        f"Fetched {report['succeeded']}/{total} tickers in {report['elapsed_seconds']}s "
+        f"({report['failed']} failed, {rows['prices_inserted']} prices inserted, "
+        f"{rows['prices_updated']} updated)"
+    )
+    for ticker, reason in failed.items():
+        logger.warning(f"Failed to fetch {ticker}: {reason}")
+    return report
@@ -8,7 +8,8 @@ import logging
 from typing import Dict, List, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 
-from app.models.stocks import Stock, StockPrice, StockIndicator
+from app.models.stocks import StockIndicator
+from app.core.price_loader import TITLE_CASE_COLUMNS, get_stock_id, load_price_frame
 from app.core.trading_strategies import (
     calculate_moving_averages,
     calculate_rsi,
@@ -46,39 +47,23 @@ class StockPredictionService:
         """
         try:
             # Get the stock from the database
-            stock = self.db.query(Stock).filter(Stock.ticker == ticker).first()
-            if not stock:
+            stock_id = get_stock_id(self.db, ticker)
+            if stock_id is None:
                 raise ValueError(f"Stock {ticker} not found in database")
             
             # Get the date range
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
             
-            # Query stock prices
-            prices = (self.db.query(StockPrice)
-                     .filter(StockPrice.stock_id == stock.id)
-                     .filter(StockPrice.date >= start_date)
-                     .filter(StockPrice.date <= end_date)
-                     .order_by(StockPrice.date)
-                     .all())
+            # Load prices as columns straight from the cursor
+            df = load_price_frame(
+                self.db, stock_id, start_date, end_date,
+                rename=TITLE_CASE_COLUMNS, index='Date'
+            )
             
-            if not prices:
+            if df.empty:
                 raise ValueError(f"No price data for {ticker} in the specified date range")
             
-            # Convert to DataFrame
-            df = pd.DataFrame([
-                {
-                    'Date': price.date,
-                    'Open': price.open,
-                    'High': price.high,
-                    'Low': price.low,
-                    'Close': price.close,
-                    'Volume': price.volume
-                }
-                for price in prices
-            ])
-            
-            df.set_index('Date', inplace=True)
             return df
             
         except Exception as e:
@@ -3,6 +3,7 @@ Custom strategy builder and executor for user-defined trading strategies
 """
 import pandas as pd
 import numpy as np
+import json
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -73,10 +74,38 @@ class StrategyBuilder:
         """Check if indicator is between lower and upper values"""
         return (df[indicator] >= lower) & (df[indicator] <= upper)
     
-    def apply_indicators(self, df, strategy_params):
-        """Apply technical indicators specified in the strategy params"""
+    @staticmethod
+    def indicator_key(indicator_type, params):
+        """Stable cache key for an indicator type and its parameters"""
+        return f"{indicator_type}:{json.dumps(params, sort_keys=True)}"
+    
+    def _compute_indicator(self, df, indicator_type, params, base_columns, indicator_cache):
+        """Return the columns produced by one indicator, computing them only on a cache miss
+        
+        Indicators are computed on the base price columns alone, so cached
+        outputs do not depend on which other indicators were applied first.
+        """
+        key = self.indicator_key(indicator_type, params)
+        if key not in indicator_cache:
+            computed = self.available_indicators[indicator_type](df[base_columns].copy(), **params)
+            indicator_cache[key] = {
+                column: computed[column].to_numpy()
+                for column in computed.columns
+                if column not in base_columns
+            }
+        return indicator_cache[key]
+    
+    def apply_indicators(self, df, strategy_params, indicator_cache=None):
+        """Apply technical indicators specified in the strategy params
+        
+        Args:
+            indicator_cache: Optional dict reused across calls on the same
+                price data, so each distinct indicator configuration is only
+                computed once (used by parameter sweeps)
+        """
         # Make a copy of the dataframe to avoid modifying the original
         df = df.copy()
+        base_columns = list(df.columns)
         
         # Process each indicator group
         indicators = strategy_params.get("indicators", [])
@@ -85,11 +114,25 @@ class StrategyBuilder:
             params = indicator.get("params", {})
             
             if indicator_type in self.available_indicators:
-                # Call the indicator function with the dataframe and params
-                df = self.available_indicators[indicator_type](df, **params)
+                if indicator_cache is None:
+                    # Call the indicator function with the dataframe and params
+                    df = self.available_indicators[indicator_type](df, **params)
+                else:
+                    columns = self._compute_indicator(df, indicator_type, params, base_columns, indicator_cache)
+                    for column, values in columns.items():
+                        df[column] = values
         
         return df
     
+    def precompute_indicators(self, df, strategy_params, indicator_cache):
+        """Fill ``indicator_cache`` with every indicator of a strategy without applying conditions"""
+        base_columns = list(df.columns)
+        for indicator in strategy_params.get("indicators", []):
+            indicator_type = indicator.get("type")
+            if indicator_type in self.available_indicators:
+                self._compute_indicator(df, indicator_type, indicator.get("params", {}), base_columns, indicator_cache)
+        return indicator_cache
+    
     def apply_conditions(self, df, conditions):
         """Apply buy or sell conditions to the dataframe"""
         signals = pd.Series(False, index=df.index)
@@ -114,11 +157,11 @@ class StrategyBuilder:
         
         return signals
     
-    def execute_strategy(self, df, strategy_params):
+    def execute_strategy(self, df, strategy_params, indicator_cache=None):
         """Execute a user-defined strategy on historical data"""
         try:
             # Apply indicators first
-            df = self.apply_indicators(df, strategy_params)
+            df = self.apply_indicators(df, strategy_params, indicator_cache)
             
             # Apply buy and sell conditions
             buy_signals = self.apply_conditions(df, strategy_params.get("buy_conditions", []))
@@ -139,10 +182,10 @@ class StrategyBuilder:
             logger.error(f"Error executing strategy: {str(e)}")
             raise
     
-    def backtest_strategy(self, df, strategy_params):
+    def backtest_strategy(self, df, strategy_params, indicator_cache=None):
         """Backtest a user-defined strategy on historical data"""
         # Apply strategy to get signals
-        df = self.execute_strategy(df, strategy_params)
+        df = self.execute_strategy(df, strategy_params, indicator_cache)
         
         # Calculate trades and performance
         trades = []
@@ -150,16 +193,19 @@ class StrategyBuilder:
         entry_price = 0
         entry_date = None
         
-        for i, row in df.iterrows():
-            if row["Action"] == "BUY" and not open_position:
+        # Only bars with an action can open or close a position
+        actions = df["Action"].to_numpy()
+        closes = df["Close"].to_numpy()
+        for i in np.flatnonzero(pd.notna(actions)):
+            if actions[i] == "BUY" and not open_position:
                 open_position = True
-                entry_price = row["Close"]
-                entry_date = row.name  # Index is the date
+                entry_price = closes[i]
+                entry_date = df.index[i]  # Index is the date
                 
-            elif row["Action"] == "SELL" and open_position:
+            elif actions[i] == "SELL" and open_position:
                 open_position = False
-                exit_price = row["Close"]
-                exit_date = row.name
+                exit_price = closes[i]
+                exit_date = df.index[i]
                 
                 profit = (exit_price - entry_price) / entry_price * 100
                 trades.append({
@@ -0,0 +1,414 @@
+"""
+Parallel model training across a process pool
+
+Scheduled retraining fans tickers out over worker processes. The parent
+brings each ticker's feature store up to date and writes the results;
+workers only read features from the store, fit the scalers and model with
+``MLEngine.fit_model`` and save the artifacts, so they need no database
+session. All new ``MLModel`` rows are written with one bulk insert.
+``StockPricePredictor`` models are retrained the same way, from price
+frames the parent loads.
+
+Concurrency is the smaller of the CPU count and what available memory
+allows for the largest job, and every ticker has a timeout. The pool is
+loky's (bundled with joblib), which also works inside Celery's daemonic
+prefork workers.
+"""
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from joblib.externals.loky import ProcessPoolExecutor, cpu_count
+from joblib.externals.loky.process_executor import BrokenProcessPool
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.feature_store import FeatureStore, get_feature_store, sync_feature_store
+from app.core.ml_engine import MLEngine
+from app.core.model_registry import get_model_registry, prune_model_artifacts
+from app.core.price_loader import load_price_frame
+from app.ml.models import MODEL_DIR as PREDICTOR_MODEL_DIR, StockPricePredictor
+from app.models.big_data import DataProcessingJob, MLModel
+from app.models.stocks import Stock
+
+logger = logging.getLogger(__name__)
+
+# Model types that can be trained in pool workers (TensorFlow does not fork safely)
+POOL_MODEL_TYPES = ("linear", "forest", "gbm")
+
+# Seconds a single ticker may train before it is abandoned
+TRAINING_TIMEOUT = int(os.getenv("TRAINING_TIMEOUT_SECONDS", "900"))
+
+# Baseline memory of a worker process (interpreter, sklearn, model)
+TRAINING_WORKER_MEMORY_MB = int(os.getenv("TRAINING_WORKER_MEMORY_MB", "512"))
+
+# Share of available memory the pool may plan to use
+TRAINING_MEMORY_FRACTION = 0.7
+
+# Runs a ticker gets when its worker pool breaks under it (the job that
+# killed the pool is not known, so every job in it is retried)
+TRAINING_ATTEMPTS = 2
+
+# Bars a StockPricePredictor needs to train
+PREDICTOR_MIN_BARS = 60
+
+# Feature columns of StockPricePredictor.create_features, for memory estimates
+PREDICTOR_FEATURE_COLUMNS = 40
+
+
+def available_memory() -> Optional[int]:
+    """Available physical memory in bytes, or None if unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def estimate_job_memory(rows: int, columns: int) -> int:
+    """Peak bytes of one training job: the worker baseline plus float64 copies of its feature matrix"""
+    # Features, split, scaled train/test and the forest's own copy
+    return TRAINING_WORKER_MEMORY_MB * 2**20 + rows * columns * 8 * 6
+
+
+def plan_workers(job_memory: Sequence[int], max_workers: Optional[int] = None) -> int:
+    """Number of worker processes for jobs with the given memory estimates"""
+    workers = min(cpu_count(), len(job_memory), max_workers or cpu_count())
+    memory = available_memory()
+    if memory and job_memory:
+        workers = min(workers, int(memory * TRAINING_MEMORY_FRACTION // max(job_memory)))
+    return max(1, workers)
+
+
+def _train_ticker(ticker: str, model_type: str, interval: str, prediction_horizon: int, days: int,
+                  n_jobs: int, store_root: str) -> Dict[str, Any]:
+    """Worker: train one ticker's model from its stored features"""
+    store = FeatureStore(store_root)
+    meta = store.meta(ticker, interval)
+    features = store.read(ticker, interval, start=datetime.now() - timedelta(days=days))
+    if meta is None or features is None or features.empty:
+        raise ValueError(f"No stored features for {ticker}")
+
+    features = MLEngine.add_targets(features, prediction_horizon)
+    trained = MLEngine.fit_model(features, ticker, model_type, n_jobs=n_jobs)
+    if trained is None:
+        raise RuntimeError(f"Failed to train model for {ticker}")
+    trained["feature_schema"] = meta["schema_hash"]
+    return trained
+
+
+def _train_predictor(ticker: str, model_type: str, bars, n_jobs: int) -> Dict[str, Any]:
+    """
+    Worker: retrain a ticker's ``StockPricePredictor`` on price bars
+
+    The predictor replaces its files atomically, so a worker killed on a
+    timeout leaves the previous model in place.
+    """
+    predictor = StockPricePredictor(ticker, model_type)
+    predictor.build_model(len(bars.columns))
+    predictor.model.set_params(n_jobs=n_jobs)
+    return {"metrics": predictor.train(bars)["metrics"]}
+
+
+def _remove_stale_tmp_files(directory: str, max_age: float) -> None:
+    """Delete temporary files left by workers killed while replacing a file"""
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".tmp") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _run_pool(jobs: Dict[str, int], workers: int, timeout: float, task,
+              job_args: Dict[str, tuple]) -> Dict[str, Any]:
+    """
+    Run ``task(ticker, *job_args[ticker])`` for every ticker in ``jobs``, largest first
+
+    At most ``workers`` jobs are in flight, so a job's clock starts when it
+    starts running. A job past its timeout cannot be interrupted; it is
+    recorded as timed out and the pool is restarted, resubmitting the other
+    running jobs. Jobs that failed because a worker died are resubmitted to
+    the new pool, up to ``TRAINING_ATTEMPTS`` runs each.
+
+    Returns:
+        Mapping of ticker -> trained artifacts, or the exception that ended it
+    """
+    pending = sorted(jobs, key=jobs.get, reverse=True)
+    outcomes: Dict[str, Any] = {}
+    running: Dict[Any, tuple] = {}  # future -> (ticker, start)
+    attempts: Dict[str, int] = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                ticker = pending.pop(0)
+                attempts[ticker] = attempts.get(ticker, 0) + 1
+                running[executor.submit(task, ticker, *job_args[ticker])] = (ticker, time.monotonic())
+
+            next_deadline = min(start for _, start in running.values()) + timeout
+            done, _ = wait(list(running), timeout=max(0.0, next_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+
+            broken = False
+            retry = []
+            for future in done:
+                ticker, _ = running.pop(future)
+                try:
+                    outcomes[ticker] = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. killed for memory); its pool is unusable
+                    broken = True
+                    if attempts[ticker] < TRAINING_ATTEMPTS:
+                        retry.append(ticker)
+                    else:
+                        outcomes[ticker] = e
+                except Exception as e:
+                    outcomes[ticker] = e
+
+            now = time.monotonic()
+            expired = [future for future, (_, start) in running.items() if now - start >= timeout]
+            for future in expired:
+                ticker, _ = running.pop(future)
+                outcomes[ticker] = TimeoutError(f"Training {ticker} exceeded {timeout:.0f}s")
+                logger.warning(f"Training {ticker} timed out after {timeout:.0f}s")
+
+            if expired or broken:
+                # Jobs still running were cut off, not failed: their runs are not counted
+                for ticker, _ in running.values():
+                    attempts[ticker] -= 1
+                pending[:0] = retry + [ticker for ticker, _ in running.values()]
+                running.clear()
+                executor.shutdown(wait=False, kill_workers=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown(wait=False, kill_workers=True)
+    return outcomes
+
+
+def _store_models(db: Session, trained: Dict[str, Dict[str, Any]], model_type: str, interval: str,
+                  prediction_horizon: int, days: int) -> Dict[str, int]:
+    """Retire the previous versions and insert the new ``MLModel`` rows in bulk; returns ticker -> model ID"""
+    same_key = (
+        MLModel.ticker.in_(list(trained)),
+        MLModel.model_type == model_type,
+        MLModel.interval == interval,
+        MLModel.prediction_horizon == prediction_horizon,
+    )
+    versions = dict(
+        db.query(MLModel.ticker, func.count(MLModel.id)).filter(*same_key).group_by(MLModel.ticker).all()
+    )
+    db.query(MLModel).filter(*same_key).update({MLModel.is_active: False}, synchronize_session=False)
+
+    rows = [
+        MLEngine.model_record(
+            ticker, model_type, interval, prediction_horizon, days, result,
+            version=f"{versions.get(ticker, 0) + 1}.0", feature_schema=result.get("feature_schema")
+        )
+        for ticker, result in trained.items()
+    ]
+    ids = dict(db.execute(insert(MLModel).returning(MLModel.ticker, MLModel.id), rows).all())
+    db.commit()
+
+    registry = get_model_registry()
+    for ticker in trained:
+        registry.invalidate(ticker=ticker)
+    prune_model_artifacts(db, list(trained), model_type, interval, prediction_horizon)
+    return ids
+
+
+def train_models_parallel(db: Session, tickers: List[str], model_type: str = "forest", interval: str = "1d",
+                          prediction_horizon: int = 5, days: int = 500, max_workers: Optional[int] = None,
+                          timeout: float = TRAINING_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+    """
+    Train one model per ticker in parallel and record them as active ``MLModel`` rows
+
+    Args:
+        db: Database session; used only by the parent process
+        tickers: Tickers to train
+        model_type: One of ``POOL_MODEL_TYPES``
+        interval: Bar interval
+        prediction_horizon: Bars ahead to predict
+        days: Days of history to train on
+        max_workers: Upper bound on worker processes
+        timeout: Seconds per ticker
+
+    Returns:
+        Mapping of ticker -> ``{"status": "success", "model_id", "metrics"}``
+        or ``{"status": "error" | "timeout", "message"}``
+    """
+    if model_type not in POOL_MODEL_TYPES:
+        raise ValueError(f"Unsupported model type for parallel training: {model_type}")
+
+    store = get_feature_store()
+    stock_ids = dict(db.query(Stock.ticker, Stock.id).filter(Stock.ticker.in_(tickers)).all())
+    results: Dict[str, Dict[str, Any]] = {}
+
+    # Bring the feature stores up to date here, so workers only read files
+    jobs: Dict[str, int] = {}
+    for ticker in tickers:
+        if ticker not in stock_ids:
+            results[ticker] = {"status": "error", "message": "Stock not found"}
+            continue
+        try:
+            sync_feature_store(db, ticker, interval, stock_id=stock_ids[ticker], store=store)
+        except Exception as e:
+            results[ticker] = {"status": "error", "message": f"Failed to build features: {e}"}
+            continue
+        meta = store.meta(ticker, interval)
+        if not meta or not meta["rows"]:
+            results[ticker] = {"status": "error", "message": "No price data"}
+            continue
+        jobs[ticker] = estimate_job_memory(meta["rows"], len(meta["columns"]))
+
+    if not jobs:
+        return results
+
+    workers = plan_workers(list(jobs.values()), max_workers)
+    # Cores left over when there are fewer jobs than cores go to the forests
+    n_jobs = max(1, cpu_count() // workers)
+
+    job = DataProcessingJob(
+        job_type="model_training",
+        status="running",
+        parameters={"tickers": len(jobs), "model_type": model_type, "days": days, "workers": workers}
+    )
+    db.add(job)
+    db.commit()
+
+    started = time.monotonic()
+    logger.info(f"Training {len(jobs)} {model_type} models with {workers} workers ({n_jobs} threads each)")
+    submit_args = (model_type, interval, prediction_horizon, days, n_jobs, store.root)
+    outcomes = _run_pool(jobs, workers, timeout, _train_ticker, {ticker: submit_args for ticker in jobs})
+
+    trained = {ticker: outcome for ticker, outcome in outcomes.items() if isinstance(outcome, dict)}
+    for ticker, outcome in outcomes.items():
+        if isinstance(outcome, TimeoutError):
+            results[ticker] = {"status": "timeout", "message": str(outcome)}
+        elif not isinstance(outcome, dict):
+            logger.error(f"Error training model for {ticker}: {str(outcome)}")
+            results[ticker] = {"status": "error", "message": str(outcome)}
+
+    ids = _store_models(db, trained, model_type, interval, prediction_horizon, days) if trained else {}
+    for ticker, result in trained.items():
+        results[ticker] = {"status": "success", "model_id": ids.get(ticker), "metrics": result["metrics"]}
+
+    job.status = "completed"
+    job.completed_at = datetime.now()
+    job.results = {"trained": len(trained), "failed": len(jobs) - len(trained),
+                   "seconds": round(time.monotonic() - started, 1)}
+    db.commit()
+
+    logger.info(f"Trained {len(trained)} of {len(jobs)} {model_type} models in {job.results['seconds']}s")
+    return results
+
+
+def train_predictors_parallel(db: Session, tickers: List[str], model_type: str = "random_forest",
+                              days: int = 365, max_workers: Optional[int] = None,
+                              timeout: float = TRAINING_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrain the ``StockPricePredictor`` model of each ticker in parallel
+
+    The predictors serve ``/ml/predict`` and keep their model and metadata
+    files under ``app.ml.models.MODEL_DIR``; no ``MLModel`` rows are written.
+
+    Args:
+        db: Database session; used only by the parent process
+        tickers: Tickers to train
+        model_type: Predictor model type
+        days: Days of history to train on
+        max_workers: Upper bound on worker processes
+        timeout: Seconds per ticker
+
+    Returns:
+        Mapping of ticker -> ``{"status": "success", "metrics"}`` or
+        ``{"status": "error" | "timeout", "message"}``
+    """
+    stock_ids = dict(db.query(Stock.ticker, Stock.id).filter(Stock.ticker.in_(tickers)).all())
+    start = datetime.now() - timedelta(days=days)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    jobs: Dict[str, int] = {}
+    bars: Dict[str, Any] = {}
+    for ticker in tickers:
+        if ticker not in stock_ids:
+            results[ticker] = {"status": "error", "message": "Stock not found"}
+            continue
+        df = load_price_frame(db, stock_ids[ticker], start, interval="1d")
+        if len(df) < PREDICTOR_MIN_BARS:
+            results[ticker] = {"status": "error",
+                               "message": f"Insufficient price data, need at least {PREDICTOR_MIN_BARS} bars"}
+            continue
+        df["adjclose"] = df["close"]
+        bars[ticker] = df
+        jobs[ticker] = estimate_job_memory(len(df), PREDICTOR_FEATURE_COLUMNS)
+
+    if not jobs:
+        return results
+
+    workers = plan_workers(list(jobs.values()), max_workers)
+    n_jobs = max(1, cpu_count() // workers)
+
+    started = time.monotonic()
+    logger.info(f"Training {len(jobs)} {model_type} predictors with {workers} workers ({n_jobs} threads each)")
+    outcomes = _run_pool(jobs, workers, timeout, _train_predictor,
+                         {ticker: (model_type, bars[ticker], n_jobs) for ticker in jobs})
+    _remove_stale_tmp_files(PREDICTOR_MODEL_DIR, timeout)
+
+    for ticker, outcome in outcomes.items():
+        if isinstance(outcome, dict):
+            results[ticker] = {"status": "success", "metrics": outcome["metrics"]}
+        elif isinstance(outcome, TimeoutError):
+            results[ticker] = {"status": "timeout", "message": str(outcome)}
+        else:
+            logger.error(f"Error training predictor for {ticker}: {str(outcome)}")
+            results[ticker] = {"status": "error", "message": str(outcome)}
+
+    trained = sum(1 for result in results.values() if result["status"] == "success")
+    logger.info(f"Trained {trained} of {len(jobs)} {model_type} predictors in "
+                f"{time.monotonic() - started:.1f}s")
+    return results
+
+
+def stale_predictor_tickers(tickers: Sequence[str], model_type: str = "random_forest",
+                            max_age_days: int = 7) -> List[str]:
+    """Tickers whose ``StockPricePredictor`` files are missing or older than ``max_age_days``"""
+    cutoff = time.time() - max_age_days * 86400
+    stale = []
+    for ticker in tickers:
+        predictor = StockPricePredictor(ticker, model_type)
+        try:
+            trained_at = min(os.path.getmtime(predictor.model_path), os.path.getmtime(predictor.metadata_path))
+        except OSError:
+            trained_at = None
+        if trained_at is None or trained_at < cutoff:
+            stale.append(ticker)
+    return stale
+
+
+def stale_tickers(db: Session, tickers: Sequence[str], model_type: str = "forest", interval: str = "1d",
+                  prediction_horizon: int = 5, max_age_days: int = 7) -> List[str]:
+    """Tickers without an active model of this kind trained within ``max_age_days``"""
+    newest = dict(
+        db.query(MLModel.ticker, func.max(MLModel.created_at)).filter(
+            MLModel.ticker.in_(list(tickers)),
+            MLModel.model_type == model_type,
+            MLModel.interval == interval,
+            MLModel.prediction_horizon == prediction_horizon,
+            MLModel.is_active == True
+        ).group_by(MLModel.ticker).all()
+    )
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    return [ticker for ticker in tickers if newest.get(ticker) is None or newest[ticker] < cutoff]
@@ -0,0 +1,318 @@
+"""
+Walk-forward validation of prediction models
+
+Evaluates a model type the way it would have been used: refit every
+``refit_every`` bars on the history known at that point (expanding, or a
+rolling ``window``), predict the next block of bars, and move on. All
+folds slice one feature matrix; with joblib's loky backend, matrices over
+1 MB are memory-mapped into the workers rather than copied per fold.
+
+Independent folds run in parallel. With ``warm_start`` the forest and
+boosting models instead grow from fold to fold, which is cheaper but
+sequential.
+
+Error, direction accuracy and a simulated strategy (long, or long/short,
+when the predicted price is above the close, held one bar) are computed
+for all folds at once with ``np.bincount`` over the fold ID of each row.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy.orm import Session
+
+from app.core.feature_store import get_feature_store, sync_feature_store
+from app.core.ml_engine import MLEngine
+from app.models.stocks import Stock
+
+logger = logging.getLogger(__name__)
+
+WALK_FORWARD_MODEL_TYPES = ("linear", "forest", "gbm")
+
+# Trees added at each refit when warm-starting a forest or boosting model
+WARM_START_ESTIMATORS = 20
+
+
+class Fold(NamedTuple):
+    """Row ranges (end exclusive) of one walk-forward step"""
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def make_folds(n_rows: int, initial_train: int, refit_every: int, prediction_horizon: int,
+               window: Optional[int] = None) -> List[Fold]:
+    """
+    Walk-forward folds over ``n_rows`` date-ordered rows
+
+    A row's target is the close ``prediction_horizon`` bars later, so a
+    model predicting from row ``t`` is trained only on rows up to
+    ``t - prediction_horizon``, whose targets were known by then.
+
+    Args:
+        n_rows: Rows with targets
+        initial_train: Training rows of the first fold
+        refit_every: Test rows per fold (bars between refits)
+        prediction_horizon: Bars between a row and its target
+        window: Train on at most this many latest rows (expanding if None)
+    """
+    folds = []
+    test_start = initial_train + prediction_horizon - 1
+    while test_start < n_rows:
+        train_end = test_start - prediction_horizon + 1
+        train_start = max(0, train_end - window) if window else 0
+        test_end = min(test_start + refit_every, n_rows)
+        folds.append(Fold(train_start, train_end, test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def _fit_scalers(X: np.ndarray, y: np.ndarray, fold: Fold):
+    rows = slice(fold.train_start, fold.train_end)
+    return StandardScaler().fit(X[rows]), StandardScaler().fit(y[rows].reshape(-1, 1))
+
+
+def _fit_predict(model_type: str, X: np.ndarray, y: np.ndarray, fold: Fold) -> np.ndarray:
+    """Fit scalers and a model on a fold's training rows and predict its test rows (as ``MLEngine.fit_model``)"""
+    scaler_X, scaler_y = _fit_scalers(X, y, fold)
+    rows = slice(fold.train_start, fold.train_end)
+    model = MLEngine.build_estimator(model_type, n_jobs=1)
+    model.fit(scaler_X.transform(X[rows]), scaler_y.transform(y[rows].reshape(-1, 1)).ravel())
+    predicted = model.predict(scaler_X.transform(X[fold.test_start:fold.test_end]))
+    return scaler_y.inverse_transform(predicted.reshape(-1, 1)).ravel()
+
+
+def _warm_start_predict(model_type: str, X: np.ndarray, y: np.ndarray, folds: Sequence[Fold]) -> List[np.ndarray]:
+    """Predict every fold with one model that grows ``WARM_START_ESTIMATORS`` trees per refit"""
+    # Trees split on the scaled values, so the scaling stays that of the first fold
+    scaler_X, scaler_y = _fit_scalers(X, y, folds[0])
+    model = MLEngine.build_estimator(model_type, n_jobs=1)
+    model.set_params(warm_start=True)
+
+    predictions = []
+    for i, fold in enumerate(folds):
+        if i:
+            model.set_params(n_estimators=model.n_estimators + WARM_START_ESTIMATORS)
+        rows = slice(fold.train_start, fold.train_end)
+        model.fit(scaler_X.transform(X[rows]), scaler_y.transform(y[rows].reshape(-1, 1)).ravel())
+        predicted = model.predict(scaler_X.transform(X[fold.test_start:fold.test_end]))
+        predictions.append(scaler_y.inverse_transform(predicted.reshape(-1, 1)).ravel())
+    return predictions
+
+
+def score_predictions(close: np.ndarray, actual: np.ndarray, predicted: np.ndarray, next_return: np.ndarray,
+                      fold_ids: np.ndarray, long_only: bool = True, cost_bps: float = 0.0,
+                      periods_per_year: int = 252) -> Dict[str, Any]:
+    """
+    Error, direction and strategy metrics per fold and overall
+
+    Args:
+        close: Close of each test row
+        actual: Target price of each test row
+        predicted: Predicted price of each test row
+        next_return: Return of the bar after each test row
+        fold_ids: Fold index of each test row (0..n_folds-1, ascending)
+        long_only: Stay flat instead of short when a fall is predicted
+        cost_bps: Cost of each change of position, in basis points
+        periods_per_year: Bars per year, to annualize the Sharpe ratio
+
+    Returns:
+        ``{"folds": {metric: array per fold}, "summary": {metric: value}}``
+    """
+    counts = np.bincount(fold_ids).astype(np.float64)
+    per_fold = lambda values: np.bincount(fold_ids, weights=values, minlength=len(counts))
+
+    squared_error = (predicted - actual) ** 2
+    hits = (np.sign(predicted - close) == np.sign(actual - close)).astype(np.float64)
+
+    position = (predicted > close).astype(np.float64)
+    if not long_only:
+        position -= predicted < close
+    turnover = np.abs(np.diff(position, prepend=0.0))
+    strategy = position * next_return - turnover * cost_bps / 1e4
+    log_growth = np.log1p(strategy)
+
+    fold_mean = per_fold(strategy) / counts
+    fold_std = np.sqrt(np.maximum(per_fold(strategy ** 2) / counts - fold_mean ** 2, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fold_sharpe = np.where(fold_std > 0, fold_mean / fold_std * np.sqrt(periods_per_year), 0.0)
+
+    equity = np.exp(np.cumsum(log_growth))
+    drawdown = 1 - equity / np.maximum.accumulate(np.maximum(equity, 1.0))
+    std = strategy.std()
+    rmse = float(np.sqrt(squared_error.mean()))
+
+    return {
+        "folds": {
+            "rows": counts.astype(int),
+            "rmse": np.sqrt(per_fold(squared_error) / counts),
+            "direction_accuracy": per_fold(hits) / counts,
+            "strategy_return": np.expm1(per_fold(log_growth)),
+            "buy_and_hold_return": np.expm1(per_fold(np.log1p(next_return))),
+            "sharpe": fold_sharpe,
+        },
+        "summary": {
+            "folds": len(counts),
+            "rows": len(fold_ids),
+            "rmse": rmse,
+            "nrmse": rmse / float(close.mean()),
+            "direction_accuracy": float(hits.mean()),
+            "strategy_return": float(np.expm1(log_growth.sum())),
+            "buy_and_hold_return": float(np.expm1(np.log1p(next_return).sum())),
+            "sharpe": float(strategy.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+            "max_drawdown": float(drawdown.max()),
+            "exposure": float(np.abs(position).mean()),
+        },
+    }
+
+
+def walk_forward(features: pd.DataFrame, model_type: str, prediction_horizon: int = 5, initial_train: int = 252,
+                 refit_every: int = 21, window: Optional[int] = None, warm_start: bool = False,
+                 n_jobs: Optional[int] = None, parallel: Optional[Parallel] = None, long_only: bool = True,
+                 cost_bps: float = 0.0, periods_per_year: int = 252) -> Dict[str, Any]:
+    """
+    Walk-forward backtest of one model type on prepared features
+
+    Args:
+        features: Output of ``MLEngine.prepare_features`` (with targets), ascending
+        model_type: One of ``WALK_FORWARD_MODEL_TYPES``
+        prediction_horizon: Horizon the targets were built with
+        initial_train: Training rows of the first fold
+        refit_every: Bars between refits
+        window: Rolling training window in rows (expanding if None)
+        warm_start: Grow forest/boosting models across folds instead of refitting
+        n_jobs: Parallel folds (all cores if None); ignored with ``parallel``
+        parallel: Open ``joblib.Parallel`` to run the folds on, so many
+            backtests share one worker pool
+
+    Returns:
+        ``summary`` metrics, per-fold metrics in ``folds`` and the test
+        rows with their predictions in ``predictions``
+
+    Raises:
+        ValueError: For an unsupported model type or too few rows
+    """
+    if model_type not in WALK_FORWARD_MODEL_TYPES:
+        raise ValueError(f"Unsupported model type for walk-forward validation: {model_type}")
+
+    X, y = MLEngine.training_matrix(features, model_type)
+    X = X.to_numpy(dtype=np.float64)
+    y = y.to_numpy(dtype=np.float64)
+    close = features["Close"].to_numpy(dtype=np.float64)
+
+    folds = make_folds(len(X), initial_train, refit_every, prediction_horizon, window)
+    if not folds:
+        raise ValueError(f"Not enough rows for walk-forward validation: {len(X)}")
+
+    if warm_start and model_type != "linear":
+        predictions = _warm_start_predict(model_type, X, y, folds)
+    else:
+        parallel = parallel or Parallel(n_jobs=n_jobs or -1)
+        predictions = parallel(delayed(_fit_predict)(model_type, X, y, fold) for fold in folds)
+
+    test = slice(folds[0].test_start, folds[-1].test_end)
+    predicted = np.concatenate(predictions)
+    fold_ids = np.repeat(np.arange(len(folds)), [fold.test_end - fold.test_start for fold in folds])
+    # The bar after the last row is not in the frame; it contributes no return
+    next_return = np.append(close[1:] / close[:-1] - 1, 0.0)[test]
+
+    scores = score_predictions(close[test], y[test], predicted, next_return, fold_ids,
+                               long_only=long_only, cost_bps=cost_bps, periods_per_year=periods_per_year)
+
+    fold_rows = []
+    for i, fold in enumerate(folds):
+        row = {"train_rows": fold.train_end - fold.train_start,
+               "test_start": features["Date"].iloc[fold.test_start],
+               "test_end": features["Date"].iloc[fold.test_end - 1]}
+        row.update({name: values[i].item() for name, values in scores["folds"].items()})
+        fold_rows.append(row)
+
+    return {
+        "model_type": model_type,
+        "summary": scores["summary"],
+        "folds": fold_rows,
+        "predictions": pd.DataFrame({
+            "Date": features["Date"].to_numpy()[test],
+            "Close": close[test],
+            "Actual": y[test],
+            "Predicted": predicted,
+            "Fold": fold_ids,
+        }),
+    }
+
+
+def evaluate_universe(db: Session, tickers: Optional[List[str]] = None,
+                      model_types: Sequence[str] = WALK_FORWARD_MODEL_TYPES, interval: str = "1d",
+                      prediction_horizon: int = 5, days: int = 1500, n_jobs: Optional[int] = None,
+                      **options) -> Dict[str, Any]:
+    """
+    Walk-forward comparison of model types over many stocks
+
+    Features come from the feature store; every backtest runs its folds on
+    one shared worker pool.
+
+    Args:
+        db: Database session
+        tickers: Stocks to evaluate (all active stocks if None)
+        model_types: Model types to compare
+        interval: Bar interval
+        prediction_horizon: Bars ahead to predict
+        days: Days of history per stock
+        n_jobs: Worker processes (all cores if None)
+        **options: Passed to ``walk_forward`` (``refit_every``, ``window``, ...)
+
+    Returns:
+        ``models``: metrics per model type over all stocks; ``tickers``:
+        summary per stock and model type; ``errors``: stocks that failed
+    """
+    store = get_feature_store()
+    stock_query = db.query(Stock.id, Stock.ticker)
+    if tickers is None:
+        stock_query = stock_query.filter(Stock.is_active == True)
+    else:
+        stock_query = stock_query.filter(Stock.ticker.in_(tickers))
+
+    start = datetime.now() - timedelta(days=days)
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    with Parallel(n_jobs=n_jobs or -1) as parallel:
+        for stock_id, ticker in stock_query.all():
+            try:
+                sync_feature_store(db, ticker, interval, stock_id=stock_id, store=store)
+                features = store.read(ticker, interval, start=start)
+                if features is None or features.empty:
+                    errors[ticker] = "No stored features"
+                    continue
+                features = MLEngine.add_targets(features, prediction_horizon)
+                results[ticker] = {
+                    model_type: walk_forward(features, model_type, prediction_horizon, parallel=parallel,
+                                             **options)["summary"]
+                    for model_type in model_types
+                }
+            except Exception as e:
+                logger.error(f"Walk-forward validation failed for {ticker}: {str(e)}")
+                errors[ticker] = str(e)
+
+    models = {}
+    for model_type in model_types:
+        summaries = [result[model_type] for result in results.values()]
+        if not summaries:
+            continue
+        rows = np.array([summary["rows"] for summary in summaries], dtype=np.float64)
+        metric = lambda name: np.array([summary[name] for summary in summaries], dtype=np.float64)
+        models[model_type] = {
+            "tickers": len(summaries),
+            "direction_accuracy": float((metric("direction_accuracy") * rows).sum() / rows.sum()),
+            "mean_nrmse": float(metric("nrmse").mean()),
+            "mean_sharpe": float(metric("sharpe").mean()),
+            "median_strategy_return": float(np.median(metric("strategy_return"))),
+            "median_excess_return": float(np.median(metric("strategy_return") - metric("buy_and_hold_return"))),
+        }
+
+    logger.info(f"Walk-forward validation of {len(model_types)} model types on {len(results)} stocks")
+    return {"models": models, "tickers": results, "errors": errors}
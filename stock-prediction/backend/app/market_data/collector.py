@@ -17,6 +17,8 @@ from typing import Dict, List, Optional, Any, Union
 from influxdb_client import InfluxDBClient, Point
 from influxdb_client.client.write_api import SYNCHRONOUS
 
+from app.core.indicator_engine import EMA, MACD, RSI, SMA, Bollinger, IndicatorEngine
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -139,40 +141,36 @@ class MarketDataCollector:
             logger.error(f"Error getting info for {ticker}: {str(e)}")
             return {}
     
+    @staticmethod
+    def indicator_engine() -> IndicatorEngine:
+        """Streaming indicator engine for the collected price data
+        
+        Keep a restored engine per ticker to update indicators from each new
+        intraday bar with ``IndicatorEngine.update``.
+        """
+        return IndicatorEngine([
+            (SMA(20), 'SMA20'),
+            (SMA(50), 'SMA50'),
+            (SMA(200), 'SMA200'),
+            (EMA(20), 'EMA20'),
+            (EMA(50), 'EMA50'),
+            (RSI(14), 'RSI'),
+            (EMA(12), 'EMA12'),
+            (EMA(26), 'EMA26'),
+            (MACD(12, 26, 9), ('MACD', 'MACD_Signal', 'MACD_Hist')),
+            (Bollinger(20, 2.0), ('BB_Upper', 'BB_Middle', 'BB_Lower')),
+        ])
+    
     def calculate_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """Calculate technical indicators for a stock"""
         if data.empty:
             return data
             
         try:
-            # Calculate SMA
-            data['SMA20'] = data['Close'].rolling(window=20).mean()
-            data['SMA50'] = data['Close'].rolling(window=50).mean()
-            data['SMA200'] = data['Close'].rolling(window=200).mean()
-            
-            # Calculate EMA
-            data['EMA20'] = data['Close'].ewm(span=20, adjust=False).mean()
-            data['EMA50'] = data['Close'].ewm(span=50, adjust=False).mean()
-            
-            # Calculate RSI
-            delta = data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            data['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Calculate MACD
-            data['EMA12'] = data['Close'].ewm(span=12, adjust=False).mean()
-            data['EMA26'] = data['Close'].ewm(span=26, adjust=False).mean()
-            data['MACD'] = data['EMA12'] - data['EMA26']
-            data['MACD_Signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
-            data['MACD_Hist'] = data['MACD'] - data['MACD_Signal']
-            
-            # Calculate Bollinger Bands
-            data['BB_Middle'] = data['Close'].rolling(window=20).mean()
-            data['BB_StdDev'] = data['Close'].rolling(window=20).std()
-            data['BB_Upper'] = data['BB_Middle'] + (data['BB_StdDev'] * 2)
-            data['BB_Lower'] = data['BB_Middle'] - (data['BB_StdDev'] * 2)
+            values = self.indicator_engine().run(data)
+            for column in values.columns:
+                data[column] = values[column]
+            data['BB_StdDev'] = (data['BB_Upper'] - data['BB_Middle']) / 2
             
             return data
         except Exception as e:
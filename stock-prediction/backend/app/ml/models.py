@@ -7,8 +7,10 @@ including LSTM, GRU, and ensemble models.
 
 import numpy as np
 import pandas as pd
+import io
 import pickle
 import os
+import tempfile
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -26,6 +28,174 @@ MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
 if not os.path.exists(MODEL_DIR):
     os.makedirs(MODEL_DIR)
 
+# Feature windows, shared by create_features and RecursiveFeatureState
+MA_WINDOWS = (5, 10, 20, 50)
+VOLATILITY_WINDOWS = (5, 10, 20)
+MOMENTUM_WINDOWS = (1, 5, 10)
+VOLUME_MA_WINDOW = 5
+RSI_WINDOW = 14
+BB_WINDOW = 20
+
+# Columns of the feature frame that are not model inputs
+NON_FEATURE_COLUMNS = ['Target', 'open', 'high', 'low', 'close', 'volume', 'adjclose', 'date']
+
+# Feature columns produced by create_features from OHLCV data, in order
+FEATURE_COLUMNS = (
+    ['Return', 'Range', 'LogReturn']
+    + [name for window in MA_WINDOWS for name in (f'MA_{window}', f'MA_ratio_{window}')]
+    + [f'Volatility_{window}' for window in VOLATILITY_WINDOWS]
+    + ['Volume_MA_5', 'Volume_Change', 'Volume_MA_Ratio']
+    + [f'Momentum_{window}' for window in MOMENTUM_WINDOWS]
+    + ['RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Middle', 'BB_Std', 'BB_Width', 'BB_Position']
+)
+
+# Bars (plus one for the first return) that determine the latest row's features
+FEATURE_LOOKBACK = max(max(MA_WINDOWS), max(VOLATILITY_WINDOWS), max(MOMENTUM_WINDOWS),
+                       VOLUME_MA_WINDOW, RSI_WINDOW, BB_WINDOW) + 1
+
+
+class RecursiveFeatureState:
+    """
+    Rolling-window state for recursive multi-day forecasts
+
+    Keeps the last ``FEATURE_LOOKBACK`` bars in arrays preallocated for the
+    forecast horizon, plus the MACD EMA states, so features of each appended
+    bar cost O(window) instead of a ``create_features`` pass over the whole
+    history. Values match the last row of ``create_features``.
+    """
+
+    def __init__(self, df: pd.DataFrame, horizon: int):
+        """
+        Args:
+            df: DataFrame with OHLCV data, ascending by date
+            horizon: Number of bars that will be appended
+        """
+        tail = df.iloc[-FEATURE_LOOKBACK:]
+        self._size = len(tail)
+        capacity = self._size + horizon
+        self._high = np.empty(capacity)
+        self._low = np.empty(capacity)
+        self._close = np.empty(capacity)
+        self._volume = np.empty(capacity)
+        for array, column in ((self._high, 'high'), (self._low, 'low'),
+                              (self._close, 'close'), (self._volume, 'volume')):
+            array[:self._size] = tail[column].to_numpy(dtype=np.float64)
+
+        # EMAs depend on the whole history; seed them once and update per bar
+        close = df['close'].astype(np.float64)
+        ema12 = close.ewm(span=12, adjust=False).mean()
+        ema26 = close.ewm(span=26, adjust=False).mean()
+        macd_signal = (ema12 - ema26).ewm(span=9, adjust=False).mean()
+        self._ema12 = ema12.iloc[-1]
+        self._ema26 = ema26.iloc[-1]
+        self._macd_signal = macd_signal.iloc[-1]
+
+    @staticmethod
+    def _ewm_step(previous: float, value: float, span: int) -> float:
+        # Same update as pandas ``ewm(adjust=False)``
+        alpha = 2.0 / (span + 1)
+        old = 1.0 - alpha
+        if np.isnan(previous):
+            return value
+        if previous == value:
+            return previous
+        return (old * previous + alpha * value) / (old + alpha)
+
+    def append(self, high: float, low: float, close: float, volume: float) -> None:
+        """Append a bar (open is not used by any feature)"""
+        i = self._size
+        if i == len(self._close):
+            raise IndexError("RecursiveFeatureState horizon exceeded")
+        self._high[i] = high
+        self._low[i] = low
+        self._close[i] = close
+        self._volume[i] = volume
+        self._size += 1
+
+        self._ema12 = self._ewm_step(self._ema12, close, 12)
+        self._ema26 = self._ewm_step(self._ema26, close, 26)
+        self._macd_signal = self._ewm_step(self._macd_signal, self._ema12 - self._ema26, 9)
+
+    def _window(self, array: np.ndarray, window: int) -> Optional[np.ndarray]:
+        start = self._size - window
+        return array[start:self._size] if start >= 0 else None
+
+    def _mean(self, array: np.ndarray, window: int) -> float:
+        values = self._window(array, window)
+        return values.mean() if values is not None else np.nan
+
+    def features(self) -> Dict[str, float]:
+        """Features of the latest bar, keyed by ``FEATURE_COLUMNS`` name"""
+        t = self._size - 1
+        close = self._close
+        c = close[t]
+        prev = close[t - 1] if t > 0 else np.nan
+        features = {}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features['Return'] = c / prev - 1
+            features['Range'] = (self._high[t] - self._low[t]) / c
+            features['LogReturn'] = np.log(c / prev)
+
+            for window in MA_WINDOWS:
+                ma = self._mean(close, window)
+                features[f'MA_{window}'] = ma
+                features[f'MA_ratio_{window}'] = c / ma
+
+            for window in VOLATILITY_WINDOWS:
+                closes = self._window(close, window + 1)
+                features[f'Volatility_{window}'] = (
+                    np.log(closes[1:] / closes[:-1]).std(ddof=1) if closes is not None else np.nan
+                )
+
+            volume = self._volume[t]
+            volume_ma = self._mean(self._volume, VOLUME_MA_WINDOW)
+            features['Volume_MA_5'] = volume_ma
+            features['Volume_Change'] = volume / self._volume[t - 1] - 1 if t > 0 else np.nan
+            features['Volume_MA_Ratio'] = volume / volume_ma
+
+            for window in MOMENTUM_WINDOWS:
+                features[f'Momentum_{window}'] = c - close[t - window] if t >= window else np.nan
+
+            closes = self._window(close, RSI_WINDOW + 1)
+            if closes is not None:
+                delta = np.diff(closes)
+                gain = np.where(delta > 0, delta, 0).mean()
+                loss = -np.where(delta < 0, delta, 0).mean()
+                features['RSI'] = 100 - (100 / (1 + gain / loss))
+            else:
+                features['RSI'] = np.nan
+
+            macd = self._ema12 - self._ema26
+            features['MACD'] = macd
+            features['MACD_Signal'] = self._macd_signal
+            features['MACD_Hist'] = macd - self._macd_signal
+
+            closes = self._window(close, BB_WINDOW)
+            middle = closes.mean() if closes is not None else np.nan
+            std = closes.std(ddof=1) if closes is not None else np.nan
+            upper = middle + std * 2
+            lower = middle - std * 2
+            features['BB_Middle'] = middle
+            features['BB_Std'] = std
+            features['BB_Width'] = (upper - lower) / middle
+            features['BB_Position'] = (c - lower) / (upper - lower)
+
+        return features
+
+
+def _replace_file(path: str, data: bytes) -> None:
+    """Atomically replace a file, so readers never see it half-written"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
 class StockPricePredictor:
     """Stock price prediction model using machine learning"""
     
@@ -91,27 +261,27 @@ class StockPricePredictor:
         df['LogReturn'] = np.log(df['close'] / df['close'].shift(1))
         
         # Moving averages
-        for window in [5, 10, 20, 50]:
+        for window in MA_WINDOWS:
             df[f'MA_{window}'] = df['close'].rolling(window=window).mean()
             df[f'MA_ratio_{window}'] = df['close'] / df[f'MA_{window}']
         
         # Volatility
-        for window in [5, 10, 20]:
+        for window in VOLATILITY_WINDOWS:
             df[f'Volatility_{window}'] = df['LogReturn'].rolling(window=window).std()
         
         # Volume features
-        df['Volume_MA_5'] = df['volume'].rolling(window=5).mean()
+        df['Volume_MA_5'] = df['volume'].rolling(window=VOLUME_MA_WINDOW).mean()
         df['Volume_Change'] = df['volume'].pct_change()
         df['Volume_MA_Ratio'] = df['volume'] / df['Volume_MA_5']
         
         # Price momentum
-        for window in [1, 5, 10]:
+        for window in MOMENTUM_WINDOWS:
             df[f'Momentum_{window}'] = df['close'] - df['close'].shift(window)
         
         # RSI - Relative Strength Index
         delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-        loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+        gain = delta.where(delta > 0, 0).rolling(window=RSI_WINDOW).mean()
+        loss = -delta.where(delta < 0, 0).rolling(window=RSI_WINDOW).mean()
         rs = gain / loss
         df['RSI'] = 100 - (100 / (1 + rs))
         
@@ -123,8 +293,8 @@ class StockPricePredictor:
         df['MACD_Hist'] = df['MACD'] - df['MACD_Signal']
         
         # Bollinger Bands
-        df['BB_Middle'] = df['close'].rolling(window=20).mean()
-        df['BB_Std'] = df['close'].rolling(window=20).std()
+        df['BB_Middle'] = df['close'].rolling(window=BB_WINDOW).mean()
+        df['BB_Std'] = df['close'].rolling(window=BB_WINDOW).std()
         df['BB_Width'] = (df['BB_Middle'] + (df['BB_Std'] * 2) - (df['BB_Middle'] - (df['BB_Std'] * 2))) / df['BB_Middle']
         df['BB_Position'] = (df['close'] - (df['BB_Middle'] - (df['BB_Std'] * 2))) / (
             (df['BB_Middle'] + (df['BB_Std'] * 2)) - (df['BB_Middle'] - (df['BB_Std'] * 2)))
@@ -160,8 +330,7 @@ class StockPricePredictor:
         y = df_features['Target'].values
         
         # Drop target and any non-feature columns from X
-        drop_cols = ['Target', 'open', 'high', 'low', 'close', 'volume', 'adjclose']
-        feature_cols = [col for col in df_features.columns if col not in drop_cols]
+        feature_cols = [col for col in df_features.columns if col not in NON_FEATURE_COLUMNS]
         X = df_features[feature_cols].values
         
         # Scale the target (price)
@@ -223,8 +392,11 @@ class StockPricePredictor:
             # Evaluate
             metrics = self.evaluate_predictions(y_test, y_pred)
             
-            # Save model
-            joblib.dump(self.model, self.model_path)
+            # Save model; files are replaced atomically, since a training
+            # worker may be killed mid-write while /ml/predict reads them
+            buffer = io.BytesIO()
+            joblib.dump(self.model, buffer)
+            _replace_file(self.model_path, buffer.getvalue())
             
             # Save metadata
             self.metadata = {
@@ -238,8 +410,7 @@ class StockPricePredictor:
                 'last_features': data['last_features']
             }
             
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
+            _replace_file(self.metadata_path, pickle.dumps(self.metadata))
                 
             logger.info(f"Trained {self.model_type} model for {self.ticker} with RMSE: {metrics['rmse']:.4f}")
             
@@ -279,29 +450,33 @@ class StockPricePredictor:
                 self.price_scaler = self.metadata['price_scaler']
                 self.feature_scaler = self.metadata['feature_scaler']
             
-            # Create features from the input data
-            df_features = self.create_features(df.copy())
-            df_features = df_features.dropna()
+            # Model inputs in training order
+            feature_cols = self.metadata.get('feature_columns') or FEATURE_COLUMNS
+            unknown = [col for col in feature_cols if col not in FEATURE_COLUMNS]
+            if unknown:
+                raise ValueError(f"Model for {self.ticker} uses unsupported features {unknown}. Please retrain.")
+            
+            # Rolling state over the latest bars; each forecast step only
+            # computes the features of the newly appended bar
+            state = RecursiveFeatureState(df, days)
+            last_features = np.empty((1, len(feature_cols)))
             
             # Get the last date for future predictions
             last_date = pd.to_datetime(df['date'].iloc[-1])
+            last_close = float(df['close'].iloc[-1])
+            last_volume = float(df['volume'].iloc[-1])
             
             # Make predictions for future days
             future_prices = []
             future_dates = []
             
-            # For each future day
-            current_data = df.copy()
-            
             for i in range(days):
-                # Create features for the current data
-                current_features = self.create_features(current_data)
-                current_features = current_features.dropna()
-                
-                # Extract the last row's features
-                drop_cols = ['Target', 'open', 'high', 'low', 'close', 'volume', 'adjclose', 'date']
-                feature_cols = [col for col in current_features.columns if col not in drop_cols]
-                last_features = current_features[feature_cols].iloc[-1].values.reshape(1, -1)
+                # Features of the latest (actual or predicted) bar
+                features = state.features()
+                last_features[0] = [features[col] for col in feature_cols]
+                if np.isnan(last_features).any():
+                    raise ValueError(
+                        f"Not enough price history for {self.ticker}: need at least {FEATURE_LOOKBACK} bars")
                 
                 # Scale the features
                 last_features_scaled = self.feature_scaler.transform(last_features)
@@ -310,8 +485,8 @@ class StockPricePredictor:
                 next_price_scaled = self.model.predict(last_features_scaled)
                 
                 # Transform back to original scale
-                next_price = self.price_scaler.inverse_transform(
-                    next_price_scaled.reshape(-1, 1))[0][0]
+                next_price = float(self.price_scaler.inverse_transform(
+                    next_price_scaled.reshape(-1, 1))[0][0])
                 
                 # Advance date (skip weekends)
                 next_date = last_date + timedelta(days=1)
@@ -319,28 +494,21 @@ class StockPricePredictor:
                     next_date = next_date + timedelta(days=1)
                 
                 # Add predictions to results
-                future_prices.append(float(next_price))
+                future_prices.append(next_price)
                 future_dates.append(next_date.strftime('%Y-%m-%d'))
                 
-                # Create a synthetic record for the next day to use in the next iteration
-                next_row = {
-                    'date': next_date,
-                    'open': float(current_data['close'].iloc[-1]),  # Use last close as next open
-                    'close': float(next_price),
-                    'high': float(max(next_price, current_data['close'].iloc[-1] * 1.01)),  # Estimated high
-                    'low': float(min(next_price, current_data['close'].iloc[-1] * 0.99)),   # Estimated low
-                    'volume': float(current_data['volume'].iloc[-1]),  # Reuse last volume
-                    'adjclose': float(next_price)
-                }
-                
-                # Append to data for next iteration
-                current_data = pd.concat([
-                    current_data,
-                    pd.DataFrame([next_row])
-                ]).reset_index(drop=True)
+                # Synthetic bar for the next iteration: estimated high/low
+                # around the last close and the last volume
+                state.append(
+                    high=max(next_price, last_close * 1.01),
+                    low=min(next_price, last_close * 0.99),
+                    close=next_price,
+                    volume=last_volume
+                )
                 
-                # Update last_date for next iteration
+                # Update last values for next iteration
                 last_date = next_date
+                last_close = next_price
             
             return {
                 'ticker': self.ticker,
@@ -1,7 +1,7 @@
 """
 Big Data models for ZAHAAM Stock Prediction platform
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text, Enum, LargeBinary
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text, Enum, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -104,6 +104,11 @@ class MLModel(Base):
     parameters = Column(JSON)  # Model parameters
     is_active = Column(Boolean, default=True)
     
+    # Lookup keys for the model registry (also encoded in ``name``)
+    ticker = Column(String(20))
+    interval = Column(String(10))
+    prediction_horizon = Column(Integer)
+    
     # Binary storage of serialized model (optional, could be stored in file system instead)
     model_data = Column(LargeBinary)
     
@@ -113,6 +118,10 @@ class MLModel(Base):
     def __repr__(self):
         return f"<MLModel(name='{self.name}', version='{self.version}')>"
 
+    __table_args__ = (
+        Index("ix_ml_models_ticker_active_created", "ticker", "is_active", "created_at"),
+    )
+
 
 class StockPrediction(Base):
     """Predictions generated by ML models"""
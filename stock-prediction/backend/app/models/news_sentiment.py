@@ -128,3 +128,20 @@ class TickerSentimentHistory(Base):
     
     def __repr__(self):
         return f"<TickerSentimentHistory(ticker='{self.ticker}', date='{self.date}', score={self.sentiment_score})>"
+
+
+class SentimentCacheEntry(Base):
+    """Model for caching sentiment scores by article content"""
+    __tablename__ = "sentiment_cache"
+    
+    # Same hash as NewsArticle.content_hash, so syndicated copies share an entry
+    content_hash = Column(String(64), primary_key=True)
+    model_type = Column(String(32), primary_key=True)  # e.g. "vader", "finbert"
+    lexicon_version = Column(String(16), primary_key=True)  # Hash of the lexicon and weights used
+    result = Column(JSONB, nullable=False)
+    
+    # Metadata
+    created_at = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<SentimentCacheEntry(content_hash='{self.content_hash[:12]}...', model_type='{self.model_type}')>"
@@ -1,7 +1,7 @@
 """
 Database models for stock data
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -45,12 +45,17 @@ class StockPrice(Base):
     
     def __repr__(self):
         return f"<StockPrice(ticker='{self.stock.ticker}', date='{self.date}', close={self.close})>"
-    
-    class Config:
-        # Create a composite index on stock_id and date
-        __table_args__ = (
-            {"sqlite_autoincrement": True},
-        )
+
+    # Composite unique key used as the ON CONFLICT target for bulk upserts;
+    # the descending index serves latest/previous-bar lookups
+    __table_args__ = (
+        UniqueConstraint("stock_id", "date", "interval", name="uq_stock_prices_stock_date_interval"),
+        Index(
+            "ix_stock_prices_stock_interval_date_desc", "stock_id", "interval", date.desc(),
+            postgresql_include=["open", "high", "low", "close", "volume"],
+        ),
+        {"sqlite_autoincrement": True},
+    )
 
 
 class StockIndicator(Base):
@@ -86,9 +91,59 @@ class StockIndicator(Base):
     
     def __repr__(self):
         return f"<StockIndicator(ticker='{self.stock.ticker}', date='{self.date}')>"
-    
-    class Config:
-        # Create a composite index on stock_id and date
-        __table_args__ = (
-            {"sqlite_autoincrement": True},
-        )
+
+    # Composite unique key used as the ON CONFLICT target for bulk upserts
+    __table_args__ = (
+        UniqueConstraint("stock_id", "date", "interval", name="uq_stock_indicators_stock_date_interval"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class IndicatorState(Base):
+    """Serialized streaming indicator state after the last stored bar"""
+    __tablename__ = "indicator_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False)
+    interval = Column(String(10), default="1d", nullable=False)
+    last_date = Column(DateTime, nullable=False)  # Bar the state was computed up to
+    last_close = Column(Float)
+    state = Column(JSON, nullable=False)  # IndicatorEngine.to_dict()
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<IndicatorState(stock_id={self.stock_id}, interval='{self.interval}', last_date='{self.last_date}')>"
+
+    __table_args__ = (
+        UniqueConstraint("stock_id", "interval", name="uq_indicator_states_stock_interval"),
+    )
+
+
+class LatestQuote(Base):
+    """Denormalized latest bar per stock and interval, kept in step with ingestion"""
+    __tablename__ = "latest_quotes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False)
+    interval = Column(String(10), default="1d", nullable=False)
+    date = Column(DateTime, nullable=False)  # Date of the latest bar
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    last_close = Column(Float)
+    previous_close = Column(Float)  # Close of the bar before, None if there is none
+    change_percent = Column(Float)
+    volume = Column(Integer)
+    signal = Column(String(20))  # Indicator signal on the latest bar
+    signal_strength = Column(Float)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relationship
+    stock = relationship("Stock")
+
+    def __repr__(self):
+        return f"<LatestQuote(stock_id={self.stock_id}, interval='{self.interval}', date='{self.date}', last_close={self.last_close})>"
+
+    __table_args__ = (
+        UniqueConstraint("stock_id", "interval", name="uq_latest_quotes_stock_interval"),
+    )
@@ -23,20 +23,130 @@ import spacy
 
 # For more advanced models when available
 try:
+    import torch
     from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
+# Persistent sentiment cache, when running inside the backend
+try:
+    from app.services.sentiment_cache import SENTIMENT_CACHE_ENABLED, SentimentCache, content_hash, lexicon_version
+    SENTIMENT_CACHE_AVAILABLE = True
+except ImportError:
+    SENTIMENT_CACHE_AVAILABLE = False
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# FinBERT reads text in chunks of this many characters
+FINBERT_CHUNK_CHARS = 512
+
+# Chunks per forward pass in batched FinBERT inference
+FINBERT_BATCH_SIZE = int(os.environ.get("FINBERT_BATCH_SIZE", "32"))
+
+# CPU threads for FinBERT inference (torch default if 0)
+FINBERT_THREADS = int(os.environ.get("FINBERT_THREADS", "0"))
+
+FINBERT_MODEL_NAME = "ProsusAI/finbert"
+
+class FinancialLexiconScorer:
+    """
+    Blends financial-lexicon terms into a VADER compound score in one pass
+    
+    Compiled once per lexicon: terms (single words or multi-word phrases)
+    are grouped by first token, and a regex of the first tokens decides
+    whether a text can contain a term at all. Only texts that pass it are
+    tokenized with ``word_tokenize``. The regex accepts a superset of the
+    texts in which a token equals a term (any non-alphanumeric boundary,
+    or a following "n't" that the tokenizer splits off), so skipping the
+    others leaves scores unchanged.
+    
+    Negation is tracked as the position of the latest negation token, so
+    checking the ``NEGATION_WINDOW`` tokens before a term is one comparison
+    instead of a rescan.
+    """
+    
+    NEGATION_WINDOW = 3
+    
+    def __init__(self, lexicon: Dict[str, float], negation_terms: List[str]):
+        self.negation_terms = frozenset(negation_terms)
+        
+        # First token -> (phrase tokens, score), longest phrase first
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], float]]] = {}
+        for term, score in lexicon.items():
+            tokens = tuple(term.split())
+            self.phrases.setdefault(tokens[0], []).append((tokens, score))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+        
+        first_tokens = sorted(self.phrases, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<![a-z0-9])(?:" + "|".join(map(re.escape, first_tokens)) + r")(?:(?![a-z0-9])|(?=n['’]t))"
+        ) if first_tokens else None
+    
+    def adjust(self, compound: float, text: str) -> float:
+        """
+        Compound score after blending in the lexicon terms of ``text``
+        
+        Args:
+            compound: VADER compound score
+            text: Lowercase text
+        """
+        if self.pattern is None or not self.pattern.search(text):
+            return compound
+        return self.adjust_tokens(compound, word_tokenize(text))
+    
+    def adjust_many(self, compounds: List[float], texts: List[str]) -> List[float]:
+        """``adjust`` for many texts"""
+        search = self.pattern.search if self.pattern is not None else None
+        adjust_tokens = self.adjust_tokens
+        return [
+            adjust_tokens(compound, word_tokenize(text)) if search and search(text) else compound
+            for compound, text in zip(compounds, texts)
+        ]
+    
+    def adjust_tokens(self, compound: float, tokens: List[str]) -> float:
+        """Blend every term found in ``tokens`` into ``compound``, in order"""
+        phrases = self.phrases
+        negation_terms = self.negation_terms
+        window = self.NEGATION_WINDOW
+        last_negation = -window - 1  # Index of the latest negation token
+        matched_end = 0  # Tokens before this belong to a matched phrase
+        
+        for i, token in enumerate(tokens):
+            if i >= matched_end:
+                candidates = phrases.get(token)
+                if candidates is not None:
+                    for phrase, score in candidates:
+                        if len(phrase) == 1 or tuple(tokens[i:i + len(phrase)]) == phrase:
+                            matched_end = i + len(phrase)
+                            
+                            # Apply lexicon score, inverting if negated in the window before the term
+                            if i - last_negation <= window:
+                                score *= -0.7  # Partial inversion to reflect real-world usage
+                            
+                            # Adjust compound score (weighted), staying in [-1, 1]
+                            compound = compound * 0.7 + score * 0.3
+                            compound = max(-1.0, min(1.0, compound))
+                            break
+            if token in negation_terms:
+                last_negation = i
+        
+        return compound
+
+
 class FinancialSentimentAnalyzer:
     """Advanced sentiment analyzer for financial text"""
     
-    def __init__(self):
-        """Initialize the sentiment analyzer with NLP models"""
+    def __init__(self, cache: Optional["SentimentCache"] = None):
+        """
+        Initialize the sentiment analyzer with NLP models
+        
+        Args:
+            cache: Sentiment cache checked before scoring (no caching if None)
+        """
         self.model_type = os.environ.get("SENTIMENT_MODEL_TYPE", "vader")
         
         # Download necessary NLTK resources
@@ -60,25 +170,43 @@ class FinancialSentimentAnalyzer:
         
         # Initialize FinBERT if available
         self.finbert = None
+        self.finbert_model = None
+        self.finbert_tokenizer = None
         if TRANSFORMERS_AVAILABLE and self.model_type == "finbert":
             try:
-                model_name = "ProsusAI/finbert"
-                self.finbert = pipeline("sentiment-analysis", model=model_name)
+                model_name = FINBERT_MODEL_NAME
+                if FINBERT_THREADS:
+                    torch.set_num_threads(FINBERT_THREADS)
+                self.finbert_tokenizer = AutoTokenizer.from_pretrained(model_name)
+                self.finbert_model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+                self.finbert = pipeline("sentiment-analysis", model=self.finbert_model,
+                                        tokenizer=self.finbert_tokenizer)
                 logger.info("FinBERT model initialized")
             except Exception as e:
                 logger.error(f"Error initializing FinBERT: {str(e)}")
         
-        # Load financial sentiment lexicon (custom dictionary)
-        self.financial_lexicon = self._load_financial_lexicon()
-        
         # Specific negation handling for financial contexts
         self.negation_terms = ["not", "no", "never", "neither", "nor", "none", 
                                "aren't", "isn't", "wasn't", "weren't", "haven't", 
                                "hasn't", "hadn't", "doesn't", "don't", "didn't"]
         
+        # Load financial sentiment lexicon (custom dictionary) and compile its scorer
+        self.financial_lexicon = self._load_financial_lexicon()
+        
         # Financial entities of interest for NER
         self.financial_entities = ["ORG", "PERSON", "GPE", "MONEY", "PERCENT"]
         
+        # Cached results are keyed by the model and lexicon that produced them
+        self.cache = cache if SENTIMENT_CACHE_AVAILABLE else None
+        if self.cache is not None:
+            if self._use_finbert():
+                self.cache_model_type = "finbert"
+                self.lexicon_version = lexicon_version(FINBERT_MODEL_NAME, FINBERT_CHUNK_CHARS)
+            else:
+                self.cache_model_type = "vader"
+                self.lexicon_version = lexicon_version(self.vader.lexicon if self.vader else None,
+                                                       self.financial_lexicon, self.negation_terms)
+        
     def _load_financial_lexicon(self) -> Dict[str, float]:
         """Load custom financial sentiment lexicon"""
         # This would normally load from a file, here we define a small subset
@@ -100,6 +228,8 @@ class FinancialSentimentAnalyzer:
             "expected": 0.1, "forecast": 0.0, "guidance": 0.0
         }
         
+        self.lexicon_scorer = FinancialLexiconScorer(lexicon, self.negation_terms)
+        
         logger.info(f"Loaded {len(lexicon)} terms in financial lexicon")
         return lexicon
     
@@ -156,33 +286,32 @@ class FinancialSentimentAnalyzer:
             scores = self.vader.polarity_scores(text)
             
             # Apply financial lexicon additions
-            words = word_tokenize(text.lower())
-            
-            for i, word in enumerate(words):
-                if word in self.financial_lexicon:
-                    # Check for negation in 3-word window before the term
-                    negation = False
-                    for j in range(max(0, i-3), i):
-                        if words[j] in self.negation_terms:
-                            negation = True
-                            break
-                    
-                    # Apply lexicon score, inverting if negated
-                    lex_score = self.financial_lexicon[word]
-                    if negation:
-                        lex_score *= -0.7  # Partial inversion to reflect real-world usage
-                    
-                    # Adjust compound score (weighted)
-                    scores["compound"] = scores["compound"] * 0.7 + lex_score * 0.3
-                    
-                    # Ensure compound stays in [-1, 1]
-                    scores["compound"] = max(-1.0, min(1.0, scores["compound"]))
-            
+            scores["compound"] = self.lexicon_scorer.adjust(scores["compound"], text.lower())
             return scores
         except Exception as e:
             logger.error(f"Error in VADER analysis: {str(e)}")
             return {"compound": 0.0, "pos": 0.0, "neu": 0.0, "neg": 0.0}
     
+    def _analyze_with_vader_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """``_analyze_with_vader`` for many texts"""
+        if not self.vader:
+            return [self._analyze_with_vader(text) for text in texts]
+        
+        try:
+            polarity_scores = self.vader.polarity_scores
+            results = [polarity_scores(text) if text else None for text in texts]
+            scored = [i for i, scores in enumerate(results) if scores is not None]
+            compounds = self.lexicon_scorer.adjust_many(
+                [results[i]["compound"] for i in scored], [texts[i].lower() for i in scored]
+            )
+            for i, compound in zip(scored, compounds):
+                results[i]["compound"] = compound
+            return [scores if scores is not None else self._analyze_with_vader(text)
+                    for text, scores in zip(texts, results)]
+        except Exception as e:
+            logger.error(f"Error in batched VADER analysis: {str(e)}")
+            return [self._analyze_with_vader(text) for text in texts]
+    
     def _analyze_with_finbert(self, text: str) -> Dict[str, float]:
         """Analyze sentiment using FinBERT model"""
         if not self.finbert or not text:
@@ -190,43 +319,94 @@ class FinancialSentimentAnalyzer:
             
         try:
             # FinBERT works better with shorter texts, so chunk if necessary
-            max_length = 512
-            if len(text) > max_length:
-                chunks = [text[i:i+max_length] for i in range(0, len(text), max_length)]
-                results = []
-                
-                for chunk in chunks:
-                    result = self.finbert(chunk)
-                    results.extend(result)
-                
-                # Aggregate results
-                labels = [r["label"] for r in results]
-                scores = [r["score"] for r in results]
-                
-                # Find most common label
-                pos_count = labels.count("positive")
-                neg_count = labels.count("negative")
-                neu_count = labels.count("neutral")
-                
-                if pos_count >= neg_count and pos_count >= neu_count:
-                    final_label = "positive"
-                elif neg_count > pos_count and neg_count > neu_count:
-                    final_label = "negative"
-                else:
-                    final_label = "neutral"
-                
-                # Average score
-                final_score = sum(scores) / len(scores)
-                
-                return {"label": final_label, "score": final_score}
-            else:
-                result = self.finbert(text)[0]
-                return {"label": result["label"], "score": result["score"]}
+            results = []
+            for chunk in self._finbert_chunks(text):
+                results.extend(self.finbert(chunk))
+            return self._aggregate_finbert(results)
                 
         except Exception as e:
             logger.error(f"Error in FinBERT analysis: {str(e)}")
             return {"label": "neutral", "score": 0.5}
     
+    @staticmethod
+    def _finbert_chunks(text: str) -> List[str]:
+        """Character chunks FinBERT reads a text in"""
+        return [text[i:i + FINBERT_CHUNK_CHARS] for i in range(0, len(text), FINBERT_CHUNK_CHARS)]
+    
+    @staticmethod
+    def _aggregate_finbert(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Majority label and mean score of a text's chunk results"""
+        if len(results) == 1:
+            return {"label": results[0]["label"], "score": results[0]["score"]}
+        
+        labels = [r["label"] for r in results]
+        scores = [r["score"] for r in results]
+        
+        # Find most common label
+        pos_count = labels.count("positive")
+        neg_count = labels.count("negative")
+        neu_count = labels.count("neutral")
+        
+        if pos_count >= neg_count and pos_count >= neu_count:
+            final_label = "positive"
+        elif neg_count > pos_count and neg_count > neu_count:
+            final_label = "negative"
+        else:
+            final_label = "neutral"
+        
+        # Average score
+        return {"label": final_label, "score": sum(scores) / len(scores)}
+    
+    def _classify_chunks(self, chunks: List[str], batch_size: int = FINBERT_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        FinBERT label and score of many chunks, in padded mini-batches
+        
+        All chunks are tokenized in one call and ordered by token count, so
+        each batch is padded only to its longest member.
+        
+        Returns:
+            One ``{"label", "score"}`` per chunk, in input order
+        """
+        encoded = self.finbert_tokenizer(chunks, truncation=True, max_length=512)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        order = sorted(range(len(chunks)), key=lengths.__getitem__)
+        id2label = self.finbert_model.config.id2label
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            features = self.finbert_tokenizer.pad(
+                [{key: encoded[key][i] for key in encoded.keys()} for i in batch],
+                return_tensors="pt"
+            )
+            with torch.inference_mode():
+                probabilities = torch.softmax(self.finbert_model(**features).logits, dim=-1)
+            scores, labels = probabilities.max(dim=-1)
+            for i, label, score in zip(batch, labels.tolist(), scores.tolist()):
+                results[i] = {"label": id2label[label], "score": score}
+        return results
+    
+    def _analyze_with_finbert_batch(self, texts: List[str],
+                                    batch_size: int = FINBERT_BATCH_SIZE) -> List[Dict[str, float]]:
+        """``_analyze_with_finbert`` for many texts, with the chunks of all texts batched together"""
+        chunks, owners = [], []
+        for index, text in enumerate(texts):
+            for chunk in self._finbert_chunks(text):
+                chunks.append(chunk)
+                owners.append(index)
+        
+        try:
+            chunk_results = self._classify_chunks(chunks, batch_size) if chunks else []
+        except Exception as e:
+            logger.error(f"Error in batched FinBERT analysis: {str(e)}")
+            return [{"label": "neutral", "score": 0.5} for _ in texts]
+        
+        per_text: List[List[Dict[str, Any]]] = [[] for _ in texts]
+        for owner, result in zip(owners, chunk_results):
+            per_text[owner].append(result)
+        return [self._aggregate_finbert(results) if results else {"label": "neutral", "score": 0.5}
+                for results in per_text]
+    
     def analyze_text(self, text: str, include_entities: bool = True) -> Dict[str, Any]:
         """
         Analyze sentiment of financial text
@@ -247,6 +427,9 @@ class FinancialSentimentAnalyzer:
                 "entities": []
             }
         
+        if self.cache is not None:
+            return self.analyze_texts([text], include_entities)[0]
+        
         start_time = time.time()
         
         # Preprocess text
@@ -256,15 +439,102 @@ class FinancialSentimentAnalyzer:
         entities = self._extract_entities(clean_text) if include_entities else []
         
         # Analyze sentiment using selected model
-        if self.model_type == "finbert" and self.finbert:
+        if self._use_finbert():
             analysis = self._analyze_with_finbert(clean_text)
-            sentiment = analysis["label"]
-            score = (analysis["score"] - 0.5) * 2  # Convert to [-1, 1] range
-            confidence = analysis["score"]
         else:
             # Default to VADER
             analysis = self._analyze_with_vader(clean_text)
+        
+        result = self._sentiment_result(analysis, entities)
+        result["processing_time"] = time.time() - start_time
+        return result
+    
+    def analyze_texts(self, texts: List[str], include_entities: bool = True,
+                      batch_size: int = FINBERT_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        ``analyze_text`` for many texts
+        
+        With FinBERT, the chunks of all texts are classified together in
+        padded mini-batches instead of one forward pass per chunk. With a
+        cache, texts scored before are looked up in one batch first and the
+        new results are stored in one batch afterwards.
+        ``processing_time`` is each text's share of the batch time.
+        
+        Args:
+            texts: The texts to analyze
+            include_entities: Whether to extract named entities
+            batch_size: Chunks per FinBERT forward pass
             
+        Returns:
+            One ``analyze_text`` result per text, in order
+        """
+        start_time = time.time()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending = [i for i, text in enumerate(texts) if text]
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = self.analyze_text(text)
+        
+        clean_texts = {i: self._preprocess_text(texts[i]) for i in pending}
+        
+        # Reuse cached results of identical texts before any model work
+        hashes = {}
+        if self.cache is not None and pending:
+            hashes = {i: content_hash(texts[i]) for i in pending}
+            cached = self.cache.get_many(list(hashes.values()), self.cache_model_type, self.lexicon_version)
+            for i in pending:
+                hit = cached.get(hashes[i])
+                if hit is None:
+                    continue
+                entities = hit.get("entities")
+                if not include_entities:
+                    entities = []
+                elif entities is None:
+                    entities = self._extract_entities(clean_texts[i])
+                results[i] = self._sentiment_result(hit["analysis"], entities)
+        
+        to_score = [i for i in pending if results[i] is None]
+        if hashes:
+            # Score syndicated copies within the batch once
+            first = {}
+            for i in to_score:
+                first.setdefault(hashes[i], i)
+            to_score = list(first.values())
+        batch_texts = [clean_texts[i] for i in to_score]
+        if self._use_finbert():
+            analyses = self._analyze_with_finbert_batch(batch_texts, batch_size)
+        else:
+            analyses = self._analyze_with_vader_batch(batch_texts)
+        
+        scored = {}
+        for i, analysis in zip(to_score, analyses):
+            entities = self._extract_entities(clean_texts[i]) if include_entities else []
+            results[i] = self._sentiment_result(analysis, entities)
+            if hashes:
+                scored[hashes[i]] = {"analysis": analysis, "entities": entities} if include_entities \
+                    else {"analysis": analysis}
+        if scored:
+            self.cache.put_many(scored, self.cache_model_type, self.lexicon_version)
+            for i in pending:
+                if results[i] is None:
+                    entry = scored[hashes[i]]
+                    results[i] = self._sentiment_result(dict(entry["analysis"]), list(entry.get("entities", [])))
+        
+        duration = (time.time() - start_time) / len(pending) if pending else 0.0
+        for i in pending:
+            results[i]["processing_time"] = duration
+        return results
+    
+    def _use_finbert(self) -> bool:
+        return self.model_type == "finbert" and self.finbert is not None
+    
+    def _sentiment_result(self, analysis: Dict[str, Any], entities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sentiment label, score and confidence of a FinBERT or VADER analysis"""
+        if self._use_finbert():
+            sentiment = analysis["label"]
+            score = (analysis["score"] - 0.5) * 2  # Convert to [-1, 1] range
+            confidence = analysis["score"]
+        else:
             # Convert compound score to sentiment label
             compound = analysis["compound"]
             if compound >= 0.05:
@@ -277,15 +547,12 @@ class FinancialSentimentAnalyzer:
             score = compound
             confidence = max(analysis["pos"], analysis["neg"], analysis["neu"])
         
-        duration = time.time() - start_time
-        
         return {
             "sentiment": sentiment,
             "score": score,
             "confidence": confidence,
             "analysis": analysis,
-            "entities": entities,
-            "processing_time": duration
+            "entities": entities
         }
     
     def analyze_news_article(self, article: Dict[str, Any]) -> Dict[str, Any]:
@@ -298,19 +565,23 @@ class FinancialSentimentAnalyzer:
         Returns:
             Dict with article data and sentiment analysis
         """
+        return self._with_sentiment(article, self.analyze_text(self._article_text(article)))
+    
+    @staticmethod
+    def _article_text(article: Dict[str, Any]) -> str:
+        """Text of a news article to analyze"""
         # Extract text from article
         title = article.get("title", "")
         description = article.get("description", "")
         content = article.get("content", "")
         
         # Combine text, giving higher weight to title
-        full_text = f"{title}. {title}. {description}. {content}"
-        
-        # Analyze sentiment
-        sentiment = self.analyze_text(full_text)
-        
-        # Add sentiment to article data
-        result = article.copy()
+        return f"{title}. {title}. {description}. {content}"
+    
+    @staticmethod
+    def _with_sentiment(item: Dict[str, Any], sentiment: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of an article or tweet with its sentiment analysis and direction"""
+        result = item.copy()
         result["sentiment_analysis"] = sentiment
         
         # Determine sentiment direction and magnitude
@@ -338,56 +609,41 @@ class FinancialSentimentAnalyzer:
         Returns:
             Dict with tweet data and sentiment analysis
         """
-        # Extract text from tweet
-        text = tweet.get("text", "")
-        
-        # Analyze sentiment
-        sentiment = self.analyze_text(text)
-        
-        # Add sentiment to tweet data
-        result = tweet.copy()
-        result["sentiment_analysis"] = sentiment
-        
-        # Determine sentiment direction and magnitude
-        score = sentiment["score"]
-        if score >= 0.5:
-            result["sentiment_direction"] = "very_positive"
-        elif 0.05 <= score < 0.5:
-            result["sentiment_direction"] = "positive"
-        elif -0.05 < score < 0.05:
-            result["sentiment_direction"] = "neutral"
-        elif -0.5 < score <= -0.05:
-            result["sentiment_direction"] = "negative"
-        else:
-            result["sentiment_direction"] = "very_negative"
-            
-        return result
+        return self._with_sentiment(tweet, self.analyze_text(tweet.get("text", "")))
     
-    def analyze_bulk(self, items: List[Dict[str, Any]], item_type: str = "article") -> List[Dict[str, Any]]:
+    def analyze_bulk(self, items: List[Dict[str, Any]], item_type: str = "article",
+                     batch_size: int = FINBERT_BATCH_SIZE) -> List[Dict[str, Any]]:
         """
         Analyze sentiment for multiple items
         
+        Texts are analyzed together with ``analyze_texts``, so FinBERT runs
+        on batches of chunks from many items.
+        
         Args:
             items: List of items to analyze
             item_type: Type of items ('article' or 'tweet')
+            batch_size: Chunks per FinBERT forward pass
             
         Returns:
             List of items with sentiment analysis
         """
-        results = []
+        if item_type == "article":
+            texts = [self._article_text(item) for item in items]
+        elif item_type == "tweet":
+            texts = [item.get("text", "") for item in items]
+        else:
+            # Generic analysis
+            texts = [item.get("text", item.get("content", "")) for item in items]
         
-        for item in items:
-            if item_type == "article":
-                result = self.analyze_news_article(item)
-            elif item_type == "tweet":
-                result = self.analyze_tweet(item)
+        sentiments = self.analyze_texts(texts, batch_size=batch_size)
+        
+        results = []
+        for item, sentiment in zip(items, sentiments):
+            if item_type in ("article", "tweet"):
+                result = self._with_sentiment(item, sentiment)
             else:
-                # Generic analysis
-                text = item.get("text", item.get("content", ""))
-                sentiment = self.analyze_text(text)
                 result = item.copy()
                 result["sentiment_analysis"] = sentiment
-                
             results.append(result)
             
         return results
@@ -482,7 +738,8 @@ def get_sentiment_analyzer() -> FinancialSentimentAnalyzer:
     """Get or create sentiment analyzer singleton"""
     global sentiment_analyzer
     if sentiment_analyzer is None:
-        sentiment_analyzer = FinancialSentimentAnalyzer()
+        cache = SentimentCache() if SENTIMENT_CACHE_AVAILABLE and SENTIMENT_CACHE_ENABLED else None
+        sentiment_analyzer = FinancialSentimentAnalyzer(cache=cache)
     return sentiment_analyzer
 
 
@@ -3,9 +3,10 @@ Database service for news sentiment analysis storage and retrieval
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import func, desc, and_, or_, update, insert
 import hashlib
 import logging
+import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
@@ -14,12 +15,20 @@ from app.models.news_sentiment import (
     NewsSentimentAnalysis, 
     NewsTickerMention,
     MarketSentimentSummary,
-    TickerSentimentHistory
+    TickerSentimentHistory,
+    SentimentCacheEntry
 )
+from app.core.bulk_writer import MAX_BIND_PARAMS, _dialect_insert
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Content hashes per cache lookup query
+CACHE_LOOKUP_BATCH = 1000
+
+# URLs, hashes or article IDs per IN query of the bulk methods
+BULK_LOOKUP_BATCH = 1000
+
 class NewsSentimentDBService:
     """Service for interacting with news sentiment database models"""
     
@@ -28,6 +37,86 @@ class NewsSentimentDBService:
         """Generate hash from article content to detect duplicates"""
         return hashlib.sha256(content.encode('utf-8')).hexdigest()
     
+    @staticmethod
+    def get_cached_sentiments(
+        db: Session,
+        content_hashes: List[str],
+        model_type: str,
+        lexicon_version: str
+    ) -> Dict[str, Dict]:
+        """
+        Look up cached sentiment results for many contents at once
+        
+        Args:
+            db: Database session
+            content_hashes: Hashes from generate_content_hash
+            model_type: Sentiment model the results were computed with
+            lexicon_version: Lexicon version the results were computed with
+            
+        Returns:
+            Dict[str, Dict]: Cached result by content hash (misses are absent)
+        """
+        hashes = list(set(content_hashes))
+        cached = {}
+        for start in range(0, len(hashes), CACHE_LOOKUP_BATCH):
+            rows = db.query(SentimentCacheEntry.content_hash, SentimentCacheEntry.result).filter(
+                and_(
+                    SentimentCacheEntry.model_type == model_type,
+                    SentimentCacheEntry.lexicon_version == lexicon_version,
+                    SentimentCacheEntry.content_hash.in_(hashes[start:start + CACHE_LOOKUP_BATCH])
+                )
+            ).all()
+            cached.update(rows)
+        return cached
+    
+    @staticmethod
+    def store_cached_sentiments(
+        db: Session,
+        results: Dict[str, Dict],
+        model_type: str,
+        lexicon_version: str
+    ) -> int:
+        """
+        Store sentiment results in the cache with one insert per batch
+        
+        Entries that already exist are left unchanged, so concurrent
+        writers of the same content do not conflict.
+        
+        Args:
+            db: Database session
+            results: Sentiment result by content hash
+            model_type: Sentiment model the results were computed with
+            lexicon_version: Lexicon version the results were computed with
+            
+        Returns:
+            int: Number of results sent to the database
+        """
+        if not results:
+            return 0
+        
+        now = datetime.now()
+        rows = [
+            {
+                "content_hash": content_hash,
+                "model_type": model_type,
+                "lexicon_version": lexicon_version,
+                "result": result,
+                "created_at": now
+            }
+            for content_hash, result in results.items()
+        ]
+        
+        _, insert = _dialect_insert(db)
+        batch_size = MAX_BIND_PARAMS // len(rows[0])
+        for start in range(0, len(rows), batch_size):
+            stmt = insert(SentimentCacheEntry).values(rows[start:start + batch_size])
+            db.execute(stmt.on_conflict_do_nothing(
+                index_elements=["content_hash", "model_type", "lexicon_version"]
+            ))
+        db.commit()
+        
+        return len(rows)
+    
     @staticmethod
     def store_article(
         db: Session, 
@@ -364,6 +453,393 @@ class NewsSentimentDBService:
         
         return new_entry
     
+    @staticmethod
+    def store_articles_bulk(
+        db: Session,
+        articles: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> Dict[str, str]:
+        """
+        Store many news articles at once, avoiding duplicates
+        
+        Existing articles are found by URL or content hash with one query
+        per batch of articles. A syndicated copy (same content under a new
+        URL) resolves to the stored article instead of being inserted.
+        Stored articles without content get it with one executemany update,
+        and new articles are inserted with one statement per batch.
+        
+        Args:
+            db: Database session
+            articles: Dicts with url, title, source, published_date and
+                optional content (as for store_article)
+            commit: Whether to commit (otherwise the caller owns the transaction)
+            
+        Returns:
+            Dict[str, str]: Article ID by URL
+        """
+        # Last occurrence of a URL in the batch wins
+        by_url = {}
+        for article in articles:
+            if article.get('url'):
+                by_url[article['url']] = article
+        if not by_url:
+            return {}
+        
+        hashes = {
+            url: NewsSentimentDBService.generate_content_hash(article['content'])
+            for url, article in by_url.items() if article.get('content')
+        }
+        
+        # Resolve duplicates by URL or content hash
+        urls = list(by_url)
+        hash_values = list(set(hashes.values()))
+        existing_by_url = {}
+        existing_by_hash = {}
+        for start in range(0, max(len(urls), len(hash_values)), BULK_LOOKUP_BATCH):
+            url_batch = urls[start:start + BULK_LOOKUP_BATCH]
+            hash_batch = hash_values[start:start + BULK_LOOKUP_BATCH]
+            rows = db.query(
+                NewsArticle.id, NewsArticle.url, NewsArticle.content_hash, NewsArticle.content.is_(None)
+            ).filter(
+                or_(NewsArticle.url.in_(url_batch), NewsArticle.content_hash.in_(hash_batch))
+            ).all()
+            for article_id, url, content_hash, missing_content in rows:
+                existing_by_url[url] = (article_id, missing_content)
+                if content_hash:
+                    existing_by_hash.setdefault(content_hash, article_id)
+        
+        now = datetime.now()
+        article_ids = {}
+        content_updates = []
+        new_rows = []
+        for url, article in by_url.items():
+            content_hash = hashes.get(url)
+            if url in existing_by_url:
+                article_id, missing_content = existing_by_url[url]
+                article_ids[url] = article_id
+                # Update existing article if needed
+                if content_hash and missing_content:
+                    content_updates.append({
+                        'id': article_id,
+                        'content': article['content'],
+                        'content_hash': content_hash,
+                        'updated_at': now
+                    })
+            elif content_hash and content_hash in existing_by_hash:
+                article_ids[url] = existing_by_hash[content_hash]
+            else:
+                article_id = str(uuid.uuid4())
+                new_rows.append({
+                    'id': article_id,
+                    'url': url,
+                    'title': article.get('title') or 'Unknown Title',
+                    'source': article.get('source'),
+                    'published_date': article.get('published_date') or now,
+                    'content': article.get('content') or None,
+                    'content_hash': content_hash,
+                    'created_at': now,
+                    'updated_at': now
+                })
+                if content_hash:
+                    # Later copies in the batch resolve to this article
+                    existing_by_hash[content_hash] = article_id
+                article_ids[url] = article_id
+        
+        if content_updates:
+            db.execute(update(NewsArticle), content_updates)
+        
+        if new_rows:
+            _, dialect_insert = _dialect_insert(db)
+            inserted = set()
+            batch_size = MAX_BIND_PARAMS // len(new_rows[0])
+            for start in range(0, len(new_rows), batch_size):
+                stmt = dialect_insert(NewsArticle).values(new_rows[start:start + batch_size])
+                stmt = stmt.on_conflict_do_nothing(index_elements=['url']).returning(NewsArticle.url)
+                inserted.update(db.execute(stmt).scalars())
+            
+            # Articles stored concurrently since the lookup keep their IDs
+            raced = [row['url'] for row in new_rows if row['url'] not in inserted]
+            if raced:
+                article_ids.update(
+                    db.query(NewsArticle.url, NewsArticle.id).filter(NewsArticle.url.in_(raced)).all()
+                )
+        
+        if commit:
+            db.commit()
+        
+        return article_ids
+    
+    @staticmethod
+    def store_sentiment_analyses_bulk(
+        db: Session,
+        analyses: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> Dict[str, str]:
+        """
+        Store sentiment analysis results for many articles at once
+        
+        Articles keep one analysis each: existing analyses are found with
+        one query per batch and updated with one executemany statement,
+        and the rest are inserted with another.
+        
+        Args:
+            db: Database session
+            analyses: Dicts with article_id, sentiment_data, sentiment_label
+                and optional analyzer_version and raw_data (as for
+                store_sentiment_analysis)
+            commit: Whether to commit (otherwise the caller owns the transaction)
+            
+        Returns:
+            Dict[str, str]: Sentiment analysis ID by article ID
+        """
+        by_article = {analysis['article_id']: analysis for analysis in analyses}
+        if not by_article:
+            return {}
+        
+        # Check which articles already have an analysis
+        article_ids = list(by_article)
+        existing = {}
+        for start in range(0, len(article_ids), BULK_LOOKUP_BATCH):
+            existing.update(
+                db.query(NewsSentimentAnalysis.article_id, NewsSentimentAnalysis.id).filter(
+                    NewsSentimentAnalysis.article_id.in_(article_ids[start:start + BULK_LOOKUP_BATCH])
+                ).all()
+            )
+        
+        now = datetime.now()
+        analysis_ids = {}
+        updates = []
+        new_rows = []
+        for article_id, analysis in by_article.items():
+            sentiment_data = analysis.get('sentiment_data') or {}
+            row = {
+                'compound_score': sentiment_data.get('compound', 0),
+                'positive_score': sentiment_data.get('positive', 0),
+                'negative_score': sentiment_data.get('negative', 0),
+                'neutral_score': sentiment_data.get('neutral', 0),
+                'financial_bias': sentiment_data.get('financial_bias'),
+                'adjusted_compound': sentiment_data.get('adjusted_compound'),
+                'sentiment_label': analysis['sentiment_label'],
+                'analyzer_version': analysis.get('analyzer_version', "1.0"),
+                'raw_data': analysis.get('raw_data'),
+                'updated_at': now
+            }
+            if article_id in existing:
+                row['id'] = existing[article_id]
+                updates.append(row)
+            else:
+                row.update(id=str(uuid.uuid4()), article_id=article_id, created_at=now)
+                new_rows.append(row)
+            analysis_ids[article_id] = row['id']
+        
+        if updates:
+            db.execute(update(NewsSentimentAnalysis), updates)
+        if new_rows:
+            db.execute(insert(NewsSentimentAnalysis), new_rows)
+        
+        if commit:
+            db.commit()
+        
+        return analysis_ids
+    
+    @staticmethod
+    def store_ticker_mentions_bulk(
+        db: Session,
+        mentions: Dict[str, Dict[str, Any]],
+        commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Store ticker mentions for many articles at once
+        
+        The previous mentions of all articles are deleted with one
+        statement per batch and the new ones inserted with one executemany.
+        
+        Args:
+            db: Database session
+            mentions: Per article ID, a dict with ticker_mentions and optional
+                company_names and primary_ticker (as for store_ticker_mentions)
+            commit: Whether to commit (otherwise the caller owns the transaction)
+            
+        Returns:
+            Dict[str, int]: Number of distinct tickers stored per article ID
+        """
+        if not mentions:
+            return {}
+        
+        # Delete existing mentions for these articles
+        article_ids = list(mentions)
+        for start in range(0, len(article_ids), BULK_LOOKUP_BATCH):
+            db.query(NewsTickerMention).filter(
+                NewsTickerMention.article_id.in_(article_ids[start:start + BULK_LOOKUP_BATCH])
+            ).delete(synchronize_session=False)
+        
+        now = datetime.now()
+        counts = {}
+        rows = []
+        for article_id, article_mentions in mentions.items():
+            company_names = article_mentions.get('company_names') or {}
+            primary_ticker = article_mentions.get('primary_ticker')
+            
+            # Create ticker mention counts
+            ticker_count = {}
+            for ticker in article_mentions.get('ticker_mentions', []):
+                ticker_count[ticker] = ticker_count.get(ticker, 0) + 1
+            
+            for ticker, count in ticker_count.items():
+                rows.append({
+                    'id': str(uuid.uuid4()),
+                    'article_id': article_id,
+                    'ticker': ticker,
+                    'company_name': company_names.get(ticker),
+                    'mention_count': count,
+                    'is_primary_subject': ticker == primary_ticker if primary_ticker else False,
+                    'created_at': now
+                })
+            counts[article_id] = len(ticker_count)
+        
+        if rows:
+            db.execute(insert(NewsTickerMention), rows)
+        
+        if commit:
+            db.commit()
+        
+        return counts
+    
+    @staticmethod
+    def update_ticker_sentiments_bulk(
+        db: Session,
+        date: datetime,
+        ticker_sentiments: Dict[str, Dict[str, Any]],
+        commit: bool = True
+    ) -> Dict[str, str]:
+        """
+        Update or create the sentiment of many tickers for a specific date
+        
+        Existing entries for the date are found with one query and updated
+        with one executemany statement; the rest are inserted with another.
+        
+        Args:
+            db: Database session
+            date: Date of the sentiment
+            ticker_sentiments: Per ticker, a dict with sentiment_score,
+                sentiment_label, article_count and optional article_ids
+            commit: Whether to commit (otherwise the caller owns the transaction)
+            
+        Returns:
+            Dict[str, str]: Ticker sentiment history ID by ticker
+        """
+        if not ticker_sentiments:
+            return {}
+        
+        # Get date without time component for uniqueness
+        date_only = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Check which tickers already have an entry for this date
+        existing = dict(
+            db.query(TickerSentimentHistory.ticker, TickerSentimentHistory.id).filter(
+                and_(
+                    TickerSentimentHistory.ticker.in_(list(ticker_sentiments)),
+                    func.date(TickerSentimentHistory.date) == func.date(date_only)
+                )
+            ).all()
+        )
+        
+        now = datetime.now()
+        entry_ids = {}
+        updates = []
+        new_rows = []
+        for ticker, data in ticker_sentiments.items():
+            row = {
+                'sentiment_score': data.get('sentiment_score', 0),
+                'sentiment_label': data.get('sentiment_label', 'Netral'),
+                'article_count': data.get('article_count', 0),
+                'updated_at': now
+            }
+            if ticker in existing:
+                row['id'] = existing[ticker]
+                if data.get('article_ids'):
+                    row['article_ids'] = data['article_ids']
+                updates.append(row)
+            else:
+                row.update(id=str(uuid.uuid4()), ticker=ticker, date=date_only,
+                           article_ids=data.get('article_ids'), created_at=now)
+                new_rows.append(row)
+            entry_ids[ticker] = row['id']
+        
+        if updates:
+            db.execute(update(TickerSentimentHistory), updates)
+        if new_rows:
+            db.execute(insert(TickerSentimentHistory), new_rows)
+        
+        if commit:
+            db.commit()
+        
+        return entry_ids
+    
+    @staticmethod
+    def store_analyzed_articles(
+        db: Session,
+        articles: List[Dict[str, Any]],
+        analyzer_version: str = "1.0"
+    ) -> List[Dict[str, Any]]:
+        """
+        Store many analyzed articles, their sentiment and ticker mentions
+        in one transaction
+        
+        Args:
+            db: Database session
+            articles: Dicts with the store_article fields plus sentiment_data,
+                sentiment_label and optional ticker_mentions, company_names,
+                primary_ticker and raw_data
+            analyzer_version: Version of the analyzer used
+            
+        Returns:
+            List[Dict]: article_id, sentiment_analysis_id and ticker_mentions
+            (distinct tickers stored) per input article, in order
+        """
+        try:
+            article_ids = NewsSentimentDBService.store_articles_bulk(db, articles, commit=False)
+            
+            analyses = {}
+            mentions = {}
+            for article in articles:
+                article_id = article_ids.get(article.get('url'))
+                if article_id is None:
+                    continue
+                analyses[article_id] = {
+                    'article_id': article_id,
+                    'sentiment_data': article.get('sentiment_data'),
+                    'sentiment_label': article['sentiment_label'],
+                    'analyzer_version': analyzer_version,
+                    'raw_data': article.get('raw_data')
+                }
+                mentions[article_id] = {
+                    'ticker_mentions': article.get('ticker_mentions', []),
+                    'company_names': article.get('company_names'),
+                    'primary_ticker': article.get('primary_ticker')
+                }
+            
+            analysis_ids = NewsSentimentDBService.store_sentiment_analyses_bulk(
+                db, list(analyses.values()), commit=False
+            )
+            mention_counts = NewsSentimentDBService.store_ticker_mentions_bulk(db, mentions, commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        results = []
+        for article in articles:
+            article_id = article_ids.get(article.get('url'))
+            results.append({
+                'article_id': article_id,
+                'sentiment_analysis_id': analysis_ids.get(article_id),
+                'ticker_mentions': mention_counts.get(article_id, 0)
+            })
+        
+        logger.info(f"Stored {len(article_ids)} articles with {len(analysis_ids)} sentiment analyses")
+        return results
+    
     @staticmethod
     def get_latest_articles(
         db: Session, 
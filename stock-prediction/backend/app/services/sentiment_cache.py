@@ -0,0 +1,132 @@
+"""
+Persistent cache of sentiment results keyed by article content
+
+Syndicated and re-scraped articles carry the same text, so their sentiment
+is looked up by (content hash, model type, lexicon version) instead of
+being scored again. Lookups and stores are batched, and a small in-process
+LRU in front of the ``sentiment_cache`` table makes repeated lookups within
+one run free (e.g. an article scored for the market summary and then stored).
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.services.news_sentiment_db import NewsSentimentDBService
+
+logger = logging.getLogger(__name__)
+
+# "false" to score every text again
+SENTIMENT_CACHE_ENABLED = os.getenv("SENTIMENT_CACHE", "true").lower() not in ("0", "false", "off")
+
+# Results kept in process memory in front of the table
+SENTIMENT_CACHE_MEMORY_ITEMS = int(os.getenv("SENTIMENT_CACHE_MEMORY_ITEMS", "10000"))
+
+# Seconds to skip the table after a database error
+SENTIMENT_CACHE_RETRY_SECONDS = 60
+
+# Mixed into every lexicon version; bump when scoring code changes results
+SENTIMENT_CACHE_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Cache key of a text, the same hash as ``NewsArticle.content_hash``"""
+    return NewsSentimentDBService.generate_content_hash(text)
+
+
+def lexicon_version(*parts: Any) -> str:
+    """Short hash of everything besides the text that a sentiment result depends on"""
+    payload = json.dumps([SENTIMENT_CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SentimentCache:
+    """Sentiment results by content hash, in memory and in the database"""
+
+    def __init__(self, db: Optional[Session] = None, memory_items: int = SENTIMENT_CACHE_MEMORY_ITEMS):
+        """
+        Args:
+            db: Session to use (a short-lived session per call if None)
+            memory_items: Results kept in process memory
+        """
+        self.db = db
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def get_many(self, content_hashes: List[str], model_type: str, lexicon_version: str) -> Dict[str, Dict]:
+        """
+        Cached results of many texts, with one query for the memory misses
+
+        Returns:
+            Copy of the cached result by content hash (misses are absent)
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key_hash in content_hashes:
+                key = (key_hash, model_type, lexicon_version)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key_hash] = self._memory[key]
+                elif key_hash not in found:
+                    missing.append(key_hash)
+
+        if missing:
+            stored = self._run(NewsSentimentDBService.get_cached_sentiments, missing, model_type, lexicon_version)
+            if stored:
+                self._remember(stored, model_type, lexicon_version)
+                found.update(stored)
+
+        return {key_hash: copy.deepcopy(result) for key_hash, result in found.items()}
+
+    def put_many(self, results: Dict[str, Dict], model_type: str, lexicon_version: str) -> None:
+        """Store the results of many texts with one insert"""
+        if not results:
+            return
+        results = {key_hash: copy.deepcopy(result) for key_hash, result in results.items()}
+        self._remember(results, model_type, lexicon_version)
+        self._run(NewsSentimentDBService.store_cached_sentiments, results, model_type, lexicon_version)
+
+    def clear_memory(self) -> None:
+        """Drop the in-process results (the table is kept)"""
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, results: Dict[str, Dict], model_type: str, lexicon_version: str) -> None:
+        with self._lock:
+            for key_hash, result in results.items():
+                key = (key_hash, model_type, lexicon_version)
+                self._memory[key] = result
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _run(self, operation: Callable, *args: Any) -> Any:
+        """Run a database operation; errors are logged and treated as misses"""
+        if time.monotonic() < self._retry_at:
+            return None
+
+        db = self.db
+        try:
+            if db is None:
+                db = SessionLocal()
+            return operation(db, *args)
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            self._retry_at = time.monotonic() + SENTIMENT_CACHE_RETRY_SECONDS
+            logger.warning(f"Sentiment cache unavailable, scoring without it: {str(e)}")
+            return None
+        finally:
+            if self.db is None and db is not None:
+                db.close()
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 
 from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
+from app.core.http_cache import get_http_cache
 from app.utils.cache_manager import CacheManager
 from app.utils.db_optimizer import analyze_db_tables, create_indices, vacuum_db_tables
 
@@ -18,9 +19,11 @@ def clear_expired_cache():
     try:
         count = CacheManager.clear_expired()
         logger.info(f"Cleared {count} expired cache entries")
+        pruned = get_http_cache().prune()
         return {
             "status": "success", 
-            "cleared_entries": count
+            "cleared_entries": count,
+            "pruned_http_entries": pruned
         }
     except Exception as e:
         logger.error(f"Error clearing expired cache: {str(e)}")
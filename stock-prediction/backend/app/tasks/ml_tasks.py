@@ -3,6 +3,7 @@ Machine Learning tasks for Celery
 """
 import logging
 from datetime import datetime
+from typing import Optional
 import pandas as pd
 from sqlalchemy.orm import Session
 
@@ -10,9 +11,19 @@ from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.models.stocks import Stock, StockPrice
 from app.ml.models import get_stock_predictor
+from app.core.ml_engine import get_ml_engine
+from app.core.training_pool import (
+    stale_predictor_tickers, stale_tickers, train_models_parallel, train_predictors_parallel
+)
+from app.core.global_model import train_global_model as train_global_model_on
+from app.core.walk_forward import WALK_FORWARD_MODEL_TYPES, evaluate_universe
+from app.models.big_data import DataProcessingJob
 
 logger = logging.getLogger(__name__)
 
+# Names of the predictor model types accepted for the ML engine's types
+MODEL_TYPE_ALIASES = {"random_forest": "forest", "gradient_boosting": "gbm"}
+
 @celery_app.task(name="app.tasks.ml_tasks.train_model")
 def train_model(ticker: str, model_type: str = "random_forest", force: bool = False):
     """
@@ -92,36 +103,41 @@ def train_model(ticker: str, model_type: str = "random_forest", force: bool = Fa
 
 
 @celery_app.task(name="app.tasks.ml_tasks.batch_predict")
-def batch_predict(tickers: list, days: int = 7, model_type: str = "random_forest"):
+def batch_predict(tickers: Optional[list] = None, days: int = 5, model_type: Optional[str] = None,
+                  interval: str = "1d"):
     """
-    Generate predictions for multiple stocks in batch
+    Generate predictions for multiple stocks in one run
+    
+    Loads the bars of all stocks with one query, predicts once per model on
+    the stacked feature rows and bulk-inserts the StockPrediction rows (see
+    ``MLEngine.batch_generate_predictions``).
     
     Args:
-        tickers: List of stock ticker symbols
-        days: Number of days to predict ahead
-        model_type: ML model type to use
+        tickers: List of stock ticker symbols (all active stocks if None)
+        days: Prediction horizon of the preferred models
+        model_type: Only use models of this type ('linear', 'forest', 'gbm', 'lstm')
+        interval: Bar interval
     """
-    logger.info(f"Batch predicting {len(tickers)} stocks for {days} days")
-    results = {}
-    
-    for ticker in tickers:
-        try:
-            # This could call the predict function directly or reuse existing code
-            # For now, we'll just track that we processed this ticker
-            results[ticker] = {"status": "queued"}
-            
-            # Start individual prediction task
-            predict.delay(ticker, days, model_type)
-            
-        except Exception as e:
-            logger.error(f"Error queueing prediction for {ticker}: {str(e)}")
-            results[ticker] = {"status": "error", "message": str(e)}
+    logger.info(f"Batch predicting {len(tickers) if tickers else 'all active'} stocks, horizon {days}")
+    db = SessionLocal()
     
-    return {
-        "status": "success",
-        "message": f"Batch prediction started for {len(tickers)} stocks",
-        "results": results
-    }
+    try:
+        summary = get_ml_engine(db).batch_generate_predictions(
+            tickers, interval=interval, prediction_horizon=days,
+            model_type=MODEL_TYPE_ALIASES.get(model_type, model_type)
+        )
+        return {
+            "status": "success",
+            "message": f"Stored {summary['predicted']} predictions using {summary['models_used']} models",
+            "results": summary["results"]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in batch prediction: {str(e)}")
+        db.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
 
 
 @celery_app.task(name="app.tasks.ml_tasks.predict")
@@ -210,26 +226,119 @@ def train_ml_models():
     
     try:
         # Get all active stocks
-        stocks = db.query(Stock).filter(Stock.is_active == True).all()
-        logger.info(f"Found {len(stocks)} active stocks to train models for")
+        tickers = [ticker for (ticker,) in db.query(Stock.ticker).filter(Stock.is_active == True).all()]
+        logger.info(f"Found {len(tickers)} active stocks to train models for")
         
-        # Queue training tasks for each stock
-        for stock in stocks:
-            # First check if model is outdated or missing
-            last_update = stock.last_model_update
-            needs_update = last_update is None or (datetime.now() - last_update).days >= 7
-            
-            if needs_update:
-                train_model.delay(stock.ticker)
+        # Only retrain models that are outdated or missing: ML engine models
+        # and the StockPricePredictor models behind /ml/predict
+        model_tickers = stale_tickers(db, tickers, max_age_days=7)
+        predictor_tickers = stale_predictor_tickers(tickers, max_age_days=7)
+        if not model_tickers and not predictor_tickers:
+            return {"status": "success", "message": "All models are up to date"}
         
-        db.close()
-        return {"status": "success", "message": f"Queued training for {len(stocks)} stocks"}
+        results = train_models_parallel(db, model_tickers) if model_tickers else {}
+        predictor_results = train_predictors_parallel(db, predictor_tickers) if predictor_tickers else {}
+        trained = sum(1 for result in results.values() if result["status"] == "success")
+        trained_predictors = sum(1 for result in predictor_results.values() if result["status"] == "success")
+        
+        return {
+            "status": "success",
+            "message": (f"Trained {trained} of {len(model_tickers)} outdated models and "
+                        f"{trained_predictors} of {len(predictor_tickers)} outdated predictors"),
+            "results": {ticker: result["status"] for ticker, result in results.items()},
+            "predictor_results": {ticker: result["status"] for ticker, result in predictor_results.items()}
+        }
         
     except Exception as e:
         logger.error(f"Error in train_ml_models job: {str(e)}")
-        if 'db' in locals():
-            db.close()
         return {"status": "error", "message": str(e)}
+    
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.ml_tasks.train_global_model")
+def train_global_model(tickers: Optional[list] = None, model_type: str = "gbm", days: int = 730,
+                       prediction_horizon: int = 5, interval: str = "1d"):
+    """
+    Train one pooled model on all stocks (see ``app.core.global_model``)
+    
+    Args:
+        tickers: Stocks to pool (all active stocks if None)
+        model_type: ML model type ('linear', 'random_forest'/'forest', 'gradient_boosting'/'gbm')
+        days: Days of history per stock
+        prediction_horizon: Bars ahead to predict
+        interval: Bar interval
+    """
+    logger.info(f"Training global {model_type} model")
+    db = SessionLocal()
+    
+    try:
+        return train_global_model_on(
+            db, tickers, model_type=MODEL_TYPE_ALIASES.get(model_type, model_type), interval=interval,
+            prediction_horizon=prediction_horizon, days=days
+        )
+        
+    except Exception as e:
+        logger.error(f"Error training global model: {str(e)}")
+        db.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.ml_tasks.evaluate_models")
+def evaluate_models(tickers: Optional[list] = None, model_types: Optional[list] = None, days: int = 1500,
+                    prediction_horizon: int = 5, refit_every: int = 21, warm_start: bool = False):
+    """
+    Compare model types with walk-forward validation over many stocks
+    
+    Args:
+        tickers: Stocks to evaluate (all active stocks if None)
+        model_types: Model types to compare (linear, forest and gbm if None)
+        days: Days of history per stock
+        prediction_horizon: Bars ahead to predict
+        refit_every: Bars between refits
+        warm_start: Grow forest/boosting models across folds instead of refitting
+    """
+    logger.info(f"Walk-forward evaluation of {model_types or 'all'} models")
+    db = SessionLocal()
+    
+    try:
+        job = DataProcessingJob(
+            job_type="model_evaluation",
+            status="running",
+            parameters={"tickers": tickers, "model_types": model_types, "days": days,
+                        "prediction_horizon": prediction_horizon, "refit_every": refit_every,
+                        "warm_start": warm_start}
+        )
+        db.add(job)
+        db.commit()
+        
+        evaluation = evaluate_universe(
+            db, tickers,
+            model_types=[MODEL_TYPE_ALIASES.get(t, t) for t in model_types] if model_types else WALK_FORWARD_MODEL_TYPES,
+            prediction_horizon=prediction_horizon, days=days, refit_every=refit_every, warm_start=warm_start
+        )
+        
+        job.status = "completed"
+        job.completed_at = datetime.now()
+        job.results = {"models": evaluation["models"], "errors": evaluation["errors"]}
+        db.commit()
+        
+        return {"status": "success", "results": evaluation["models"], "errors": evaluation["errors"]}
+        
+    except Exception as e:
+        logger.error(f"Error in walk-forward evaluation: {str(e)}")
+        db.rollback()
+        if 'job' in locals():
+            job.status = "failed"
+            job.error_message = str(e)
+            job.completed_at = datetime.now()
+            db.commit()
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
 
 
 @celery_app.task(name="app.tasks.ml_tasks.monitor_model_performance")
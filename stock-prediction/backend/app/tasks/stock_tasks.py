@@ -4,105 +4,63 @@ Stock data tasks for Celery
 import logging
 from datetime import datetime, timedelta
 import yfinance as yf
-import pandas as pd
 from typing import List, Dict, Any, Optional
 
 from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
-from app.models.stocks import Stock, StockPrice
-from app.utils.cache_manager import CacheManager
+from app.models.stocks import Stock
+from app.core.incremental_refresh import refresh_stock_incremental
+from app.utils.cache_manager import invalidate
 
 logger = logging.getLogger(__name__)
 
 @celery_app.task(name="app.tasks.stock_tasks.update_stock")
-def update_stock(ticker: str, period: str = "7d") -> Dict[str, Any]:
+def update_stock(ticker: str, period: str = "7d", interval: str = "1d") -> Dict[str, Any]:
     """
-    Update price data for a specific stock
+    Update price data and indicators for a specific stock
+    
+    Only bars after the last stored one are fetched and written; their
+    indicators are computed from a short tail of stored history.
     
     Args:
         ticker: Stock ticker symbol
-        period: Data period to fetch (default: 7d)
+        period: Data period to fetch if nothing is stored yet (default: 7d)
+        interval: Bar interval (default: 1d)
     """
     logger.info(f"Updating stock data for {ticker}")
     db = SessionLocal()
-    updated_count = 0
     
     try:
         # Check if stock exists
         stock = db.query(Stock).filter(Stock.ticker == ticker).first()
         if not stock:
             logger.error(f"Stock {ticker} not found in database")
-            db.close()
             return {"status": "error", "message": f"Stock {ticker} not found"}
         
-        # Get latest data from Yahoo Finance
-        ticker_obj = yf.Ticker(ticker)
-        hist = ticker_obj.history(period=period)
-        
-        if hist.empty:
-            logger.warning(f"No data returned for {ticker}")
-            db.close()
-            return {"status": "warning", "message": f"No data returned for {ticker}"}
-        
-        # Convert index to datetime
-        hist.index = pd.to_datetime(hist.index)
-        
-        # Get latest date in DB
-        latest_price = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock.id
-        ).order_by(StockPrice.date.desc()).first()
-        
-        latest_date = latest_price.date if latest_price else None
+        stats = refresh_stock_incremental(db, stock, interval=interval, fallback_period=period)
+        updated_count = stats["prices_inserted"]
         
-        # Only add new data
-        for date, row in hist.iterrows():
-            # Convert to datetime date
-            date = date.to_pydatetime().date()
-            
-            # Skip if we already have this date
-            if latest_date and date <= latest_date:
-                continue
-            
-            # Add new price data
-            price = StockPrice(
-                stock_id=stock.id,
-                date=date,
-                open=row['Open'],
-                high=row['High'],
-                low=row['Low'],
-                close=row['Close'],
-                volume=row['Volume']
-            )
-            db.add(price)
-            updated_count += 1
-        
-        # Only commit if we have updates
         if updated_count > 0:
-            # Update last_updated timestamp
-            stock.last_updated = datetime.now()
-            db.commit()
-            
             # Clear cache for this stock
-            CacheManager.delete(f"get_stock_data_{ticker}")
-            CacheManager.delete(f"technical_signals_{ticker}")
+            invalidate("get_stock_indicators", ticker)
             
             logger.info(f"Added {updated_count} new price records for {ticker}")
         else:
             logger.info(f"No new data for {ticker}")
         
-        db.close()
         return {
             "status": "success", 
             "ticker": ticker,
-            "updated_count": updated_count
+            "updated_count": updated_count,
+            "indicators_added": stats["indicators_inserted"]
         }
         
     except Exception as e:
         logger.error(f"Error updating {ticker}: {str(e)}")
-        if 'db' in locals():
-            db.rollback()
-            db.close()
+        db.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
 
 
 @celery_app.task(name="app.tasks.stock_tasks.update_active_stocks")
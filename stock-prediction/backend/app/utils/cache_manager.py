@@ -3,14 +3,34 @@ Cache Manager for Stock Data
 
 This module provides caching functionality to reduce database load
 and improve API response times for frequently accessed data.
+
+The cache is bounded: entries are evicted least-recently-used first once
+the entry count, total byte budget or a per-namespace byte budget is
+exceeded, and expired entries are dropped whenever room is needed. All
+operations are thread-safe.
+
+The ``cached`` decorator stores results in the backend chosen by
+``CACHE_BACKEND``: this in-process cache, or Redis so that API and Celery
+workers share results.
 """
 
+import os
+import sys
 import time
+import asyncio
+import hashlib
+import inspect
 import logging
 import functools
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, Callable, Optional, TypeVar, cast
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import Dict, Any, Callable, Optional, Tuple, TypeVar, cast
+
+from sqlalchemy.orm import Session
 
 # Type definitions for better typing
 T = TypeVar('T')
@@ -18,172 +38,726 @@ CacheDict = Dict[str, Dict[str, Any]]
 
 logger = logging.getLogger(__name__)
 
+# Marker for "not in cache", so cached None values can be told apart
+_MISSING = object()
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimate the memory footprint of a cached value in bytes
+
+    Follows dicts, lists, tuples and sets; uses ``nbytes`` for NumPy arrays
+    and ``memory_usage(deep=True)`` for pandas objects.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'index'):
+        return int(obj.memory_usage(deep=True))
+    if hasattr(obj, 'nbytes') and not isinstance(obj, (bytes, bytearray)):
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    return size
+
+
 class CacheManager:
     """Cache manager for stock data and frequently accessed API responses"""
-    
-    # Cache storage
-    _cache: CacheDict = {}
-    
+
+    # Cache storage, ordered from least to most recently used
+    _cache: CacheDict = OrderedDict()
+
     # Default TTL (Time to live) in seconds
     DEFAULT_TTL = 300  # 5 minutes
-    
+
+    # Namespace used when none is given
+    DEFAULT_NAMESPACE = 'default'
+
+    # Global limits
+    max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+    max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))  # 256 MB
+
+    # Optional byte budget per namespace
+    _namespace_budgets: Dict[str, int] = {}
+
+    # Bookkeeping, guarded by _lock
+    _lock = threading.RLock()
+    _total_bytes = 0
+    _namespace_bytes: Dict[str, int] = {}
+    _counters: Dict[str, Dict[str, int]] = {}
+
+    # Per-key locks for single-flight computation: key -> [lock, waiters]
+    _inflight: Dict[str, list] = {}
+
+    @classmethod
+    def configure(cls, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                  namespace_budgets: Optional[Dict[str, int]] = None) -> None:
+        """
+        Change the cache limits and evict entries that no longer fit
+
+        Args:
+            max_entries: Maximum number of entries
+            max_bytes: Maximum estimated size of all entries in bytes
+            namespace_budgets: Maximum estimated size in bytes per namespace
+        """
+        with cls._lock:
+            if max_entries is not None:
+                cls.max_entries = max_entries
+            if max_bytes is not None:
+                cls.max_bytes = max_bytes
+            if namespace_budgets is not None:
+                cls._namespace_budgets = dict(namespace_budgets)
+            for namespace in list(cls._namespace_bytes):
+                cls._enforce_limits(namespace)
+
+    @classmethod
+    def set_namespace_budget(cls, namespace: str, max_bytes: Optional[int]) -> None:
+        """Set (or remove with None) the byte budget of one namespace"""
+        with cls._lock:
+            if max_bytes is None:
+                cls._namespace_budgets.pop(namespace, None)
+            else:
+                cls._namespace_budgets[namespace] = max_bytes
+                cls._enforce_limits(namespace)
+
+    @classmethod
+    def _count(cls, namespace: str, counter: str, amount: int = 1) -> None:
+        """Increment a hit/miss/eviction counter for a namespace"""
+        counters = cls._counters.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0})
+        counters[counter] += amount
+
+    @classmethod
+    def _remove(cls, key: str) -> Dict[str, Any]:
+        """Remove an entry and update the size bookkeeping (caller holds the lock)"""
+        entry = cls._cache.pop(key)
+        namespace = entry['namespace']
+        cls._total_bytes -= entry['size']
+        cls._namespace_bytes[namespace] = cls._namespace_bytes.get(namespace, 0) - entry['size']
+        return entry
+
+    @classmethod
+    def _lookup(cls, key: str, namespace: Optional[str] = None, record: bool = True) -> Any:
+        """Return the cached value or _MISSING, counting hits and misses if ``record``"""
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is None:
+                if record:
+                    cls._count(namespace or cls.DEFAULT_NAMESPACE, 'misses')
+                return _MISSING
+
+            namespace = entry['namespace']
+            # Check if entry is expired
+            if time.time() > entry.get('expires_at', 0):
+                # Remove expired entry
+                cls._remove(key)
+                cls._count(namespace, 'expirations')
+                if record:
+                    cls._count(namespace, 'misses')
+                return _MISSING
+
+            cls._cache.move_to_end(key)
+            if record:
+                cls._count(namespace, 'hits')
+            return entry.get('data')
+
+    @classmethod
+    def _purge_expired(cls) -> int:
+        """Drop expired entries (caller holds the lock)"""
+        now = time.time()
+        expired_keys = [key for key, entry in cls._cache.items() if now > entry.get('expires_at', 0)]
+        for key in expired_keys:
+            entry = cls._remove(key)
+            cls._count(entry['namespace'], 'expirations')
+        return len(expired_keys)
+
+    @classmethod
+    def _enforce_limits(cls, namespace: str) -> None:
+        """Evict least recently used entries until all limits hold (caller holds the lock)"""
+        budget = cls._namespace_budgets.get(namespace)
+        over_namespace = budget is not None and cls._namespace_bytes.get(namespace, 0) > budget
+        over_global = len(cls._cache) > cls.max_entries or cls._total_bytes > cls.max_bytes
+
+        if not (over_namespace or over_global):
+            return
+
+        # Expired entries go first
+        cls._purge_expired()
+
+        if budget is not None:
+            for key in [k for k, e in cls._cache.items() if e['namespace'] == namespace]:
+                if cls._namespace_bytes.get(namespace, 0) <= budget:
+                    break
+                cls._remove(key)
+                cls._count(namespace, 'evictions')
+
+        while cls._cache and (len(cls._cache) > cls.max_entries or cls._total_bytes > cls.max_bytes):
+            key = next(iter(cls._cache))
+            entry = cls._remove(key)
+            cls._count(entry['namespace'], 'evictions')
+
     @classmethod
-    def get(cls, key: str) -> Optional[Dict[str, Any]]:
+    def get(cls, key: str, namespace: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Get an item from cache if it exists and is not expired
-        
+
         Args:
             key: Cache key to retrieve
-            
+            namespace: Namespace a miss is counted against (hits use the
+                namespace the entry was stored under)
+
         Returns:
             Cache entry or None if not found or expired
         """
-        if key not in cls._cache:
-            return None
-        
-        cache_entry = cls._cache[key]
-        
-        # Check if entry is expired
-        if time.time() > cache_entry.get('expires_at', 0):
-            # Remove expired entry
-            del cls._cache[key]
-            return None
-            
-        return cache_entry.get('data')
-    
+        value = cls._lookup(key, namespace)
+        return None if value is _MISSING else value
+
     @classmethod
-    def set(cls, key: str, data: Dict[str, Any], ttl: int = DEFAULT_TTL) -> None:
+    def set(cls, key: str, data: Dict[str, Any], ttl: int = DEFAULT_TTL, namespace: Optional[str] = None) -> None:
         """
         Set an item in cache with expiration
-        
+
         Args:
             key: Cache key to set
             data: Data to cache
             ttl: Time to live in seconds (default: 5 minutes)
+            namespace: Namespace whose byte budget the entry counts against
         """
-        expires_at = time.time() + ttl
-        
-        cls._cache[key] = {
-            'data': data,
-            'expires_at': expires_at,
-            'created_at': time.time()
-        }
-    
+        namespace = namespace or cls.DEFAULT_NAMESPACE
+        size = estimate_size(data) + sys.getsizeof(key)
+        now = time.time()
+
+        with cls._lock:
+            if key in cls._cache:
+                cls._remove(key)
+
+            budget = cls._namespace_budgets.get(namespace)
+            if size > cls.max_bytes or (budget is not None and size > budget):
+                logger.debug(f"Not caching {key}: {size} bytes exceeds the cache budget")
+                return
+
+            cls._cache[key] = {
+                'data': data,
+                'expires_at': now + ttl,
+                'created_at': now,
+                'size': size,
+                'namespace': namespace
+            }
+            cls._total_bytes += size
+            cls._namespace_bytes[namespace] = cls._namespace_bytes.get(namespace, 0) + size
+            cls._enforce_limits(namespace)
+
+    @classmethod
+    def get_or_set(cls, key: str, compute: Callable[[], Any], ttl: int = DEFAULT_TTL,
+                   namespace: Optional[str] = None) -> Any:
+        """
+        Return the cached value or compute and cache it, single-flight
+
+        Concurrent callers missing on the same key wait for the first one
+        instead of computing the value again.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            ttl: Time to live in seconds
+            namespace: Namespace whose byte budget the entry counts against
+        """
+        value = cls._lookup(key, namespace)
+        if value is not _MISSING:
+            return value
+
+        with cls._lock:
+            inflight = cls._inflight.setdefault(key, [threading.Lock(), 0])
+            inflight[1] += 1
+
+        try:
+            with inflight[0]:
+                # Another caller may have filled the entry while we waited
+                value = cls._lookup(key, namespace, record=False)
+                if value is not _MISSING:
+                    return value
+                value = compute()
+                cls.set(key, value, ttl, namespace)
+                return value
+        finally:
+            with cls._lock:
+                inflight[1] -= 1
+                if inflight[1] == 0:
+                    cls._inflight.pop(key, None)
+
     @classmethod
     def delete(cls, key: str) -> bool:
         """
         Delete an item from cache
-        
+
         Args:
             key: Cache key to delete
-            
+
         Returns:
             True if item was deleted, False if not found
         """
-        if key in cls._cache:
-            del cls._cache[key]
-            return True
-        return False
-    
+        with cls._lock:
+            if key in cls._cache:
+                cls._remove(key)
+                return True
+            return False
+
     @classmethod
     def clear(cls) -> None:
         """Clear all cache entries"""
-        cls._cache.clear()
-    
+        with cls._lock:
+            cls._cache.clear()
+            cls._total_bytes = 0
+            cls._namespace_bytes.clear()
+
     @classmethod
     def get_stats(cls) -> Dict[str, Any]:
         """Get cache statistics"""
-        total_entries = len(cls._cache)
-        expired_entries = sum(
-            1 for entry in cls._cache.values() 
-            if time.time() > entry.get('expires_at', 0)
-        )
-        
-        # Calculate average age of cache entries
-        if total_entries > 0:
+        with cls._lock:
             current_time = time.time()
-            avg_age = sum(
-                current_time - entry.get('created_at', current_time) 
-                for entry in cls._cache.values()
-            ) / total_entries
-        else:
-            avg_age = 0
-            
-        return {
-            'total_entries': total_entries,
-            'expired_entries': expired_entries,
-            'active_entries': total_entries - expired_entries,
-            'avg_age_seconds': round(avg_age, 2),
-            'memory_usage_estimate_kb': total_entries * 2  # Rough estimate
-        }
-    
+            total_entries = len(cls._cache)
+            expired_entries = sum(
+                1 for entry in cls._cache.values()
+                if current_time > entry.get('expires_at', 0)
+            )
+
+            # Calculate average age of cache entries
+            if total_entries > 0:
+                avg_age = sum(
+                    current_time - entry.get('created_at', current_time)
+                    for entry in cls._cache.values()
+                ) / total_entries
+            else:
+                avg_age = 0
+
+            namespace_entries: Dict[str, int] = {}
+            for entry in cls._cache.values():
+                namespace_entries[entry['namespace']] = namespace_entries.get(entry['namespace'], 0) + 1
+
+            namespaces = {}
+            for namespace in set(cls._counters) | set(namespace_entries):
+                counters = cls._counters.get(namespace, {})
+                lookups = counters.get('hits', 0) + counters.get('misses', 0)
+                namespaces[namespace] = {
+                    'entries': namespace_entries.get(namespace, 0),
+                    'bytes': cls._namespace_bytes.get(namespace, 0),
+                    'budget_bytes': cls._namespace_budgets.get(namespace),
+                    'hits': counters.get('hits', 0),
+                    'misses': counters.get('misses', 0),
+                    'evictions': counters.get('evictions', 0),
+                    'expirations': counters.get('expirations', 0),
+                    'hit_rate': round(counters.get('hits', 0) / lookups, 4) if lookups else 0
+                }
+
+            hits = sum(ns['hits'] for ns in namespaces.values())
+            misses = sum(ns['misses'] for ns in namespaces.values())
+
+            return {
+                'total_entries': total_entries,
+                'expired_entries': expired_entries,
+                'active_entries': total_entries - expired_entries,
+                'avg_age_seconds': round(avg_age, 2),
+                'memory_usage_estimate_kb': round(cls._total_bytes / 1024, 2),
+                'max_entries': cls.max_entries,
+                'max_bytes': cls.max_bytes,
+                'hits': hits,
+                'misses': misses,
+                'evictions': sum(ns['evictions'] for ns in namespaces.values()),
+                'expirations': sum(ns['expirations'] for ns in namespaces.values()),
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0,
+                'namespaces': namespaces
+            }
+
+    @classmethod
+    def get_cache_size(cls) -> int:
+        """Estimated size of all cached entries in bytes"""
+        return cls._total_bytes
+
+    @classmethod
+    def get_item_count(cls) -> int:
+        """Number of cached entries, including not yet purged expired ones"""
+        return len(cls._cache)
+
+    @classmethod
+    def get_hit_rate(cls) -> float:
+        """Fraction of lookups served from cache since start-up"""
+        return cls.get_stats()['hit_rate']
+
     @classmethod
     def clear_expired(cls) -> int:
         """
         Clear all expired cache entries
-        
+
         Returns:
             Number of entries cleared
         """
-        expired_keys = [
-            key for key, entry in cls._cache.items()
-            if time.time() > entry.get('expires_at', 0)
-        ]
-        
-        for key in expired_keys:
-            del cls._cache[key]
-            
-        return len(expired_keys)
+        with cls._lock:
+            return cls._purge_expired()
+
+    @classmethod
+    def delete_prefix(cls, prefix: str) -> int:
+        """
+        Delete all items whose key starts with ``prefix``
+
+        Returns:
+            Number of entries deleted
+        """
+        with cls._lock:
+            keys = [key for key in cls._cache if key.startswith(prefix)]
+            for key in keys:
+                cls._remove(key)
+            return len(keys)
+
+
+class RedisCacheBackend:
+    """
+    Cache backend storing pickled entries in Redis
+
+    Lets all API and Celery worker processes share one warm cache. Expiry is
+    left to Redis; hit/miss counters are kept per process.
+    """
+
+    # Calls block on the network, so async callers run them in a thread
+    blocking_io = True
+
+    def __init__(self, url: Optional[str] = None, key_prefix: str = "cache:"):
+        import redis
+
+        self.url = url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(self.url)
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def get(self, key: str, namespace: Optional[str] = None) -> Optional[Any]:
+        """Get an item, None if not found"""
+        raw = self._client.get(self.key_prefix + key)
+        if raw is None:
+            self._counters['misses'] += 1
+            return None
+        self._counters['hits'] += 1
+        return pickle.loads(raw)
+
+    def set(self, key: str, data: Any, ttl: int = CacheManager.DEFAULT_TTL, namespace: Optional[str] = None) -> None:
+        """Set an item with expiration; values that cannot be pickled are not cached"""
+        try:
+            raw = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Result for {key} is not cacheable: {e}")
+            return
+        self._client.set(self.key_prefix + key, raw, ex=max(1, int(ttl)))
+
+    def delete(self, key: str) -> bool:
+        """Delete an item"""
+        return bool(self._client.delete(self.key_prefix + key))
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete all items whose key starts with ``prefix``"""
+        keys = list(self._client.scan_iter(match=self.key_prefix + prefix + "*", count=1000))
+        if keys:
+            self._client.delete(*keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Clear all cache entries"""
+        self.delete_prefix("")
+
+    def clear_expired(self) -> int:
+        """Redis expires keys itself"""
+        return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self._counters['hits'] + self._counters['misses']
+        return {
+            'backend': 'redis',
+            'total_entries': sum(1 for _ in self._client.scan_iter(match=self.key_prefix + "*", count=1000)),
+            'hits': self._counters['hits'],
+            'misses': self._counters['misses'],
+            'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0
+        }
+
+
+_backend: Optional[Any] = None
+
+
+def get_cache_backend():
+    """
+    Return the cache backend used by ``cached``
+
+    Selected with the ``CACHE_BACKEND`` environment variable: ``memory``
+    (default, the in-process ``CacheManager``) or ``redis`` (``REDIS_URL``).
+    Falls back to memory if Redis cannot be reached.
+    """
+    global _backend
+    if _backend is None:
+        if os.getenv("CACHE_BACKEND", "memory").lower() == "redis":
+            try:
+                backend = RedisCacheBackend()
+                backend._client.ping()
+                _backend = backend
+                logger.info(f"Using Redis cache backend at {backend.url}")
+            except Exception as e:
+                logger.warning(f"Redis cache backend unavailable, using in-memory cache: {e}")
+                _backend = CacheManager
+        else:
+            _backend = CacheManager
+    return _backend
+
+
+def set_cache_backend(backend) -> None:
+    """Replace the cache backend (``CacheManager`` or a ``RedisCacheBackend``)"""
+    global _backend
+    _backend = backend
+
+
+def _is_session(value: Any) -> bool:
+    """True for database sessions, which never belong in a cache key"""
+    return isinstance(value, Session)
+
+
+class _UncacheableArgument(TypeError):
+    """A call argument that cannot be represented in a cache key"""
+
+
+def _content_digest(value: Any) -> Optional[str]:
+    """Digest of the contents of pandas and NumPy objects, None for other types"""
+    module = type(value).__module__
+    if module.startswith('pandas') and hasattr(value, 'index'):
+        import pandas as pd
+
+        digest = hashlib.sha1(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        if hasattr(value, 'columns'):
+            digest.update(repr([(str(c), str(t)) for c, t in value.dtypes.items()]).encode('utf-8'))
+        else:
+            digest.update(repr((value.name, str(value.dtype))).encode('utf-8'))
+        return f"{type(value).__name__}:{digest.hexdigest()}"
+    if module == 'numpy' and hasattr(value, 'tobytes') and hasattr(value, 'shape'):
+        if value.dtype.hasobject:
+            raise _UncacheableArgument("object arrays cannot be hashed")
+        digest = hashlib.sha1(value.tobytes())
+        digest.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+        return f"ndarray:{digest.hexdigest()}"
+    return None
+
+
+def _key_default(value: Any) -> Any:
+    """
+    JSON fallback for key arguments that are not JSON types
+
+    Dates, sets, enums, NumPy values and pandas objects are represented by
+    their contents. Any other object would only be representable by its
+    type, so different objects would share cached results; such calls
+    raise ``_UncacheableArgument`` and bypass the cache.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(str(v) for v in value)
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, 'item') and type(value).__module__ == 'numpy' and getattr(value, 'shape', None) == ():
+        return value.item()
+    try:
+        digest = _content_digest(value)
+    except TypeError as e:
+        raise _UncacheableArgument(f"{type(value).__qualname__} argument cannot be hashed: {e}")
+    if digest is not None:
+        return digest
+    raise _UncacheableArgument(f"{type(value).__qualname__} argument has no stable cache key")
+
+
+def make_cache_key(func: Callable, args: tuple, kwargs: dict, key_prefix: str = '') -> str:
+    """
+    Build a stable cache key for a call
+
+    Arguments are bound to the signature (so positional and keyword calls
+    share a key), Session objects and ``db`` are skipped, and the rest is
+    hashed. ``self``/``cls`` are represented by their class, so methods of
+    the (singleton) services share results across instances. A ``ticker``
+    argument is kept readable in the key so all entries of one stock can be
+    dropped with ``invalidate``.
+
+    Returns:
+        ``"<prefix><function>:<ticker>:<hash>"`` (ticker part only when present)
+
+    Raises:
+        _UncacheableArgument: If an argument has no stable representation
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except (TypeError, ValueError):
+        arguments = {'args': list(args), **kwargs}
+
+    key_arguments = {}
+    for name, value in arguments.items():
+        # Sessions (and the conventional ``db`` parameter, even when None)
+        # must not make otherwise identical calls miss each other
+        if name == 'db' or _is_session(value):
+            continue
+        if name in ('self', 'cls'):
+            cls = value if isinstance(value, type) else type(value)
+            value = f"{cls.__module__}.{cls.__qualname__}"
+        if isinstance(value, dict) and any(_is_session(v) for v in value.values()):
+            value = {k: v for k, v in value.items() if not _is_session(v)}
+        key_arguments[name] = value
+
+    payload = json.dumps(key_arguments, sort_keys=True, default=_key_default)
+    digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    cache_key = f"{key_prefix}{func.__name__}:"
+    ticker = key_arguments.get('ticker')
+    if isinstance(ticker, str):
+        cache_key += f"{ticker}:"
+    return cache_key + digest
+
+
+def invalidate(func_name: str, ticker: Optional[str] = None, key_prefix: str = '') -> int:
+    """
+    Drop cached results of a ``cached`` function, optionally for one ticker
+
+    Returns:
+        Number of entries deleted
+    """
+    prefix = f"{key_prefix}{func_name}:"
+    if ticker:
+        prefix += f"{ticker}:"
+    return get_cache_backend().delete_prefix(prefix)
+
+
+# In-flight computations for single-flight async callers: (event loop, key) -> Future.
+# A future can only be awaited on the loop that created it.
+_async_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+# In-flight computations for single-flight sync callers: key -> [lock, waiters]
+_sync_inflight: Dict[str, list] = {}
+_sync_inflight_lock = threading.Lock()
 
 
 # Decorator for function-level caching
-def cached(ttl: int = CacheManager.DEFAULT_TTL, key_prefix: str = ''):
+def cached(ttl: int = CacheManager.DEFAULT_TTL, key_prefix: str = '',
+           namespace: Optional[str] = None, single_flight: bool = False):
     """
     Decorator to cache function results
-    
+
+    Works on plain and ``async`` functions; for coroutine functions the
+    awaited result is cached, not the coroutine. Results are stored in the
+    backend returned by ``get_cache_backend``.
+
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
         key_prefix: Prefix for cache key
-        
+        namespace: Cache namespace for byte budgets and statistics
+            (default: the function name)
+        single_flight: Let concurrent misses on the same key wait for one
+            computation instead of each calling the function
+
     Returns:
         Decorator function
     """
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        cache_namespace = namespace or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            async def backend_call(method: str, *args):
+                backend = get_cache_backend()
+                if getattr(backend, 'blocking_io', False):
+                    return await asyncio.to_thread(getattr(backend, method), *args)
+                return getattr(backend, method)(*args)
+
+            async def compute_async(cache_key: str, args, kwargs):
+                result = await func(*args, **kwargs)
+                await backend_call('set', cache_key, {'result': result}, ttl, cache_namespace)
+                return result
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    cache_key = make_cache_key(func, args, kwargs, key_prefix)
+                except _UncacheableArgument as e:
+                    logger.debug(f"Not caching {func.__name__}: {e}")
+                    return await func(*args, **kwargs)
+
+                cached_result = await backend_call('get', cache_key, cache_namespace)
+                if cached_result is not None:
+                    logger.debug(f"Cache hit for {cache_key}")
+                    return cached_result['result']
+
+                logger.debug(f"Cache miss for {cache_key}")
+                if not single_flight:
+                    return await compute_async(cache_key, args, kwargs)
+
+                loop = asyncio.get_running_loop()
+                inflight_key = (loop, cache_key)
+                inflight = _async_inflight.get(inflight_key)
+                if inflight is not None:
+                    return await asyncio.shield(inflight)
+
+                future = loop.create_future()
+                _async_inflight[inflight_key] = future
+                try:
+                    result = await compute_async(cache_key, args, kwargs)
+                    future.set_result(result)
+                    return result
+                except BaseException as e:
+                    future.set_exception(e)
+                    # Mark the exception as retrieved when nobody was waiting
+                    future.exception()
+                    raise
+                finally:
+                    _async_inflight.pop(inflight_key, None)
+
+            return cast(Callable[..., T], async_wrapper)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> T:
-            # Create cache key from function name, args and kwargs
-            cache_key = key_prefix + func.__name__
-            
-            # Add args to cache key
-            if args:
-                cache_key += '_' + '_'.join(str(arg) for arg in args)
-            
-            # Add kwargs to cache key (sorted for consistency)
-            if kwargs:
-                kwargs_str = '_'.join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-                cache_key += '_' + kwargs_str
-            
+            try:
+                cache_key = make_cache_key(func, args, kwargs, key_prefix)
+            except _UncacheableArgument as e:
+                logger.debug(f"Not caching {func.__name__}: {e}")
+                return func(*args, **kwargs)
+            backend = get_cache_backend()
+
             # Attempt to get from cache
-            cached_result = CacheManager.get(cache_key)
+            cached_result = backend.get(cache_key, cache_namespace)
             if cached_result is not None:
                 logger.debug(f"Cache hit for {cache_key}")
                 return cast(T, cached_result['result'])
-            
+
             # Cache miss, execute function
             logger.debug(f"Cache miss for {cache_key}")
-            result = func(*args, **kwargs)
-            
-            # Store in cache if cacheable
+            if not single_flight:
+                result = func(*args, **kwargs)
+                backend.set(cache_key, {'result': result}, ttl, cache_namespace)
+                return result
+
+            with _sync_inflight_lock:
+                inflight = _sync_inflight.setdefault(cache_key, [threading.Lock(), 0])
+                inflight[1] += 1
             try:
-                # Test if result is JSON serializable
-                json.dumps(result)
-                CacheManager.set(cache_key, {'result': result}, ttl)
-            except (TypeError, OverflowError):
-                # If result is not JSON serializable, don't cache
-                logger.warning(f"Result for {cache_key} is not cacheable (not JSON serializable)")
-            
-            return result
-        
+                with inflight[0]:
+                    # Another caller may have filled the entry while we waited
+                    cached_result = backend.get(cache_key, cache_namespace)
+                    if cached_result is not None:
+                        return cast(T, cached_result['result'])
+                    result = func(*args, **kwargs)
+                    backend.set(cache_key, {'result': result}, ttl, cache_namespace)
+                    return result
+            finally:
+                with _sync_inflight_lock:
+                    inflight[1] -= 1
+                    if inflight[1] == 0:
+                        _sync_inflight.pop(cache_key, None)
+
         return wrapper
-    
+
     return decorator
@@ -85,6 +85,13 @@ def create_indices():
             ON stock_prices (stock_id, date);
         """))
         
+        # Covering index for latest/previous bar per stock
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_stock_prices_stock_interval_date_desc
+            ON stock_prices (stock_id, interval, date DESC)
+            INCLUDE (open, high, low, close, volume);
+        """))
+        
         # Stock indicator indices
         db.execute(text("""
             CREATE INDEX IF NOT EXISTS idx_stock_indicators_stock_id_date 
@@ -118,6 +125,105 @@ def create_indices():
     finally:
         db.close()
 
+def create_unique_price_indexes(bind=None):
+    """
+    Create the (stock_id, date, interval) unique indexes used as ON CONFLICT
+    targets by the bulk upsert path.
+
+    Tables created before the unique constraints were added to the models may
+    hold duplicate rows, so those are removed first (keeping the newest id).
+    The backfill and dedupe scan and lock the whole table, so tables that
+    already have the index (all of them after the first run, and tables
+    created by create_all) are skipped.
+
+    Args:
+        bind: Engine to use instead of the application's (e.g. a loader
+            script's own engine)
+    """
+    bind = bind or engine
+    if bind.dialect.name != "postgresql":
+        # Other dialects get the constraints from create_all only
+        return True
+
+    try:
+        db = SessionLocal(bind=bind)
+
+        for table in ("stock_prices", "stock_indicators"):
+            index_name = f"uq_{table}_stock_date_interval"
+            exists = db.execute(
+                text("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = :name"),
+                {"name": index_name}
+            ).first()
+            if exists:
+                continue
+
+            logger.info(f"Building unique index {index_name}, deduplicating {table} first")
+            db.execute(text(f"UPDATE {table} SET interval = '1d' WHERE interval IS NULL"))
+
+            result = db.execute(text(f"""
+                DELETE FROM {table} a
+                USING {table} b
+                WHERE a.stock_id = b.stock_id
+                  AND a.date = b.date
+                  AND a.interval = b.interval
+                  AND a.id < b.id
+            """))
+            if result.rowcount:
+                logger.info(f"Removed {result.rowcount} duplicate rows from {table}")
+
+            db.execute(text(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {index_name}
+                ON {table} (stock_id, date, interval);
+            """))
+            logger.info(f"Successfully created unique index {index_name}")
+
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error creating unique price indices: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def ensure_ml_model_lookup_columns():
+    """
+    Add the model registry lookup columns (ticker, interval,
+    prediction_horizon) to ml_models tables created before they existed,
+    backfill them from the model name and parameters, and index them.
+    """
+    try:
+        db = SessionLocal()
+
+        for column, column_type in (("ticker", "VARCHAR(20)"), ("interval", "VARCHAR(10)"),
+                                    ("prediction_horizon", "INTEGER")):
+            db.execute(text(f"ALTER TABLE ml_models ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+
+        # Names are "{ticker}_{model_type}_{interval}_{horizon}"
+        result = db.execute(text("""
+            UPDATE ml_models
+            SET ticker = split_part(name, '_', 1),
+                interval = parameters->>'interval',
+                prediction_horizon = (parameters->>'prediction_horizon')::integer
+            WHERE ticker IS NULL
+        """))
+        if result.rowcount:
+            logger.info(f"Backfilled lookup columns of {result.rowcount} ML models")
+
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_ml_models_ticker_active_created
+            ON ml_models (ticker, is_active, created_at);
+        """))
+
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error adding ML model lookup columns: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
 def check_db_health():
     """Check database connection health and performance metrics"""
     try:
@@ -173,5 +279,7 @@ if __name__ == "__main__":
     check_db_health()
     analyze_db_tables()
     create_indices()
+    create_unique_price_indexes()
+    ensure_ml_model_lookup_columns()
     # Only run vacuum during maintenance windows
     # vacuum_db_tables()
@@ -0,0 +1,293 @@
+"""
+Benchmark for the vectorized backtest engine
+
+Compares the vectorized engine in app/core/backtest_engine.py against the
+previous iloc-based loop on synthetic daily bars, checks that both produce
+the same result and reports the speedup.
+
+Usage:
+    python benchmark_backtest.py [--years 10] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.backtest_engine import generate_signal_array, run_backtest_arrays
+
+STRATEGIES = {
+    "golden_cross": {"type": "technical", "parameters": {"fast_ma": 50, "slow_ma": 200}},
+    "fast_cross": {"type": "technical", "parameters": {"fast_ma": 5, "slow_ma": 20}},
+    "rsi": {"type": "technical", "parameters": {"rsi_period": 14, "rsi_threshold": 30}},
+}
+
+
+def legacy_run_backtest(price_data: pd.DataFrame, strategy_params: Dict, initial_capital: float) -> Dict:
+    """Previous row-by-row implementation of run_backtest, kept as the baseline"""
+    # Initialize results
+    trades = []
+    portfolio_value = []
+    cash = initial_capital
+    shares = 0
+    
+    # Get strategy type
+    strategy_type = strategy_params.get('type', 'technical')
+    params = strategy_params.get('parameters', {})
+    
+    # Generate signals based on strategy type
+    signals = legacy_generate_signals(price_data, strategy_type, params)
+    
+    # Simulate trading
+    for i in range(len(price_data)):
+        date = price_data.iloc[i]['date']
+        close_price = price_data.iloc[i]['close']
+        
+        # Check for buy signal
+        if signals[i] == 1 and cash > 0:
+            # Buy as many shares as possible
+            max_shares = int(cash / close_price)
+            if max_shares > 0:
+                shares += max_shares
+                cost = max_shares * close_price
+                cash -= cost
+                
+                trades.append({
+                    'date': date.strftime("%Y-%m-%d"),
+                    'type': 'BUY',
+                    'shares': max_shares,
+                    'price': close_price,
+                    'cost': cost,
+                    'remaining_cash': cash
+                })
+        
+        # Check for sell signal
+        elif signals[i] == -1 and shares > 0:
+            # Sell all shares
+            proceeds = shares * close_price
+            cash += proceeds
+            
+            trades.append({
+                'date': date.strftime("%Y-%m-%d"),
+                'type': 'SELL',
+                'shares': shares,
+                'price': close_price,
+                'proceeds': proceeds,
+                'remaining_cash': cash
+            })
+            
+            shares = 0
+        
+        # Calculate portfolio value
+        portfolio_value.append({
+            'date': date.strftime("%Y-%m-%d"),
+            'close': close_price,
+            'shares': shares,
+            'cash': cash,
+            'value': cash + (shares * close_price)
+        })
+    
+    # Calculate performance metrics
+    if not portfolio_value:
+        return {
+            'trades': [],
+            'portfolio_history': [],
+            'metrics': {
+                'total_return': 0,
+                'total_return_percent': 0,
+                'annualized_return': 0,
+                'max_drawdown': 0,
+                'win_rate': 0,
+                'total_trades': 0
+            }
+        }
+    
+    start_value = initial_capital
+    end_value = portfolio_value[-1]['value']
+    total_return = end_value - start_value
+    total_return_percent = (total_return / start_value) * 100
+    
+    # Calculate max drawdown
+    max_value = start_value
+    max_drawdown = 0
+    
+    for pv in portfolio_value:
+        if pv['value'] > max_value:
+            max_value = pv['value']
+        drawdown = (max_value - pv['value']) / max_value * 100
+        max_drawdown = max(max_drawdown, drawdown)
+    
+    # Calculate win rate
+    winning_trades = 0
+    current_buy = None
+    
+    for trade in trades:
+        if trade['type'] == 'BUY':
+            current_buy = trade
+        elif trade['type'] == 'SELL' and current_buy:
+            if trade['price'] > current_buy['price']:
+                winning_trades += 1
+            current_buy = None
+    
+    win_rate = (winning_trades / (len(trades) // 2)) * 100 if trades and len(trades) >= 2 else 0
+    
+    # Calculate annualized return
+    days = (price_data.iloc[-1]['date'] - price_data.iloc[0]['date']).days
+    annualized_return = ((1 + (total_return / start_value)) ** (365 / days) - 1) * 100 if days > 0 else 0
+    
+    return {
+        'trades': trades,
+        'portfolio_history': portfolio_value[::max(1, len(portfolio_value)//100)],  # Downsample to ~100 points
+        'metrics': {
+            'total_return': round(total_return, 2),
+            'total_return_percent': round(total_return_percent, 2),
+            'annualized_return': round(annualized_return, 2),
+            'max_drawdown': round(max_drawdown, 2),
+            'win_rate': round(win_rate, 2),
+            'total_trades': len(trades),
+            'profitable_trades': winning_trades,
+            'loss_making_trades': (len(trades) // 2) - winning_trades
+        }
+    }
+
+def legacy_generate_signals(price_data: pd.DataFrame, strategy_type: str, params: Dict) -> List[int]:
+    """Previous iloc-based implementation of generate_signals, kept as the baseline"""
+    signals = [0] * len(price_data)
+    
+    if strategy_type == 'technical':
+        # Implement technical strategy signals
+        if 'fast_ma' in params and 'slow_ma' in params:
+            # Golden Cross / Death Cross strategy
+            fast_period = params.get('fast_ma', 50)
+            slow_period = params.get('slow_ma', 200)
+            
+            # Calculate moving averages
+            price_data['fast_ma'] = price_data['close'].rolling(window=fast_period).mean()
+            price_data['slow_ma'] = price_data['close'].rolling(window=slow_period).mean()
+            
+            # Generate signals
+            for i in range(1, len(price_data)):
+                if pd.notna(price_data.iloc[i]['fast_ma']) and pd.notna(price_data.iloc[i]['slow_ma']):
+                    # Buy when fast crosses above slow (Golden Cross)
+                    if (price_data.iloc[i-1]['fast_ma'] <= price_data.iloc[i-1]['slow_ma'] and
+                        price_data.iloc[i]['fast_ma'] > price_data.iloc[i]['slow_ma']):
+                        signals[i] = 1
+                    
+                    # Sell when fast crosses below slow (Death Cross)
+                    elif (price_data.iloc[i-1]['fast_ma'] >= price_data.iloc[i-1]['slow_ma'] and
+                          price_data.iloc[i]['fast_ma'] < price_data.iloc[i]['slow_ma']):
+                        signals[i] = -1
+        
+        elif 'rsi_period' in params and 'rsi_threshold' in params:
+            # RSI strategy
+            rsi_period = params.get('rsi_period', 14)
+            oversold = params.get('rsi_threshold', 30)
+            overbought = params.get('overbought_threshold', 70)
+            
+            # Calculate RSI
+            delta = price_data['close'].diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
+            
+            rs = gain / loss
+            price_data['rsi'] = 100 - (100 / (1 + rs))
+            
+            # Generate signals
+            for i in range(1, len(price_data)):
+                if pd.notna(price_data.iloc[i]['rsi']):
+                    # Buy when RSI crosses below oversold threshold
+                    if (price_data.iloc[i-1]['rsi'] >= oversold and
+                        price_data.iloc[i]['rsi'] < oversold):
+                        signals[i] = 1
+                    
+                    # Sell when RSI crosses above overbought threshold
+                    elif (price_data.iloc[i-1]['rsi'] <= overbought and
+                          price_data.iloc[i]['rsi'] > overbought):
+                        signals[i] = -1
+    
+    elif strategy_type == 'ai':
+        # Simulate AI strategy with random signals for demonstration
+        # In a real implementation, this would use an actual AI model
+        import random
+        
+        # Generate signals with slight upward bias
+        for i in range(len(price_data)):
+            if i > 0 and signals[i-1] != 0:
+                # After a trade, wait a few days
+                continue
+                
+            rand_val = random.random()
+            if rand_val > 0.95:  # 5% chance of buy signal
+                signals[i] = 1
+            elif rand_val < 0.03:  # 3% chance of sell signal
+                signals[i] = -1
+    
+    return signals
+
+
+def vectorized_run_backtest(price_data: pd.DataFrame, strategy_params: Dict, initial_capital: float) -> Dict:
+    """Same entry point as app.api.backtesting.run_backtest"""
+    close = price_data['close'].to_numpy(dtype=np.float64)
+    signals = generate_signal_array(close, strategy_params.get('type', 'technical'),
+                                    strategy_params.get('parameters', {}))
+    return run_backtest_arrays(price_data['date'].to_numpy(), close, signals, initial_capital)
+
+
+def make_price_data(years: int, seed: int = 42) -> pd.DataFrame:
+    """Random-walk daily bars for the given number of years"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=years * 252)
+    close = 5000 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(dates))))
+    return pd.DataFrame({
+        'date': dates,
+        'open': close,
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': rng.integers(1_000_000, 10_000_000, len(dates)),
+    })
+
+
+def best_time(func, repeat: int) -> float:
+    """Best wall-clock time of ``repeat`` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized backtest engine")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation")
+    parser.add_argument("--capital", type=float, default=10000.0, help="Initial capital")
+    args = parser.parse_args()
+
+    price_data = make_price_data(args.years)
+    print(f"{len(price_data)} daily bars ({args.years} years)")
+
+    for name, strategy in STRATEGIES.items():
+        legacy = legacy_run_backtest(price_data.copy(), strategy, args.capital)
+        vectorized = vectorized_run_backtest(price_data, strategy, args.capital)
+        same = legacy['metrics'] == vectorized['metrics'] and len(legacy['trades']) == len(vectorized['trades'])
+
+        legacy_time = best_time(lambda: legacy_run_backtest(price_data.copy(), strategy, args.capital), args.repeat)
+        vectorized_time = best_time(lambda: vectorized_run_backtest(price_data, strategy, args.capital), args.repeat)
+
+        print(
+            f"{name:>14}: legacy {legacy_time * 1000:9.1f} ms | "
+            f"vectorized {vectorized_time * 1000:7.2f} ms | "
+            f"speedup {legacy_time / vectorized_time:7.1f}x | "
+            f"trades {len(vectorized['trades'])} | identical metrics: {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for the compiled financial-lexicon scorer
+
+Checks that FinancialSentimentAnalyzer._analyze_with_vader gives the same
+scores as the previous implementation (word_tokenize every text, rescan
+three tokens for negation at every lexicon hit) on a deterministic golden
+set, then reports the time per 1,000 articles for both, and for the batch
+API, on articles with and without lexicon terms.
+
+Requires nltk with the punkt and vader_lexicon data.
+
+Usage:
+    python benchmark_lexicon_scorer.py [--articles 1000] [--words 300]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from nltk.tokenize import word_tokenize
+
+from app.news_data.sentiment_analysis import FinancialSentimentAnalyzer
+
+FILLER = ("the company said on monday that its quarterly revenue was in line with estimates "
+          "while investors watched the central bank and the enterprise again reported").split()
+
+TRICKY = ["not", "no", "never", "isn't", "don't", "cannot", "profit's", "re-gain", "growth.", "u.s.",
+          "$5", "...", "--", "\"rally\"", "(loss)", "strong,", "weak;", "rise!", "e.g.", "gains",
+          "downgrade:", "n't", "profitn't", "_beat", "beat2"]
+
+
+def legacy_vader(analyzer: FinancialSentimentAnalyzer, text: str):
+    """Previous implementation, kept as the baseline"""
+    if not analyzer.vader or not text:
+        return {"compound": 0.0, "pos": 0.0, "neu": 0.0, "neg": 0.0}
+    scores = analyzer.vader.polarity_scores(text)
+    words = word_tokenize(text.lower())
+    for i, word in enumerate(words):
+        if word in analyzer.financial_lexicon:
+            negation = False
+            for j in range(max(0, i - 3), i):
+                if words[j] in analyzer.negation_terms:
+                    negation = True
+                    break
+            lex_score = analyzer.financial_lexicon[word]
+            if negation:
+                lex_score *= -0.7
+            scores["compound"] = scores["compound"] * 0.7 + lex_score * 0.3
+            scores["compound"] = max(-1.0, min(1.0, scores["compound"]))
+    return scores
+
+
+def golden_texts(analyzer: FinancialSentimentAnalyzer, count: int = 5000, seed: int = 7):
+    """Short texts mixing lexicon terms, negations, punctuation and contractions"""
+    rng = random.Random(seed)
+    pieces = list(analyzer.financial_lexicon) + TRICKY + FILLER
+    separators = [" ", " ", " ", ". ", ", ", "\n", "; ", " - "]
+    texts = ["", "not a strong quarter", "no. profit", "the bank cannot rally", "it isn't growth"]
+    for _ in range(count):
+        texts.append("".join(rng.choice(pieces) + rng.choice(separators) for _ in range(rng.randint(1, 40))))
+    return texts
+
+
+def articles(analyzer: FinancialSentimentAnalyzer, count: int, words: int, term_rate: float, seed: int = 42):
+    rng = random.Random(seed)
+    terms = list(analyzer.financial_lexicon)
+    return [
+        " ".join(rng.choice(terms) if rng.random() < term_rate else rng.choice(FILLER) for _ in range(words))
+        for _ in range(count)
+    ]
+
+
+def timed(function, texts):
+    start = time.perf_counter()
+    function(texts)
+    return (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=300)
+    args = parser.parse_args()
+
+    analyzer = FinancialSentimentAnalyzer()
+    if analyzer.vader is None:
+        sys.exit("VADER is not available (nltk vader_lexicon missing)")
+
+    golden = golden_texts(analyzer)
+    differing = [text for text in golden
+                 if legacy_vader(analyzer, text) != analyzer._analyze_with_vader(text)]
+    batch_differing = sum(a != b for a, b in zip(analyzer._analyze_with_vader_batch(golden),
+                                                 (legacy_vader(analyzer, text) for text in golden)))
+    print(f"golden set: {len(golden)} texts, {len(differing)} differ, {batch_differing} differ in batch")
+    for text in differing[:5]:
+        print(f"  {text!r}")
+
+    for label, rate in (("with terms", 0.02), ("without terms", 0.0)):
+        texts = articles(analyzer, args.articles, args.words, rate)
+        legacy = timed(lambda batch: [legacy_vader(analyzer, text) for text in batch], texts)
+        compiled = timed(lambda batch: [analyzer._analyze_with_vader(text) for text in batch], texts)
+        batched = timed(analyzer._analyze_with_vader_batch, texts)
+        print(f"{label:>14}: legacy {legacy * 1000:8.1f} ms/1k  compiled {compiled * 1000:8.1f} ms/1k  "
+              f"batch {batched * 1000:8.1f} ms/1k")
+
+    if differing or batch_differing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
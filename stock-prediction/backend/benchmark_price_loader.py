@@ -0,0 +1,165 @@
+"""
+Benchmark for the columnar price loader
+
+Compares app/core/price_loader.py against the previous ORM path (load
+StockPrice objects, copy them into a list of dicts, build a DataFrame) on
+synthetic daily bars stored in a temporary SQLite database, and reports
+latency and peak Python memory for each.
+
+Usage:
+    python benchmark_price_loader.py [--years 10] [--repeat 3] [--database-url sqlite:///bench.db]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.models  # noqa: F401  (registers all mappers)
+from app.core.database import Base
+from app.core.price_loader import INDICATOR_COLUMNS, load_price_frame
+from app.models.stocks import Stock, StockIndicator, StockPrice
+
+TICKER = "BENCH.JK"
+
+
+def legacy_load(db, stock_id: int) -> pd.DataFrame:
+    """Previous ORM implementation, kept as the baseline"""
+    prices = db.query(StockPrice).filter(
+        StockPrice.stock_id == stock_id
+    ).order_by(StockPrice.date).all()
+
+    data = []
+    for price in prices:
+        data.append({
+            'date': price.date,
+            'open': price.open,
+            'high': price.high,
+            'low': price.low,
+            'close': price.close,
+            'volume': price.volume
+        })
+    return pd.DataFrame(data)
+
+
+def legacy_load_with_indicators(db, stock_id: int) -> pd.DataFrame:
+    """Previous ORM implementation with a second indicator query matched by date"""
+    df = legacy_load(db, stock_id)
+    indicators = db.query(StockIndicator).filter(
+        StockIndicator.stock_id == stock_id
+    ).order_by(StockIndicator.date).all()
+    by_date = {indicator.date: indicator for indicator in indicators}
+    for column in INDICATOR_COLUMNS:
+        df[column] = [getattr(by_date[d], column) if d in by_date else None for d in df['date']]
+    return df
+
+
+def populate(session_factory, years: int, seed: int = 42) -> int:
+    """Store ``years`` of synthetic daily bars with indicators, returns the stock ID"""
+    rng = np.random.default_rng(seed)
+    bars = years * 252
+    dates = [datetime(2000, 1, 3) + timedelta(days=i) for i in range(bars)]
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    volume = rng.integers(100_000, 5_000_000, bars)
+
+    with session_factory() as db:
+        stock = Stock(ticker=TICKER, name="Benchmark")
+        db.add(stock)
+        db.flush()
+        db.execute(insert(StockPrice), [
+            {
+                "stock_id": stock.id, "date": dates[i], "interval": "1d",
+                "open": close[i] * 0.995, "high": close[i] * 1.01, "low": close[i] * 0.99,
+                "close": close[i], "volume": int(volume[i]),
+            }
+            for i in range(bars)
+        ])
+        db.execute(insert(StockIndicator), [
+            {
+                "stock_id": stock.id, "date": dates[i], "interval": "1d",
+                **{column: float(close[i]) for column in INDICATOR_COLUMNS if column not in ("signal", "notes")},
+                "signal": "HOLD", "notes": "",
+            }
+            for i in range(bars)
+        ])
+        db.commit()
+        return stock.id
+
+
+def measure(session_factory, func, repeat: int):
+    """Best wall time over ``repeat`` runs and peak traced memory of one run"""
+    best = float("inf")
+    for _ in range(repeat):
+        with session_factory() as db:
+            start = time.perf_counter()
+            result = func(db)
+            best = min(best, time.perf_counter() - start)
+
+    with session_factory() as db:
+        tracemalloc.start()
+        func(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar price loader")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation")
+    parser.add_argument("--database-url", default=None, help="Database to use (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.database_url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[Stock.__table__, StockPrice.__table__, StockIndicator.__table__])
+    session_factory = sessionmaker(bind=engine)
+    stock_id = populate(session_factory, args.years)
+    print(f"{args.years * 252} daily bars ({args.years} years)")
+
+    cases = {
+        "prices": (
+            lambda db: legacy_load(db, stock_id),
+            lambda db: load_price_frame(db, stock_id),
+        ),
+        "prices+indicators": (
+            lambda db: legacy_load_with_indicators(db, stock_id),
+            lambda db: load_price_frame(db, stock_id, indicators=INDICATOR_COLUMNS),
+        ),
+    }
+
+    try:
+        for name, (legacy, columnar) in cases.items():
+            legacy_time, legacy_peak, legacy_df = measure(session_factory, legacy, args.repeat)
+            columnar_time, columnar_peak, columnar_df = measure(session_factory, columnar, args.repeat)
+            same = np.allclose(
+                legacy_df["close"].to_numpy(dtype=float), columnar_df["close"].to_numpy(), equal_nan=True
+            ) and len(legacy_df) == len(columnar_df)
+
+            print(
+                f"{name:>18}: ORM {legacy_time * 1000:8.1f} ms, {legacy_peak / 2**20:6.1f} MiB | "
+                f"columnar {columnar_time * 1000:7.1f} ms, {columnar_peak / 2**20:6.1f} MiB | "
+                f"speedup {legacy_time / columnar_time:5.1f}x | same data: {same}"
+            )
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for batched FinBERT sentiment analysis
+
+Runs FinancialSentimentAnalyzer over synthetic news articles item by item
+(``analyze_news_article``, one pipeline call per 512-character chunk) and
+with ``analyze_bulk`` (chunks of all articles in padded mini-batches), and
+reports articles per second and how many labels differ.
+
+Requires ``transformers`` and ``torch``; the ProsusAI/finbert weights are
+downloaded on first use.
+
+Usage:
+    python benchmark_sentiment.py [--articles 200] [--batch-size 32] [--threads 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SENTENCES = [
+    "The bank reported strong quarterly profit, beating analyst expectations.",
+    "Shares fell sharply after the company cut its full-year guidance.",
+    "Coal exporters rallied as commodity prices recovered.",
+    "The regulator opened an investigation into the lender's accounting.",
+    "Retail sales were unchanged from the previous month.",
+    "Analysts downgraded the stock on concerns about slowing growth.",
+    "The telecom operator announced a record dividend payout.",
+    "Investors remained cautious ahead of the central bank decision.",
+]
+
+
+def make_articles(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(count):
+        # Mostly short wire stories, some long features
+        length = rng.choice([2, 3, 5, 8, 20, 40])
+        articles.append({
+            "title": rng.choice(SENTENCES),
+            "description": rng.choice(SENTENCES),
+            "content": " ".join(rng.choice(SENTENCES) for _ in range(length)),
+        })
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="torch CPU threads (default: torch's choice)")
+    args = parser.parse_args()
+
+    os.environ["SENTIMENT_MODEL_TYPE"] = "finbert"
+    os.environ["FINBERT_THREADS"] = str(args.threads)
+    from app.news_data.sentiment_analysis import FinancialSentimentAnalyzer
+
+    analyzer = FinancialSentimentAnalyzer()
+    if analyzer.finbert is None:
+        sys.exit("FinBERT is not available (install transformers and torch)")
+
+    articles = make_articles(args.articles)
+    # Warm up both paths
+    analyzer.analyze_news_article(articles[0])
+    analyzer.analyze_bulk(articles[:4], batch_size=args.batch_size)
+
+    start = time.perf_counter()
+    sequential = [analyzer.analyze_news_article(article) for article in articles]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = analyzer.analyze_bulk(articles, batch_size=args.batch_size)
+    batched_time = time.perf_counter() - start
+
+    differing = sum(
+        a["sentiment_analysis"]["sentiment"] != b["sentiment_analysis"]["sentiment"]
+        for a, b in zip(sequential, batched)
+    )
+    max_score_diff = max(
+        abs(a["sentiment_analysis"]["score"] - b["sentiment_analysis"]["score"])
+        for a, b in zip(sequential, batched)
+    )
+
+    print(f"{len(articles)} articles, batch size {args.batch_size}")
+    print(f"  per item:  {sequential_time:8.2f}s  {len(articles) / sequential_time:8.1f} articles/s")
+    print(f"  batched:   {batched_time:8.2f}s  {len(articles) / batched_time:8.1f} articles/s")
+    print(f"  speedup:   {sequential_time / batched_time:8.1f}x")
+    print(f"  labels differing: {differing}, max score difference: {max_score_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
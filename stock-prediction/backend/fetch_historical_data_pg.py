@@ -6,6 +6,11 @@ Cara penggunaan:
 1. Pastikan PostgreSQL sudah terinstall dan database sudah dibuat
 2. Pastikan kredensial database sudah sesuai di app/core/database.py atau environment variable
 3. Jalankan script ini dengan: python fetch_historical_data_pg.py
+
+Mode --bulk (khusus PostgreSQL) mengalirkan data tiap ticker melalui
+COPY FROM STDIN ke tabel staging lalu menggabungkannya ke stock_prices dan
+stock_indicators dalam satu statement, dengan banyak ticker diproses paralel:
+    python fetch_historical_data_pg.py --ticker-file ../../list_saham.txt --period 5y --bulk --workers 8
 """
 import yfinance as yf
 import pandas as pd
@@ -16,8 +21,10 @@ from sqlalchemy.orm import sessionmaker
 import time
 import logging
 import os
+import io
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from tqdm import tqdm
 from dotenv import load_dotenv
@@ -245,7 +252,7 @@ def get_stock_list():
     try:
         # Import here to avoid circular import
         from app.data.indonesian_stocks import INDONESIAN_STOCKS
-        return list(INDONESIAN_STOCKS.keys())
+        return [stock["ticker"] for stock in INDONESIAN_STOCKS]
     except ImportError:
         logger.warning("Tidak bisa mengimport INDONESIAN_STOCKS, menggunakan daftar default")
         # Daftar default jika tidak bisa import
@@ -269,7 +276,7 @@ def get_stock_id(ticker, session):
             # Jika stock tidak ditemukan, coba cari info dari INDONESIAN_STOCKS
             try:
                 from app.data.indonesian_stocks import INDONESIAN_STOCKS
-                stock_info = INDONESIAN_STOCKS.get(ticker, {})
+                stock_info = next((s for s in INDONESIAN_STOCKS if s["ticker"] == ticker), {})
                 name = stock_info.get("name", ticker)
                 sector = stock_info.get("sector", "Unknown")
             except ImportError:
@@ -413,8 +420,9 @@ def fetch_stock_data(ticker, interval, period, max_retries=3, retry_delay=5):
                 logger.warning(f"Terdapat duplikasi tanggal untuk {ticker}, menghapus duplikasi...")
                 df = df.drop_duplicates('date', keep='first')
             
-            # Pastikan kolom tanggal dalam format yang benar
-            df['date'] = pd.to_datetime(df['date'])
+            # Tanggal dalam UTC tanpa zona waktu, sama untuk semua jalur penyimpanan
+            from app.core.bulk_writer import normalize_dates
+            df['date'] = normalize_dates(df['date'])
             
             # Sortir berdasarkan tanggal untuk memastikan urutan yang benar
             df = df.sort_values('date')
@@ -577,6 +585,207 @@ def save_to_database(ticker, df, interval, session):
         logger.error(traceback.format_exc())
         return 0
 
+# Kolom tabel staging untuk mode --bulk, urutannya sama dengan data COPY
+STAGING_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume',
+                   'sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'rsi_14',
+                   'macd', 'macd_signal', 'macd_histogram',
+                   'bb_upper', 'bb_middle', 'bb_lower']
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+INDICATOR_COLUMNS = STAGING_COLUMNS[6:]
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_stock_data (
+        date TIMESTAMP NOT NULL,
+        open DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        close DOUBLE PRECISION,
+        volume BIGINT,
+        sma_20 DOUBLE PRECISION,
+        sma_50 DOUBLE PRECISION,
+        sma_200 DOUBLE PRECISION,
+        ema_12 DOUBLE PRECISION,
+        ema_26 DOUBLE PRECISION,
+        rsi_14 DOUBLE PRECISION,
+        macd DOUBLE PRECISION,
+        macd_signal DOUBLE PRECISION,
+        macd_histogram DOUBLE PRECISION,
+        bb_upper DOUBLE PRECISION,
+        bb_middle DOUBLE PRECISION,
+        bb_lower DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Satu statement (writable CTE) yang menggabungkan staging ke kedua tabel
+MERGE_STAGING_SQL = """
+    WITH prices AS (
+        INSERT INTO stock_prices (stock_id, date, interval, {price_cols})
+        SELECT %(stock_id)s, date, %(interval)s, {price_cols}
+        FROM staging_stock_data
+        ON CONFLICT (stock_id, date, interval) DO UPDATE SET {price_updates}
+        RETURNING (xmax = 0) AS inserted
+    ), indicators AS (
+        INSERT INTO stock_indicators (stock_id, date, interval, {indicator_cols})
+        SELECT %(stock_id)s, date, %(interval)s, {indicator_cols}
+        FROM staging_stock_data
+        ON CONFLICT (stock_id, date, interval) DO UPDATE SET {indicator_updates}
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM prices WHERE inserted),
+        (SELECT count(*) FROM prices WHERE NOT inserted),
+        (SELECT count(*) FROM indicators WHERE inserted),
+        (SELECT count(*) FROM indicators WHERE NOT inserted)
+""".format(
+    price_cols=', '.join(PRICE_COLUMNS),
+    price_updates=', '.join(f"{c} = EXCLUDED.{c}" for c in PRICE_COLUMNS),
+    indicator_cols=', '.join(INDICATOR_COLUMNS),
+    indicator_updates=', '.join(f"{c} = EXCLUDED.{c}" for c in INDICATOR_COLUMNS),
+)
+
+def load_ticker_file(path):
+    """Membaca daftar ticker dari file seperti list_saham.txt (TICKER<tab>NAMA, dengan header)"""
+    tickers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            code = line.split('\t')[0].strip().upper()
+            if not code or code == 'TICKER':
+                continue
+            tickers.append(code if code.endswith('.JK') else f"{code}.JK")
+    logger.info(f"Membaca {len(tickers)} ticker dari {path}")
+    return tickers
+
+def get_stock_ids(tickers, session):
+    """Mendapatkan ID untuk banyak saham sekaligus, membuat yang belum ada dalam satu commit"""
+    from app.models.stocks import Stock
+    
+    stock_ids = {
+        ticker: stock_id
+        for ticker, stock_id in session.query(Stock.ticker, Stock.id).filter(Stock.ticker.in_(tickers))
+    }
+    
+    missing = [t for t in tickers if t not in stock_ids]
+    if missing:
+        try:
+            from app.data.indonesian_stocks import INDONESIAN_STOCKS
+            stock_infos = {stock["ticker"]: stock for stock in INDONESIAN_STOCKS}
+        except ImportError:
+            stock_infos = {}
+        
+        new_stocks = []
+        for ticker in missing:
+            stock_info = stock_infos.get(ticker, {})
+            new_stocks.append(Stock(
+                ticker=ticker,
+                name=stock_info.get("name", ticker),
+                sector=stock_info.get("sector", "Unknown"),
+                is_active=True,
+                last_updated=datetime.now()
+            ))
+        session.add_all(new_stocks)
+        session.commit()
+        stock_ids.update({stock.ticker: stock.id for stock in new_stocks})
+        logger.info(f"{len(new_stocks)} stock baru ditambahkan")
+    
+    return stock_ids
+
+def copy_to_database(stock_id, df, interval, engine):
+    """Menyimpan data saham melalui COPY FROM STDIN ke tabel staging lalu merge dalam satu statement
+    
+    Returns:
+        Dictionary jumlah baris inserted/updated untuk harga dan indikator
+    """
+    frame = df.reindex(columns=STAGING_COLUMNS)
+    frame['date'] = pd.to_datetime(frame['date'])
+    frame['volume'] = pd.to_numeric(frame['volume'], errors='coerce').round().astype('Int64')
+    for col in INDICATOR_COLUMNS:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep='', date_format='%Y-%m-%d %H:%M:%S')
+    buffer.seek(0)
+    
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CREATE_STAGING_SQL)
+        cursor.copy_expert(
+            f"COPY staging_stock_data ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cursor.execute(MERGE_STAGING_SQL, {'stock_id': stock_id, 'interval': interval})
+        prices_inserted, prices_updated, indicators_inserted, indicators_updated = cursor.fetchone()
+        conn.commit()
+        cursor.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return {
+        'prices_inserted': prices_inserted,
+        'prices_updated': prices_updated,
+        'indicators_inserted': indicators_inserted,
+        'indicators_updated': indicators_updated,
+    }
+
+# Engine per proses worker untuk mode --bulk
+_WORKER_ENGINE = None
+
+def _init_bulk_worker(database_url):
+    """Initializer proses worker: setiap proses memakai koneksi database sendiri"""
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = create_engine(database_url, pool_size=1, max_overflow=0)
+
+def _bulk_load_ticker(ticker, stock_id, intervals_to_process):
+    """Mengambil dan menyimpan semua interval untuk satu ticker di proses worker"""
+    results = []
+    for config in intervals_to_process:
+        interval = config["interval"]
+        df = fetch_stock_data(ticker, interval, config["period"])
+        if df is None or df.empty:
+            logger.warning(f"Tidak ada data untuk disimpan untuk {ticker} interval {interval}")
+            continue
+        stats = copy_to_database(stock_id, df, interval, _WORKER_ENGINE)
+        logger.info(f"COPY {ticker} interval {interval}: {stats}")
+        results.append((interval, stats))
+    return results
+
+def run_bulk_load(stock_list, intervals_to_process, session, workers):
+    """Memuat banyak ticker secara paralel dengan COPY FROM STDIN
+    
+    Returns:
+        Tuple (total statistik, daftar ticker yang gagal)
+    """
+    stock_ids = get_stock_ids(stock_list, session)
+    totals = {
+        'prices_inserted': 0,
+        'prices_updated': 0,
+        'indicators_inserted': 0,
+        'indicators_updated': 0,
+    }
+    failed = []
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker,
+                             initargs=(DATABASE_URL,)) as executor:
+        futures = {
+            executor.submit(_bulk_load_ticker, ticker, stock_ids[ticker], intervals_to_process): ticker
+            for ticker in stock_list
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Memproses saham (bulk)"):
+            ticker = futures[future]
+            try:
+                for interval, stats in future.result():
+                    for key, value in stats.items():
+                        totals[key] += value
+            except Exception as e:
+                logger.error(f"Gagal memuat {ticker} dalam mode bulk: {str(e)}")
+                failed.append(ticker)
+    
+    return totals, failed
+
 def parse_args():
     """Parse command line arguments"""
     import argparse
@@ -596,6 +805,14 @@ def parse_args():
     
     # Argumen untuk memproses semua saham
     parser.add_argument("--all", action="store_true", help="Proses semua saham dalam daftar")
+    parser.add_argument("--ticker-file", type=str,
+                        help="File daftar ticker (format list_saham.txt: TICKER<tab>NAMA)")
+    
+    # Argumen untuk mode bulk (COPY FROM STDIN + worker paralel)
+    parser.add_argument("--bulk", action="store_true",
+                        help="Gunakan COPY FROM STDIN dan merge set-based (hanya PostgreSQL)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1),
+                        help="Jumlah proses worker untuk mode --bulk")
     
     return parser.parse_args()
 
@@ -617,6 +834,8 @@ def main():
         if args.ticker:
             stock_list = [args.ticker]
             logger.info(f"Mengambil data untuk ticker spesifik: {args.ticker}")
+        elif args.ticker_file:
+            stock_list = load_ticker_file(args.ticker_file)
         elif args.all:
             stock_list = get_stock_list()
             logger.info(f"Mengambil data untuk semua {len(stock_list)} saham")
@@ -640,6 +859,21 @@ def main():
             intervals_to_process = INTERVALS_AND_PERIODS
             logger.info(f"Menggunakan {len(intervals_to_process)} interval default")
         
+        if args.bulk:
+            if IS_POSTGRES:
+                # ON CONFLICT membutuhkan unique index (stock_id, date, interval) pada tabel lama
+                from app.utils.db_optimizer import create_unique_price_indexes
+                if not create_unique_price_indexes(engine):
+                    logger.error("Gagal membuat unique index harga, mode bulk dibatalkan")
+                    return
+                logger.info(f"Mode bulk: {len(stock_list)} saham dengan {args.workers} worker")
+                totals, failed = run_bulk_load(stock_list, intervals_to_process, session, args.workers)
+                logger.info(f"Mode bulk selesai: {totals}")
+                if failed:
+                    logger.warning(f"{len(failed)} saham gagal dimuat: {', '.join(failed)}")
+                return
+            logger.warning("Mode --bulk membutuhkan PostgreSQL, menggunakan penyimpanan per baris")
+        
         # Untuk setiap saham
         for ticker in tqdm(stock_list, desc="Memproses saham"):
             logger.info(f"=== Memproses {ticker} ===")